@@ -4,6 +4,7 @@ import { useState, useEffect, useMemo, useCallback, memo } from "react"
 import { Card, CardContent, CardDescription, CardHeader, CardTitle } from "@/components/ui/card"
 import { Button } from "@/components/ui/button"
 import { useToast } from "@/hooks/use-toast"
+import { useEventStream } from "@/hooks/use-event-stream"
 import { api } from "@/lib/api"
 import {
   Users,
@@ -235,12 +236,11 @@ export default function PrincipalSchoolDashboard() {
 
   useEffect(() => {
     fetchDashboardData()
-
-    // Set up real-time updates every 30 seconds
-    const interval = setInterval(() => fetchDashboardData(false), 30000)
-    return () => clearInterval(interval)
   }, [fetchDashboardData])
 
+  // Refresh when the server pushes a change instead of polling
+  useEventStream(["leave_request", "notification"], () => fetchDashboardData(false))
+
   // Manual refresh function
   const handleRefresh = useCallback(() => {
     fetchDashboardData(false)
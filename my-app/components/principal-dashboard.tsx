@@ -76,11 +76,12 @@ export function PrincipalDashboard() {
       setIsLoading(true)
       setError(null)
       try {
-        const [studentsRes, teachersRes, classesRes, attendanceRes] = await Promise.all([
-          api.students.list(),
-          api.teachers.list(),
-          api.classes.list(),
-          api.attendance.list(),
+        // One round trip for the four lists
+        const [studentsRes, teachersRes, classesRes, attendanceRes] = await apiClient.batch([
+          { path: "/students/" },
+          { path: "/teachers/" },
+          { path: "/classes/" },
+          { path: "/attendance/" },
         ])
 
         if (!studentsRes.success || !teachersRes.success || !classesRes.success || !attendanceRes.success) {
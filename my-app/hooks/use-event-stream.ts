@@ -0,0 +1,58 @@
+import * as React from "react"
+import { apiClient } from "@/lib/api"
+
+export type ServerEvent = "notification" | "leave_status" | "leave_request"
+
+const RECONNECT_DELAY_MS = 5000
+
+/**
+ * Subscribe to the server-push stream (/api/events/) and call `onEvent` for
+ * the listed event types. Replaces interval polling: pages refetch only when
+ * the server reports a change, and once after every (re)connect.
+ */
+export function useEventStream(events: ServerEvent[], onEvent: (event: ServerEvent, data: any) => void) {
+  const handler = React.useRef(onEvent)
+  handler.current = onEvent
+  const eventKey = events.join(",")
+
+  React.useEffect(() => {
+    if (typeof window === "undefined" || typeof EventSource === "undefined") return
+    let source: EventSource | null = null
+    let retry: ReturnType<typeof setTimeout> | null = null
+    let closed = false
+    let connectedOnce = false
+
+    const connect = async () => {
+      // The access token expires; touching the API refreshes it before reconnecting
+      if (connectedOnce) await apiClient.ensureFreshToken()
+      const url = apiClient.eventStreamUrl()
+      if (closed || !url) return
+      source = new EventSource(url)
+      source.onopen = () => {
+        // Catch up on anything missed while disconnected
+        if (connectedOnce) eventKey.split(",").forEach((event) => handler.current(event as ServerEvent, null))
+        connectedOnce = true
+      }
+      eventKey.split(",").forEach((event) => {
+        source?.addEventListener(event, (message) => {
+          handler.current(event as ServerEvent, JSON.parse((message as MessageEvent).data))
+        })
+      })
+      source.onerror = () => {
+        // A 401 or a dropped connection closes the stream for good; reopen with a fresh token
+        if (source?.readyState === EventSource.CLOSED) {
+          source = null
+          connectedOnce = true
+          if (!closed) retry = setTimeout(connect, RECONNECT_DELAY_MS)
+        }
+      }
+    }
+
+    connect()
+    return () => {
+      closed = true
+      if (retry) clearTimeout(retry)
+      source?.close()
+    }
+  }, [eventKey])
+}
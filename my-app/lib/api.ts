@@ -22,6 +22,12 @@ export interface User {
     subject?: string;
   };
 }
+export interface BatchRequest {
+  id?: string;
+  method?: "GET" | "POST" | "PUT" | "PATCH" | "DELETE";
+  path: string;
+  body?: any;
+}
 export interface AuthTokens {
   access: string;
   refresh: string;
@@ -113,12 +119,14 @@ class ApiClient {
   private async refreshToken(): Promise<boolean> {
     const refreshToken = this.getRefreshToken();
     if (!refreshToken) return false;
-    const response = await this.request<{ access: string }>("/auth/token/refresh/", {
+    const response = await this.request<{ access: string; refresh?: string }>("/auth/token/refresh/", {
       method: "POST",
       body: JSON.stringify({ refresh: refreshToken }),
     });
     if (response.success && response.data?.access) {
-      this.setAccessToken(response.data.access);
+      // Refresh tokens rotate: the old one is blacklisted as soon as it is used
+      if (response.data.refresh) this.setTokens(response.data.access, response.data.refresh);
+      else this.setAccessToken(response.data.access);
       return true;
     }
     return false;
@@ -150,12 +158,32 @@ class ApiClient {
     return { success: true, message: "Logged out successfully" };
   }
 
+  /** URL of the server-push stream; EventSource cannot send headers, so the token goes in the query. */
+  eventStreamUrl(): string | null {
+    return this.accessToken ? `${this.baseURL}/events/?token=${encodeURIComponent(this.accessToken)}` : null;
+  }
+
+  /** Refresh the access token before reopening the event stream after a 401. */
+  async ensureFreshToken(): Promise<boolean> { return (await this.getCurrentUser()).success; }
+
   async getCurrentUser(): Promise<ApiResponse<User>> { return this.request<User>("/auth/user/"); }
   async get<T>(endpoint: string): Promise<ApiResponse<T>> { return this.request<T>(endpoint); }
   async post<T>(endpoint: string, data: any): Promise<ApiResponse<T>> { return this.request<T>(endpoint, { method: "POST", body: JSON.stringify(data) }); }
   async put<T>(endpoint: string, data: any): Promise<ApiResponse<T>> { return this.request<T>(endpoint, { method: "PUT", body: JSON.stringify(data) }); }
   async patch<T>(endpoint: string, data: any): Promise<ApiResponse<T>> { return this.request<T>(endpoint, { method: "PATCH", body: JSON.stringify(data) }); }
   async delete<T>(endpoint: string): Promise<ApiResponse<T>> { return this.request<T>(endpoint, { method: "DELETE" }); }
+
+  /** Several calls in one round trip through /batch/; each result succeeds or fails on its own. */
+  async batch(requests: BatchRequest[]): Promise<ApiResponse[]> {
+    type BatchResponse = { responses: { status: number; body: any }[] };
+    const response = await this.request<BatchResponse>("/batch/", { method: "POST", body: JSON.stringify({ requests }) });
+    if (!response.success || !response.data) {
+      return requests.map(() => ({ success: false, message: response.message }));
+    }
+    return response.data.responses.map(({ status, body }) => status < 400
+      ? { success: true, data: body }
+      : { success: false, message: body?.detail || body?.message || body?.error || `HTTP Error: ${status}`, errors: body?.errors || {} });
+  }
 }
 
 // --- Singleton Instance and Helper Object ---
@@ -83,6 +83,10 @@ export function AuthProvider({ children }: { children: React.ReactNode }) {
         // Now, we can update our React state with the user object.
         setUser(response.data.user)
         setIsLoading(false)
+        // Login returns a lean user; load the full profile in the background
+        api.auth.getCurrentUser().then((current) => {
+          if (current.success && current.data) setUser(current.data)
+        })
         router.push("/") // Redirect to the dashboard page
         return true
       } else {
@@ -1,14 +1,48 @@
 # api/admin.py
 
 from django.contrib import admin
-from .models import User, UserProfile, SchoolClass, Student, Teacher, Fee, Attendance, LeaveRequest
+from .models import (
+    User, UserProfile, SchoolClass, Student, Teacher, Fee, Payment, Attendance, LeaveRequest, Notification,
+    SubjectRequirement, TeacherUnavailability,
+)
 
 # A simple way to register many models
-admin.site.register(User)
 admin.site.register(UserProfile)
 admin.site.register(SchoolClass)
-admin.site.register(Student)
 admin.site.register(Teacher)
 admin.site.register(Fee)
+admin.site.register(Notification)
 admin.site.register(Attendance)
-admin.site.register(LeaveRequest)
\ No newline at end of file
+admin.site.register(LeaveRequest)
+admin.site.register(SubjectRequirement)
+admin.site.register(TeacherUnavailability)
+
+
+@admin.register(User)
+class UserAdmin(admin.ModelAdmin):
+    # Maintained by api.notifications
+    readonly_fields = ['unread_notifications']
+
+
+@admin.register(Student)
+class StudentAdmin(admin.ModelAdmin):
+    # Maintained by api.fees from the student's fees
+    readonly_fields = ['outstanding_balance']
+
+
+@admin.register(Payment)
+class PaymentAdmin(admin.ModelAdmin):
+    """
+    View only. Payments must go through api.fees.record_payment, which also
+    updates the fee, the FeeSummary rows and the student's balance.
+    """
+    list_display = ['fee', 'amount', 'paid_on', 'method', 'recorded_by']
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def has_delete_permission(self, request, obj=None):
+        return False
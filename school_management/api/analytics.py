@@ -0,0 +1,218 @@
+# api/analytics.py
+"""
+Vectorized analytics for the performance and attendance reports.
+
+Each report pulls its compact columns once into NumPy arrays and computes
+every aggregate from them, instead of issuing one annotate query (or a
+correlated subquery) per statistic. Used by the `generate_reports` command
+and by `ReportViewSet`.
+"""
+
+import numpy as np
+from django.db.models import Count
+from .models import Assignment, AttendanceMonthlyRollup, Grade, SchoolClass, Student
+
+PERCENTILES = [10, 25, 50, 75, 90]
+RATE_BUCKETS = [0, 50, 75, 90, 100.0001]
+
+
+def _group_mean(keys, values):
+    """Return (unique_keys, means, counts) of `values` grouped by `keys`."""
+    unique, inverse = np.unique(keys, return_inverse=True)
+    counts = np.bincount(inverse)
+    sums = np.bincount(inverse, weights=values)
+    return unique, sums / counts, counts
+
+
+def _student_directory(student_ids):
+    """Map student id -> name/class fields used in report rows (one query)."""
+    rows = Student.objects.filter(pk__in=[int(pk) for pk in student_ids]).values(
+        'pk', 'user__first_name', 'user__last_name', 'user__username', 'school_class__name'
+    )
+    return {row.pop('pk'): row for row in rows}
+
+
+def _class_names():
+    return dict(SchoolClass.objects.values_list('pk', 'name'))
+
+
+# --------------------------
+# Performance
+# --------------------------
+
+def load_grade_arrays():
+    """Fetch (student_id, class_id, assignment_id, score) as parallel arrays."""
+    rows = list(Grade.objects.values_list('student_id', 'student__school_class_id', 'assignment_id', 'score'))
+    if not rows:
+        empty = np.array([], dtype=np.int64)
+        return empty, empty, empty, np.array([], dtype=np.float64)
+    data = np.array([(s, c if c is not None else -1, a, score) for s, c, a, score in rows], dtype=np.int64)
+    return data[:, 0], data[:, 1], data[:, 2], data[:, 3].astype(np.float64)
+
+
+def performance_analytics(top_n=10):
+    student_ids, class_ids, assignment_ids, scores = load_grade_arrays()
+    if not scores.size:
+        return {
+            'grade_distribution': [], 'score_percentiles': {}, 'student_performance': [],
+            'class_performance': [], 'assignment_performance': [], 'top_performers': [],
+        }
+
+    values, counts = np.unique(scores.astype(np.int64), return_counts=True)
+    grade_distribution = [{'score': int(v), 'count': int(c)} for v, c in zip(values, counts)]
+    score_percentiles = {f'p{p}': float(v) for p, v in zip(PERCENTILES, np.percentile(scores, PERCENTILES))}
+
+    # Per-student means and a competition ranking (ties share the best rank)
+    students, student_means, student_counts = _group_mean(student_ids, scores)
+    order = np.argsort(-student_means, kind='stable')
+    sorted_means = student_means[order]
+    first_of_value = np.concatenate(([True], sorted_means[1:] != sorted_means[:-1]))
+    ranks_sorted = np.maximum.accumulate(np.where(first_of_value, np.arange(1, len(order) + 1), 0))
+    ranks = np.empty_like(ranks_sorted)
+    ranks[order] = ranks_sorted
+
+    directory = _student_directory(students)
+    student_performance = []
+    for idx, student_id in enumerate(students):
+        row = dict(directory.get(int(student_id), {}))
+        row.update({
+            'avg_score': float(student_means[idx]),
+            'total_assignments': int(student_counts[idx]),
+            'rank': int(ranks[idx]),
+        })
+        student_performance.append(row)
+    top_performers = [student_performance[i] for i in order[:top_n]]
+
+    # Per-class means over all grades of the class's students
+    class_names = _class_names()
+    classes, class_means, class_counts = _group_mean(class_ids, scores)
+    class_performance = [
+        {'class_name': class_names.get(int(c)), 'avg_score': float(m), 'total_grades': int(n)}
+        for c, m, n in zip(classes, class_means, class_counts) if c >= 0
+    ]
+
+    assignments, assignment_means, assignment_counts = _group_mean(assignment_ids, scores)
+    titles = dict(Assignment.objects.filter(pk__in=assignments.tolist()).values_list('pk', 'title'))
+    assignment_performance = [
+        {'title': titles.get(int(a)), 'avg_score': float(m), 'total_submissions': int(n)}
+        for a, m, n in zip(assignments, assignment_means, assignment_counts)
+    ]
+
+    return {
+        'grade_distribution': grade_distribution,
+        'score_percentiles': score_percentiles,
+        'student_performance': student_performance,
+        'class_performance': class_performance,
+        'assignment_performance': assignment_performance,
+        'top_performers': top_performers,
+    }
+
+
+# --------------------------
+# Attendance
+# --------------------------
+
+def load_attendance_arrays():
+    """
+    Fetch (student_id, class_id, month, present, absent, late) from the monthly
+    rollups as parallel arrays; months are numpy datetime64[M].
+    """
+    rows = list(AttendanceMonthlyRollup.objects.values_list(
+        'student_id', 'student__school_class_id', 'month', 'present_count', 'absent_count', 'late_count'
+    ))
+    if not rows:
+        empty = np.array([], dtype=np.int64)
+        return empty, empty, np.array([], dtype='datetime64[M]'), empty, empty, empty
+    student_ids, class_ids, months, present, absent, late = zip(*rows)
+    return (
+        np.array(student_ids, dtype=np.int64),
+        np.array([c if c is not None else -1 for c in class_ids], dtype=np.int64),
+        np.array(months, dtype='datetime64[M]'),
+        np.array(present, dtype=np.int64),
+        np.array(absent, dtype=np.int64),
+        np.array(late, dtype=np.int64),
+    )
+
+
+def attendance_analytics(months=6, at_risk_below=75.0):
+    student_ids, class_ids, month_keys, present, absent, late = load_attendance_arrays()
+    total = present + absent + late
+
+    statistics = {
+        'total_records': int(total.sum()),
+        'present_count': int(present.sum()),
+        'absent_count': int(absent.sum()),
+        'late_count': int(late.sum()),
+    }
+
+    students, inverse = np.unique(student_ids, return_inverse=True)
+    s_present = np.bincount(inverse, weights=present, minlength=len(students))
+    s_absent = np.bincount(inverse, weights=absent, minlength=len(students))
+    s_late = np.bincount(inverse, weights=late, minlength=len(students))
+    s_total = s_present + s_absent + s_late
+    # Present-only rate, matching the historical class average definition
+    with np.errstate(divide='ignore', invalid='ignore'):
+        present_rate = np.where(s_total > 0, s_present * 100.0 / s_total, np.nan)
+        attended_rate = np.where(s_total > 0, (s_present + s_late) * 100.0 / s_total, np.nan)
+
+    directory = _student_directory(students)
+    student_attendance = []
+    for idx, student_id in enumerate(students):
+        row = dict(directory.get(int(student_id), {}))
+        row.update({
+            'total_classes': int(s_total[idx]),
+            'present_count': int(s_present[idx]),
+            'absent_count': int(s_absent[idx]),
+            'late_count': int(s_late[idx]),
+            'attendance_rate': None if np.isnan(attended_rate[idx]) else float(attended_rate[idx]),
+        })
+        student_attendance.append(row)
+
+    # Class averages of per-student present rates
+    student_class = np.full(len(students), -1, dtype=np.int64)
+    student_class[inverse] = class_ids
+    valid = ~np.isnan(present_rate) & (student_class >= 0)
+    class_means = {}
+    if valid.any():
+        classes, means, _ = _group_mean(student_class[valid], present_rate[valid])
+        class_means = dict(zip(classes.tolist(), means.tolist()))
+    class_attendance = [
+        {'name': name, 'total_students': total_students, 'avg_attendance': class_means.get(pk)}
+        for pk, name, total_students in SchoolClass.objects.annotate(
+            total_students=Count('students')
+        ).values_list('pk', 'name', 'total_students')
+    ]
+
+    rated = attended_rate[~np.isnan(attended_rate)]
+    bucket_counts, _ = np.histogram(rated, bins=RATE_BUCKETS)
+    rate_distribution = [
+        {'range': f'{int(lo)}-{int(min(hi, 100))}%', 'students': int(n)}
+        for lo, hi, n in zip(RATE_BUCKETS[:-1], RATE_BUCKETS[1:], bucket_counts)
+    ]
+    rate_percentiles = (
+        {f'p{p}': float(v) for p, v in zip(PERCENTILES, np.percentile(rated, PERCENTILES))} if rated.size else {}
+    )
+    at_risk = [student_attendance[i] for i in np.flatnonzero(attended_rate < at_risk_below)]
+
+    # Monthly trend over the most recent `months` calendar months
+    this_month = np.datetime64('today', 'M')
+    window = this_month - np.arange(months)
+    monthly_trend = []
+    for month in window:
+        mask = month_keys == month
+        monthly_trend.append({
+            'month': str(month),
+            'present': int(present[mask].sum()),
+            'absent': int(absent[mask].sum()),
+            'late': int(late[mask].sum()),
+        })
+
+    return {
+        'attendance_statistics': statistics,
+        'student_attendance': student_attendance,
+        'class_attendance': class_attendance,
+        'rate_distribution': rate_distribution,
+        'rate_percentiles': rate_percentiles,
+        'at_risk_students': at_risk,
+        'monthly_attendance_trend': monthly_trend,
+    }
@@ -0,0 +1,311 @@
+# api/attendance.py
+"""
+Attendance storage helpers.
+
+Raw attendance lives in two tables: `Attendance` holds the current academic
+year and `AttendanceArchive` holds closed years (see the `archive_attendance`
+command). Reads go through `attendance_history`, which picks the table(s) a
+date range needs. Rate and count queries are answered from
+`AttendanceMonthlyRollup`, which is kept in sync by the signal handlers in
+`api.signals`.
+
+When `ATTENDANCE_BITMAP_ENABLED` is set, each student's term is also stored
+as one packed `AttendanceBitmap` row, which dashboards decode in a single
+read instead of fetching one row per day.
+"""
+
+from datetime import date, timedelta
+import numpy as np
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, F, Q, Sum
+from django.db.models.functions import TruncMonth
+from .models import Attendance, AttendanceArchive, AttendanceBitmap, AttendanceMonthlyRollup
+
+ROLLUP_FIELDS = {
+    Attendance.Status.PRESENT: 'present_count',
+    Attendance.Status.ABSENT: 'absent_count',
+    Attendance.Status.LATE: 'late_count',
+}
+
+
+def academic_year_for(day):
+    """Return the calendar year in which the academic year containing `day` starts."""
+    start_month = getattr(settings, 'ACADEMIC_YEAR_START_MONTH', 6)
+    return day.year if day.month >= start_month else day.year - 1
+
+
+def academic_year_start(year):
+    return date(year, getattr(settings, 'ACADEMIC_YEAR_START_MONTH', 6), 1)
+
+
+def current_academic_year_start():
+    return academic_year_start(academic_year_for(date.today()))
+
+
+# --------------------------
+# Routed reads
+# --------------------------
+
+def attendance_history(student, start=None, end=None):
+    """
+    Return a student's attendance between `start` and `end` (inclusive) as a
+    list of dicts shaped like `AttendanceSerializer` output, ordered by date,
+    reading the live table, the archive, or both.
+    """
+    boundary = current_academic_year_start()
+    fields = ('id', 'student_id', 'date', 'status')
+    rows = []
+
+    if start is None or start < boundary:
+        archived = AttendanceArchive.objects.filter(student=student)
+        if start:
+            archived = archived.filter(date__gte=start)
+        if end:
+            archived = archived.filter(date__lte=end)
+        rows.extend(archived.values_list(*fields))
+
+    if end is None or end >= boundary:
+        live = Attendance.objects.filter(student=student)
+        if start:
+            live = live.filter(date__gte=start)
+        if end:
+            live = live.filter(date__lte=end)
+        rows.extend(live.values_list(*fields))
+
+    rows.sort(key=lambda row: row[2])
+    return [
+        {'id': pk, 'student': student_id, 'date': day, 'status': status}
+        for pk, student_id, day, status in rows
+    ]
+
+
+def attendance_totals(student_ids=None, start=None, end=None):
+    """
+    Sum rollup counters, optionally restricted to students and a month range.
+    Returns a dict with present/absent/late/total counts.
+    """
+    rollups = AttendanceMonthlyRollup.objects.all()
+    if student_ids is not None:
+        rollups = rollups.filter(student_id__in=student_ids)
+    if start:
+        rollups = rollups.filter(month__gte=start.replace(day=1))
+    if end:
+        rollups = rollups.filter(month__lte=end)
+    totals = rollups.aggregate(
+        present=Sum('present_count'), absent=Sum('absent_count'), late=Sum('late_count')
+    )
+    totals = {key: value or 0 for key, value in totals.items()}
+    totals['total'] = totals['present'] + totals['absent'] + totals['late']
+    return totals
+
+
+def attendance_rate(student, start=None, end=None):
+    """Percentage of recorded days the student was present or late, from rollups."""
+    totals = attendance_totals([student.pk], start, end)
+    if not totals['total']:
+        return None
+    return (totals['present'] + totals['late']) / totals['total'] * 100
+
+
+# --------------------------
+# Rollup maintenance
+# --------------------------
+
+def apply_rollup_delta(student_id, day, status, delta):
+    """Add `delta` to the rollup counter for one (student, month, status)."""
+    field = ROLLUP_FIELDS.get(status)
+    if field is None:
+        return
+    if isinstance(day, str):
+        day = date.fromisoformat(day)
+    month = day.replace(day=1)
+    rollup, _ = AttendanceMonthlyRollup.objects.get_or_create(student_id=student_id, month=month)
+    AttendanceMonthlyRollup.objects.filter(pk=rollup.pk).update(**{field: F(field) + delta})
+
+
+def _monthly_counts(queryset):
+    return queryset.annotate(month=TruncMonth('date')).values('student_id', 'month').annotate(
+        present=Count('id', filter=Q(status=Attendance.Status.PRESENT)),
+        absent=Count('id', filter=Q(status=Attendance.Status.ABSENT)),
+        late=Count('id', filter=Q(status=Attendance.Status.LATE)),
+    ).order_by()
+
+
+@transaction.atomic
+def rebuild_rollups(student_ids=None):
+    """Recompute rollups from the live and archived rows. Returns the number of rollup rows."""
+    live = Attendance.objects.all()
+    archived = AttendanceArchive.objects.all()
+    rollups = AttendanceMonthlyRollup.objects.all()
+    if student_ids is not None:
+        live = live.filter(student_id__in=student_ids)
+        archived = archived.filter(student_id__in=student_ids)
+        rollups = rollups.filter(student_id__in=student_ids)
+    rollups.delete()
+
+    counters = {}
+    for row in list(_monthly_counts(live)) + list(_monthly_counts(archived)):
+        month = row['month'].date() if hasattr(row['month'], 'date') else row['month']
+        key = (row['student_id'], month)
+        current = counters.setdefault(key, [0, 0, 0])
+        current[0] += row['present']
+        current[1] += row['absent']
+        current[2] += row['late']
+
+    AttendanceMonthlyRollup.objects.bulk_create(
+        [AttendanceMonthlyRollup(
+            student_id=student_id, month=month,
+            present_count=present, absent_count=absent, late_count=late,
+        ) for (student_id, month), (present, absent, late) in counters.items()],
+        batch_size=1000,
+    )
+    return len(counters)
+
+
+# --------------------------
+# Archiving
+# --------------------------
+
+def archive_before(cutoff, batch_size=5000):
+    """
+    Move live attendance rows dated before `cutoff` into the archive table in
+    batches. Rollups are unaffected because they already cover both tables.
+    Returns the number of rows moved.
+    """
+    moved = 0
+    while True:
+        with transaction.atomic():
+            batch = list(
+                Attendance.objects.filter(date__lt=cutoff)
+                .order_by('id').values('id', 'student_id', 'date', 'status')[:batch_size]
+            )
+            if not batch:
+                break
+            AttendanceArchive.objects.bulk_create(
+                [AttendanceArchive(
+                    student_id=row['student_id'], date=row['date'], status=row['status'],
+                    academic_year=academic_year_for(row['date']),
+                ) for row in batch],
+                ignore_conflicts=True,
+            )
+            # Bypass the rollup signals: archived rows are still counted
+            Attendance.objects.filter(id__in=[row['id'] for row in batch])._raw_delete(Attendance.objects.db)
+            moved += len(batch)
+    return moved
+
+
+# --------------------------
+# Compact bitmap store
+# --------------------------
+
+BITMAP_CODES = {
+    Attendance.Status.PRESENT: 1,
+    Attendance.Status.ABSENT: 2,
+    Attendance.Status.LATE: 3,
+}
+BITMAP_STATUSES = {code: status for status, code in BITMAP_CODES.items()}
+_SHIFTS = np.array([0, 2, 4, 6], dtype=np.uint8)
+
+
+def bitmap_enabled():
+    return getattr(settings, 'ATTENDANCE_BITMAP_ENABLED', False)
+
+
+def term_start_for(day):
+    return academic_year_start(academic_year_for(day))
+
+
+def decode_bitmap(packed):
+    """Unpack a bitmap blob into a uint8 array of per-day codes."""
+    raw = np.frombuffer(bytes(packed), dtype=np.uint8)
+    return ((raw[:, None] >> _SHIFTS) & 3).reshape(-1)
+
+
+def encode_bitmap(codes):
+    """Pack an array of per-day codes (0-3) into bytes, four days per byte."""
+    codes = np.asarray(codes, dtype=np.uint8)
+    padded = np.zeros(-(-len(codes) // 4) * 4, dtype=np.uint8)
+    padded[:len(codes)] = codes
+    return (padded.reshape(-1, 4) << _SHIFTS).sum(axis=1, dtype=np.uint8).tobytes()
+
+
+def set_bitmap_day(student_id, day, status):
+    """Record `status` (or clear the day when None) in the student's term bitmap."""
+    if isinstance(day, str):
+        day = date.fromisoformat(day)
+    term_start = term_start_for(day)
+    index = (day - term_start).days
+    with transaction.atomic():
+        bitmap, _ = AttendanceBitmap.objects.select_for_update().get_or_create(
+            student_id=student_id, term_start=term_start
+        )
+        packed = bytearray(bytes(bitmap.days))
+        if len(packed) <= index // 4:
+            if status is None:
+                return
+            packed.extend(b'\x00' * (index // 4 + 1 - len(packed)))
+        shift = (index % 4) * 2
+        packed[index // 4] = (packed[index // 4] & ~(3 << shift) & 0xFF) | (BITMAP_CODES.get(status, 0) << shift)
+        AttendanceBitmap.objects.filter(pk=bitmap.pk).update(days=bytes(packed))
+
+
+def bitmap_records(codes, term_start):
+    """Return (date, status) pairs for every recorded day in a decoded bitmap."""
+    indexes = np.flatnonzero(codes)
+    return [(term_start + timedelta(days=int(i)), BITMAP_STATUSES[int(codes[i])]) for i in indexes]
+
+
+def bitmap_summary(codes, term_start):
+    """
+    Vectorized term statistics: attendance rate, current and longest streak of
+    attended days (present or late), and the list of absent dates.
+    """
+    recorded = codes[codes > 0]
+    attended = (recorded == BITMAP_CODES[Attendance.Status.PRESENT]) | (recorded == BITMAP_CODES[Attendance.Status.LATE])
+    # Run boundaries of consecutive attended (recorded) days
+    edges = np.diff(np.concatenate(([0], attended.astype(np.int8), [0])))
+    run_lengths = np.flatnonzero(edges == -1) - np.flatnonzero(edges == 1)
+    absent_indexes = np.flatnonzero(codes == BITMAP_CODES[Attendance.Status.ABSENT])
+    return {
+        'recorded_days': int(recorded.size),
+        'attendance_rate': float(attended.mean() * 100) if recorded.size else None,
+        'current_streak': int(run_lengths[-1]) if run_lengths.size and attended[-1] else 0,
+        'longest_streak': int(run_lengths.max()) if run_lengths.size else 0,
+        'absent_days': [term_start + timedelta(days=int(i)) for i in absent_indexes],
+    }
+
+
+def load_term_bitmap(student, day=None):
+    """Return (codes, term_start) for the term containing `day` (default today)."""
+    term_start = term_start_for(day or date.today())
+    packed = AttendanceBitmap.objects.filter(student=student, term_start=term_start).values_list('days', flat=True).first()
+    return decode_bitmap(packed or b''), term_start
+
+
+@transaction.atomic
+def rebuild_bitmaps(student_ids=None):
+    """Rebuild term bitmaps from the live and archived rows. Returns the number of bitmaps written."""
+    live = Attendance.objects.all()
+    archived = AttendanceArchive.objects.all()
+    bitmaps = AttendanceBitmap.objects.all()
+    if student_ids is not None:
+        live = live.filter(student_id__in=student_ids)
+        archived = archived.filter(student_id__in=student_ids)
+        bitmaps = bitmaps.filter(student_id__in=student_ids)
+    bitmaps.delete()
+
+    terms = {}
+    for queryset in (live, archived):
+        for student_id, day, status in queryset.values_list('student_id', 'date', 'status').iterator():
+            term_start = term_start_for(day)
+            codes = terms.setdefault((student_id, term_start), np.zeros(366, dtype=np.uint8))
+            codes[(day - term_start).days] = BITMAP_CODES.get(status, 0)
+
+    AttendanceBitmap.objects.bulk_create(
+        [AttendanceBitmap(student_id=student_id, term_start=term_start, days=encode_bitmap(np.trim_zeros(codes, 'b')))
+         for (student_id, term_start), codes in terms.items()],
+        batch_size=1000,
+    )
+    return len(terms)
+
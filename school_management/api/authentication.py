@@ -0,0 +1,275 @@
+# api/authentication.py
+"""
+Stateless JWT authentication from signed claims.
+
+Tokens issued by `CustomTokenObtainPairSerializer` carry the user's
+username, role, staff/superuser flags and teacher/student profile ids
+(`token_claims`). `ClaimsJWTAuthentication` builds `request.user` from them
+without a query: the instance has those fields loaded and every other field
+deferred, loaded together in one query on first access. Tokens without the
+claims (issued before this backend) fall back to the usual user lookup.
+
+Claims go stale when a user's role, flags, password or profiles change. The
+signal handlers then call `revoke_user_tokens`, which upserts the time into
+the user's `TokenRevocation` row. Each process keeps a read-through copy of
+the rows that can still matter, re-read at most every
+`AUTH_REVOCATION_REFRESH_SECONDS`, so most requests need no auth queries at
+all. Tokens whose claims predate a revocation are
+rejected; refreshing re-reads the claims from the database. A password
+change (or a disabled password) also rejects the refresh tokens issued
+before it (`refresh_revoked`), so it ends every session.
+
+Logout and refresh rotation blacklist token ids in simplejwt's
+`token_blacklist` tables. `jti_blacklist` mirrors the unexpired ones in an
+in-process set that is synced incrementally every
+`AUTH_BLACKLIST_SYNC_SECONDS`, so checking a refresh or access token costs a
+dict lookup instead of a query.
+"""
+
+import threading
+import time
+import uuid
+from datetime import timedelta
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS
+from django.utils import timezone
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidToken, TokenError
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.token_blacklist.models import BlacklistedToken, OutstandingToken
+from rest_framework_simplejwt.tokens import RefreshToken
+from rest_framework_simplejwt.utils import datetime_from_epoch
+from . import identity
+from .models import Student, Teacher, TokenRevocation, User
+
+
+def token_claims(user):
+    """Claims embedded in tokens at sign-in; `claims_at` dates them for revocation."""
+    return {
+        'username': user.username,
+        'role': user.role,
+        'is_staff': user.is_staff,
+        'is_superuser': user.is_superuser,
+        'teacher_id': Teacher.objects.filter(pk=user.pk).values_list('pk', flat=True).first(),
+        'student_id': Student.objects.filter(pk=user.pk).values_list('pk', flat=True).first(),
+        'claims_at': time.time(),
+    }
+
+
+# --------------------------
+# Revocation
+# --------------------------
+
+class RevocationCache:
+    """Per-process copy of {user_id: revoked at (epoch seconds)}, read through from TokenRevocation."""
+
+    def __init__(self):
+        self._revoked = {}
+        self._loaded_at = None
+        self._lock = threading.Lock()
+
+    def _horizon(self):
+        # Claims older than a refresh token's lifetime cannot be presented any more
+        return time.time() - api_settings.REFRESH_TOKEN_LIFETIME.total_seconds()
+
+    def revoked_at(self, user_id):
+        now = time.monotonic()
+        if self._loaded_at is None or now - self._loaded_at >= settings.AUTH_REVOCATION_REFRESH_SECONDS:
+            with self._lock:
+                self._revoked = dict(
+                    TokenRevocation.objects.filter(revoked_at__gt=self._horizon()).values_list('user_id', 'revoked_at')
+                )
+                self._loaded_at = now
+        return self._revoked.get(user_id)
+
+    def revoke(self, user_ids, password=False):
+        """Record a revocation now for each of `user_ids`, as one upsert; `password` also ends their sessions."""
+        now = time.time()
+        changed_at = now if password else None
+        TokenRevocation.objects.bulk_create(
+            [TokenRevocation(user_id=user_id, revoked_at=now, password_changed_at=changed_at) for user_id in user_ids],
+            update_conflicts=True, unique_fields=['user_id'],
+            update_fields=['revoked_at', 'password_changed_at'] if password else ['revoked_at'],
+        )
+        TokenRevocation.objects.filter(revoked_at__lte=self._horizon()).delete()
+        with self._lock:
+            for user_id in user_ids:
+                self._revoked[user_id] = now
+
+    def clear(self):
+        """Forget this process's copy; the next lookup re-reads the table."""
+        with self._lock:
+            self._revoked = {}
+            self._loaded_at = None
+
+
+revocations = RevocationCache()
+
+
+def revoke_user_tokens(user_id, password=False):
+    """
+    Reject every token of `user_id` whose claims were issued before now.
+    Refreshing re-reads the claims, unless `password` changed: then the
+    refresh tokens issued before now are rejected as well.
+    """
+    revocations.revoke([user_id], password=password)
+
+
+def refresh_revoked(token):
+    """True when the user's password changed after this refresh token was issued (one query)."""
+    issued_at = token.get('claims_at', token.get('iat', 0))
+    return TokenRevocation.objects.filter(
+        user_id=token[api_settings.USER_ID_CLAIM], password_changed_at__gt=issued_at,
+    ).exists()
+
+
+def claims_revoked(token):
+    revoked_at = revocations.revoked_at(token[api_settings.USER_ID_CLAIM])
+    return revoked_at is not None and token.get('claims_at', 0) < revoked_at
+
+
+# --------------------------
+# Blacklist
+# --------------------------
+
+class JTIBlacklist:
+    """
+    Expiring in-process set of blacklisted token ids ({16-byte id: exp}).
+    Each sync reads only rows blacklisted since the previous one (with some
+    overlap for transactions that commit late) and drops expired ids.
+    """
+
+    overlap = timedelta(minutes=1)
+
+    def __init__(self):
+        self._expires = {}
+        self._synced_at = None
+        self._watermark = None
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _key(jti):
+        try:
+            return uuid.UUID(hex=jti).bytes
+        except (TypeError, ValueError):
+            return jti
+
+    def add(self, jti, exp):
+        self._expires[self._key(jti)] = exp
+
+    def sync(self):
+        with self._lock:
+            started = timezone.now()
+            rows = BlacklistedToken.objects.filter(token__expires_at__gt=started)
+            if self._watermark is not None:
+                rows = rows.filter(blacklisted_at__gte=self._watermark - self.overlap)
+            for jti, expires_at in rows.values_list('token__jti', 'token__expires_at').iterator():
+                self.add(jti, expires_at.timestamp())
+            now = time.time()
+            self._expires = {key: exp for key, exp in self._expires.items() if exp > now}
+            self._watermark = started
+            self._synced_at = time.monotonic()
+
+    def __contains__(self, jti):
+        if self._synced_at is None or time.monotonic() - self._synced_at >= settings.AUTH_BLACKLIST_SYNC_SECONDS:
+            self.sync()
+        exp = self._expires.get(self._key(jti))
+        return exp is not None and exp > time.time()
+
+    def __len__(self):
+        return len(self._expires)
+
+    def clear(self):
+        with self._lock:
+            self._expires = {}
+            self._synced_at = None
+            self._watermark = None
+
+
+jti_blacklist = JTIBlacklist()
+
+
+def blacklist_token(token, user_id=None):
+    """Blacklist any token (refresh or access) in the database and in this process's set."""
+    jti, exp = token[api_settings.JTI_CLAIM], token['exp']
+    outstanding, _ = OutstandingToken.objects.get_or_create(jti=jti, defaults={
+        'user_id': user_id if user_id is not None else token.get(api_settings.USER_ID_CLAIM),
+        'token': str(token),
+        'expires_at': datetime_from_epoch(exp),
+    })
+    BlacklistedToken.objects.get_or_create(token=outstanding)
+    jti_blacklist.add(jti, exp)
+
+
+class SchoolRefreshToken(RefreshToken):
+    """Refresh token whose blacklist check reads the in-process set instead of querying."""
+
+    def check_blacklist(self):
+        if self.payload[api_settings.JTI_CLAIM] in jti_blacklist:
+            raise TokenError('Token is blacklisted')
+
+    def blacklist(self):
+        blacklist_token(self)
+
+
+# --------------------------
+# Authentication
+# --------------------------
+
+def _load_deferred(user, using=None, fields=None):
+    # Touching any deferred field loads all of them in one query rather than one query per field
+    if fields is not None:
+        fields = set(fields) | user.get_deferred_fields()
+    User.refresh_from_db(user, using=using, fields=fields)
+
+
+def user_from_claims(token):
+    values = {
+        'id': token[api_settings.USER_ID_CLAIM], 'username': token['username'], 'role': token['role'],
+        'is_staff': token['is_staff'], 'is_superuser': token['is_superuser'], 'is_active': True,
+    }
+    # from_db expects the loaded values in model field order
+    names = [field.attname for field in User._meta.concrete_fields if field.attname in values]
+    user = User.from_db(DEFAULT_DB_ALIAS, names, [values[name] for name in names])
+    user.refresh_from_db = lambda using=None, fields=None: _load_deferred(user, using, fields)
+    user.claims = {'teacher_id': token.get('teacher_id'), 'student_id': token.get('student_id')}
+    return user
+
+
+def teacher_id_for(user):
+    """The user's Teacher pk (None without a profile), from the token claims when present."""
+    claims = getattr(user, 'claims', None)
+    if claims is not None:
+        return claims['teacher_id']
+    if identity.current() is not None:
+        teacher = identity.get(Teacher, user.pk)
+        return teacher.pk if teacher else None
+    return Teacher.objects.filter(pk=user.pk).values_list('pk', flat=True).first()
+
+
+def student_id_for(user):
+    """The user's Student pk (None without a profile), from the token claims when present."""
+    claims = getattr(user, 'claims', None)
+    if claims is not None:
+        return claims['student_id']
+    if identity.current() is not None:
+        student = identity.get(Student, user.pk)
+        return student.pk if student else None
+    return Student.objects.filter(pk=user.pk).values_list('pk', flat=True).first()
+
+
+class ClaimsJWTAuthentication(JWTAuthentication):
+    """JWT authentication that trusts the signed user claims instead of loading the user row."""
+
+    def get_validated_token(self, raw_token):
+        token = super().get_validated_token(raw_token)
+        if token.get(api_settings.JTI_CLAIM) in jti_blacklist:
+            raise InvalidToken('Token is blacklisted')
+        return token
+
+    def get_user(self, validated_token):
+        if 'role' not in validated_token:
+            return super().get_user(validated_token)
+        if claims_revoked(validated_token):
+            raise AuthenticationFailed('Token claims are out of date; sign in again.', code='claims_revoked')
+        return user_from_claims(validated_token)
@@ -0,0 +1,149 @@
+# api/batch.py
+"""
+Batched API requests (`POST /api/batch/`).
+
+The body lists sub-requests against the existing API routes:
+
+    {"requests": [{"id": "students", "method": "GET", "path": "/students/?page=2"},
+                  {"id": "leave", "method": "POST", "path": "/leaves/", "body": {...}}]}
+
+Paths are relative to `/api`, as in the frontend's `apiClient` (a leading
+`/api` is accepted too). Each sub-request is resolved and dispatched to its
+view in this process, in order, as the already authenticated batch user.
+So the token is checked once per batch instead of once per call, and the
+sub-requests share one identity map (`api.identity`), emptied after every
+write so later reads see its effects.
+
+Every sub-request succeeds or fails on its own. The batch answers 200 with
+one `{"id", "status", "body"}` per sub-request, in order. An error in one
+sub-request gives that item an error status and does not affect the others.
+Writes run in their own transaction (a savepoint), so a failed write rolls
+back only itself.
+
+The sub-requests skip the middleware: no page cache, and metrics and
+profiling count the batch as one request. Streams (`/api/events/`) and
+nested batches are rejected.
+"""
+
+import io
+import json
+import logging
+from asgiref.sync import async_to_sync, iscoroutinefunction
+from django.conf import settings
+from django.core.exceptions import PermissionDenied
+from django.core.handlers.wsgi import WSGIRequest
+from django.db import transaction
+from django.http import Http404
+from django.urls import Resolver404, resolve
+from django.utils.http import urlencode
+from rest_framework import exceptions
+from . import identity
+
+logger = logging.getLogger(__name__)
+
+API_PREFIX = '/api'
+METHODS = ('GET', 'HEAD', 'OPTIONS', 'POST', 'PUT', 'PATCH', 'DELETE')
+READ_METHODS = ('GET', 'HEAD', 'OPTIONS')
+# Request-specific keys not carried over from the batch request to its sub-requests
+_PER_REQUEST_META = {
+    'PATH_INFO', 'QUERY_STRING', 'REQUEST_METHOD', 'CONTENT_TYPE', 'CONTENT_LENGTH',
+    'HTTP_CONTENT_TYPE', 'HTTP_CONTENT_LENGTH', 'wsgi.input',
+}
+_REJECTED = (f'{API_PREFIX}/batch/', f'{API_PREFIX}/events/')
+
+
+def parse_requests(data):
+    """The validated sub-requests as [(id, method, path, query string, body)]; raises ValidationError."""
+    items = data.get('requests') if isinstance(data, dict) else None
+    if not isinstance(items, list) or not items:
+        raise exceptions.ValidationError({'requests': 'A non-empty list of sub-requests is required.'})
+    if len(items) > settings.BATCH_MAX_REQUESTS:
+        raise exceptions.ValidationError(
+            {'requests': f'At most {settings.BATCH_MAX_REQUESTS} sub-requests are allowed per batch.'}
+        )
+    parsed = []
+    for index, item in enumerate(items):
+        if not isinstance(item, dict) or not isinstance(item.get('path'), str) or not item['path'].startswith('/'):
+            raise exceptions.ValidationError({'requests': f'Sub-request {index} needs a "path" starting with "/".'})
+        method = str(item.get('method', 'GET')).upper()
+        if method not in METHODS:
+            raise exceptions.ValidationError({'requests': f'Sub-request {index} has an unsupported method.'})
+        path, _, query = item['path'].partition('?')
+        if isinstance(item.get('query'), dict):
+            query = '&'.join(part for part in (query, urlencode(item['query'], doseq=True)) if part)
+        if not (path == API_PREFIX or path.startswith(API_PREFIX + '/')):
+            path = API_PREFIX + path
+        parsed.append((item.get('id', index), method, path, query, item.get('body')))
+    return parsed
+
+
+def _sub_request(request, method, path, query, body):
+    environ = {key: value for key, value in request.META.items() if key not in _PER_REQUEST_META}
+    payload = b'' if body is None else json.dumps(body).encode()
+    environ.update({
+        'REQUEST_METHOD': method,
+        'PATH_INFO': path,
+        'QUERY_STRING': query,
+        'CONTENT_TYPE': 'application/json',
+        'CONTENT_LENGTH': str(len(payload)),
+        'wsgi.input': io.BytesIO(payload),
+        'wsgi.url_scheme': request.scheme,
+    })
+    sub = WSGIRequest(environ)
+    # The batch request was authenticated already; DRF's Request takes these as forced authentication
+    sub._force_auth_user = request.user
+    sub._force_auth_token = request.auth
+    return sub
+
+
+def _body(response):
+    if getattr(response, 'render', None) is not None and not response.is_rendered:
+        response.render()
+    if not response.content:
+        return None
+    if response.get('Content-Type', '').startswith('application/json'):
+        return json.loads(response.content)
+    return response.content.decode(response.charset, errors='replace')
+
+
+def _dispatch(request, item_id, method, path, query, body):
+    if path.startswith(_REJECTED):
+        return {'id': item_id, 'status': 400, 'body': {'detail': 'This endpoint cannot be used in a batch.'}}
+    sub = _sub_request(request, method, path, query, body)
+    try:
+        match = resolve(path, getattr(request, 'urlconf', None))
+    except Resolver404:
+        return {'id': item_id, 'status': 404, 'body': {'detail': 'Not found.'}}
+    sub.resolver_match = match
+    view = async_to_sync(match.func) if iscoroutinefunction(match.func) else match.func
+    try:
+        if method in READ_METHODS:
+            response = view(sub, *match.args, **match.kwargs)
+        else:
+            with transaction.atomic():
+                response = view(sub, *match.args, **match.kwargs)
+                if response.status_code >= 400:
+                    transaction.set_rollback(True)
+        if response.streaming:
+            response.close()
+            return {'id': item_id, 'status': 400, 'body': {'detail': 'Streaming responses cannot be batched.'}}
+        return {'id': item_id, 'status': response.status_code, 'body': _body(response)}
+    except Http404:
+        return {'id': item_id, 'status': 404, 'body': {'detail': 'Not found.'}}
+    except PermissionDenied:
+        return {'id': item_id, 'status': 403, 'body': {'detail': 'You do not have permission to perform this action.'}}
+    except Exception:
+        logger.exception('Batch sub-request %s %s failed', method, path)
+        return {'id': item_id, 'status': 500, 'body': {'detail': 'Internal server error.'}}
+
+
+def run_batch(request, items):
+    """The responses to the parsed sub-requests of a DRF `request`, in order."""
+    responses = []
+    with identity.identity_scope() as identity_map:
+        for item in items:
+            responses.append(_dispatch(request, *item))
+            if item[1] not in READ_METHODS:
+                # A write may have changed rows without signals (raw SQL, rolled back savepoints)
+                identity_map.clear()
+    return responses
@@ -0,0 +1,24 @@
+# api/checks.py
+"""System checks for settings that otherwise fail only on first use."""
+
+import importlib.util
+from django.conf import settings
+from django.core.checks import Error, register
+from .hasher_profiles import HASHER_PROFILES, PROFILE_LIBRARIES
+
+
+@register()
+def check_password_hasher_profile(app_configs, **kwargs):
+    profile = getattr(settings, 'PASSWORD_HASHER_PROFILE', 'pbkdf2')
+    if profile not in HASHER_PROFILES:
+        return [Error(
+            f"Unknown PASSWORD_HASHER_PROFILE '{profile}'.",
+            hint=f"Use one of: {', '.join(HASHER_PROFILES)}.", id='api.E001',
+        )]
+    library = PROFILE_LIBRARIES.get(profile)
+    if library and importlib.util.find_spec(library) is None:
+        return [Error(
+            f"PASSWORD_HASHER_PROFILE '{profile}' needs the '{library}' package, which is not installed.",
+            hint=f"pip install {'argon2-cffi' if library == 'argon2' else library}", id='api.E002',
+        )]
+    return []
@@ -0,0 +1,329 @@
+# api/fees.py
+"""
+Fee ledger and aggregate maintenance.
+
+Payments are recorded with `record_payment`, which updates the fee's cached
+`amount_paid` and status. Every fee write then flows through
+`apply_fee_change` (called by the signal handlers in `api.signals`, inside the
+Fee write transaction), which keeps two caches exact:
+
+- `FeeSummary`: fee counts, collected and outstanding totals, overall and per class
+- `Student.outstanding_balance`: the student's total still owed
+
+Bulk paths (`bulk_create`, queryset `update`) bypass the signals and must call
+`rebuild_fee_summary` and `rebuild_student_balances` instead; the installment
+and late-fee schedulers at the end of this module do so.
+"""
+
+import calendar
+from datetime import timedelta
+from decimal import Decimal
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Case, Count, DecimalField, F, OuterRef, Q, Subquery, Sum, Value, When
+from django.db.models.functions import Coalesce, Greatest, Round
+from django.utils import timezone
+from . import identity
+from .models import Fee, FeeSummary, FeeType, Payment, Student
+
+UNPAID_STATUSES = [Fee.Status.UNPAID, Fee.Status.PARTIAL]
+
+
+def is_unpaid(status):
+    return status in UNPAID_STATUSES
+
+
+def total_due_expression(prefix=''):
+    """SQL expression for a fee's amount plus late fee, matching `Fee.total_due`."""
+    return F(f'{prefix}amount') + F(f'{prefix}late_fee')
+
+
+def outstanding_expression(prefix=''):
+    """SQL expression for a fee's balance, matching `Fee.balance`."""
+    return Case(
+        When(**{f'{prefix}status': Fee.Status.PAID}, then=Value(Decimal('0'))),
+        default=Greatest(total_due_expression(prefix) - F(f'{prefix}amount_paid'), Value(Decimal('0'))),
+        output_field=DecimalField(max_digits=12, decimal_places=2),
+    )
+
+
+def fee_snapshot(fee):
+    """The fields of a fee that the aggregates depend on."""
+    amount = Decimal(fee.amount or 0) + Decimal(fee.late_fee or 0)
+    status = fee.status
+    outstanding = Decimal('0') if status == Fee.Status.PAID else max(amount - Decimal(fee.amount_paid or 0), Decimal('0'))
+    return {
+        'student_id': fee.student_id,
+        'class_id': Student.objects.filter(pk=fee.student_id).values_list('school_class_id', flat=True).first(),
+        'amount': amount,
+        'outstanding': outstanding,
+        'status': status,
+    }
+
+
+def _apply_delta(class_id, deltas):
+    """Add `deltas` (field -> amount) to the overall row and the class row."""
+    updates = {field: F(field) + delta for field, delta in deltas.items()}
+    for key, school_class_id in ((FeeSummary.OVERALL, None), (FeeSummary.class_key(class_id), class_id)):
+        summary, _ = FeeSummary.objects.get_or_create(key=key, defaults={'school_class_id': school_class_id})
+        FeeSummary.objects.filter(pk=summary.pk).update(**updates)
+
+
+def apply_fee_change(fee_pk, before, after):
+    """
+    Move a fee's contribution from its `before` snapshot to its `after`
+    snapshot (either may be None for create/delete).
+    """
+    for snapshot, sign in ((before, -1), (after, 1)):
+        if snapshot:
+            _apply_delta(snapshot['class_id'], {
+                'unpaid_count' if is_unpaid(snapshot['status']) else 'paid_count': sign,
+                'paid_total': sign * (snapshot['amount'] - snapshot['outstanding']),
+                'unpaid_total': sign * snapshot['outstanding'],
+            })
+            Student.objects.filter(pk=snapshot['student_id']).update(
+                outstanding_balance=F('outstanding_balance') + sign * snapshot['outstanding']
+            )
+            identity.forget(Student, [snapshot['student_id']])
+
+    # A student is counted once per scope while they have any unpaid fee
+    students = {snapshot['student_id']: snapshot['class_id'] for snapshot in (before, after) if snapshot}
+    for student_id, class_id in students.items():
+        was_unpaid = bool(before and before['student_id'] == student_id and is_unpaid(before['status']))
+        now_unpaid = bool(after and after['student_id'] == student_id and is_unpaid(after['status']))
+        if was_unpaid == now_unpaid:
+            continue
+        others = Fee.objects.filter(student_id=student_id, status__in=UNPAID_STATUSES).exclude(pk=fee_pk).exists()
+        if not others:
+            _apply_delta(class_id, {'unpaid_student_count': 1 if now_unpaid else -1})
+
+
+def _aggregates():
+    unpaid = Q(status__in=UNPAID_STATUSES)
+    return dict(
+        paid_count=Count('id', filter=~unpaid),
+        paid_total=Sum(total_due_expression() - outstanding_expression()),
+        unpaid_count=Count('id', filter=unpaid),
+        unpaid_total=Sum(outstanding_expression()),
+        unpaid_student_count=Count('student', filter=unpaid, distinct=True),
+    )
+
+
+def _clean(values):
+    return {
+        field: values.get(field) or (Decimal('0') if field.endswith('_total') else 0)
+        for field in ('paid_count', 'paid_total', 'unpaid_count', 'unpaid_total', 'unpaid_student_count')
+    }
+
+
+@transaction.atomic
+def rebuild_fee_summary(class_ids=None):
+    """
+    Recompute FeeSummary from the Fee table. With `class_ids`, only those
+    class rows (use None in the list for unassigned students) and the overall
+    row are rebuilt. Returns the number of rows written.
+    """
+    fees = Fee.objects.all()
+    if class_ids is None:
+        FeeSummary.objects.all().delete()
+        per_class = fees.values('student__school_class').annotate(**_aggregates()).order_by()
+    else:
+        FeeSummary.objects.filter(key__in=[FeeSummary.class_key(c) for c in class_ids]).delete()
+        condition = Q(student__school_class__in=[c for c in class_ids if c is not None])
+        if None in class_ids:
+            condition |= Q(student__school_class__isnull=True)
+        per_class = fees.filter(condition).values('student__school_class').annotate(**_aggregates()).order_by()
+
+    rows = [
+        FeeSummary(
+            key=FeeSummary.class_key(values['student__school_class']),
+            school_class_id=values['student__school_class'],
+            **_clean(values),
+        )
+        for values in per_class
+    ]
+    overall = _clean(fees.aggregate(**_aggregates()))
+    FeeSummary.objects.update_or_create(key=FeeSummary.OVERALL, defaults=overall)
+    FeeSummary.objects.bulk_create(rows)
+    return len(rows) + 1
+
+
+def rebuild_student_balances(student_ids=None):
+    """Recompute Student.outstanding_balance with one set-based UPDATE."""
+    balances = Fee.objects.filter(student=OuterRef('pk')).values('student').annotate(
+        total=Sum(outstanding_expression())
+    ).values('total')
+    students = Student.objects.all()
+    if student_ids is not None:
+        students = students.filter(pk__in=student_ids)
+    updated = students.update(outstanding_balance=Coalesce(
+        Subquery(balances, output_field=DecimalField(max_digits=12, decimal_places=2)), Value(Decimal('0'))
+    ))
+    identity.forget(Student, student_ids)
+    return updated
+
+
+# --------------------------
+# Payments
+# --------------------------
+
+class PaymentError(ValueError):
+    pass
+
+
+def record_payment(fee_id, amount, recorded_by=None, **details):
+    """
+    Record a payment against a fee and update its cached amount paid and
+    status. The fee row is locked so concurrent payments cannot overpay it.
+    """
+    amount = Decimal(str(amount))
+    if amount <= 0:
+        raise PaymentError("Payment amount must be positive.")
+    with transaction.atomic():
+        fee = Fee.objects.select_for_update().get(pk=fee_id)
+        if amount > fee.balance:
+            raise PaymentError(f"Payment exceeds the outstanding balance of {fee.balance}.")
+        payment = Payment.objects.create(fee=fee, amount=amount, recorded_by=recorded_by, **details)
+        fee.amount_paid += amount
+        fee.status = Fee.Status.PAID if fee.amount_paid >= fee.total_due else Fee.Status.PARTIAL
+        fee.save(update_fields=['amount_paid', 'status'])
+    return payment
+
+
+def fees_summary():
+    """Dashboard payload for ReportViewSet.fees_summary, read from FeeSummary."""
+    summaries = list(FeeSummary.objects.select_related('school_class'))
+    overall = next((s for s in summaries if s.key == FeeSummary.OVERALL), None) or FeeSummary()
+    class_breakdown = sorted(
+        (s for s in summaries if s.key != FeeSummary.OVERALL and s.unpaid_count),
+        key=lambda s: s.unpaid_total, reverse=True,
+    )
+    return {
+        'pie_chart': {
+            'paid_count': overall.paid_count,
+            'paid_total': overall.paid_total,
+            'unpaid_count': overall.unpaid_count,
+            'unpaid_total': overall.unpaid_total,
+        },
+        'class_breakdown': [
+            {
+                'student__school_class__name': s.school_class.name if s.school_class else None,
+                'total_pending': s.unpaid_total,
+                'student_count': s.unpaid_student_count,
+            }
+            for s in class_breakdown
+        ],
+    }
+
+
+# --------------------------
+# Scheduling
+# --------------------------
+
+# (number of installments, months between due dates) per FeeType.category
+INSTALLMENT_PLANS = {
+    FeeType.Category.ADMISSION: (1, 0),
+    FeeType.Category.ANNUAL: (4, 3),
+    FeeType.Category.TUITION: (10, 1),
+    FeeType.Category.TRANSPORT: (10, 1),
+    FeeType.Category.OTHER: (1, 0),
+}
+
+
+def add_months(day, months):
+    """Shift `day` by whole months, clamping to the end of shorter months."""
+    month_index = day.month - 1 + months
+    year, month = day.year + month_index // 12, month_index % 12 + 1
+    return day.replace(year=year, month=month, day=min(day.day, calendar.monthrange(year, month)[1]))
+
+
+def split_amount(amount, parts):
+    """Split `amount` into `parts` installments to the paisa; the last one absorbs the remainder."""
+    paise = int(Decimal(amount) * 100)
+    share = paise // parts
+    return [Decimal(share) / 100] * (parts - 1) + [Decimal(paise - share * (parts - 1)) / 100]
+
+
+def installment_schedule(fee_type, start):
+    """Return (installment_number, due_date, amount) for a fee type's plan starting at `start`."""
+    count, interval = INSTALLMENT_PLANS.get(fee_type.category, (1, 0))
+    return [
+        (number, add_months(start, (number - 1) * interval), amount)
+        for number, amount in enumerate(split_amount(fee_type.amount, count), start=1)
+    ]
+
+
+@transaction.atomic
+def schedule_installments(fee_type, start, students=None, batch_size=5000):
+    """
+    Create a fee type's installment fees for `students` (a Student queryset,
+    default all) with one bulk insert. Installments that already exist are
+    skipped, so re-running a schedule is harmless. Returns the number created.
+    """
+    students = Student.objects.all() if students is None else students
+    schedule = installment_schedule(fee_type, start)
+    existing = set(Fee.objects.filter(
+        fee_type=fee_type, due_date__in=[due_date for _, due_date, _ in schedule]
+    ).values_list('student_id', 'due_date'))
+
+    fees = []
+    class_ids = set()
+    for student_id, class_id in students.values_list('pk', 'school_class_id').iterator():
+        for number, due_date, amount in schedule:
+            if (student_id, due_date) not in existing:
+                fees.append(Fee(
+                    student_id=student_id, fee_type=fee_type, installment_number=number,
+                    amount=amount, due_date=due_date,
+                ))
+                class_ids.add(class_id)
+    if not fees:
+        return 0
+
+    Fee.objects.bulk_create(fees, batch_size=batch_size, ignore_conflicts=True)
+    rebuild_fee_summary(class_ids=list(class_ids))
+    rebuild_student_balances(student_ids=students.values('pk'))
+    return len(fees)
+
+
+def late_fee_expression(today):
+    """
+    SQL expression for the late fee owed on `today`: LATE_FEE_PERCENT of the
+    amount for every started LATE_FEE_PERIOD_DAYS past the grace period,
+    capped at LATE_FEE_MAX_PERIODS periods.
+    """
+    grace = getattr(settings, 'LATE_FEE_GRACE_DAYS', 7)
+    period = getattr(settings, 'LATE_FEE_PERIOD_DAYS', 30)
+    rate = Decimal(str(getattr(settings, 'LATE_FEE_PERCENT', 2))) / 100
+    periods = getattr(settings, 'LATE_FEE_MAX_PERIODS', 6)
+    return Case(
+        *[
+            When(
+                due_date__lt=today - timedelta(days=grace + period * (k - 1)),
+                then=Round(F('amount') * Value(rate * k), 2),
+            )
+            for k in range(periods, 0, -1)
+        ],
+        default=Value(Decimal('0')),
+        output_field=DecimalField(max_digits=10, decimal_places=2),
+    )
+
+
+@transaction.atomic
+def apply_late_fees(today=None):
+    """
+    Set the late fee of every overdue unpaid or partial fee with a single
+    UPDATE. Rows whose late fee is already current are not rewritten, so a
+    nightly run only touches fees that crossed a period boundary. Returns the
+    number of fees updated.
+    """
+    today = today or timezone.localdate()
+    late_fee = late_fee_expression(today)
+    grace = getattr(settings, 'LATE_FEE_GRACE_DAYS', 7)
+    updated = Fee.objects.filter(
+        status__in=UNPAID_STATUSES, due_date__lt=today - timedelta(days=grace)
+    ).exclude(late_fee=late_fee).update(late_fee=late_fee)
+    if updated:
+        identity.forget(Fee)
+        rebuild_fee_summary()
+        rebuild_student_balances()
+    return updated
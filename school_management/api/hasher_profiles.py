@@ -0,0 +1,19 @@
+# api/hasher_profiles.py
+"""
+Password hasher profile names and their hasher classes, as import paths.
+
+No Django imports, so `settings.py` can build `PASSWORD_HASHERS` from it;
+`api.hashers` defines the classes.
+"""
+
+HASHER_PROFILES = {
+    'pbkdf2': 'api.hashers.ProfilePBKDF2PasswordHasher',
+    'argon2': 'api.hashers.ProfileArgon2PasswordHasher',
+    'bcrypt': 'api.hashers.ProfileBCryptSHA256PasswordHasher',
+}
+PROFILE_LIBRARIES = {'argon2': 'argon2', 'bcrypt': 'bcrypt'}
+
+
+def password_hashers(profile):
+    """Every profile's hasher path, the one of `profile` first."""
+    return sorted(HASHER_PROFILES.values(), key=lambda path: path != HASHER_PROFILES.get(profile))
@@ -0,0 +1,42 @@
+# api/hashers.py
+"""
+Password hasher profiles.
+
+`PASSWORD_HASHER_PROFILE` selects the preferred hasher ('pbkdf2', 'argon2'
+or 'bcrypt'). The other profiles stay in `PASSWORD_HASHERS`, so existing
+hashes still verify. Their algorithm names match Django's built-in
+hashers. Costs are read from settings, so numbers measured with
+`manage.py tune_password_hasher` apply without code changes. When the
+profile or cost changes, Django rehashes a password the next time its owner
+logs in (`must_update`). The profile names live in `api.hasher_profiles`,
+which settings import.
+"""
+
+from django.conf import settings
+from django.contrib.auth.hashers import Argon2PasswordHasher, BCryptSHA256PasswordHasher, PBKDF2PasswordHasher
+
+
+class ProfilePBKDF2PasswordHasher(PBKDF2PasswordHasher):
+    @property
+    def iterations(self):
+        return settings.PASSWORD_PBKDF2_ITERATIONS
+
+
+class ProfileArgon2PasswordHasher(Argon2PasswordHasher):
+    @property
+    def time_cost(self):
+        return settings.PASSWORD_ARGON2_TIME_COST
+
+    @property
+    def memory_cost(self):
+        return settings.PASSWORD_ARGON2_MEMORY_COST
+
+    @property
+    def parallelism(self):
+        return settings.PASSWORD_ARGON2_PARALLELISM
+
+
+class ProfileBCryptSHA256PasswordHasher(BCryptSHA256PasswordHasher):
+    @property
+    def rounds(self):
+        return settings.PASSWORD_BCRYPT_ROUNDS
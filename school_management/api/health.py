@@ -0,0 +1,130 @@
+# api/health.py
+"""
+Liveness and readiness probes.
+
+Liveness (`/api/health/live/`) only shows that the process answers requests.
+Readiness (`/api/health/ready/`, and `/api/health/` used by the frontend)
+checks the node's dependencies: the database, the caches the app uses, the
+report storage directory and the event relay. The probes run in parallel
+threads and any probe still running after `HEALTH_PROBE_TIMEOUT_SECONDS`
+counts as failed, so a hung dependency cannot hang the check. Results are
+reused for `HEALTH_CACHE_SECONDS` in each process, so frequent load balancer
+checks cost at most one round of probes per interval.
+
+Only the probes named in `HEALTH_CRITICAL_PROBES` make the node unavailable
+(503); failures of the others report it as degraded.
+"""
+
+import os
+import shutil
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor, wait
+from django.conf import settings
+from django.core.cache import caches
+from django.db import connections
+from django.utils import timezone
+
+# Bounded: probes stuck on a hung dependency cannot pile up threads without limit
+_executor = ThreadPoolExecutor(max_workers=8, thread_name_prefix='health-probe')
+_lock = threading.Lock()
+_last = None  # (monotonic time, result)
+
+
+def reports_dir():
+    return os.path.join(settings.BASE_DIR, 'reports')
+
+
+def probe_database():
+    for connection in connections.all():
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT 1')
+            cursor.fetchone()
+    return {}
+
+
+def probe_cache():
+    value = uuid.uuid4().hex
+    for alias in settings.HEALTH_CACHE_ALIASES:
+        cache = caches[alias]
+        cache.set('health:probe', value, timeout=30)
+        if cache.get('health:probe') != value:
+            raise RuntimeError(f'cache {alias!r} did not return the value just written')
+    return {}
+
+
+def probe_report_storage():
+    directory = reports_dir()
+    os.makedirs(directory, exist_ok=True)
+    if not os.access(directory, os.W_OK):
+        raise PermissionError('report directory is not writable')
+    free_mb = shutil.disk_usage(directory).free // (1024 * 1024)
+    if free_mb < settings.HEALTH_REPORT_MIN_FREE_MB:
+        raise RuntimeError(f'only {free_mb} MB free for reports')
+    return {'free_mb': free_mb}
+
+
+def probe_job_queue():
+    """The event relay (Redis when configured) and this process's stream delivery queues."""
+    from .realtime import RedisRelay, broker, get_relay
+
+    relay = get_relay()
+    if isinstance(relay, RedisRelay):
+        relay.client.ping()
+    return {
+        'backend': 'redis' if isinstance(relay, RedisRelay) else 'local',
+        'subscribers': broker.subscriber_count(),
+        'queued_events': broker.queued_events(),
+    }
+
+
+PROBES = {
+    'database': probe_database,
+    'cache': probe_cache,
+    'report_storage': probe_report_storage,
+    'job_queue': probe_job_queue,
+}
+
+
+def _timed(probe):
+    started = time.perf_counter()
+    try:
+        details = probe()
+    finally:
+        # Probe threads are reused; don't keep their connections open between rounds
+        connections.close_all()
+    return {'status': 'ok', 'ms': round((time.perf_counter() - started) * 1000, 2), **details}
+
+
+def run_probes():
+    """{probe name: {'status': 'ok' | 'error' | 'timeout', 'ms' or 'error', ...}}, bounded in time."""
+    futures = {name: _executor.submit(_timed, probe) for name, probe in PROBES.items()}
+    wait(futures.values(), timeout=settings.HEALTH_PROBE_TIMEOUT_SECONDS)
+    checks = {}
+    for name, future in futures.items():
+        if not future.done():
+            future.cancel()
+            checks[name] = {'status': 'timeout'}
+        elif future.exception() is not None:
+            # The exception type only: this is a public endpoint
+            checks[name] = {'status': 'error', 'error': type(future.exception()).__name__}
+        else:
+            checks[name] = future.result()
+    return checks
+
+
+def readiness(refresh=False):
+    """The probe results with an overall 'ok', 'degraded' or 'unavailable' status, cached per process."""
+    global _last
+    with _lock:
+        now = time.monotonic()
+        if refresh or _last is None or now - _last[0] >= settings.HEALTH_CACHE_SECONDS:
+            checks = run_probes()
+            failed = {name for name, check in checks.items() if check['status'] != 'ok'}
+            if failed & set(settings.HEALTH_CRITICAL_PROBES):
+                overall = 'unavailable'
+            else:
+                overall = 'degraded' if failed else 'ok'
+            _last = (now, {'status': overall, 'checks': checks, 'checked_at': timezone.now().isoformat()})
+        return _last[1]
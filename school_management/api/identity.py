@@ -0,0 +1,223 @@
+# api/identity.py
+"""
+Request-scoped identity map.
+
+Inside `identity_scope()`, `get(model, pk)` returns one shared instance per
+row. The first lookup loads it and later lookups reuse it, from any view or
+serializer running in the scope. `get_many` loads all the missing rows of a
+batch in one query. Rows that do not exist are remembered as well, so a
+missing profile is looked up only once. Saving or deleting a row drops it
+from the map, so the next lookup reads it again. Queryset `update()`s send
+no signals, so the code that runs them calls `forget` for the rows they
+change (the fee balances, unread counters and late fees).
+
+`IdentityMapMiddleware` opens a scope for every request, and `/api/batch/`
+runs all of its sub-requests in one scope, so the rows they share are read
+once. Outside a scope every lookup goes to the database.
+
+`prime(instances, paths)` is the loader, in the style of a dataloader. For
+a list of rows it collects the keys of the relations along each path, such
+as `teacher__user__profile`, and loads every level with one query for the
+distinct keys not yet in the map. The loaded rows are then set as the
+relation caches of the instances. A list of timetable entries therefore
+costs one query per relation level instead of one per row, and the teachers
+it loads are reused by every other serializer in the request. Serializers
+use it through `api.serializers.PrimedListSerializer`.
+"""
+
+import contextvars
+from contextlib import contextmanager
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.db.models.signals import post_delete, post_save
+
+_current = contextvars.ContextVar('identity_map', default=None)
+
+
+class IdentityMap:
+    def __init__(self):
+        self._rows = {}  # (model, pk) -> instance, or None for a row that does not exist
+
+    @staticmethod
+    def _key(model, pk):
+        model = model._meta.concrete_model
+        return model, model._meta.pk.to_python(pk)
+
+    def get_many(self, model, pks):
+        """{pk: instance} for the pks that exist, loading the ones not seen yet in one query."""
+        keys = {pk: self._key(model, pk) for pk in pks if pk is not None}
+        missing = {key[1] for key in keys.values() if key not in self._rows}
+        if missing:
+            concrete = model._meta.concrete_model
+            found = concrete._base_manager.in_bulk(missing)
+            for pk in missing:
+                self._rows[(concrete, pk)] = found.get(pk)
+        return {pk: self._rows[key] for pk, key in keys.items() if self._rows[key] is not None}
+
+    def get(self, model, pk):
+        return self.get_many(model, [pk]).get(pk)
+
+    def add(self, instance):
+        self._rows[self._key(type(instance), instance.pk)] = instance
+
+    def discard(self, model, pk):
+        self._rows.pop(self._key(model, pk), None)
+
+    def discard_model(self, model):
+        concrete = model._meta.concrete_model
+        self._rows = {key: row for key, row in self._rows.items() if key[0] is not concrete}
+
+    def clear(self):
+        self._rows = {}
+
+
+def current():
+    """The active IdentityMap, or None outside a scope."""
+    return _current.get()
+
+
+@contextmanager
+def identity_scope():
+    """Share one IdentityMap for the duration of the block; nested scopes reuse the outer map."""
+    if _current.get() is not None:
+        yield _current.get()
+        return
+    token = _current.set(IdentityMap())
+    try:
+        yield _current.get()
+    finally:
+        _current.reset(token)
+
+
+def get(model, pk):
+    """The instance with this pk, or None; shared within a scope."""
+    identity_map = current()
+    if identity_map is None:
+        return model._base_manager.filter(pk=pk).first() if pk is not None else None
+    return identity_map.get(model, pk)
+
+
+def get_many(model, pks):
+    """{pk: instance} for those of `pks` that exist; shared within a scope."""
+    identity_map = current()
+    if identity_map is None:
+        return model._base_manager.in_bulk({pk for pk in pks if pk is not None})
+    return identity_map.get_many(model, pks)
+
+
+def forget(model, pks=None):
+    """
+    Drop the rows with these pks (all rows of `model` when None) from the
+    current map. Call it after queryset `update()`s and other writes that
+    send no post_save signal, so later lookups read the new values.
+    """
+    identity_map = current()
+    if identity_map is None:
+        return
+    if pks is None:
+        identity_map.discard_model(model)
+    else:
+        for pk in pks:
+            identity_map.discard(model, pk)
+
+
+def _load_by(model, field, keys):
+    """{key: instance} of the `model` rows whose unique `field` is in keys, through the identity map."""
+    rows = model._base_manager.filter(**{f'{field.attname}__in': keys}) if keys else []
+    identity_map = current()
+    found = {}
+    for row in rows:
+        if identity_map is not None:
+            identity_map.add(row)
+        found[getattr(row, field.attname)] = row
+    return found
+
+
+def _prime_relation(instances, model, name):
+    """Fill relation `name` of each instance in a single query; returns the related instances."""
+    field = model._meta.get_field(name)
+    if field.concrete:
+        # Forward foreign key or one-to-one
+        if not field.target_field.primary_key:
+            # Keyed by another column: leave it to the descriptor
+            return [getattr(instance, name) for instance in instances if getattr(instance, field.attname) is not None]
+        pending = [instance for instance in instances if not field.is_cached(instance)]
+        loaded = get_many(field.related_model, {getattr(instance, field.attname) for instance in pending})
+        for instance in pending:
+            related = loaded.get(getattr(instance, field.attname))
+            if related is not None:
+                field.set_cached_value(instance, related)
+        values = (field.get_cached_value(instance, None) for instance in instances)
+    else:
+        # Reverse one-to-one: rows that are absent are cached as such
+        remote = field.remote_field
+        key = remote.target_field.attname
+        pending = [instance for instance in instances if not field.is_cached(instance)]
+        loaded = _load_by(field.related_model, remote, {getattr(instance, key) for instance in pending})
+        for instance in pending:
+            related = loaded.get(getattr(instance, key))
+            field.set_cached_value(instance, related)
+            if related is not None:
+                remote.set_cached_value(related, instance)
+        values = (field.get_cached_value(instance, None) for instance in instances)
+    unique = {}
+    for value in values:
+        if value is not None:
+            unique.setdefault(id(value), value)
+    return list(unique.values())
+
+
+def prime(instances, paths):
+    """
+    Load the forward and one-to-one relations along each `a__b` path for all
+    instances, one query per relation level, skipping rows already cached.
+    """
+    tree = {}
+    for path in paths:
+        node = tree
+        for name in path.split('__'):
+            node = node.setdefault(name, {})
+
+    def walk(instances, node):
+        by_model = {}
+        for instance in instances:
+            by_model.setdefault(type(instance)._meta.concrete_model, []).append(instance)
+        for model, group in by_model.items():
+            for name, children in node.items():
+                related = _prime_relation(group, model, name)
+                if children and related:
+                    walk(related, children)
+
+    if instances and tree:
+        walk(list(instances), tree)
+    return instances
+
+
+class IdentityMapMiddleware:
+    """Gives each request its own identity map."""
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        with identity_scope():
+            return self.get_response(request)
+
+    async def __acall__(self, request):
+        with identity_scope():
+            return await self.get_response(request)
+
+
+def _forget(sender, instance, **kwargs):
+    identity_map = current()
+    if identity_map is not None and instance.pk is not None:
+        identity_map.discard(sender, instance.pk)
+
+
+post_save.connect(_forget, dispatch_uid='identity_map_forget_saved')
+post_delete.connect(_forget, dispatch_uid='identity_map_forget_deleted')
@@ -0,0 +1,38 @@
+# api/management/commands/archive_attendance.py
+
+from datetime import date
+from django.core.management.base import BaseCommand, CommandError
+from api.attendance import archive_before, current_academic_year_start, rebuild_rollups
+
+
+class Command(BaseCommand):
+    help = 'Moves attendance from closed academic years into the archive table and optionally rebuilds the monthly rollups.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--before',
+            type=str,
+            help='Archive rows dated before YYYY-MM-DD (default: start of the current academic year)'
+        )
+        parser.add_argument('--batch-size', type=int, default=5000, help='Rows moved per transaction')
+        parser.add_argument(
+            '--rebuild-rollups',
+            action='store_true',
+            help='Recompute AttendanceMonthlyRollup from the live and archived rows'
+        )
+
+    def handle(self, *args, **options):
+        if options['before']:
+            try:
+                cutoff = date.fromisoformat(options['before'])
+            except ValueError:
+                raise CommandError('--before must be in YYYY-MM-DD format')
+        else:
+            cutoff = current_academic_year_start()
+
+        moved = archive_before(cutoff, batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f"Archived {moved} attendance rows dated before {cutoff}."))
+
+        if options['rebuild_rollups']:
+            count = rebuild_rollups()
+            self.stdout.write(self.style.SUCCESS(f"Rebuilt {count} monthly attendance rollups."))
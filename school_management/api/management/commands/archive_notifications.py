@@ -0,0 +1,31 @@
+# api/management/commands/archive_notifications.py
+
+from datetime import timedelta
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from api.notifications import archive_read_before, rebuild_unread_counts
+
+
+class Command(BaseCommand):
+    help = 'Moves read notifications older than the retention window into the archive table in batches.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, default=90, help='Keep read notifications for this many days (default 90)')
+        parser.add_argument('--batch-size', type=int, default=5000, help='Rows moved per transaction')
+        parser.add_argument(
+            '--rebuild-counts',
+            action='store_true',
+            help='Recompute the cached unread counts of every user'
+        )
+
+    def handle(self, *args, **options):
+        if options['days'] < 0:
+            raise CommandError('--days must not be negative')
+        cutoff = timezone.now() - timedelta(days=options['days'])
+
+        moved = archive_read_before(cutoff, batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f"Archived {moved} read notifications created before {cutoff:%Y-%m-%d %H:%M}."))
+
+        if options['rebuild_counts']:
+            count = rebuild_unread_counts()
+            self.stdout.write(self.style.SUCCESS(f"Rebuilt unread counts for {count} users."))
@@ -0,0 +1,83 @@
+# api/management/commands/benchmark_asgi.py
+
+import json
+from django.core.management.base import BaseCommand, CommandError
+from api.workload import (
+    ClientTransport, HTTPTransport, clear_page_cache, read_only, replay, replay_async, summarize,
+)
+
+
+class Command(BaseCommand):
+    help = (
+        'Replays a workload profile under WSGI and under ASGI and compares throughput and latency per endpoint. '
+        'In-process by default (threads through the WSGI test client vs. tasks on one event loop through the '
+        'ASGI handler); --wsgi-url/--asgi-url compare two running servers, e.g. gunicorn and uvicorn. '
+        'Only the read requests of the profile are replayed, so both runs see the same data.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('profile', help='Profile file written by make_workload (exam-week exercises the dashboards)')
+        parser.add_argument('--concurrency', type=int, default=16, help='Requests in flight at once (default 16)')
+        parser.add_argument('--speed', type=float, default=0.0,
+                            help='Time compression as in replay_workload (default 0: as fast as possible)')
+        parser.add_argument('--wsgi-url', help='Base URL of a WSGI server running this project')
+        parser.add_argument('--asgi-url', help='Base URL of an ASGI server running this project')
+        parser.add_argument('--json', dest='report', help='Also write both reports to this file')
+
+    def handle(self, *args, **options):
+        try:
+            with open(options['profile']) as source:
+                profile = json.load(source)
+        except (OSError, ValueError) as e:
+            raise CommandError(f"Cannot read profile: {e}")
+        if options['speed'] < 0:
+            raise CommandError('--speed must not be negative.')
+        concurrency, speed = options['concurrency'], options['speed']
+        # Writes would change the data between the runs (and fail the second time, e.g. duplicate attendance)
+        writes = len(profile['events'])
+        profile = read_only(profile)
+        writes -= len(profile['events'])
+        if writes:
+            self.stdout.write(f'Skipping {writes} write requests; both runs replay the same reads.')
+        if not profile['events']:
+            raise CommandError('The profile has no read requests to replay.')
+
+        runs = {}
+        for mode, url in (('wsgi', options['wsgi_url']), ('asgi', options['asgi_url'])):
+            self.stdout.write(f"{mode.upper()}: replaying {len(profile['events'])} requests against "
+                              f"{url or 'the in-process handler'}...")
+            # Both runs start without cached pages; other keys in that cache (schedule versions, ...) stay
+            if not clear_page_cache():
+                self.stdout.write(self.style.WARNING('The page cache backend cannot be cleared selectively; '
+                                                     'the second run may be served cached pages.'))
+            if url:
+                results = replay(profile, HTTPTransport(url), concurrency=concurrency, speed=speed)
+            elif mode == 'wsgi':
+                results = replay(profile, ClientTransport(), concurrency=concurrency, speed=speed)
+            else:
+                results = replay_async(profile, concurrency=concurrency, speed=speed)
+            runs[mode] = summarize(*results)
+
+        header = (f"{'endpoint':<44} {'wsgi rps':>9} {'asgi rps':>9} {'wsgi p50':>9} {'asgi p50':>9} "
+                  f"{'wsgi p99':>9} {'asgi p99':>9} {'4xx':>5} {'err':>5}")
+        self.stdout.write(header)
+        self.stdout.write('-' * len(header))
+        wsgi, asgi = runs['wsgi'], runs['asgi']
+        names = sorted(set(wsgi['endpoints']) | set(asgi['endpoints']))
+        rows = [(name, wsgi['endpoints'].get(name), asgi['endpoints'].get(name)) for name in names]
+        for name, w, a in rows + [('TOTAL', wsgi['total'], asgi['total'])]:
+            w, a = w or {}, a or {}
+            client_errors = w.get('client_errors', 0) + a.get('client_errors', 0)
+            errors = w.get('errors', 0) + a.get('errors', 0)
+            self.stdout.write(
+                f"{name[:44]:<44} {w.get('rps', 0):>9.2f} {a.get('rps', 0):>9.2f} {w.get('p50_ms', 0):>9.1f} "
+                f"{a.get('p50_ms', 0):>9.1f} {w.get('p99_ms', 0):>9.1f} {a.get('p99_ms', 0):>9.1f} {client_errors:>5} {errors:>5}"
+            )
+        if wsgi['total']['rps']:
+            self.stdout.write(
+                f"Latencies in ms. ASGI throughput is {asgi['total']['rps'] / wsgi['total']['rps']:.2f}x WSGI "
+                f"at concurrency {concurrency}."
+            )
+        if options['report']:
+            with open(options['report'], 'w') as out:
+                json.dump(runs, out, indent=1)
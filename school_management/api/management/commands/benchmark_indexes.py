@@ -0,0 +1,206 @@
+# api/management/commands/benchmark_indexes.py
+
+import random
+import statistics
+import time
+from datetime import date, time as dtime, timedelta
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.db.models import Sum
+from api.models import (
+    User, SchoolClass, Student, Teacher, Fee, Task, Notification, Timetable, LeaveRequest
+)
+
+# Models whose Meta.indexes are under test
+INDEXED_MODELS = [Fee, Task, Notification, Timetable, LeaveRequest]
+
+
+class Command(BaseCommand):
+    help = (
+        'Seeds synthetic rows inside a rolled-back transaction and compares query plans and '
+        'latencies of the hot query paths with and without the composite/partial indexes.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=100000, help='Rows seeded into Fee and Notification (default 100000)')
+        parser.add_argument('--repeat', type=int, default=7, help='Timed runs per query (median is reported)')
+        parser.add_argument('--seed', type=int, default=42, help='Random seed for the synthetic data')
+
+    def handle(self, *args, **options):
+        self.random = random.Random(options['seed'])
+        self.repeat = options['repeat']
+        rows = options['rows']
+
+        self.stdout.write(self.style.SUCCESS(f"\n--- Index Benchmark ({connection.vendor}, {rows} rows) ---"))
+        # Everything below is rolled back, so the benchmark never touches real data
+        with transaction.atomic():
+            self._seed(rows)
+            self._analyze()
+            cases = self._cases()
+
+            self._drop_indexes()
+            self._analyze()
+            before = self._run(cases)
+
+            self._create_indexes()
+            self._analyze()
+            after = self._run(cases)
+
+            transaction.set_rollback(True)
+
+        self._report(cases, before, after)
+
+    # --------------------------
+    # Synthetic data
+    # --------------------------
+
+    def _seed(self, rows):
+        started = time.perf_counter()
+        rnd = self.random
+        today = date.today()
+        student_count = max(rows // 20, 1)
+        teacher_count = 50
+        class_count = 100
+
+        users = User.objects.bulk_create(
+            [User(username=f'bench_t{i}', password='!', role=User.Role.TEACHER) for i in range(teacher_count)] +
+            [User(username=f'bench_s{i}', password='!', role=User.Role.STUDENT) for i in range(student_count)],
+            batch_size=5000,
+        )
+        teachers = Teacher.objects.bulk_create([Teacher(user=u) for u in users[:teacher_count]], batch_size=5000)
+        classes = SchoolClass.objects.bulk_create(
+            [SchoolClass(name=f'Bench {i}', teacher=rnd.choice(teachers).user) for i in range(class_count)],
+            batch_size=5000,
+        )
+        students = Student.objects.bulk_create(
+            [Student(user=u, school_class=rnd.choice(classes)) for u in users[teacher_count:]],
+            batch_size=5000,
+        )
+
+        fee_statuses = Fee.Status.values
+        Fee.objects.bulk_create(
+            [Fee(
+                student=rnd.choice(students),
+                amount=rnd.choice([500, 1000, 1500, 3000]),
+                due_date=today + timedelta(days=rnd.randint(-365, 90)),
+                status=rnd.choice(fee_statuses),
+            ) for _ in range(rows)],
+            batch_size=5000,
+        )
+        Notification.objects.bulk_create(
+            [Notification(
+                user=rnd.choice(users),
+                title='Benchmark',
+                message='Synthetic notification',
+                is_read=rnd.random() < 0.8,
+            ) for _ in range(rows)],
+            batch_size=5000,
+        )
+        Task.objects.bulk_create(
+            [Task(
+                teacher=rnd.choice(teachers),
+                title='Benchmark task',
+                due_date=today + timedelta(days=rnd.randint(-180, 30)),
+            ) for _ in range(rows // 4)],
+            batch_size=5000,
+        )
+        days = Timetable.Day.values
+        Timetable.objects.bulk_create(
+            [Timetable(
+                school_class=rnd.choice(classes),
+                day_of_week=rnd.choice(days),
+                start_time=dtime(8 + i % 8),
+                end_time=dtime(8 + i % 8, 50),
+                subject='Benchmark',
+                teacher=rnd.choice(teachers),
+            ) for i in range(rows // 4)],
+            batch_size=5000,
+        )
+        leave_statuses = LeaveRequest.Status.values
+        LeaveRequest.objects.bulk_create(
+            [LeaveRequest(
+                user=rnd.choice(users),
+                start_date=today,
+                end_date=today + timedelta(days=2),
+                reason='Benchmark',
+                # Pending leaves are the minority in a real inbox
+                status=leave_statuses[0] if rnd.random() < 0.05 else rnd.choice(leave_statuses[1:]),
+            ) for _ in range(rows // 4)],
+            batch_size=5000,
+        )
+
+        self.sample_teacher = rnd.choice(teachers)
+        self.sample_user = rnd.choice(users)
+        self.sample_class = rnd.choice(classes)
+        self.stdout.write(f"  - Seeded synthetic data in {time.perf_counter() - started:.1f}s.")
+
+    def _analyze(self):
+        # Refresh planner statistics so both runs see the same row estimates
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE')
+
+    # --------------------------
+    # Index toggling
+    # --------------------------
+
+    def _index_sql(self, create):
+        editor = connection.schema_editor()
+        for model in INDEXED_MODELS:
+            for index in model._meta.indexes:
+                yield str(index.create_sql(model, editor) if create else index.remove_sql(model, editor))
+
+    def _drop_indexes(self):
+        with connection.cursor() as cursor:
+            for sql in self._index_sql(create=False):
+                cursor.execute(sql)
+
+    def _create_indexes(self):
+        with connection.cursor() as cursor:
+            for sql in self._index_sql(create=True):
+                cursor.execute(sql)
+
+    # --------------------------
+    # Measurement
+    # --------------------------
+
+    def _cases(self):
+        today = date.today()
+        return [
+            ('Overdue unpaid/partial fees', lambda: Fee.objects.filter(
+                status__in=[Fee.Status.UNPAID, Fee.Status.PARTIAL], due_date__lt=today)),
+            ('Paid fees due this month', lambda: Fee.objects.filter(
+                status=Fee.Status.PAID, due_date__gte=today.replace(day=1), due_date__lte=today)),
+            ("Teacher's tasks due today", lambda: Task.objects.filter(
+                teacher=self.sample_teacher, due_date=today)),
+            ('Unread notifications for user', lambda: Notification.objects.filter(
+                user=self.sample_user, is_read=False).order_by('-created_at')),
+            ('Class timetable for Monday', lambda: Timetable.objects.filter(
+                school_class=self.sample_class, day_of_week=Timetable.Day.MONDAY)),
+            ('Pending leave requests', lambda: LeaveRequest.objects.filter(
+                status=LeaveRequest.Status.PENDING).order_by('-id')),
+        ]
+
+    def _run(self, cases):
+        results = []
+        for name, build in cases:
+            plan = build().explain()
+            timings = []
+            for _ in range(self.repeat):
+                started = time.perf_counter()
+                list(build().values_list('pk', flat=True))
+                timings.append((time.perf_counter() - started) * 1000)
+            results.append({'plan': plan, 'median_ms': statistics.median(timings)})
+        return results
+
+    def _report(self, cases, before, after):
+        for (name, _), b, a in zip(cases, before, after):
+            speedup = b['median_ms'] / a['median_ms'] if a['median_ms'] else float('inf')
+            self.stdout.write(self.style.MIGRATE_HEADING(f"\n{name}"))
+            self.stdout.write(f"  Without indexes: {b['median_ms']:.2f} ms")
+            self.stdout.write(self._indent(b['plan']))
+            self.stdout.write(f"  With indexes:    {a['median_ms']:.2f} ms ({speedup:.1f}x)")
+            self.stdout.write(self._indent(a['plan']))
+        self.stdout.write(self.style.SUCCESS('\nBenchmark complete. All synthetic data was rolled back.'))
+
+    def _indent(self, plan):
+        return '\n'.join(f"    | {line}" for line in plan.splitlines())
@@ -0,0 +1,16 @@
+# api/management/commands/build_attendance_bitmaps.py
+
+from django.core.management.base import BaseCommand
+from api.attendance import bitmap_enabled, rebuild_bitmaps
+
+
+class Command(BaseCommand):
+    help = 'Rebuilds the packed per-term AttendanceBitmap rows from the live and archived attendance tables.'
+
+    def handle(self, *args, **options):
+        count = rebuild_bitmaps()
+        self.stdout.write(self.style.SUCCESS(f"Built {count} attendance bitmaps."))
+        if not bitmap_enabled():
+            self.stdout.write(self.style.WARNING(
+                "ATTENDANCE_BITMAP_ENABLED is off, so new attendance writes will not update these bitmaps."
+            ))
@@ -1,11 +1,16 @@
 import os
 import json
+import time
 from datetime import datetime, timedelta
 from django.core.management.base import BaseCommand, CommandError
 from django.conf import settings
 from django.utils import timezone
 from django.db.models import Sum, Count, Avg
 from api.models import *
+from api.fees import outstanding_expression, total_due_expression
+from api.analytics import attendance_analytics, performance_analytics
+from api import metrics
+from api.health import readiness
 import pandas as pd
 
 
@@ -53,6 +58,8 @@ class Command(BaseCommand):
 
         report_type = options['report_type']
         output_format = options['format']
+        started = time.perf_counter()
+        outcome = 'error'
 
         try:
             if report_type in ['all', 'academic']:
@@ -76,10 +83,16 @@ class Command(BaseCommand):
             self.stdout.write(
                 self.style.SUCCESS(f'Reports generated successfully in: {report_dir}')
             )
+            outcome = 'success'
 
         except Exception as e:
             raise CommandError(f'Error generating reports: {str(e)}')
 
+        finally:
+            metrics.observe_report(report_type, time.perf_counter() - started, outcome)
+            # A separate `manage.py` process publishes right away; in a worker this joins the next flush
+            metrics.flush()
+
     def generate_academic_reports(self, report_dir, output_format):
         """Generate academic-related reports"""
         self.stdout.write('Generating Academic Reports...')
@@ -127,15 +140,15 @@ class Command(BaseCommand):
 
         # Fee collection summary
         fee_summary = Fee.objects.aggregate(
-            total_amount=Sum('amount'),
-            paid_amount=Sum('amount', filter=models.Q(status='paid')),
-            pending_amount=Sum('amount', filter=models.Q(status__in=['unpaid', 'partial']))
+            total_amount=Sum(total_due_expression()),
+            paid_amount=Sum(total_due_expression() - outstanding_expression()),
+            pending_amount=Sum(outstanding_expression())
         )
 
         # Fee status breakdown
         fee_status_breakdown = list(Fee.objects.values('status').annotate(
             count=Count('status'),
-            total_amount=Sum('amount')
+            total_amount=Sum(total_due_expression())
         ))
 
         # Monthly fee collection trend (last 12 months)
@@ -149,8 +162,8 @@ class Command(BaseCommand):
                 due_date__gte=month_start,
                 due_date__lte=month_end
             ).aggregate(
-                collected=Sum('amount', filter=models.Q(status='paid')),
-                pending=Sum('amount', filter=models.Q(status__in=['unpaid', 'partial']))
+                collected=Sum(total_due_expression() - outstanding_expression()),
+                pending=Sum(outstanding_expression())
             )
 
             monthly_trend.append({
@@ -163,9 +176,9 @@ class Command(BaseCommand):
         class_fee_analysis = list(Fee.objects.values(
             'student__school_class__name'
         ).annotate(
-            total_fees=Sum('amount'),
-            paid_fees=Sum('amount', filter=models.Q(status='paid')),
-            pending_fees=Sum('amount', filter=models.Q(status__in=['unpaid', 'partial']))
+            total_fees=Sum(total_due_expression()),
+            paid_fees=Sum(total_due_expression() - outstanding_expression()),
+            pending_fees=Sum(outstanding_expression())
         ))
 
         reports = {
@@ -183,65 +196,8 @@ class Command(BaseCommand):
 
         attendance_dir = os.path.join(report_dir, 'attendance')
 
-        # Overall attendance statistics
-        attendance_stats = Attendance.objects.aggregate(
-            total_records=Count('id'),
-            present_count=Count('id', filter=models.Q(status='present')),
-            absent_count=Count('id', filter=models.Q(status='absent')),
-            late_count=Count('id', filter=models.Q(status='late'))
-        )
-
-        # Student-wise attendance
-        student_attendance = list(Student.objects.annotate(
-            total_classes=Count('attendance_records'),
-            present_count=Count('attendance_records', filter=models.Q(attendance_records__status='present')),
-            absent_count=Count('attendance_records', filter=models.Q(attendance_records__status='absent')),
-            late_count=Count('attendance_records', filter=models.Q(attendance_records__status='late'))
-        ).values(
-            'user__first_name', 'user__last_name', 'user__username',
-            'school_class__name', 'total_classes', 'present_count',
-            'absent_count', 'late_count'
-        ))
-
-        # Class-wise attendance
-        class_attendance = list(SchoolClass.objects.annotate(
-            total_students=Count('students'),
-            avg_attendance=Avg(
-                Student.objects.filter(school_class=models.OuterRef('pk')).annotate(
-                    attendance_rate=Count('attendance_records', filter=models.Q(attendance_records__status='present')) * 100.0 / Count('attendance_records')
-                ).values('attendance_rate')
-            )
-        ).values('name', 'total_students', 'avg_attendance'))
-
-        # Monthly attendance trend
-        monthly_attendance = []
-        for i in range(6):
-            date = timezone.now() - timedelta(days=30*i)
-            month_start = date.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
-            month_end = (month_start + timedelta(days=32)).replace(day=1) - timedelta(days=1)
-
-            monthly_data = Attendance.objects.filter(
-                date__gte=month_start,
-                date__lte=month_end
-            ).aggregate(
-                present=Count('id', filter=models.Q(status='present')),
-                absent=Count('id', filter=models.Q(status='absent')),
-                late=Count('id', filter=models.Q(status='late'))
-            )
-
-            monthly_attendance.append({
-                'month': month_start.strftime('%Y-%m'),
-                'present': monthly_data['present'] or 0,
-                'absent': monthly_data['absent'] or 0,
-                'late': monthly_data['late'] or 0
-            })
-
-        reports = {
-            'attendance_statistics': attendance_stats,
-            'student_attendance': student_attendance,
-            'class_attendance': class_attendance,
-            'monthly_attendance_trend': monthly_attendance
-        }
+        # All attendance aggregates come from one pass over the monthly rollups
+        reports = attendance_analytics()
 
         self.save_report(attendance_dir, 'attendance_reports', reports, output_format)
 
@@ -251,40 +207,9 @@ class Command(BaseCommand):
 
         performance_dir = os.path.join(report_dir, 'performance')
 
-        # Grade distribution
-        grade_distribution = list(Grade.objects.values('score').annotate(
-            count=Count('score')
-        ).order_by('score'))
-
-        # Student performance summary
-        student_performance = list(Student.objects.annotate(
-            avg_score=Avg('grades__score'),
-            total_assignments=Count('grades')
-        ).values(
-            'user__first_name', 'user__last_name', 'user__username',
-            'school_class__name', 'avg_score', 'total_assignments'
-        ))
-
-        # Assignment-wise performance
-        assignment_performance = list(Assignment.objects.annotate(
-            avg_score=Avg('grades__score'),
-            total_submissions=Count('grades')
-        ).values('title', 'avg_score', 'total_submissions'))
-
-        # Top performers
-        top_performers = list(Student.objects.annotate(
-            avg_score=Avg('grades__score')
-        ).filter(avg_score__isnull=False).order_by('-avg_score')[:10].values(
-            'user__first_name', 'user__last_name', 'user__username',
-            'school_class__name', 'avg_score'
-        ))
-
-        reports = {
-            'grade_distribution': grade_distribution,
-            'student_performance': student_performance,
-            'assignment_performance': assignment_performance,
-            'top_performers': top_performers
-        }
+        # Distributions, per-class means, rankings and top performers are
+        # computed from a single fetch of the grade columns
+        reports = performance_analytics()
 
         self.save_report(performance_dir, 'performance_reports', reports, output_format)
 
@@ -321,11 +246,14 @@ class Command(BaseCommand):
             ).count()
         }
 
+        health = readiness(refresh=True)
         reports = {
             'overall_statistics': summary_stats,
             'recent_activity': recent_activity,
             'system_health': {
-                'database_status': 'healthy',
+                'status': health['status'],
+                'database_status': health['checks']['database']['status'],
+                'checks': health['checks'],
                 'last_backup': timezone.now().isoformat(),
                 'active_users': User.objects.filter(is_active=True).count()
             }
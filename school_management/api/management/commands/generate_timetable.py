@@ -0,0 +1,41 @@
+# api/management/commands/generate_timetable.py
+
+from django.core.management.base import BaseCommand, CommandError
+from api.timetable import generate_timetable
+from api.timetable_solver import SolverError
+
+
+class Command(BaseCommand):
+    help = (
+        'Generates class timetables from subject requirements, periods and teacher unavailability '
+        'with a parallel local search. Use --teacher to re-schedule only one teacher\'s lessons.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--budget', type=float, default=10.0, help='Solver time budget in seconds (default 10)')
+        parser.add_argument('--workers', type=int, help='Parallel restarts (default: CPU count)')
+        parser.add_argument('--seed', type=int, default=0, help='Base random seed; each worker uses seed + n')
+        parser.add_argument('--class-id', type=int, action='append', help='Only schedule this class (repeatable)')
+        parser.add_argument('--teacher', type=int, help='Re-solve incrementally around this teacher')
+        parser.add_argument('--dry-run', action='store_true', help='Solve and report without saving')
+
+    def handle(self, *args, **options):
+        try:
+            summary = generate_timetable(
+                class_ids=options['class_id'], time_budget=options['budget'], workers=options['workers'],
+                seed=options['seed'], teacher_id=options['teacher'], dry_run=options['dry_run'],
+            )
+        except SolverError as e:
+            raise CommandError(str(e))
+
+        message = (
+            f"{summary['lessons']} lessons for {summary['classes']} classes: {summary['hard_violations']} conflicts, "
+            f"{summary['soft_violations']} soft violations (seed {summary['seed']}, {summary['iterations']} moves, "
+            f"{summary['seconds']}s)."
+        )
+        if summary['hard_violations']:
+            raise CommandError(f'No conflict-free timetable found; nothing saved. {message}')
+        if options['dry_run']:
+            self.stdout.write(f'Dry run, nothing saved. {message}')
+        else:
+            self.stdout.write(self.style.SUCCESS(f"Saved {summary['saved']} timetable entries. {message}"))
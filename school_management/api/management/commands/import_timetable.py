@@ -0,0 +1,49 @@
+# api/management/commands/import_timetable.py
+
+import sys
+from django.core.management.base import BaseCommand, CommandError
+from api.timetable import export_timetable_csv, import_timetable_csv
+
+
+class Command(BaseCommand):
+    help = (
+        'Imports a whole timetable from CSV (class, day_of_week, period or start_time/end_time, subject, teacher), '
+        'validating every row before one bulk insert. With --export, writes the current timetable as CSV instead.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', nargs='?', help="CSV file to import or export to ('-' or omitted for stdin/stdout)")
+        parser.add_argument('--replace', action='store_true', help="Replace the timetables of the classes in the file")
+        parser.add_argument('--export', action='store_true', help='Export the current timetable instead of importing')
+
+    def handle(self, *args, **options):
+        path = options['path']
+        if options['export']:
+            if path in (None, '-'):
+                export_timetable_csv(self.stdout)
+            else:
+                with open(path, 'w', newline='', encoding='utf-8') as out:
+                    export_timetable_csv(out)
+            return
+
+        if path in (None, '-'):
+            result = import_timetable_csv(sys.stdin, replace=options['replace'])
+        else:
+            try:
+                with open(path, newline='', encoding='utf-8-sig') as lines:
+                    result = import_timetable_csv(lines, replace=options['replace'])
+            except OSError as e:
+                raise CommandError(str(e))
+
+        for error in result['errors']:
+            self.stderr.write(f"line {error['line']}: {error['error']}")
+        for conflict in result['conflicts']:
+            # Stored rows are referred to as 'id:<pk>', file rows by line number
+            line, other = conflict['entry'], conflict['conflicts_with']
+            if isinstance(line, str):
+                line, other = other, line
+            other = f'stored entry {other[3:]}' if isinstance(other, str) else f'line {other}'
+            self.stderr.write(f"line {line}: {conflict['type']} overlap on {conflict['day_of_week']} with {other}")
+        if result['errors'] or result['conflicts']:
+            raise CommandError('Timetable not imported; fix the rows above.')
+        self.stdout.write(self.style.SUCCESS(f"Imported {result['created']} timetable entries."))
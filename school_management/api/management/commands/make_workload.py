@@ -0,0 +1,46 @@
+# api/management/commands/make_workload.py
+
+import json
+from datetime import date
+from django.core.management.base import BaseCommand, CommandError
+from api.workload import SCENARIOS, profile_from_log, synthesize
+
+
+class Command(BaseCommand):
+    help = (
+        'Writes a replayable workload profile: a synthetic scenario built from the users and classes '
+        'in the database, or a converted WORKLOAD_RECORD_FILE capture (--from-log).'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('output', help='Profile file to write (JSON)')
+        parser.add_argument('--scenario', choices=sorted(SCENARIOS), default='school-day')
+        parser.add_argument('--from-log', help='Convert a recorded request log instead of synthesizing')
+        parser.add_argument('--duration', type=float, default=300.0, help='Seconds over which sessions start (default 300)')
+        parser.add_argument('--think-time', type=float, default=2.0, help='Mean pause between a user\'s requests (default 2s)')
+        parser.add_argument('--users', type=int, help='Sample this many user sessions')
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--date', type=date.fromisoformat, help='School day the requests refer to (default today)')
+
+    def handle(self, *args, **options):
+        if options['from_log']:
+            try:
+                with open(options['from_log']) as log:
+                    profile = profile_from_log(log)
+            except OSError as e:
+                raise CommandError(str(e))
+        else:
+            profile = synthesize(
+                options['scenario'], duration=options['duration'], think_time=options['think_time'],
+                max_users=options['users'], seed=options['seed'], day=options['date'],
+            )
+        if not profile['events']:
+            raise CommandError('The profile has no requests; seed the database or record some traffic first.')
+
+        with open(options['output'], 'w') as out:
+            json.dump(profile, out, indent=1)
+        endpoints = len({event['name'] for event in profile['events']})
+        self.stdout.write(self.style.SUCCESS(
+            f"Wrote {len(profile['events'])} requests from {profile['users']} users over {endpoints} endpoints "
+            f"({profile['scenario']}) to {options['output']}."
+        ))
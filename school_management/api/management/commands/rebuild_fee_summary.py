@@ -0,0 +1,17 @@
+# api/management/commands/rebuild_fee_summary.py
+
+from django.core.management.base import BaseCommand
+from api.fees import rebuild_fee_summary, rebuild_student_balances
+
+
+class Command(BaseCommand):
+    help = (
+        'Recomputes the FeeSummary aggregates (overall and per class) and the cached '
+        'Student.outstanding_balance values from the Fee table.'
+    )
+
+    def handle(self, *args, **options):
+        count = rebuild_fee_summary()
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt {count} fee summary rows."))
+        count = rebuild_student_balances()
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt outstanding balances for {count} students."))
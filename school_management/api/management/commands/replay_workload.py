@@ -0,0 +1,54 @@
+# api/management/commands/replay_workload.py
+
+import json
+from django.core.management.base import BaseCommand, CommandError
+from api.workload import ClientTransport, HTTPTransport, replay, summarize
+
+
+class Command(BaseCommand):
+    help = (
+        'Replays a workload profile from make_workload concurrently, in-process through the test client '
+        'or against a running server (--url), and reports throughput and latency percentiles per endpoint.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('profile', help='Profile file written by make_workload')
+        parser.add_argument('--url', help='Base URL of a running server, e.g. http://127.0.0.1:8000')
+        parser.add_argument('--concurrency', type=int, default=8, help='Requests in flight at once (default 8)')
+        parser.add_argument('--speed', type=float, default=1.0,
+                            help='Time compression; 2 replays twice as fast, 0 sends as fast as possible')
+        parser.add_argument('--json', dest='report', help='Also write the report to this file')
+
+    def handle(self, *args, **options):
+        try:
+            with open(options['profile']) as source:
+                profile = json.load(source)
+        except (OSError, ValueError) as e:
+            raise CommandError(f"Cannot read profile: {e}")
+        if options['speed'] < 0:
+            raise CommandError('--speed must not be negative.')
+
+        transport = HTTPTransport(options['url']) if options['url'] else ClientTransport()
+        self.stdout.write(
+            f"Replaying {len(profile['events'])} requests ({profile.get('scenario')}) "
+            f"against {options['url'] or 'the test client'}..."
+        )
+        report = summarize(*replay(profile, transport, concurrency=options['concurrency'], speed=options['speed']))
+
+        header = f"{'endpoint':<48} {'reqs':>6} {'rps':>8} {'p50':>8} {'p90':>8} {'p99':>8} {'max':>8} {'4xx':>5} {'err':>5}"
+        self.stdout.write(header)
+        self.stdout.write('-' * len(header))
+        rows = list(report['endpoints'].items()) + [('TOTAL', report['total'])]
+        for name, stats in rows:
+            self.stdout.write(
+                f"{name[:48]:<48} {stats['requests']:>6} {stats['rps']:>8.2f} {stats['p50_ms']:>8.1f} "
+                f"{stats['p90_ms']:>8.1f} {stats['p99_ms']:>8.1f} {stats['max_ms']:>8.1f} "
+                f"{stats['client_errors']:>5} {stats['errors']:>5}"
+            )
+        self.stdout.write(
+            f"Latencies in ms. {report['wall_seconds']}s wall time; requests were sent "
+            f"{report['total']['mean_lag_ms']}ms behind schedule on average."
+        )
+        if options['report']:
+            with open(options['report'], 'w') as out:
+                json.dump(report, out, indent=1)
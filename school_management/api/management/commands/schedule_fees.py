@@ -0,0 +1,56 @@
+# api/management/commands/schedule_fees.py
+
+import time
+from datetime import date
+from django.core.management.base import BaseCommand, CommandError
+from api.fees import apply_late_fees, schedule_installments
+from api.models import FeeType, Student
+
+
+class Command(BaseCommand):
+    help = (
+        'Generates installment fees for a fee type according to its category plan and/or '
+        'applies late fees to every overdue fee in one set-based update. Run nightly with --late-fees.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--late-fees', action='store_true', help='Recompute late fees for overdue unpaid/partial fees')
+        parser.add_argument('--date', type=str, help='Treat YYYY-MM-DD as today when applying late fees')
+        parser.add_argument('--installments', type=int, metavar='FEE_TYPE_ID', help='Create installment fees for this fee type')
+        parser.add_argument('--start', type=str, help='First installment due date, YYYY-MM-DD (required with --installments)')
+        parser.add_argument('--class-id', type=int, help='Only schedule installments for students of this class')
+
+    def _parse_date(self, value, option):
+        try:
+            return date.fromisoformat(value)
+        except ValueError:
+            raise CommandError(f'{option} must be in YYYY-MM-DD format')
+
+    def handle(self, *args, **options):
+        if not options['late_fees'] and options['installments'] is None:
+            raise CommandError('Nothing to do: pass --late-fees and/or --installments FEE_TYPE_ID')
+
+        if options['installments'] is not None:
+            if not options['start']:
+                raise CommandError('--start is required with --installments')
+            try:
+                fee_type = FeeType.objects.get(pk=options['installments'])
+            except FeeType.DoesNotExist:
+                raise CommandError(f"Fee type {options['installments']} does not exist")
+            students = Student.objects.all()
+            if options['class_id']:
+                students = students.filter(school_class_id=options['class_id'])
+
+            started = time.perf_counter()
+            created = schedule_installments(fee_type, self._parse_date(options['start'], '--start'), students)
+            self.stdout.write(self.style.SUCCESS(
+                f"Created {created} installment fees for {fee_type.name} in {time.perf_counter() - started:.2f}s."
+            ))
+
+        if options['late_fees']:
+            today = self._parse_date(options['date'], '--date') if options['date'] else None
+            started = time.perf_counter()
+            updated = apply_late_fees(today)
+            self.stdout.write(self.style.SUCCESS(
+                f"Updated late fees on {updated} overdue fees in {time.perf_counter() - started:.2f}s."
+            ))
@@ -1,78 +1,247 @@
 # api/management/commands/seed_data.py
 
+import csv
+import io
+import math
 import random
-from django.core.management.base import BaseCommand
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import date, timedelta
+from itertools import islice
+import numpy as np
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand, CommandError
 from faker import Faker
-from django.db import transaction
-from datetime import timedelta
+from django.db import connection, transaction
+from api.attendance import bitmap_enabled, rebuild_bitmaps, rebuild_rollups
+from api.fees import rebuild_fee_summary, rebuild_student_balances
+from api.notifications import rebuild_unread_counts
+from api.reset import reset_school_data
+from api.schedule import bump_timetable_version
 from api.models import (
-    User, UserProfile, SchoolClass, Student, Teacher, FeeType, Fee,
-    Attendance, LeaveRequest, Assignment, Grade, Notification, Timetable, Period, Task
+    User, UserProfile, SchoolClass, Student, Teacher, FeeType, Fee, Attendance, LeaveRequest, Assignment, Grade,
+    Notification, Timetable, Period, Task,
 )
 
+FAKE_CHUNK = 5000
+ATTENDANCE_STATUSES = [Attendance.Status.PRESENT, Attendance.Status.ABSENT, Attendance.Status.LATE]
+ATTENDANCE_WEIGHTS = [0.9, 0.07, 0.03]
+SUBJECTS = [
+    'Mathematics', 'Physics', 'Chemistry', 'Biology', 'History', 'Geography',
+    'English', 'Art', 'Music', 'Physical Education', 'Computer Science', 'Economics'
+]
+TIMETABLE_SUBJECTS = ["Mathematics", "Physics", "Chemistry", "English", "History", "Art"]
+TASK_TEMPLATES = [
+    {
+        'title': 'Prepare lesson plan for Mathematics',
+        'description': 'Create detailed lesson plan for algebra chapter',
+        'task_type': 'lesson_planning',
+        'priority': 'high'
+    },
+    {
+        'title': 'Grade assignment submissions',
+        'description': 'Review and grade student assignments for the week',
+        'task_type': 'grade_assignments',
+        'priority': 'medium'
+    },
+    {
+        'title': 'Update attendance records',
+        'description': 'Mark attendance for today\'s classes',
+        'task_type': 'attendance_marking',
+        'priority': 'high'
+    },
+    {
+        'title': 'Parent-teacher meeting preparation',
+        'description': 'Prepare reports and materials for parent meetings',
+        'task_type': 'parent_meetings',
+        'priority': 'medium'
+    },
+    {
+        'title': 'Class preparation for tomorrow',
+        'description': 'Prepare materials and activities for next class',
+        'task_type': 'class_preparation',
+        'priority': 'high'
+    },
+    {
+        'title': 'Update student progress reports',
+        'description': 'Review and update individual student progress',
+        'task_type': 'administrative',
+        'priority': 'low'
+    },
+    {
+        'title': 'Plan laboratory experiment',
+        'description': 'Design and prepare chemistry lab experiment',
+        'task_type': 'lesson_planning',
+        'priority': 'medium'
+    },
+    {
+        'title': 'Review homework submissions',
+        'description': 'Check and provide feedback on homework',
+        'task_type': 'grade_assignments',
+        'priority': 'urgent'
+    }
+]
+
+
+def fake_people(seed, count):
+    """(first name, last name, phone, address) tuples; module-level so worker processes can run it."""
+    faker = Faker()
+    faker.seed_instance(seed)
+    return [
+        (faker.first_name(), faker.last_name(), faker.phone_number()[:20], faker.address())
+        for _ in range(count)
+    ]
+
 
 class Command(BaseCommand):
-    help = 'Seeds the database with a full set of realistic, random demo data for all models. Idempotent version.'
+    help = (
+        'Seeds the database with a full set of realistic, random demo data for all models. Idempotent version. '
+        'Rows are written with chunked bulk inserts (attendance as raw COPY/executemany) and the cached '
+        'counters and aggregates are rebuilt at the end, so large datasets for load testing seed quickly.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--students', type=int, default=360, help='Number of students (default 360)')
+        parser.add_argument('--class-size', type=int, default=30, help='Students per class (default 30)')
+        parser.add_argument('--days', type=int, default=30,
+                            help='Days of attendance history up to yesterday; weekdays get a row (default 30)')
+        parser.add_argument('--workers', type=int, default=1, help='Processes generating fake names and addresses')
+        parser.add_argument('--batch-size', type=int, default=5000, help='Rows per bulk insert (default 5000)')
+        parser.add_argument('--seed', type=int, help='Random seed for a reproducible dataset')
+        parser.add_argument('--password', default='demo', help='Password for every seeded user (default "demo")')
 
     @transaction.atomic
-    def handle(self, *args, **kwargs):
+    def handle(self, *args, **options):
+        if options['students'] < 1 or options['class_size'] < 1 or options['batch_size'] < 1:
+            raise CommandError('--students, --class-size and --batch-size must be positive.')
+        started = time.perf_counter()
         self.stdout.write(self.style.SUCCESS("\n--- Seeding Demo Data (Idempotent) ---"))
+        self.batch_size = options['batch_size']
+        self.random = random.Random(options['seed'])
+        self.rng = np.random.default_rng(options['seed'])
         self.faker = Faker()
+        self.faker.seed_instance(options['seed'])
+        # One hash shared by every seeded user instead of one slow hash per user
+        self.password = make_password(options['password'])
+
+        student_count = options['students']
+        class_count = math.ceil(student_count / options['class_size'])
+        teacher_count = max(12, class_count)
+        self.people = iter(self._fake_people(teacher_count + student_count, options['workers']))
 
         # Phase 1: Create foundational data
         self.stdout.write("Phase 1: Creating foundational data...")
+        reset_school_data()
+        self.stdout.write("Old data deleted successfully.")
         self._create_principal()
-        self._create_periods()
-        teachers = self._create_teachers(12)
-        classes = self._create_classes(teachers, 12)
-        self._create_fee_types()
+        periods = self._create_periods()
+        teachers = self._create_teachers(teacher_count)
+        classes = self._create_classes(teachers, class_count)
+        fee_types = self._create_fee_types()
         self.stdout.write(self.style.SUCCESS("-> Phase 1 Complete"))
 
         # Phase 2: Create class-level data
         self.stdout.write("Phase 2: Creating class-level data...")
-        all_teachers = list(Teacher.objects.all())
-        for school_class in classes:
-            self._create_realistic_timetable(school_class, all_teachers)
-            self._create_assignments_for_class(school_class)
+        self._create_timetables(classes, teachers, periods)
+        assignments = self._create_assignments(classes)
         self.stdout.write(self.style.SUCCESS("-> Phase 2 Complete"))
 
         # Phase 3: Create student-level data
         self.stdout.write("Phase 3: Creating students and related data...")
-        all_students = self._create_students_for_classes(classes)
+        students = self._create_students(classes, student_count)
+        self._create_fees(students, fee_types)
+        self._create_attendance(students, options['days'])
+        self._create_grades(students, assignments)
         self.stdout.write(self.style.SUCCESS("-> Phase 3 Complete"))
 
         # Phase 4: Post-creation activity
         self.stdout.write("Phase 4: Creating post-creation activity...")
-        self._create_leave_requests(all_students, all_teachers)
-        self._create_notifications(all_students, all_teachers)
-        self._create_sample_tasks(all_teachers)
+        user_ids = [user_id for user_id, _ in students] + teachers
+        self._create_leave_requests(user_ids)
+        self._create_notifications(user_ids)
+        self._create_sample_tasks(teachers)
         self.stdout.write(self.style.SUCCESS("-> Phase 4 Complete"))
 
-        self.stdout.write(self.style.SUCCESS('\nDatabase seeding complete!'))
-        self.stdout.write(self.style.SUCCESS('Password for ALL users is "demo".'))
+        # Phase 5: Bulk inserts skip the model signals, so rebuild what they maintain
+        self.stdout.write("Phase 5: Rebuilding cached counters and aggregates...")
+        rebuild_rollups()
+        if bitmap_enabled():
+            rebuild_bitmaps()
+        rebuild_fee_summary()
+        rebuild_student_balances()
+        rebuild_unread_counts()
+        transaction.on_commit(bump_timetable_version)
+        self.stdout.write(self.style.SUCCESS("-> Phase 5 Complete"))
+
+        self.stdout.write(self.style.SUCCESS(
+            f'\nDatabase seeding complete! {student_count} students in {class_count} classes '
+            f'({time.perf_counter() - started:.1f}s).'
+        ))
+        self.stdout.write(self.style.SUCCESS(f'Password for ALL users is "{options["password"]}".'))
 
     # --------------------------
-    # Foundational Data
+    # Bulk helpers
     # --------------------------
 
-    def _create_principal(self):
-        Grade.objects.all().delete()
-        Assignment.objects.all().delete()
-        Attendance.objects.all().delete()
-        Fee.objects.all().delete()
-        FeeType.objects.all().delete()
-        Notification.objects.all().delete()
-        LeaveRequest.objects.all().delete()
-        Timetable.objects.all().delete()
-        Task.objects.all().delete()
-        Student.objects.all().delete()
-        Teacher.objects.all().delete()
-        SchoolClass.objects.all().delete()
-        UserProfile.objects.all().delete()
-        User.objects.filter(is_superuser=False).delete()
-        self.stdout.write("Old data deleted successfully.")
+    def _fake_people(self, count, workers):
+        # Fixed-size chunks with their own seeds give the same people whatever the worker count
+        base = self.random.randrange(2 ** 31)
+        sizes = [min(FAKE_CHUNK, count - start) for start in range(0, count, FAKE_CHUNK)]
+        seeds = [base + n for n in range(len(sizes))]
+        if workers > 1 and len(sizes) > 1:
+            with ProcessPoolExecutor(max_workers=workers) as pool:
+                chunks = list(pool.map(fake_people, seeds, sizes))
+        else:
+            chunks = map(fake_people, seeds, sizes)
+        return [person for chunk in chunks for person in chunk]
+
+    def _bulk_create(self, model, objects):
+        """bulk_create from any iterable, building one batch of instances at a time."""
+        objects = iter(objects)
+        total = 0
+        while True:
+            batch = list(islice(objects, self.batch_size))
+            if not batch:
+                return total
+            model.objects.bulk_create(batch)
+            total += len(batch)
+
+    def _insert_rows(self, model, fields, rows):
+        """
+        Write value tuples straight to `model`'s table, skipping model instances:
+        COPY on PostgreSQL, executemany elsewhere. For the largest tables only.
+        """
+        quote = connection.ops.quote_name
+        table = quote(model._meta.db_table)
+        columns = ', '.join(quote(model._meta.get_field(name).column) for name in fields)
+        if connection.vendor == 'postgresql':
+            sql = f'COPY {table} ({columns}) FROM STDIN WITH (FORMAT csv)'
+        else:
+            sql = f"INSERT INTO {table} ({columns}) VALUES ({', '.join(['%s'] * len(fields))})"
+        rows = iter(rows)
+        total = 0
+        with connection.cursor() as cursor:
+            while True:
+                batch = list(islice(rows, self.batch_size * 20))
+                if not batch:
+                    return total
+                if connection.vendor == 'postgresql':
+                    buffer = io.StringIO()
+                    csv.writer(buffer).writerows(batch)
+                    buffer.seek(0)
+                    cursor.copy_expert(sql, buffer)
+                else:
+                    cursor.executemany(sql, batch)
+                total += len(batch)
+
+    def _user_ids(self, role):
+        return dict(User.objects.filter(role=role, is_superuser=False).values_list('username', 'id'))
 
+    # --------------------------
+    # Foundational Data
+    # --------------------------
 
+    def _create_principal(self):
         user, created = User.objects.get_or_create(
             username='principal',
             defaults={
@@ -82,14 +251,13 @@ class Command(BaseCommand):
                 'role': User.Role.PRINCIPAL,
                 'is_staff': True,
                 'is_superuser': True,
+                'password': self.password,
             },
         )
         if created:
-            user.set_password('demo')
-            user.save()
             UserProfile.objects.get_or_create(
                 user=user,
-                defaults={'phone': self.faker.phone_number(), 'address': self.faker.address()}
+                defaults={'phone': self.faker.phone_number()[:20], 'address': self.faker.address()}
             )
             self.stdout.write("  - Principal 'principal' created.")
         else:
@@ -110,52 +278,39 @@ class Command(BaseCommand):
         for data in periods_data:
             Period.objects.get_or_create(period_number=data['period_number'], defaults=data)
         self.stdout.write("  - Standard Periods ensured.")
+        return list(Period.objects.values_list('start_time', 'end_time'))
 
     def _create_teachers(self, count):
-        teachers = []
-        subjects = [
-            'Mathematics', 'Physics', 'Chemistry', 'Biology', 'History', 'Geography',
-            'English', 'Art', 'Music', 'Physical Education', 'Computer Science', 'Economics'
-        ]
-        for i in range(count):
-            username = f"teacher{i+1}"
-            user, created = User.objects.get_or_create(
-                username=username,
-                defaults={
-                    'password': 'demo',
-                    'first_name': self.faker.first_name(),
-                    'last_name': self.faker.last_name(),
-                    'email': f"{username}@school.edu",
-                    'role': User.Role.TEACHER,
-                }
-            )
-            if created:
-                user.set_password('demo')
-                user.save()
-                UserProfile.objects.get_or_create(
-                    user=user,
-                    defaults={
-                        'subject': subjects[i % len(subjects)],
-                        'phone': self.faker.phone_number(),
-                        'address': self.faker.address(),
-                    }
-                )
-                teacher, _ = Teacher.objects.get_or_create(user=user)
-                teachers.append(teacher)
+        """Returns the teacher ids (their user ids) in creation order."""
+        people = list(islice(self.people, count))
+        self._bulk_create(User, (
+            User(
+                username=f"teacher{i+1}", password=self.password, first_name=first, last_name=last,
+                email=f"teacher{i+1}@school.edu", role=User.Role.TEACHER,
+            ) for i, (first, last, _, _) in enumerate(people)
+        ))
+        ids = self._user_ids(User.Role.TEACHER)
+        teacher_ids = [ids[f"teacher{i+1}"] for i in range(count)]
+        self._bulk_create(Teacher, (Teacher(user_id=user_id) for user_id in teacher_ids))
+        self._bulk_create(UserProfile, (
+            UserProfile(user_id=user_id, subject=SUBJECTS[i % len(SUBJECTS)], phone=phone, address=address)
+            for i, (user_id, (_, _, phone, address)) in enumerate(zip(teacher_ids, people))
+        ))
         self.stdout.write(f"  - {count} Teachers ensured.")
-        return Teacher.objects.all()
+        return teacher_ids
 
     def _create_classes(self, teachers, count):
-        classes = []
-        for i in range(count):
-            teacher_user = teachers[i].user
-            school_class, _ = SchoolClass.objects.get_or_create(
-                name=f"Grade {i+1}",
-                defaults={'teacher': teacher_user},
-            )
-            classes.append(school_class)
+        """Returns (class id, name) pairs; classes past the twelfth grade become extra sections."""
+        names = [
+            f"Grade {i % 12 + 1}" + (f"-{i // 12 + 1}" if i >= 12 else '')
+            for i in range(count)
+        ]
+        self._bulk_create(SchoolClass, (
+            SchoolClass(name=name, teacher_id=teacher_id) for name, teacher_id in zip(names, teachers)
+        ))
+        ids = dict(SchoolClass.objects.values_list('name', 'id'))
         self.stdout.write(f"  - {count} Classes ensured.")
-        return classes
+        return [(ids[name], name) for name in names]
 
     def _create_fee_types(self):
         fee_types_data = [
@@ -174,199 +329,161 @@ class Command(BaseCommand):
         for data in fee_types_data:
             FeeType.objects.get_or_create(name=data['name'], defaults=data)
         self.stdout.write("  - Fee structure ensured.")
+        return list(FeeType.objects.values_list('id', 'amount'))
 
     # --------------------------
     # Class-Level Data
     # --------------------------
 
-    def _create_realistic_timetable(self, school_class, all_teachers):
-        all_periods = list(Period.objects.all())
-        subjects = ["Mathematics", "Physics", "Chemistry", "English", "History", "Art"]
-        # Clear existing timetable entries for this class
-        Timetable.objects.filter(school_class=school_class).delete()
-        for day in Timetable.Day.values:
-            for period in random.sample(all_periods, random.randint(5, 8)):
-                Timetable.objects.get_or_create(
-                    school_class=school_class,
-                    day_of_week=day,
-                    start_time=period.start_time,
-                    end_time=period.end_time,
-                    defaults={
-                        'subject': random.choice(subjects),
-                        'teacher': random.choice(all_teachers)
-                    }
-                )
+    def _create_timetables(self, classes, teachers, periods):
+        def entries():
+            for class_id, _ in classes:
+                for day in Timetable.Day.values:
+                    for start_time, end_time in self.random.sample(periods, self.random.randint(5, 8)):
+                        yield Timetable(
+                            school_class_id=class_id, day_of_week=day, start_time=start_time, end_time=end_time,
+                            subject=self.random.choice(TIMETABLE_SUBJECTS), teacher_id=self.random.choice(teachers),
+                        )
+
+        count = self._bulk_create(Timetable, entries())
+        self.stdout.write(f"  - {count} timetable slots created.")
 
-    def _create_assignments_for_class(self, school_class):
-        Assignment.objects.filter(school_class=school_class).delete()
-        for _ in range(random.randint(3, 5)):
-            Assignment.objects.create(
-                school_class=school_class,
+    def _create_assignments(self, classes):
+        """Returns {class id: [assignment id, ...]}."""
+        today = date.today()
+        self._bulk_create(Assignment, (
+            Assignment(
+                school_class_id=class_id,
                 title=self.faker.sentence(nb_words=4),
                 description=self.faker.paragraph(nb_sentences=2),
-                due_date=self.faker.date_between(start_date='+10d', end_date='+60d')
+                due_date=today + timedelta(days=self.random.randint(10, 60)),
             )
+            for class_id, _ in classes for _ in range(self.random.randint(3, 5))
+        ))
+        assignments = {}
+        for assignment_id, class_id in Assignment.objects.values_list('id', 'school_class_id'):
+            assignments.setdefault(class_id, []).append(assignment_id)
+        self.stdout.write(f"  - Assignments created for {len(classes)} classes.")
+        return assignments
 
     # --------------------------
     # Student-Level Data
     # --------------------------
 
-    def _create_students_for_classes(self, classes):
-        all_students = []
-        fee_types = list(FeeType.objects.all())
-        for school_class in classes:
-            class_assignments = list(Assignment.objects.filter(school_class=school_class))
-            # Clear existing students for this class
-            Student.objects.filter(school_class=school_class).delete()
-            for _ in range(random.randint(25, 35)):
-                username = f"student{User.objects.filter(role=User.Role.STUDENT).count() + 1}"
-                user = User.objects.create_user(
-                    username=username,
-                    password='demo',
-                    first_name=self.faker.first_name(),
-                    last_name=self.faker.last_name(),
-                    email=f"{username}@school.edu",
-                    role=User.Role.STUDENT
-                )
-                student = Student.objects.create(user=user, school_class=school_class)
-                UserProfile.objects.create(
-                    user=user,
-                    class_name=school_class.name,
-                    address=self.faker.address(),
-                    phone=self.faker.phone_number()
-                )
-                all_students.append(student)
-
-                for _ in range(random.randint(2, 5)):
-                    Fee.objects.create(
-                        student=student,
-                        amount=random.choice(fee_types).amount,
-                        due_date=self.faker.date_between(start_date='-45d', end_date='+45d'),
-                        status=random.choice(Fee.Status.values)
+    def _create_students(self, classes, count):
+        """Returns (student id, class id) pairs, spreading students evenly over the classes."""
+        people = list(islice(self.people, count))
+        self._bulk_create(User, (
+            User(
+                username=f"student{i+1}", password=self.password, first_name=first, last_name=last,
+                email=f"student{i+1}@school.edu", role=User.Role.STUDENT,
+            ) for i, (first, last, _, _) in enumerate(people)
+        ))
+        ids = self._user_ids(User.Role.STUDENT)
+        students = [(ids[f"student{i+1}"], classes[i % len(classes)]) for i in range(count)]
+        self._bulk_create(Student, (
+            Student(user_id=user_id, school_class_id=class_id, roll_number=str(i // len(classes) + 1))
+            for i, (user_id, (class_id, _)) in enumerate(students)
+        ))
+        self._bulk_create(UserProfile, (
+            UserProfile(user_id=user_id, class_name=class_name, address=address, phone=phone)
+            for (user_id, (_, class_name)), (_, _, phone, address) in zip(students, people)
+        ))
+        self.stdout.write(f"  - {count} Students created.")
+        return [(user_id, class_id) for user_id, (class_id, _) in students]
+
+    def _create_fees(self, students, fee_types):
+        today = date.today()
+
+        def fees():
+            for student_id, _ in students:
+                for fee_type_id, amount in self.random.sample(fee_types, self.random.randint(2, 5)):
+                    status = self.random.choice(Fee.Status.values)
+                    yield Fee(
+                        student_id=student_id, fee_type_id=fee_type_id, amount=amount,
+                        due_date=today + timedelta(days=self.random.randint(-45, 45)), status=status,
+                        amount_paid=amount if status == Fee.Status.PAID else
+                        amount / 2 if status == Fee.Status.PARTIAL else 0,
                     )
-                for _ in range(15):
-                    Attendance.objects.get_or_create(
-                        student=student,
-                        date=self.faker.date_between(start_date='-30d', end_date='-1d'),
-                        defaults={'status': random.choice(Attendance.Status.values)}
-                    )
-                if class_assignments:
-                    for assignment in class_assignments:
-                        Grade.objects.create(
-                            student=student,
-                            assignment=assignment,
-                            score=random.randint(60, 100)
-                        )
-        self.stdout.write(f"  - Students created with full related data.")
-        return all_students
+
+        count = self._bulk_create(Fee, fees())
+        self.stdout.write(f"  - {count} fees created.")
+
+    def _create_attendance(self, students, days):
+        today = date.today()
+        school_days = [
+            day for day in (today - timedelta(days=n) for n in range(days, 0, -1)) if day.weekday() < 5
+        ]
+        if not school_days:
+            return
+
+        def rows():
+            student_ids = [student_id for student_id, _ in students]
+            for start in range(0, len(student_ids), 1000):
+                chunk = student_ids[start:start + 1000]
+                codes = self.rng.choice(len(ATTENDANCE_STATUSES), size=(len(chunk), len(school_days)),
+                                        p=ATTENDANCE_WEIGHTS)
+                for student_id, student_codes in zip(chunk, codes.tolist()):
+                    for day, code in zip(school_days, student_codes):
+                        yield student_id, day.isoformat(), ATTENDANCE_STATUSES[code]
+
+        count = self._insert_rows(Attendance, ['student', 'date', 'status'], rows())
+        self.stdout.write(f"  - {count} attendance records over {len(school_days)} school days created.")
+
+    def _create_grades(self, students, assignments):
+        count = self._bulk_create(Grade, (
+            Grade(student_id=student_id, assignment_id=assignment_id, score=self.random.randint(60, 100))
+            for student_id, class_id in students for assignment_id in assignments.get(class_id, [])
+        ))
+        self.stdout.write(f"  - {count} grades created.")
 
     # --------------------------
     # Post-Creation Activity
     # --------------------------
 
-    def _create_leave_requests(self, students, teachers):
-        users = [s.user for s in students] + [t.user for t in teachers]
-        LeaveRequest.objects.all().delete()
-        for user in random.sample(users, min(len(users), 5)):
-            start_date = self.faker.date_between(start_date='-10d', end_date='+10d')
-            LeaveRequest.objects.create(
-                user=user,
-                start_date=start_date,
-                end_date=start_date + timedelta(days=random.randint(1, 3)),
-                reason=self.faker.sentence(),
-                status=random.choice(LeaveRequest.Status.values)
-            )
+    def _create_leave_requests(self, user_ids):
+        today = date.today()
+
+        def requests():
+            for user_id in self.random.sample(user_ids, min(len(user_ids), max(5, len(user_ids) // 100))):
+                start_date = today + timedelta(days=self.random.randint(-10, 10))
+                yield LeaveRequest(
+                    user_id=user_id,
+                    start_date=start_date,
+                    end_date=start_date + timedelta(days=self.random.randint(1, 3)),
+                    reason=self.faker.sentence(),
+                    status=self.random.choice(LeaveRequest.Status.values)
+                )
+
+        self._bulk_create(LeaveRequest, requests())
         self.stdout.write("  - Random leave requests created.")
 
-    def _create_notifications(self, students, teachers):
-        users = [s.user for s in students] + [t.user for t in teachers]
-        Notification.objects.all().delete()
-        for user in random.sample(users, min(len(users), 10)):
-            Notification.objects.create(
-                user=user,
+    def _create_notifications(self, user_ids):
+        self._bulk_create(Notification, (
+            Notification(
+                user_id=user_id,
                 title=self.faker.sentence(nb_words=3),
-                message=self.faker.paragraph(nb_sentences=1)
+                message=self.faker.paragraph(nb_sentences=1),
             )
+            for user_id in self.random.sample(user_ids, min(len(user_ids), max(10, len(user_ids) // 10)))
+        ))
         self.stdout.write("  - Random notifications created.")
 
     def _create_sample_tasks(self, teachers):
         """Create sample tasks for teachers."""
-        Task.objects.all().delete()  # Clear existing tasks
-
-        task_templates = [
-            {
-                'title': 'Prepare lesson plan for Mathematics',
-                'description': 'Create detailed lesson plan for algebra chapter',
-                'task_type': 'lesson_planning',
-                'priority': 'high'
-            },
-            {
-                'title': 'Grade assignment submissions',
-                'description': 'Review and grade student assignments for the week',
-                'task_type': 'grade_assignments',
-                'priority': 'medium'
-            },
-            {
-                'title': 'Update attendance records',
-                'description': 'Mark attendance for today\'s classes',
-                'task_type': 'attendance_marking',
-                'priority': 'high'
-            },
-            {
-                'title': 'Parent-teacher meeting preparation',
-                'description': 'Prepare reports and materials for parent meetings',
-                'task_type': 'parent_meetings',
-                'priority': 'medium'
-            },
-            {
-                'title': 'Class preparation for tomorrow',
-                'description': 'Prepare materials and activities for next class',
-                'task_type': 'class_preparation',
-                'priority': 'high'
-            },
-            {
-                'title': 'Update student progress reports',
-                'description': 'Review and update individual student progress',
-                'task_type': 'administrative',
-                'priority': 'low'
-            },
-            {
-                'title': 'Plan laboratory experiment',
-                'description': 'Design and prepare chemistry lab experiment',
-                'task_type': 'lesson_planning',
-                'priority': 'medium'
-            },
-            {
-                'title': 'Review homework submissions',
-                'description': 'Check and provide feedback on homework',
-                'task_type': 'grade_assignments',
-                'priority': 'urgent'
-            }
-        ]
-
-        tasks_created = 0
-        for teacher in teachers:
-            # Create 3-5 tasks per teacher
-            num_tasks = random.randint(3, 5)
-            selected_templates = random.sample(task_templates, num_tasks)
-
-            for template in selected_templates:
-                # Random due date within next 7 days
-                due_date = self.faker.date_between(start_date='today', end_date='+7d')
-
-                # Some tasks for today
-                if random.choice([True, False]):
-                    due_date = self.faker.date_between(start_date='today', end_date='today')
-
-                Task.objects.create(
-                    teacher=teacher,
-                    title=template['title'],
-                    description=template['description'],
-                    task_type=template['task_type'],
-                    priority=template['priority'],
-                    due_date=due_date,
-                    status=random.choice(['pending', 'in_progress', 'completed'])
-                )
-                tasks_created += 1
+        today = date.today()
+
+        def tasks():
+            for teacher_id in teachers:
+                # Create 3-5 tasks per teacher, some of them due today
+                for template in self.random.sample(TASK_TEMPLATES, self.random.randint(3, 5)):
+                    due_in = 0 if self.random.choice([True, False]) else self.random.randint(0, 7)
+                    yield Task(
+                        teacher_id=teacher_id,
+                        due_date=today + timedelta(days=due_in),
+                        status=self.random.choice(['pending', 'in_progress', 'completed']),
+                        **template,
+                    )
 
+        tasks_created = self._bulk_create(Task, tasks())
         self.stdout.write(f"  - {tasks_created} sample tasks created for {len(teachers)} teachers.")
@@ -0,0 +1,98 @@
+# api/management/commands/tune_password_hasher.py
+
+import importlib.util
+import statistics
+import time
+from django.conf import settings
+from django.contrib.auth.hashers import PBKDF2PasswordHasher
+from django.core.management.base import BaseCommand, CommandError
+from api.hasher_profiles import HASHER_PROFILES, PROFILE_LIBRARIES
+
+PASSWORD = 'correct horse battery staple'
+
+
+def _pbkdf2(iterations):
+    hasher, salt = PBKDF2PasswordHasher(), PBKDF2PasswordHasher().salt()
+    return lambda: hasher.encode(PASSWORD, salt, iterations=iterations)
+
+
+def _argon2(time_cost, memory_cost, parallelism):
+    import argon2
+
+    hasher = argon2.PasswordHasher(time_cost=time_cost, memory_cost=memory_cost, parallelism=parallelism)
+    return lambda: hasher.hash(PASSWORD)
+
+
+def _bcrypt(rounds):
+    import bcrypt
+
+    salt = bcrypt.gensalt(rounds)
+    return lambda: bcrypt.hashpw(PASSWORD.encode(), salt)
+
+
+class Command(BaseCommand):
+    help = (
+        'Measures password hashing time on this machine and recommends the largest cost for a '
+        'hasher profile that stays within --target-ms per login.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--profile', choices=sorted(HASHER_PROFILES), default='pbkdf2')
+        parser.add_argument('--target-ms', type=float, default=100.0, help='Hashing budget per login (default 100ms)')
+        parser.add_argument('--repeat', type=int, default=3, help='Timings per candidate; the median is used')
+        parser.add_argument('--argon2-memory', type=int, default=65536, help='Argon2 memory cost in KiB (default 64 MiB)')
+        parser.add_argument(
+            '--argon2-parallelism', type=int, default=settings.PASSWORD_ARGON2_PARALLELISM,
+            help='Argon2 lanes (default PASSWORD_ARGON2_PARALLELISM)',
+        )
+
+    def _median_ms(self, run, repeat):
+        timings = []
+        for _ in range(repeat):
+            started = time.perf_counter()
+            run()
+            timings.append((time.perf_counter() - started) * 1000)
+        return statistics.median(timings)
+
+    def handle(self, *args, **options):
+        profile, target, repeat = options['profile'], options['target_ms'], options['repeat']
+        library = PROFILE_LIBRARIES.get(profile)
+        if library and importlib.util.find_spec(library) is None:
+            raise CommandError(f"The '{profile}' profile needs the '{library}' package installed.")
+
+        if profile == 'pbkdf2':
+            # Cost is linear in iterations, so scale from one measurement and confirm
+            base = 100000
+            per_iteration = self._median_ms(_pbkdf2(base), repeat) / base
+            iterations = max(100000, int(target / per_iteration) // 10000 * 10000)
+            measured = self._median_ms(_pbkdf2(iterations), repeat)
+            settings_lines = [f'PASSWORD_PBKDF2_ITERATIONS={iterations}']
+        elif profile == 'argon2':
+            memory, parallelism = options['argon2_memory'], options['argon2_parallelism']
+            time_cost, measured = 1, self._median_ms(_argon2(1, memory, parallelism), repeat)
+            while True:
+                candidate = self._median_ms(_argon2(time_cost + 1, memory, parallelism), repeat)
+                if candidate > target:
+                    break
+                time_cost, measured = time_cost + 1, candidate
+            settings_lines = [
+                f'PASSWORD_ARGON2_TIME_COST={time_cost}',
+                f'PASSWORD_ARGON2_MEMORY_COST={memory}',
+                f'PASSWORD_ARGON2_PARALLELISM={parallelism}',
+            ]
+        else:
+            rounds, measured = 10, self._median_ms(_bcrypt(10), repeat)
+            while rounds < 16:
+                candidate = self._median_ms(_bcrypt(rounds + 1), repeat)
+                if candidate > target:
+                    break
+                rounds, measured = rounds + 1, candidate
+            settings_lines = [f'PASSWORD_BCRYPT_ROUNDS={rounds}']
+
+        if measured > target:
+            self.stdout.write(self.style.WARNING(f'The minimum cost already takes {measured:.0f}ms on this machine.'))
+        self.stdout.write(f'{profile}: {measured:.0f}ms per hash ({1000 / measured:.1f} logins/s per core).')
+        self.stdout.write('Add to the environment:')
+        self.stdout.write(f'PASSWORD_HASHER_PROFILE={profile}')
+        for line in settings_lines:
+            self.stdout.write(line)
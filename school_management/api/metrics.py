@@ -0,0 +1,416 @@
+# api/metrics.py
+"""
+Prometheus metrics without a client library.
+
+Each process counts into an in-memory `Registry` (a dict update under a
+lock per event). `MetricsMiddleware` records request counts and latency per
+route name (the `name=` of the pattern in `api/urls.py`), database queries
+and time per connection alias, and cache hits and misses per alias in
+`CACHES`. `generate_reports` records how long each report run took.
+
+Several worker processes (gunicorn, uvicorn, several nodes) each have their
+own registry. Every `METRICS_FLUSH_SECONDS` a process writes its snapshot to
+the `METRICS_CACHE_ALIAS` cache (its own table, not the page cache's) under
+its own key and lists itself in a shared index;
+`GET /metrics` sums the snapshots of every process seen within
+`METRICS_PROCESS_TTL_SECONDS`. Counters of a process that stopped disappear
+after that TTL, which Prometheus treats as a counter reset.
+"""
+
+import logging
+import os
+import socket
+import threading
+import time
+from bisect import bisect_left
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.core.cache import caches
+from django.db import connections
+from django.db.backends.signals import connection_created
+from django.http import HttpResponse, HttpResponseForbidden
+from django.urls import Resolver404, resolve
+from django.utils.crypto import constant_time_compare
+from django.views.decorators.cache import never_cache
+
+logger = logging.getLogger(__name__)
+
+PROCESSES_KEY = 'metrics:processes'
+REQUEST_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+REPORT_BUCKETS = (0.1, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300)
+
+# name -> (type, help, histogram buckets)
+METRICS = {
+    'school_http_requests_total': ('counter', 'HTTP requests by route name, method and status.', None),
+    'school_http_request_duration_seconds': ('histogram', 'HTTP request latency by route name.', REQUEST_BUCKETS),
+    'school_db_queries_total': ('counter', 'SQL statements executed per database alias.', None),
+    'school_db_query_seconds_total': ('counter', 'Time spent executing SQL per database alias.', None),
+    'school_db_connections_opened_total': ('counter', 'Database connections opened per alias.', None),
+    'school_db_connections': ('gauge', 'Server connections to the database by state (PostgreSQL only).', None),
+    'school_cache_requests_total': ('counter', 'Cache lookups per alias and result (hit or miss).', None),
+    'school_cache_hit_ratio': ('gauge', 'Cache hits / lookups per alias since the processes started.', None),
+    'school_realtime_subscribers': ('gauge', 'Open Server-Sent Events streams.', None),
+    'school_realtime_queued_events': ('gauge', 'Events waiting in stream delivery queues.', None),
+    'school_report_generation_seconds': ('histogram', 'Report generation time by report type and outcome.', REPORT_BUCKETS),
+    'school_metrics_processes': ('gauge', 'Worker processes included in this scrape.', None),
+}
+
+
+class Registry:
+    """
+    One process's metrics: {(name, labels): value} for counters and gauges and
+    {(name, labels): [bucket counts..., +Inf count, sum]} for histograms,
+    where labels is a tuple of (label, value) pairs.
+    """
+
+    def __init__(self):
+        self._values = {}
+        self._histograms = {}
+        self._lock = threading.Lock()
+        self.flushed_at = None
+
+    def inc(self, name, labels=(), value=1):
+        key = (name, labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + value
+
+    def set(self, name, labels=(), value=0):
+        with self._lock:
+            self._values[(name, labels)] = value
+
+    def observe(self, name, labels, seconds):
+        buckets = METRICS[name][2]
+        key = (name, labels)
+        with self._lock:
+            counts = self._histograms.get(key)
+            if counts is None:
+                counts = self._histograms[key] = [0] * (len(buckets) + 2)
+            counts[bisect_left(buckets, seconds)] += 1
+            counts[-1] += seconds
+
+    def snapshot(self):
+        with self._lock:
+            return {'values': dict(self._values), 'histograms': {key: list(v) for key, v in self._histograms.items()}}
+
+    def clear(self):
+        with self._lock:
+            self._values.clear()
+            self._histograms.clear()
+            self.flushed_at = None
+
+
+registry = Registry()
+
+
+# --------------------------
+# Collectors
+# --------------------------
+
+_cache_observers = []
+_local = threading.local()
+_MISS = object()
+
+
+def observe_caches(callback):
+    """Call `callback(alias, hits, misses)` after every instrumented cache lookup."""
+    if callback not in _cache_observers:
+        _cache_observers.append(callback)
+
+
+class untracked:
+    """Cache lookups inside this block are not reported (the metrics' own reads and writes)."""
+
+    def __enter__(self):
+        self._previous = getattr(_local, 'busy', False)
+        _local.busy = True
+
+    def __exit__(self, *exc_info):
+        _local.busy = self._previous
+
+
+def _instrument(alias, cache):
+    if getattr(cache, '_observed', False):
+        return
+    original_get, original_get_many = cache.get, cache.get_many
+
+    def get(key, default=None, version=None):
+        if getattr(_local, 'busy', False):
+            return original_get(key, default, version=version)
+        with untracked():  # backends implement get() with get_many(); count once
+            value = original_get(key, _MISS, version=version)
+        hit = value is not _MISS
+        for callback in _cache_observers:
+            callback(alias, int(hit), int(not hit))
+        return value if hit else default
+
+    def get_many(keys, version=None):
+        if getattr(_local, 'busy', False):
+            return original_get_many(keys, version=version)
+        keys = list(keys)
+        with untracked():
+            found = original_get_many(keys, version=version)
+        for callback in _cache_observers:
+            callback(alias, len(found), len(keys) - len(found))
+        return found
+
+    cache.get, cache.get_many = get, get_many
+    cache._observed = True
+
+
+def instrument_caches():
+    """Report lookups on this thread's instance of every configured cache to the observers."""
+    for alias in settings.CACHES:
+        _instrument(alias, caches[alias])
+
+
+def _count_cache(alias, hits, misses):
+    if hits:
+        registry.inc('school_cache_requests_total', (('alias', alias), ('result', 'hit')), hits)
+    if misses:
+        registry.inc('school_cache_requests_total', (('alias', alias), ('result', 'miss')), misses)
+
+
+observe_caches(_count_cache)
+
+
+def _count_query(execute, sql, params, many, context):
+    # connection.execute_wrapper hook, installed once per connection
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        labels = (('alias', context['connection'].alias),)
+        registry.inc('school_db_queries_total', labels)
+        registry.inc('school_db_query_seconds_total', labels, time.perf_counter() - started)
+
+
+def _wrap(connection):
+    if _count_query not in connection.execute_wrappers:
+        # At the bottom, below wrappers pushed and popped by execute_wrapper() blocks
+        connection.execute_wrappers.insert(0, _count_query)
+
+
+def count_queries():
+    """Count the statements of this thread's connections."""
+    for connection in connections.all():
+        _wrap(connection)
+
+
+def _count_connection(sender, connection, **kwargs):
+    registry.inc('school_db_connections_opened_total', (('alias', connection.alias),))
+    _wrap(connection)
+
+
+connection_created.connect(_count_connection, dispatch_uid='api.metrics.connection_created')
+
+
+def observe_report(report_type, seconds, outcome='success'):
+    registry.observe(
+        'school_report_generation_seconds', (('report_type', report_type), ('outcome', outcome)), seconds,
+    )
+
+
+def _process_gauges():
+    from .realtime import broker
+
+    registry.set('school_realtime_subscribers', value=broker.subscriber_count())
+    registry.set('school_realtime_queued_events', value=broker.queued_events())
+
+
+# --------------------------
+# Aggregation across processes
+# --------------------------
+
+def _process_key():
+    return f'metrics:proc:{socket.gethostname()}:{os.getpid()}'
+
+
+def flush_due():
+    flushed_at = registry.flushed_at
+    return flushed_at is None or time.monotonic() - flushed_at >= settings.METRICS_FLUSH_SECONDS
+
+
+def flush(force=False):
+    """Publish this process's snapshot if METRICS_FLUSH_SECONDS have passed (always with `force`)."""
+    if not force and not flush_due():
+        return
+    registry.flushed_at = time.monotonic()
+    _process_gauges()
+    ttl = settings.METRICS_PROCESS_TTL_SECONDS
+    key = _process_key()
+    try:
+        with untracked():
+            cache = caches[settings.METRICS_CACHE_ALIAS]
+            cache.set(key, registry.snapshot(), timeout=ttl)
+            # Read-modify-write: a concurrent flush can drop an entry, which its process re-adds on its next flush
+            processes = cache.get(PROCESSES_KEY) or {}
+            processes[key] = time.time()
+            cache.set(PROCESSES_KEY, processes, timeout=None)
+    except Exception:
+        logger.exception('Could not publish metrics')
+
+
+def collect():
+    """Sum of the snapshots of every live process: ({(name, labels): value}, histograms, processes)."""
+    flush(force=True)
+    with untracked():
+        cache = caches[settings.METRICS_CACHE_ALIAS]
+        processes = cache.get(PROCESSES_KEY) or {}
+        horizon = time.time() - settings.METRICS_PROCESS_TTL_SECONDS
+        live = {key: seen for key, seen in processes.items() if seen > horizon}
+        if len(live) != len(processes):
+            cache.set(PROCESSES_KEY, live, timeout=None)
+        snapshots = cache.get_many(list(live))
+
+    values, histograms = {}, {}
+    for snapshot in snapshots.values():
+        for key, value in snapshot['values'].items():
+            values[key] = values.get(key, 0) + value
+        for key, counts in snapshot['histograms'].items():
+            total = histograms.setdefault(key, [0] * len(counts))
+            for index, count in enumerate(counts):
+                total[index] += count
+    return values, histograms, len(snapshots)
+
+
+def _scrape_gauges(values):
+    """Gauges computed once per scrape rather than per process."""
+    lookups = {}
+    for (name, labels), value in values.items():
+        if name == 'school_cache_requests_total':
+            alias, result = dict(labels)['alias'], dict(labels)['result']
+            lookups.setdefault(alias, {'hit': 0, 'miss': 0})[result] += value
+    for alias, counts in lookups.items():
+        total = counts['hit'] + counts['miss']
+        values[('school_cache_hit_ratio', (('alias', alias),))] = counts['hit'] / total if total else 0
+
+    for connection in connections.all():
+        if connection.vendor != 'postgresql':
+            continue
+        try:
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    'SELECT COALESCE(state, %s), COUNT(*) FROM pg_stat_activity WHERE datname = current_database() '
+                    'GROUP BY 1', ['unknown'],
+                )
+                for state, count in cursor.fetchall():
+                    values[('school_db_connections', (('alias', connection.alias), ('state', state)))] = count
+        except Exception:
+            logger.exception('Could not read pg_stat_activity for %s', connection.alias)
+
+
+# --------------------------
+# Exposition
+# --------------------------
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _labels(labels, extra=()):
+    pairs = tuple(labels) + tuple(extra)
+    if not pairs:
+        return ''
+    return '{' + ','.join(f'{name}="{_escape(value)}"' for name, value in pairs) + '}'
+
+
+def _number(value):
+    if isinstance(value, float):
+        return repr(round(value, 6))
+    return str(value)
+
+
+def render(values, histograms):
+    """Prometheus text exposition format (version 0.0.4)."""
+    by_name = {}
+    for (name, labels), value in values.items():
+        by_name.setdefault(name, []).append((labels, value))
+    for (name, labels), counts in histograms.items():
+        by_name.setdefault(name, []).append((labels, counts))
+
+    lines = []
+    for name, (kind, help_text, buckets) in METRICS.items():
+        series = by_name.get(name)
+        if not series:
+            continue
+        lines.append(f'# HELP {name} {help_text}')
+        lines.append(f'# TYPE {name} {kind}')
+        for labels, value in sorted(series, key=lambda item: item[0]):
+            if kind != 'histogram':
+                lines.append(f'{name}{_labels(labels)} {_number(value)}')
+                continue
+            cumulative = 0
+            for bound, count in zip(buckets + ('+Inf',), value[:-1]):
+                cumulative += count
+                lines.append(f'{name}_bucket{_labels(labels, [("le", bound)])} {cumulative}')
+            lines.append(f'{name}_sum{_labels(labels)} {_number(value[-1])}')
+            lines.append(f'{name}_count{_labels(labels)} {cumulative}')
+    return '\n'.join(lines) + '\n'
+
+
+@never_cache
+def metrics_view(request):
+    """GET /metrics, for Prometheus. Needs `Authorization: Bearer <METRICS_TOKEN>`; tokenless only under DEBUG."""
+    token = settings.METRICS_TOKEN
+    if not token and not settings.DEBUG:
+        return HttpResponseForbidden('Set METRICS_TOKEN to serve metrics.')
+    if token and not constant_time_compare(request.headers.get('Authorization', ''), f'Bearer {token}'):
+        return HttpResponseForbidden()
+    values, histograms, process_count = collect()
+    values[('school_metrics_processes', ())] = process_count
+    _scrape_gauges(values)
+    return HttpResponse(render(values, histograms), content_type='text/plain; version=0.0.4; charset=utf-8')
+
+
+# --------------------------
+# Middleware
+# --------------------------
+
+def route_name(request):
+    """The matched URL pattern's name (or route), also for responses served before URL resolution."""
+    match = request.resolver_match
+    if match is None:
+        try:
+            match = resolve(request.path_info)
+        except Resolver404:
+            return 'unmatched'
+    return match.view_name or match.route or 'unnamed'
+
+
+class MetricsMiddleware:
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        instrument_caches()
+        count_queries()
+        started = time.perf_counter()
+        response = self.get_response(request)
+        self.record(request, response, time.perf_counter() - started)
+        flush()
+        return response
+
+    async def __acall__(self, request):
+        # Sync code of this request runs in other threads; their connections are wrapped when opened
+        instrument_caches()
+        started = time.perf_counter()
+        response = await self.get_response(request)
+        self.record(request, response, time.perf_counter() - started)
+        if flush_due():
+            await sync_to_async(flush)(force=True)
+        return response
+
+    @staticmethod
+    def record(request, response, elapsed):
+        route = route_name(request)
+        registry.inc('school_http_requests_total', (
+            ('route', route), ('method', request.method), ('status', str(response.status_code)),
+        ))
+        registry.observe('school_http_request_duration_seconds', (('route', route), ('method', request.method)), elapsed)
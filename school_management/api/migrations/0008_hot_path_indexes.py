@@ -0,0 +1,45 @@
+# Generated by Django 4.2.23 on 2026-10-18 21:08
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0007_student_admission_date_student_father_name_and_more'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='fee',
+            index=models.Index(fields=['status', 'due_date'], name='fee_status_due_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='fee',
+            index=models.Index(condition=models.Q(('status__in', ['unpaid', 'partial'])), fields=['due_date'], name='fee_outstanding_due_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='leaverequest',
+            index=models.Index(fields=['status'], name='leave_status_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='notification',
+            index=models.Index(fields=['user', 'is_read'], name='notification_user_read_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='notification',
+            index=models.Index(condition=models.Q(('is_read', False)), fields=['user', '-created_at'], name='notification_unread_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='task',
+            index=models.Index(fields=['teacher', 'due_date'], name='task_teacher_due_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='timetable',
+            index=models.Index(fields=['school_class', 'day_of_week'], name='timetable_class_day_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='timetable',
+            index=models.Index(fields=['teacher', 'day_of_week'], name='timetable_teacher_day_idx'),
+        ),
+    ]
@@ -0,0 +1,61 @@
+# Generated by Django 4.2.23 on 2026-10-18 21:10
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def build_rollups(apps, schema_editor):
+    Attendance = apps.get_model('api', 'Attendance')
+    AttendanceMonthlyRollup = apps.get_model('api', 'AttendanceMonthlyRollup')
+    fields = {'present': 'present_count', 'absent': 'absent_count', 'late': 'late_count'}
+    counters = {}
+    for student_id, day, status in Attendance.objects.values_list('student_id', 'date', 'status').iterator():
+        if status not in fields:
+            continue
+        rollup = counters.setdefault((student_id, day.replace(day=1)), {name: 0 for name in fields.values()})
+        rollup[fields[status]] += 1
+    AttendanceMonthlyRollup.objects.bulk_create(
+        [AttendanceMonthlyRollup(student_id=student_id, month=month, **counts)
+         for (student_id, month), counts in counters.items()],
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0008_hot_path_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AttendanceMonthlyRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('month', models.DateField(help_text='First day of the month')),
+                ('present_count', models.PositiveIntegerField(default=0)),
+                ('absent_count', models.PositiveIntegerField(default=0)),
+                ('late_count', models.PositiveIntegerField(default=0)),
+                ('student', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='attendance_rollups', to='api.student')),
+            ],
+            options={
+                'ordering': ['month'],
+                'unique_together': {('student', 'month')},
+            },
+        ),
+        migrations.CreateModel(
+            name='AttendanceArchive',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('status', models.CharField(choices=[('present', 'Present'), ('absent', 'Absent'), ('late', 'Late')], max_length=10)),
+                ('academic_year', models.PositiveIntegerField(help_text='Calendar year in which the academic year starts')),
+                ('student', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='archived_attendance', to='api.student')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['academic_year', 'student'], name='attendance_archive_year_idx')],
+                'unique_together': {('student', 'date')},
+            },
+        ),
+        migrations.RunPython(build_rollups, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,27 @@
+# Generated by Django 4.2.23 on 2026-10-18 21:13
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0009_attendance_archive_rollups'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AttendanceBitmap',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('term_start', models.DateField()),
+                ('days', models.BinaryField(default=bytes)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('student', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='attendance_bitmaps', to='api.student')),
+            ],
+            options={
+                'unique_together': {('student', 'term_start')},
+            },
+        ),
+    ]
@@ -0,0 +1,55 @@
+# Generated by Django 4.2.23 on 2026-10-18 21:17
+
+from django.db import migrations, models
+import django.db.models.deletion
+from django.db.models import Count, Q, Sum
+
+
+def build_fee_summary(apps, schema_editor):
+    Fee = apps.get_model('api', 'Fee')
+    FeeSummary = apps.get_model('api', 'FeeSummary')
+    unpaid = Q(status__in=['unpaid', 'partial'])
+    aggregates = dict(
+        paid_count=Count('id', filter=~unpaid),
+        paid_total=Sum('amount', filter=~unpaid),
+        unpaid_count=Count('id', filter=unpaid),
+        unpaid_total=Sum('amount', filter=unpaid),
+        unpaid_student_count=Count('student', filter=unpaid, distinct=True),
+    )
+
+    def clean(values):
+        return {field: values.get(field) or 0 for field in aggregates}
+
+    FeeSummary.objects.create(key='overall', **clean(Fee.objects.aggregate(**aggregates)))
+    for values in Fee.objects.values('student__school_class').annotate(**aggregates).order_by():
+        class_id = values['student__school_class']
+        FeeSummary.objects.create(
+            key=f"class:{class_id if class_id is not None else 'none'}",
+            school_class_id=class_id,
+            **clean(values),
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0010_attendance_bitmap'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='FeeSummary',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('key', models.CharField(max_length=30, unique=True)),
+                ('paid_count', models.IntegerField(default=0)),
+                ('paid_total', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('unpaid_count', models.IntegerField(default=0, help_text='Unpaid and partial fees')),
+                ('unpaid_total', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('unpaid_student_count', models.IntegerField(default=0, help_text='Students with at least one unpaid or partial fee')),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('school_class', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='fee_summaries', to='api.schoolclass')),
+            ],
+        ),
+        migrations.RunPython(build_fee_summary, migrations.RunPython.noop),
+    ]
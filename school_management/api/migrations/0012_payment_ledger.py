@@ -0,0 +1,86 @@
+# Generated by Django 4.2.23 on 2026-10-18 21:19
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+import django.utils.timezone
+from django.db.models import F, OuterRef, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
+
+
+def backfill_balances(apps, schema_editor):
+    Fee = apps.get_model('api', 'Fee')
+    Student = apps.get_model('api', 'Student')
+    # Fees already marked paid are treated as paid in full
+    Fee.objects.filter(status='paid').update(amount_paid=F('amount'))
+    owed = Fee.objects.filter(student=OuterRef('pk')).exclude(status='paid').values('student').annotate(
+        total=Sum('amount')
+    ).values('total')
+    Student.objects.update(outstanding_balance=Coalesce(Subquery(owed), Value(0), output_field=models.DecimalField()))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0011_fee_summary'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Payment',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('amount', models.DecimalField(decimal_places=2, max_digits=10)),
+                ('paid_on', models.DateField(default=django.utils.timezone.localdate)),
+                ('method', models.CharField(choices=[('cash', 'Cash'), ('card', 'Card'), ('bank_transfer', 'Bank Transfer'), ('upi', 'UPI'), ('other', 'Other')], default='cash', max_length=20)),
+                ('reference', models.CharField(blank=True, max_length=100)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'ordering': ['paid_on', 'id'],
+            },
+        ),
+        migrations.AddField(
+            model_name='fee',
+            name='amount_paid',
+            field=models.DecimalField(decimal_places=2, default=0, help_text='Cached sum of recorded payments', max_digits=10),
+        ),
+        migrations.AddField(
+            model_name='student',
+            name='outstanding_balance',
+            field=models.DecimalField(decimal_places=2, default=0, help_text='Cached sum of unpaid fee balances', max_digits=12),
+        ),
+        migrations.AlterField(
+            model_name='feesummary',
+            name='paid_total',
+            field=models.DecimalField(decimal_places=2, default=0, help_text='Amount collected, including partial payments', max_digits=14),
+        ),
+        migrations.AlterField(
+            model_name='feesummary',
+            name='unpaid_total',
+            field=models.DecimalField(decimal_places=2, default=0, help_text='Outstanding balance still owed', max_digits=14),
+        ),
+        migrations.AddIndex(
+            model_name='student',
+            index=models.Index(fields=['school_class', 'outstanding_balance'], name='student_class_dues_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='student',
+            index=models.Index(fields=['outstanding_balance'], name='student_dues_idx'),
+        ),
+        migrations.AddField(
+            model_name='payment',
+            name='fee',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='payments', to='api.fee'),
+        ),
+        migrations.AddField(
+            model_name='payment',
+            name='recorded_by',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='recorded_payments', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddIndex(
+            model_name='payment',
+            index=models.Index(fields=['paid_on'], name='payment_paid_on_idx'),
+        ),
+        migrations.RunPython(backfill_balances, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 4.2.23 on 2026-10-18 21:22
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0012_payment_ledger'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='fee',
+            name='fee_type',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='fees', to='api.feetype'),
+        ),
+        migrations.AddField(
+            model_name='fee',
+            name='installment_number',
+            field=models.PositiveSmallIntegerField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='fee',
+            name='late_fee',
+            field=models.DecimalField(decimal_places=2, default=0, help_text='Penalty set by the late-fee scheduler', max_digits=10),
+        ),
+        migrations.AddConstraint(
+            model_name='fee',
+            constraint=models.UniqueConstraint(condition=models.Q(('fee_type__isnull', False)), fields=('student', 'fee_type', 'due_date'), name='fee_unique_installment'),
+        ),
+    ]
@@ -0,0 +1,39 @@
+# Generated by Django 4.2.23 on 2026-10-18 21:35
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0014_notification_inbox'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TeacherUnavailability',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day_of_week', models.CharField(choices=[('MON', 'Monday'), ('TUE', 'Tuesday'), ('WED', 'Wednesday'), ('THU', 'Thursday'), ('FRI', 'Friday')], max_length=3)),
+                ('period', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='unavailable_teachers', to='api.period')),
+                ('teacher', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='unavailable_periods', to='api.teacher')),
+            ],
+            options={
+                'unique_together': {('teacher', 'day_of_week', 'period')},
+            },
+        ),
+        migrations.CreateModel(
+            name='SubjectRequirement',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('subject', models.CharField(max_length=100)),
+                ('periods_per_week', models.PositiveSmallIntegerField()),
+                ('school_class', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='subject_requirements', to='api.schoolclass')),
+                ('teacher', models.ForeignKey(blank=True, help_text='Leave empty to let the generator pick a teacher by specialization', null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='subject_requirements', to='api.teacher')),
+            ],
+            options={
+                'unique_together': {('school_class', 'subject')},
+            },
+        ),
+    ]
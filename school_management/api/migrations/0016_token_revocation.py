@@ -0,0 +1,20 @@
+# Generated by Django 4.2.23 on 2026-10-18 22:59
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0015_timetable_generator_inputs'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TokenRevocation',
+            fields=[
+                ('user_id', models.BigIntegerField(primary_key=True, serialize=False)),
+                ('revoked_at', models.FloatField(help_text='Epoch seconds; tokens with older claims are rejected')),
+            ],
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 4.2.23 on 2026-10-18 23:23
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0016_token_revocation'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='tokenrevocation',
+            name='password_changed_at',
+            field=models.FloatField(blank=True, help_text='Epoch seconds; refresh tokens issued earlier are rejected too', null=True),
+        ),
+    ]
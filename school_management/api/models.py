@@ -1,7 +1,25 @@
-from django.db import models
+from django.db import models, transaction
 from django.contrib.auth.models import AbstractUser
 from django.utils import timezone
 
+class MaintainedFieldsMixin:
+    """
+    `maintained_fields` are kept current by set-based UPDATEs (F() deltas,
+    rebuild commands). A plain save() of an existing row leaves them out,
+    so an instance loaded earlier never writes a stale value back.
+    """
+    maintained_fields = ()
+
+    def save(self, *args, **kwargs):
+        if not args and not self._state.adding and kwargs.get('update_fields') is None \
+                and not kwargs.get('force_insert'):
+            deferred = self.get_deferred_fields()
+            kwargs['update_fields'] = [
+                field.name for field in self._meta.concrete_fields
+                if not field.primary_key and field.name not in self.maintained_fields and field.attname not in deferred
+            ]
+        super().save(*args, **kwargs)
+
 # === School Model ===
 
 class School(models.Model):
@@ -17,13 +35,28 @@ class School(models.Model):
 
 # === User and Profile Models ===
 
-class User(AbstractUser):
+class User(MaintainedFieldsMixin, AbstractUser):
     class Role(models.TextChoices):
         PRINCIPAL = "principal", "Principal"
         TEACHER = "teacher", "Teacher"
         STUDENT = "student", "Student"
 
     role = models.CharField(max_length=10, choices=Role.choices, default=Role.STUDENT)
+    unread_notifications = models.PositiveIntegerField(default=0, help_text="Cached count of unread notifications")
+
+    # Written only by api.notifications; admin edits, password changes and rehashes save the rest of the row
+    maintained_fields = ('unread_notifications',)
+
+class TokenRevocation(models.Model):
+    """
+    Time after which a user's token claims are accepted again, read by api.authentication.
+    Keyed by the plain id (not a foreign key) so it outlives the deleted user it revokes.
+    """
+    user_id = models.BigIntegerField(primary_key=True)
+    revoked_at = models.FloatField(help_text="Epoch seconds; tokens with older claims are rejected")
+    password_changed_at = models.FloatField(
+        null=True, blank=True, help_text="Epoch seconds; refresh tokens issued earlier are rejected too",
+    )
 
 class Period(models.Model):
     period_number = models.PositiveIntegerField(unique=True, help_text="e.g., 1 for 1st period")
@@ -78,13 +111,23 @@ class SchoolClass(models.Model):
     def __str__(self):
         return self.name
 
-class Student(models.Model):
+class Student(MaintainedFieldsMixin, models.Model):
     user = models.OneToOneField(User, on_delete=models.CASCADE, primary_key=True, limit_choices_to={'role': User.Role.STUDENT})
     school_class = models.ForeignKey(SchoolClass, on_delete=models.SET_NULL, null=True, blank=True, related_name='students')
     admission_date = models.DateField(blank=True, null=True)
     roll_number = models.CharField(max_length=20, blank=True)
     father_name = models.CharField(max_length=100, blank=True)
     mother_name = models.CharField(max_length=100, blank=True)
+    outstanding_balance = models.DecimalField(max_digits=12, decimal_places=2, default=0, help_text="Cached sum of unpaid fee balances")
+
+    # Written only by api.fees
+    maintained_fields = ('outstanding_balance',)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['school_class', 'outstanding_balance'], name='student_class_dues_idx'),
+            models.Index(fields=['outstanding_balance'], name='student_dues_idx'),
+        ]
 
     def __str__(self):
         return self.user.get_full_name() or self.user.username
@@ -112,6 +155,48 @@ class Attendance(models.Model):
     class Meta:
         unique_together = ('student', 'date')
 
+class AttendanceArchive(models.Model):
+    """Attendance rows from closed academic years, moved out of the hot table."""
+    student = models.ForeignKey(Student, on_delete=models.CASCADE, related_name='archived_attendance')
+    date = models.DateField()
+    status = models.CharField(max_length=10, choices=Attendance.Status.choices)
+    academic_year = models.PositiveIntegerField(help_text="Calendar year in which the academic year starts")
+
+    class Meta:
+        unique_together = ('student', 'date')
+        indexes = [
+            models.Index(fields=['academic_year', 'student'], name='attendance_archive_year_idx'),
+        ]
+
+class AttendanceBitmap(models.Model):
+    """
+    Compact per-term attendance: 2 bits per calendar day from `term_start`
+    (0 = no record, 1 = present, 2 = absent, 3 = late), packed 4 days per byte.
+    """
+    student = models.ForeignKey(Student, on_delete=models.CASCADE, related_name='attendance_bitmaps')
+    term_start = models.DateField()
+    days = models.BinaryField(default=bytes)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        unique_together = ('student', 'term_start')
+
+class AttendanceMonthlyRollup(models.Model):
+    """Per-student monthly attendance counters, maintained on every Attendance write."""
+    student = models.ForeignKey(Student, on_delete=models.CASCADE, related_name='attendance_rollups')
+    month = models.DateField(help_text="First day of the month")
+    present_count = models.PositiveIntegerField(default=0)
+    absent_count = models.PositiveIntegerField(default=0)
+    late_count = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        unique_together = ('student', 'month')
+        ordering = ['month']
+
+    @property
+    def total_count(self):
+        return self.present_count + self.absent_count + self.late_count
+
 class Timetable(models.Model):
     class Day(models.TextChoices):
         MONDAY = 'MON', 'Monday'
@@ -127,6 +212,40 @@ class Timetable(models.Model):
     subject = models.CharField(max_length=100)
     teacher = models.ForeignKey(Teacher, on_delete=models.SET_NULL, null=True)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['school_class', 'day_of_week'], name='timetable_class_day_idx'),
+            models.Index(fields=['teacher', 'day_of_week'], name='timetable_teacher_day_idx'),
+        ]
+
+class SubjectRequirement(models.Model):
+    """Weekly periods of a subject that a class needs; input to the timetable generator."""
+    school_class = models.ForeignKey(SchoolClass, on_delete=models.CASCADE, related_name='subject_requirements')
+    subject = models.CharField(max_length=100)
+    periods_per_week = models.PositiveSmallIntegerField()
+    teacher = models.ForeignKey(
+        Teacher, on_delete=models.SET_NULL, null=True, blank=True, related_name='subject_requirements',
+        help_text="Leave empty to let the generator pick a teacher by specialization",
+    )
+
+    class Meta:
+        unique_together = ('school_class', 'subject')
+
+    def __str__(self):
+        return f"{self.school_class.name}: {self.subject} x{self.periods_per_week}"
+
+class TeacherUnavailability(models.Model):
+    """A weekly period in which a teacher cannot be scheduled."""
+    teacher = models.ForeignKey(Teacher, on_delete=models.CASCADE, related_name='unavailable_periods')
+    day_of_week = models.CharField(max_length=3, choices=Timetable.Day.choices)
+    period = models.ForeignKey(Period, on_delete=models.CASCADE, related_name='unavailable_teachers')
+
+    class Meta:
+        unique_together = ('teacher', 'day_of_week', 'period')
+
+    def __str__(self):
+        return f"{self.teacher} unavailable {self.day_of_week} period {self.period.period_number}"
+
 class Assignment(models.Model):
     title = models.CharField(max_length=200)
     description = models.TextField(blank=True)
@@ -173,10 +292,96 @@ class Fee(models.Model):
     amount = models.DecimalField(max_digits=10, decimal_places=2)
     due_date = models.DateField()
     status = models.CharField(max_length=10, choices=Status.choices, default=Status.UNPAID)
-    
+    amount_paid = models.DecimalField(max_digits=10, decimal_places=2, default=0, help_text="Cached sum of recorded payments")
+    fee_type = models.ForeignKey(FeeType, on_delete=models.SET_NULL, null=True, blank=True, related_name='fees')
+    installment_number = models.PositiveSmallIntegerField(null=True, blank=True)
+    late_fee = models.DecimalField(max_digits=10, decimal_places=2, default=0, help_text="Penalty set by the late-fee scheduler")
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['status', 'due_date'], name='fee_status_due_idx'),
+            # Partial index for the outstanding-dues paths (reminders, overdue lists)
+            models.Index(
+                fields=['due_date'], name='fee_outstanding_due_idx',
+                condition=models.Q(status__in=['unpaid', 'partial']),
+            ),
+        ]
+        constraints = [
+            # Lets the installment scheduler re-run without duplicating rows
+            models.UniqueConstraint(
+                fields=['student', 'fee_type', 'due_date'], name='fee_unique_installment',
+                condition=models.Q(fee_type__isnull=False),
+            ),
+        ]
+
     def __str__(self):
         return f"Fee for {self.student} due {self.due_date} - {self.status}"
 
+    @property
+    def total_due(self):
+        return self.amount + self.late_fee
+
+    @property
+    def balance(self):
+        """Amount still owed, including any late fee; a fee marked paid owes nothing."""
+        if self.status == self.Status.PAID:
+            return 0
+        return max(self.total_due - self.amount_paid, 0)
+
+    def save(self, *args, **kwargs):
+        # Keep the row and the FeeSummary updates made by its signal handlers in one transaction
+        with transaction.atomic(using=kwargs.get('using')):
+            super().save(*args, **kwargs)
+
+class Payment(models.Model):
+    class Method(models.TextChoices):
+        CASH = 'cash', 'Cash'
+        CARD = 'card', 'Card'
+        BANK_TRANSFER = 'bank_transfer', 'Bank Transfer'
+        UPI = 'upi', 'UPI'
+        OTHER = 'other', 'Other'
+
+    fee = models.ForeignKey(Fee, on_delete=models.CASCADE, related_name='payments')
+    amount = models.DecimalField(max_digits=10, decimal_places=2)
+    paid_on = models.DateField(default=timezone.localdate)
+    method = models.CharField(max_length=20, choices=Method.choices, default=Method.CASH)
+    reference = models.CharField(max_length=100, blank=True)
+    recorded_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True, related_name='recorded_payments')
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ['paid_on', 'id']
+        indexes = [
+            models.Index(fields=['paid_on'], name='payment_paid_on_idx'),
+        ]
+
+    def __str__(self):
+        return f"Payment of {self.amount} for fee {self.fee_id} on {self.paid_on}"
+
+class FeeSummary(models.Model):
+    """
+    Maintained fee aggregates: one 'overall' row plus one row per class
+    ('class:<id>', or 'class:none' for students without a class). Updated by the
+    Fee signal handlers; rebuild with `manage.py rebuild_fee_summary`.
+    """
+    OVERALL = 'overall'
+
+    key = models.CharField(max_length=30, unique=True)
+    school_class = models.ForeignKey(SchoolClass, on_delete=models.CASCADE, null=True, blank=True, related_name='fee_summaries')
+    paid_count = models.IntegerField(default=0)
+    paid_total = models.DecimalField(max_digits=14, decimal_places=2, default=0, help_text="Amount collected, including partial payments")
+    unpaid_count = models.IntegerField(default=0, help_text="Unpaid and partial fees")
+    unpaid_total = models.DecimalField(max_digits=14, decimal_places=2, default=0, help_text="Outstanding balance still owed")
+    unpaid_student_count = models.IntegerField(default=0, help_text="Students with at least one unpaid or partial fee")
+    updated_at = models.DateTimeField(auto_now=True)
+
+    @staticmethod
+    def class_key(class_id):
+        return f"class:{class_id if class_id is not None else 'none'}"
+
+    def __str__(self):
+        return f"Fee summary ({self.key})"
+
 # === Leave & Notification Models ===
 
 class LeaveRequest(models.Model):
@@ -191,6 +396,11 @@ class LeaveRequest(models.Model):
     reason = models.TextField()
     status = models.CharField(max_length=10, choices=Status.choices, default=Status.PENDING)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['status'], name='leave_status_idx'),
+        ]
+
 class Notification(models.Model):
     user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='notifications')
     title = models.CharField(max_length=200)
@@ -198,9 +408,39 @@ class Notification(models.Model):
     is_read = models.BooleanField(default=False)
     created_at = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['user', 'is_read'], name='notification_user_read_idx'),
+            # Partial index so unread counters only touch unread rows
+            models.Index(
+                fields=['user', '-created_at'], name='notification_unread_idx',
+                condition=models.Q(is_read=False),
+            ),
+            # Inbox pages are cursor-paginated newest first
+            models.Index(fields=['user', '-created_at', '-id'], name='notification_inbox_idx'),
+            # Retention job scans read rows by age
+            models.Index(fields=['created_at'], name='notification_read_age_idx', condition=models.Q(is_read=True)),
+        ]
+
     def __str__(self):
         return f"Notification for {self.user.username}: {self.title}"
 
+class NotificationArchive(models.Model):
+    """Read notifications moved out of the inbox by `manage.py archive_notifications`."""
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='archived_notifications')
+    title = models.CharField(max_length=200)
+    message = models.TextField()
+    created_at = models.DateTimeField()
+    archived_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['user', '-created_at'], name='notification_archive_user_idx'),
+        ]
+
+    def __str__(self):
+        return f"Archived notification for {self.user.username}: {self.title}"
+
 # === Task Management Models ===
 
 class Task(models.Model):
@@ -239,6 +479,9 @@ class Task(models.Model):
 
     class Meta:
         ordering = ['due_date', 'due_time', 'priority']
+        indexes = [
+            models.Index(fields=['teacher', 'due_date'], name='task_teacher_due_idx'),
+        ]
 
     def __str__(self):
         return f"{self.teacher.user.get_full_name()}: {self.title}"
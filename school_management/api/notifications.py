@@ -0,0 +1,84 @@
+# api/notifications.py
+"""
+Notification inbox helpers.
+
+`User.unread_notifications` caches each user's unread count. It is left
+out of plain `User.save()` calls (`MaintainedFieldsMixin`), so saving a
+user loaded earlier cannot write back a stale count. Single-row
+writes keep it current through the signal handlers in `api.signals`;
+`mark_read` flips many rows with one UPDATE and adjusts the counter by the
+number of rows it changed. Read notifications past the retention window are
+moved to `NotificationArchive` by `archive_read_before`.
+"""
+
+from django.db import transaction
+from django.db.models import Count, F, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce, Greatest
+from . import identity
+from .models import Notification, NotificationArchive, User
+
+
+def adjust_unread_count(user_id, delta):
+    User.objects.filter(pk=user_id).update(unread_notifications=Greatest(F('unread_notifications') + delta, Value(0)))
+    identity.forget(User, [user_id])
+
+
+def unread_count(user):
+    """The cached unread count, read fresh from the database."""
+    return User.objects.filter(pk=user.pk).values_list('unread_notifications', flat=True).first() or 0
+
+
+@transaction.atomic
+def mark_read(user, ids=None, before=None):
+    """
+    Mark the user's unread notifications read: those in `ids`, those created
+    at or before `before`, or all of them. Returns the number changed.
+    """
+    notifications = Notification.objects.filter(user=user, is_read=False)
+    if ids is not None:
+        notifications = notifications.filter(pk__in=ids)
+    if before is not None:
+        notifications = notifications.filter(created_at__lte=before)
+    updated = notifications.update(is_read=True)
+    if updated:
+        identity.forget(Notification, ids)
+        adjust_unread_count(user.pk, -updated)
+    return updated
+
+
+def rebuild_unread_counts(user_ids=None):
+    """Recompute User.unread_notifications with one set-based UPDATE."""
+    unread = Notification.objects.filter(user=OuterRef('pk'), is_read=False).values('user').annotate(
+        total=Count('id')
+    ).values('total')
+    users = User.objects.all()
+    if user_ids is not None:
+        users = users.filter(pk__in=user_ids)
+    updated = users.update(unread_notifications=Coalesce(Subquery(unread), Value(0)))
+    identity.forget(User, user_ids)
+    return updated
+
+
+def archive_read_before(cutoff, batch_size=5000):
+    """
+    Move read notifications created before `cutoff` into the archive table in
+    batches. Unread counts are unaffected. Returns the number of rows moved.
+    """
+    moved = 0
+    while True:
+        with transaction.atomic():
+            batch = list(
+                Notification.objects.filter(is_read=True, created_at__lt=cutoff)
+                .order_by('id').values('id', 'user_id', 'title', 'message', 'created_at')[:batch_size]
+            )
+            if not batch:
+                break
+            NotificationArchive.objects.bulk_create([
+                NotificationArchive(
+                    user_id=row['user_id'], title=row['title'], message=row['message'], created_at=row['created_at'],
+                ) for row in batch
+            ])
+            # Read rows carry no counter state, so skip the per-row delete signals
+            Notification.objects.filter(id__in=[row['id'] for row in batch])._raw_delete(Notification.objects.db)
+            moved += len(batch)
+    return moved
@@ -0,0 +1,169 @@
+# api/profiling.py
+"""
+Opt-in request profiling (`PROFILING_ENABLED`).
+
+`RequestProfilerMiddleware` measures every request's wall time, database
+time and query count, groups queries by fingerprint (the parameterised SQL
+with IN-lists collapsed) to flag repeated statements (likely N+1 loops),
+and counts cache hits and misses on every configured cache. It reports them
+in a `Server-Timing` header, so browser dev tools show them per request.
+
+Requests slower than `PROFILING_SLOW_REQUEST_MS` are written as JSON lines
+to a rotating log (`PROFILING_SLOW_LOG`) with their most expensive
+statements. A `PROFILING_CPROFILE_SAMPLE_RATE` fraction of requests also
+runs under cProfile; the stats of those slower than
+`PROFILING_CPROFILE_THRESHOLD_MS` are dumped to `PROFILING_CPROFILE_DIR` for
+`python -m pstats` or snakeviz.
+"""
+
+import contextvars
+import cProfile
+import json
+import logging
+import random
+import re
+import time
+from contextlib import ExitStack
+from logging.handlers import RotatingFileHandler
+from pathlib import Path
+from django.conf import settings
+from django.db import connections
+from .metrics import instrument_caches, observe_caches
+
+slow_log = logging.getLogger('api.profiling.slow')
+_current = contextvars.ContextVar('request_profile', default=None)
+_IN_LIST = re.compile(r'\((?:%s, )+%s\)')
+
+
+def fingerprint(sql):
+    """The statement with IN-lists of any length collapsed, so loops over ids group together."""
+    return _IN_LIST.sub('(...)', ' '.join(sql.split()))
+
+
+class RequestProfile:
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.queries = {}  # fingerprint -> [count, total seconds, example sql]
+        self.query_count = 0
+        self.db_seconds = 0.0
+        self.cache_hits = 0
+        self.cache_misses = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        # connection.execute_wrapper hook
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            elapsed = time.perf_counter() - started
+            entry = self.queries.setdefault(fingerprint(sql), [0, 0.0, sql])
+            entry[0] += 1
+            entry[1] += elapsed
+            self.query_count += 1
+            self.db_seconds += elapsed
+
+    def duplicates(self):
+        """[(count, fingerprint)] of statements run at least PROFILING_DUPLICATE_QUERY_THRESHOLD times."""
+        threshold = settings.PROFILING_DUPLICATE_QUERY_THRESHOLD
+        return sorted(
+            ((count, key) for key, (count, _, _) in self.queries.items() if count >= threshold), reverse=True
+        )
+
+    def top_queries(self, limit=5):
+        ranked = sorted(self.queries.items(), key=lambda item: item[1][1], reverse=True)[:limit]
+        return [
+            {'count': count, 'ms': round(seconds * 1000, 2), 'sql': example[:2000]}
+            for _, (count, seconds, example) in ranked
+        ]
+
+    def server_timing(self, wall_seconds):
+        duplicates = self.duplicates()
+        parts = [
+            f'db;dur={self.db_seconds * 1000:.1f};desc="{self.query_count} queries"',
+            f'app;dur={(wall_seconds - self.db_seconds) * 1000:.1f}',
+            f'cache;desc="{self.cache_hits} hits {self.cache_misses} misses"',
+            f'total;dur={wall_seconds * 1000:.1f}',
+        ]
+        if duplicates:
+            parts.append(f'dupes;desc="{sum(count for count, _ in duplicates)} repeated queries"')
+        return ', '.join(parts)
+
+
+def _count_cache(alias, hits, misses):
+    profile = _current.get()
+    if profile is not None:
+        profile.cache_hits += hits
+        profile.cache_misses += misses
+
+
+observe_caches(_count_cache)
+
+
+def _slow_log_handler():
+    if not slow_log.handlers:
+        path = Path(settings.PROFILING_SLOW_LOG)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        handler = RotatingFileHandler(
+            path, maxBytes=settings.PROFILING_SLOW_LOG_MAX_BYTES, backupCount=settings.PROFILING_SLOW_LOG_BACKUPS,
+        )
+        handler.setFormatter(logging.Formatter('%(message)s'))
+        slow_log.addHandler(handler)
+        slow_log.setLevel(logging.INFO)
+        slow_log.propagate = False
+    return slow_log
+
+
+class RequestProfilerMiddleware:
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        instrument_caches()
+        profile = RequestProfile()
+        token = _current.set(profile)
+        profiler = None
+        if random.random() < settings.PROFILING_CPROFILE_SAMPLE_RATE:
+            profiler = cProfile.Profile()
+        try:
+            with ExitStack() as stack:
+                for connection in connections.all():
+                    stack.enter_context(connection.execute_wrapper(profile))
+                if profiler is not None:
+                    profiler.enable()
+                try:
+                    response = self.get_response(request)
+                finally:
+                    if profiler is not None:
+                        profiler.disable()
+        finally:
+            _current.reset(token)
+
+        wall = time.perf_counter() - profile.started
+        response['Server-Timing'] = profile.server_timing(wall)
+        if wall * 1000 >= settings.PROFILING_SLOW_REQUEST_MS:
+            self.log_slow(request, response, profile, wall)
+        if profiler is not None and wall * 1000 >= settings.PROFILING_CPROFILE_THRESHOLD_MS:
+            self.dump_profile(request, profiler)
+        return response
+
+    def log_slow(self, request, response, profile, wall):
+        _slow_log_handler().info(json.dumps({
+            'ts': round(time.time(), 3),
+            'method': request.method,
+            'path': request.get_full_path(),
+            'view': getattr(request.resolver_match, 'view_name', None),
+            'status': response.status_code,
+            'ms': round(wall * 1000, 2),
+            'db_ms': round(profile.db_seconds * 1000, 2),
+            'queries': profile.query_count,
+            'cache_hits': profile.cache_hits,
+            'cache_misses': profile.cache_misses,
+            'duplicates': [{'count': count, 'sql': key[:500]} for count, key in profile.duplicates()[:5]],
+            'top_queries': profile.top_queries(),
+        }))
+
+    def dump_profile(self, request, profiler):
+        directory = Path(settings.PROFILING_CPROFILE_DIR)
+        directory.mkdir(parents=True, exist_ok=True)
+        slug = re.sub(r'[^A-Za-z0-9]+', '-', request.path).strip('-') or 'root'
+        profiler.dump_stats(directory / f'{time.strftime("%Y%m%d-%H%M%S")}-{request.method}-{slug[:80]}.prof')
@@ -0,0 +1,280 @@
+# api/realtime.py
+"""
+Server push for notifications and leave-request updates.
+
+Clients open one Server-Sent Events stream at `/api/events/` (served by
+`EventStreamApp`, mounted in `school_management/asgi.py`) instead of polling.
+Model signals call `publish(user_id, event, data)` after the write commits;
+the event travels through a relay to every node and is handed to that user's
+open streams by the in-process `Broker`.
+
+Relays:
+
+- `LocalRelay` (default): delivers straight to this process. It is the
+  stand-in for a multi-node deployment when running a single ASGI worker.
+- `RedisRelay`: used when `REALTIME_REDIS_URL` is set, fanning events out to
+  every worker subscribed to the same channel.
+"""
+
+import asyncio
+import json
+import logging
+import threading
+import uuid
+from urllib.parse import parse_qs
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+
+logger = logging.getLogger(__name__)
+
+
+# --------------------------
+# In-process pub/sub
+# --------------------------
+
+class Broker:
+    """
+    Per-user fan-out to open streams. Subscribers are asyncio queues owned by
+    the event loop that serves the stream; `deliver` may be called from any
+    thread (signal handlers run in sync worker threads).
+    """
+
+    def __init__(self, queue_size=100):
+        self.queue_size = queue_size
+        self._subscribers = {}
+        self._lock = threading.Lock()
+
+    def subscribe(self, user_id):
+        queue = asyncio.Queue(maxsize=self.queue_size)
+        subscriber = (asyncio.get_running_loop(), queue)
+        with self._lock:
+            self._subscribers.setdefault(user_id, set()).add(subscriber)
+        return subscriber
+
+    def unsubscribe(self, user_id, subscriber):
+        with self._lock:
+            subscribers = self._subscribers.get(user_id)
+            if subscribers:
+                subscribers.discard(subscriber)
+                if not subscribers:
+                    del self._subscribers[user_id]
+
+    def subscriber_count(self, user_id=None):
+        with self._lock:
+            if user_id is not None:
+                return len(self._subscribers.get(user_id, ()))
+            return sum(len(subscribers) for subscribers in self._subscribers.values())
+
+    def queued_events(self):
+        """Events delivered but not yet written to their streams, over all subscribers."""
+        with self._lock:
+            return sum(queue.qsize() for subscribers in self._subscribers.values() for _, queue in subscribers)
+
+    def deliver(self, user_id, message):
+        with self._lock:
+            subscribers = list(self._subscribers.get(user_id, ()))
+        for loop, queue in subscribers:
+            try:
+                loop.call_soon_threadsafe(self._offer, queue, message)
+            except RuntimeError:
+                # The stream's loop has closed; it unsubscribes on its way out
+                pass
+        return len(subscribers)
+
+    @staticmethod
+    def _offer(queue, message):
+        # A slow client loses its oldest events rather than growing without bound
+        if queue.full():
+            queue.get_nowait()
+        queue.put_nowait(message)
+
+
+broker = Broker()
+
+
+# --------------------------
+# Relays
+# --------------------------
+
+class LocalRelay:
+    """Single-node relay: events go straight to this process's broker."""
+
+    def publish(self, user_id, message):
+        broker.deliver(user_id, message)
+
+
+class RedisRelay:
+    """Fans events out to every worker through a Redis pub/sub channel."""
+
+    def __init__(self, url, channel):
+        import redis  # Optional dependency, installed with django-redis
+
+        self.client = redis.Redis.from_url(url)
+        self.channel = channel
+        self.node_id = uuid.uuid4().hex
+        self._listener = None
+        self._lock = threading.Lock()
+        # Listen from the start: a node that only serves streams never publishes
+        self._ensure_listener()
+
+    def publish(self, user_id, message):
+        # Deliver locally right away; the listener skips this node's own events
+        broker.deliver(user_id, message)
+        self.client.publish(self.channel, json.dumps({'node': self.node_id, 'user_id': user_id, 'message': message}))
+
+    def _ensure_listener(self):
+        with self._lock:
+            if self._listener is None:
+                self._listener = threading.Thread(target=self._listen, name='realtime-relay', daemon=True)
+                self._listener.start()
+
+    def _listen(self):
+        pubsub = self.client.pubsub(ignore_subscribe_messages=True)
+        pubsub.subscribe(self.channel)
+        for item in pubsub.listen():
+            try:
+                envelope = json.loads(item['data'])
+            except (TypeError, ValueError):
+                continue
+            if envelope.get('node') != self.node_id:
+                broker.deliver(envelope['user_id'], envelope['message'])
+
+
+_relay = None
+_relay_lock = threading.Lock()
+
+
+def get_relay():
+    global _relay
+    with _relay_lock:
+        if _relay is None:
+            url = getattr(settings, 'REALTIME_REDIS_URL', '')
+            if url:
+                _relay = RedisRelay(url, getattr(settings, 'REALTIME_CHANNEL', 'school_events'))
+            else:
+                _relay = LocalRelay()
+        return _relay
+
+
+def publish(user_id, event, data):
+    """Push `event` with JSON-serializable `data` to every open stream of `user_id`."""
+    message = json.dumps({'event': event, 'data': data}, cls=DjangoJSONEncoder)
+    try:
+        get_relay().publish(user_id, message)
+    except Exception:
+        # Push is best effort; clients resync from the REST endpoints on reconnect
+        logger.exception('Failed to publish %s event for user %s', event, user_id)
+
+
+def notification_payload(notification):
+    return {
+        'id': notification.pk,
+        'title': notification.title,
+        'message': notification.message,
+        'is_read': notification.is_read,
+        'created_at': notification.created_at,
+    }
+
+
+def leave_payload(leave):
+    return {
+        'id': leave.pk,
+        'status': leave.status,
+        'start_date': leave.start_date,
+        'end_date': leave.end_date,
+    }
+
+
+# --------------------------
+# SSE endpoint
+# --------------------------
+
+def format_event(message):
+    """Encode a published message as an SSE frame."""
+    envelope = json.loads(message)
+    return f"event: {envelope['event']}\ndata: {json.dumps(envelope['data'])}\n\n".encode()
+
+
+def _authenticate(raw_token):
+    """Return the active user id for an access token, or None."""
+    from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidToken
+    from .authentication import ClaimsJWTAuthentication
+
+    authentication = ClaimsJWTAuthentication()
+    try:
+        user = authentication.get_user(authentication.get_validated_token(raw_token))
+    except (InvalidToken, AuthenticationFailed):
+        return None
+    return user.pk if user.is_active else None
+
+
+class EventStreamApp:
+    """
+    ASGI app serving the SSE stream. EventSource cannot send headers, so the
+    access token may be passed as `?token=`; an `Authorization: Bearer`
+    header works too. Runs outside Django's middleware stack so it can watch
+    for client disconnects and free the subscription immediately.
+    """
+
+    def __init__(self, heartbeat=None):
+        self.heartbeat = heartbeat
+
+    async def __call__(self, scope, receive, send):
+        headers = {key.decode('latin-1').lower(): value.decode('latin-1') for key, value in scope.get('headers', [])}
+        response_headers = self._cors_headers(headers.get('origin'))
+
+        raw_token = parse_qs(scope.get('query_string', b'').decode()).get('token', [None])[0]
+        authorization = headers.get('authorization', '')
+        if not raw_token and authorization.startswith('Bearer '):
+            raw_token = authorization[len('Bearer '):]
+        user_id = await sync_to_async(_authenticate)(raw_token) if raw_token else None
+        if user_id is None:
+            await send({'type': 'http.response.start', 'status': 401,
+                        'headers': response_headers + [(b'content-type', b'application/json')]})
+            await send({'type': 'http.response.body', 'body': b'{"detail": "Authentication credentials were not provided or are invalid."}'})
+            return
+
+        # Creates the relay on nodes that have not published yet, so events from other nodes reach this one
+        get_relay()
+        subscriber = broker.subscribe(user_id)
+        _, queue = subscriber
+        disconnected = asyncio.ensure_future(self._wait_for_disconnect(receive))
+        heartbeat = self.heartbeat or getattr(settings, 'REALTIME_HEARTBEAT_SECONDS', 15)
+        try:
+            await send({'type': 'http.response.start', 'status': 200, 'headers': response_headers + [
+                (b'content-type', b'text/event-stream'),
+                (b'cache-control', b'no-cache'),
+                (b'x-accel-buffering', b'no'),
+            ]})
+            await send({'type': 'http.response.body', 'body': b'retry: 5000\n\n', 'more_body': True})
+            while True:
+                next_message = asyncio.ensure_future(queue.get())
+                done, _ = await asyncio.wait({next_message, disconnected}, timeout=heartbeat,
+                                             return_when=asyncio.FIRST_COMPLETED)
+                if disconnected in done:
+                    next_message.cancel()
+                    break
+                if next_message in done:
+                    body = format_event(next_message.result())
+                else:
+                    next_message.cancel()
+                    body = b': ping\n\n'
+                await send({'type': 'http.response.body', 'body': body, 'more_body': True})
+        finally:
+            disconnected.cancel()
+            broker.unsubscribe(user_id, subscriber)
+
+    @staticmethod
+    async def _wait_for_disconnect(receive):
+        while True:
+            message = await receive()
+            if message['type'] == 'http.disconnect':
+                return
+
+    @staticmethod
+    def _cors_headers(origin):
+        if origin and (getattr(settings, 'CORS_ALLOW_ALL_ORIGINS', False)
+                       or origin in getattr(settings, 'CORS_ALLOWED_ORIGINS', [])):
+            return [(b'access-control-allow-origin', origin.encode('latin-1')), (b'vary', b'Origin')]
+        return []
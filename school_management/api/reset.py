@@ -0,0 +1,87 @@
+# api/reset.py
+"""
+Fast reset of all school data.
+
+`reset_school_data` empties every table of the `api` app with the
+database's own flush SQL instead of the ORM's delete. On PostgreSQL that is
+one `TRUNCATE ... RESTART IDENTITY CASCADE`; elsewhere it is one `DELETE`
+per table, with children before the tables they reference, followed by a
+sequence reset. No rows are loaded into Python and no model signals run.
+
+User accounts are the exception: superusers (and their profiles) are kept,
+so only the other users' rows are deleted, after detaching them from tables
+outside the app (admin log, token blacklist, group memberships). Their
+tokens are revoked and their ids are never reused. Token revocations are
+kept too, since the tokens they reject are still valid.
+"""
+
+from django.apps import apps
+from django.core.cache import cache
+from django.core.management.color import no_style
+from django.db import connection, models, transaction
+from .authentication import jti_blacklist, revocations
+from .models import TokenRevocation, User, UserProfile
+
+
+def flush_order(model_list):
+    """`model_list` ordered so that every model comes before the models it references."""
+    members, ordered, seen = set(model_list), [], set()
+
+    def visit(model):
+        if model in seen:
+            return
+        seen.add(model)
+        # Referencing models first: visit everything that points at `model`
+        for relation in model._meta.related_objects:
+            if relation.related_model in members:
+                visit(relation.related_model)
+        ordered.append(model)
+
+    for model in model_list:
+        visit(model)
+    return ordered
+
+
+def _delete_users(users, flushed):
+    for relation in User._meta.related_objects:
+        model = relation.related_model
+        if model in flushed:
+            continue
+        rows = model._base_manager.filter(**{f'{relation.field.name}__in': users})
+        if relation.on_delete is models.CASCADE:
+            rows.delete()  # single DELETE unless the model has signals or dependents of its own
+        elif relation.on_delete is models.SET_NULL:
+            rows.update(**{relation.field.name: None})
+    for field in User._meta.many_to_many:
+        through = field.remote_field.through
+        through._base_manager.filter(**{f'{field.m2m_field_name()}__in': users}).delete()
+    return users._raw_delete(users.db)
+
+
+@transaction.atomic
+def reset_school_data(keep_superusers=True):
+    """
+    Delete all school data, keeping superuser accounts unless
+    `keep_superusers` is False. Returns (tables flushed, users deleted).
+    """
+    kept = {User, UserProfile, TokenRevocation}
+    flushed = flush_order([model for model in apps.get_app_config('api').get_models() if model not in kept])
+    tables = [model._meta.db_table for model in flushed]
+    connection.ops.execute_sql_flush(connection.ops.sql_flush(
+        no_style(), tables, reset_sequences=True, allow_cascade=connection.vendor == 'postgresql',
+    ))
+
+    users = User.objects.filter(is_superuser=False) if keep_superusers else User.objects.all()
+    # No signals run for the raw delete, so revoke the deleted users' tokens here, in the same transaction
+    revocations.revoke(list(users.values_list('pk', flat=True)))
+    UserProfile.objects.filter(user__in=users)._raw_delete(UserProfile.objects.db)
+    deleted = _delete_users(users, set(flushed) | kept)
+    # The user id sequence is not reset: a reused id would inherit the old user's tokens
+    with connection.cursor() as cursor:
+        for sql in connection.ops.sequence_reset_sql(no_style(), [UserProfile]):
+            cursor.execute(sql)
+
+    # Cached pages, schedule indexes and the blacklist copy all describe the deleted rows
+    transaction.on_commit(cache.clear)
+    transaction.on_commit(jti_blacklist.clear)
+    return len(tables), deleted
@@ -0,0 +1,222 @@
+# api/schedule.py
+"""
+Per-user weekly schedule index.
+
+`schedule_index` groups a class's or teacher's timetable slots by weekday,
+sorted by start time and tagged with their period number, and caches the
+result. Cache keys embed a timetable version that every timetable write
+bumps (the model signals in `api.signals`, and bulk writers such as
+`api.timetable.save_solution` call `bump_timetable_version` directly), so a
+stale index is never read after a change; entries simply age out.
+
+`ical_feed` renders the same index as a weekly-recurring iCalendar feed,
+cached under the same version.
+"""
+
+import time
+from datetime import datetime, timedelta
+from django.conf import settings
+from django.core.cache import cache
+from django.utils import timezone
+from .attendance import current_academic_year_start
+from .models import LeaveRequest, Period, Student, Task, Timetable, User
+
+VERSION_KEY = 'timetable:version'
+WEEKDAYS = list(Timetable.Day.values)  # date.weekday() 0..4 -> MON..FRI
+
+
+def timetable_version():
+    """
+    Current timetable version. A missing key (first use or evicted) is
+    seeded from the clock so it never repeats a version already used in keys.
+    """
+    version = cache.get(VERSION_KEY)
+    if version is None:
+        cache.add(VERSION_KEY, int(time.time() * 1000), timeout=None)
+        version = cache.get(VERSION_KEY)
+    return version
+
+
+def bump_timetable_version():
+    try:
+        return cache.incr(VERSION_KEY)
+    except ValueError:
+        version = int(time.time() * 1000)
+        cache.set(VERSION_KEY, version, timeout=None)
+        return version
+
+
+def schedule_index(school_class_id=None, teacher_id=None):
+    """
+    {weekday: [slot, ...]} for one class or one teacher, slots sorted by
+    start time. Each slot is a dict with id, period, start_time, end_time,
+    subject, class and teacher fields.
+    """
+    owner = ('class', school_class_id) if school_class_id is not None else ('teacher', teacher_id)
+    key = f'schedule:{timetable_version()}:{owner[0]}:{owner[1]}'
+    index = cache.get(key)
+    if index is not None:
+        return index
+
+    rows = Timetable.objects.filter(**{'school_class_id' if owner[0] == 'class' else 'teacher_id': owner[1]})
+    periods = dict(Period.objects.values_list('start_time', 'period_number'))
+    index = {day: [] for day in WEEKDAYS}
+    for row in rows.order_by('start_time').values(
+        'id', 'day_of_week', 'start_time', 'end_time', 'subject', 'school_class_id', 'school_class__name',
+        'teacher_id', 'teacher__user__first_name', 'teacher__user__last_name',
+    ):
+        teacher_name = f"{row['teacher__user__first_name']} {row['teacher__user__last_name']}".strip()
+        index[row['day_of_week']].append({
+            'id': row['id'],
+            'period': periods.get(row['start_time']),
+            'start_time': row['start_time'],
+            'end_time': row['end_time'],
+            'subject': row['subject'],
+            'school_class': row['school_class_id'],
+            'class_name': row['school_class__name'],
+            'teacher': row['teacher_id'],
+            'teacher_name': teacher_name if row['teacher_id'] else None,
+        })
+    cache.set(key, index, settings.SCHEDULE_CACHE_SECONDS)
+    return index
+
+
+def user_schedule_index(user):
+    """The schedule index of a student's class or a teacher's own slots; empty for other roles."""
+    if user.role == User.Role.TEACHER:
+        return schedule_index(teacher_id=user.pk)
+    if user.role == User.Role.STUDENT:
+        school_class_id = Student.objects.filter(pk=user.pk).values_list('school_class_id', flat=True).first()
+        if school_class_id is not None:
+            return schedule_index(school_class_id=school_class_id)
+    return {day: [] for day in WEEKDAYS}
+
+
+def upcoming(index, now):
+    """Yield (start datetime, slot) for slots starting after `now`, over the next week."""
+    for offset in range(8):
+        day = now.date() + timedelta(days=offset)
+        if day.weekday() >= len(WEEKDAYS):
+            continue
+        for slot in index[WEEKDAYS[day.weekday()]]:
+            if offset == 0 and slot['start_time'] <= now.time():
+                continue
+            if offset == 7 and slot['start_time'] > now.time():
+                return
+            yield timezone.make_aware(datetime.combine(day, slot['start_time']), now.tzinfo), slot
+
+
+def next_class(index, now, subject=None):
+    """(start datetime, slot) of the next slot, optionally of one subject, or None."""
+    return next(((at, slot) for at, slot in upcoming(index, now) if subject in (None, slot['subject'])), None)
+
+
+def next_class_by_subject(index, now):
+    """{subject: start datetime} of each subject's next slot, from one pass over the week."""
+    found = {}
+    for at, slot in upcoming(index, now):
+        found.setdefault(slot['subject'], at)
+    return found
+
+
+def describe_start(at, now):
+    """'Today 9:00 AM', 'Tomorrow 9:00 AM' or 'Wednesday 9:00 AM'."""
+    days = (at.date() - now.date()).days
+    label = 'Today' if days == 0 else 'Tomorrow' if days == 1 else at.strftime('%A')
+    return f"{label} {at.strftime('%I:%M %p').lstrip('0')}"
+
+
+def my_day(user, now=None):
+    """
+    Everything on `user`'s plate for the day of `now`: timetable slots, tasks
+    due, pending leave requests and the next class. Uses a fixed number of
+    queries whatever the size of the timetable.
+    """
+    now = timezone.localtime(now)
+    today = now.date()
+    index = user_schedule_index(user)
+    slots = index[WEEKDAYS[today.weekday()]] if today.weekday() < len(WEEKDAYS) else []
+
+    tasks = Task.objects.none()
+    if user.role == User.Role.TEACHER:
+        tasks = Task.objects.filter(teacher_id=user.pk, due_date=today).exclude(
+            status__in=[Task.Status.COMPLETED, Task.Status.CANCELLED]
+        ).select_related('teacher__user')
+    leaves = LeaveRequest.objects.filter(user=user, status=LeaveRequest.Status.PENDING).select_related('user') \
+        .order_by('start_date')
+
+    upcoming_class = next_class(index, now)
+    return {
+        'date': today,
+        'day_of_week': WEEKDAYS[today.weekday()] if today.weekday() < len(WEEKDAYS) else None,
+        'slots': slots,
+        'tasks': list(tasks),
+        'pending_leaves': list(leaves),
+        'next_class': dict(upcoming_class[1], starts_at=upcoming_class[0], label=describe_start(upcoming_class[0], now))
+        if upcoming_class else None,
+    }
+
+
+# --------------------------
+# iCalendar feeds
+# --------------------------
+
+def _ical_text(value):
+    return value.replace('\\', '\\\\').replace(';', '\\;').replace(',', '\\,').replace('\n', '\\n')
+
+
+def _ical_fold(line):
+    # RFC 5545 lines are at most 75 octets; continuations start with a space
+    parts = []
+    while len(line.encode()) > 75:
+        cut = 75
+        while len(line[:cut].encode()) > 75:
+            cut -= 1
+        parts.append(line[:cut])
+        line = ' ' + line[cut:]
+    parts.append(line)
+    return '\r\n'.join(parts)
+
+
+def ical_feed(name, school_class_id=None, teacher_id=None):
+    """
+    (version, text) of an iCalendar feed with one weekly event per slot of a
+    class or teacher, recurring from the start of the current academic year
+    for a year. Regenerated only when the timetable version changes.
+    """
+    version = timetable_version()
+    first_day = current_academic_year_start()
+    owner = f'class:{school_class_id}' if school_class_id is not None else f'teacher:{teacher_id}'
+    key = f'ical:{version}:{first_day.isoformat()}:{owner}'
+    feed = cache.get(key)
+    if feed is not None:
+        return version, feed
+
+    index = schedule_index(school_class_id=school_class_id, teacher_id=teacher_id)
+    until = first_day.replace(year=first_day.year + 1) - timedelta(days=1)
+    stamp = timezone.now().strftime('%Y%m%dT%H%M%SZ')
+    lines = [
+        'BEGIN:VCALENDAR', 'VERSION:2.0', 'PRODID:-//School Management//Timetable//EN', 'CALSCALE:GREGORIAN',
+        f'X-WR-CALNAME:{_ical_text(name)}', f'X-WR-TIMEZONE:{settings.TIME_ZONE}',
+    ]
+    for offset, day in enumerate(WEEKDAYS):
+        first = first_day + timedelta(days=(offset - first_day.weekday()) % 7)
+        for slot in index[day]:
+            summary = slot['subject'] if slot['period'] is None else f"{slot['subject']} (Period {slot['period']})"
+            details = slot['teacher_name'] if school_class_id is not None else slot['class_name']
+            lines += [
+                'BEGIN:VEVENT',
+                f"UID:timetable-{slot['id']}@school-management",
+                f'DTSTAMP:{stamp}',
+                f"DTSTART:{first:%Y%m%d}T{slot['start_time']:%H%M%S}",
+                f"DTEND:{first:%Y%m%d}T{slot['end_time']:%H%M%S}",
+                f'RRULE:FREQ=WEEKLY;BYDAY={day[:2]};UNTIL={until:%Y%m%d}T235959',
+                f'SUMMARY:{_ical_text(summary)}',
+            ]
+            if details:
+                lines.append(f'DESCRIPTION:{_ical_text(details)}')
+            lines.append('END:VEVENT')
+    lines.append('END:VCALENDAR')
+    feed = '\r\n'.join(_ical_fold(line) for line in lines) + '\r\n'
+    cache.set(key, feed, settings.SCHEDULE_CACHE_SECONDS)
+    return version, feed
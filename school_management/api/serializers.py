@@ -1,8 +1,56 @@
 from rest_framework import serializers
-from rest_framework_simplejwt.serializers import TokenObtainPairSerializer
+from rest_framework_simplejwt.exceptions import InvalidToken
+from rest_framework_simplejwt.serializers import TokenObtainPairSerializer, TokenRefreshSerializer
+from rest_framework_simplejwt.settings import api_settings
 from django.contrib.auth.password_validation import validate_password
+from django.core.exceptions import FieldDoesNotExist
 from django.db import transaction
+from django.db.models import Manager
 from .models import *
+from . import identity
+from .authentication import SchoolRefreshToken, refresh_revoked, teacher_id_for, token_claims
+from .timetable import slot_conflicts
+
+# === Related Row Loading ===
+
+def related_paths(serializer, model):
+    """
+    The `a__b` paths of the foreign key and one-to-one relations a
+    serializer's read fields go through, nested serializers included.
+    """
+    paths = set()
+    for field in serializer.fields.values():
+        if field.write_only or field.source == '*':
+            continue
+        if isinstance(field, serializers.RelatedField) and field.use_pk_only_optimization():
+            continue  # Renders the stored key; nothing to load
+        current, names = model, []
+        for attr in field.source_attrs:
+            try:
+                relation = current._meta.get_field(attr)
+            except FieldDoesNotExist:
+                break
+            if not (relation.many_to_one or relation.one_to_one):
+                break
+            names.append(attr)
+            current = relation.related_model
+        if not names:
+            continue
+        path = '__'.join(names)
+        paths.add(path)
+        if isinstance(field, serializers.ModelSerializer) and len(names) == len(field.source_attrs):
+            paths.update(f'{path}__{nested}' for nested in related_paths(field, current))
+    return paths
+
+class PrimedListSerializer(serializers.ListSerializer):
+    """
+    many=True serializer that loads the related rows its child reads for all
+    rows up front (api.identity.prime): one query per relation, not per row.
+    """
+    def to_representation(self, data):
+        instances = list(data.all() if isinstance(data, Manager) else data)
+        identity.prime(instances, related_paths(self.child, self.child.Meta.model))
+        return [self.child.to_representation(item) for item in instances]
 
 # === User and Auth Serializers ===
 
@@ -21,6 +69,7 @@ class UserSerializer(serializers.ModelSerializer):
     profile = UserProfileSerializer(required=False)
     class Meta:
         model = User
+        list_serializer_class = PrimedListSerializer
         fields = ['id', 'username', 'email', 'first_name', 'last_name', 'role', 'profile']
         extra_kwargs = {
             'username': {'required': False},
@@ -34,13 +83,59 @@ class SchoolSerializer(serializers.ModelSerializer):
     principal = UserSerializer(read_only=True)
     class Meta:
         model = School
+        list_serializer_class = PrimedListSerializer
         fields = '__all__'
 
+class LoginUserSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = User
+        fields = ['id', 'username', 'email', 'first_name', 'last_name', 'role']
+
 class CustomTokenObtainPairSerializer(TokenObtainPairSerializer):
+    token_class = SchoolRefreshToken
+
+    @classmethod
+    def get_token(cls, user):
+        # Signed claims let api.authentication.ClaimsJWTAuthentication skip the user lookup
+        token = super().get_token(user)
+        for claim, value in token_claims(user).items():
+            token[claim] = value
+        return token
+
     def validate(self, attrs):
         data = super().validate(attrs)
-        serializer = UserSerializer(self.user)
-        data['user'] = serializer.data
+        # Lean payload; clients fetch the full user with profile from /api/auth/user/ when needed
+        data['user'] = LoginUserSerializer(self.user).data
+        return data
+
+class ClaimsTokenRefreshSerializer(TokenRefreshSerializer):
+    """
+    Refresh with rotation. The old refresh token is blacklisted and the
+    claims are re-read, so a rotated pair never carries stale role or
+    profile data. Inactive users cannot refresh, and neither can tokens
+    issued before the user's password changed.
+    """
+    token_class = SchoolRefreshToken
+
+    def validate(self, attrs):
+        refresh = self.token_class(attrs['refresh'])
+        user = User.objects.filter(pk=refresh[api_settings.USER_ID_CLAIM], is_active=True).first()
+        if user is None:
+            raise serializers.ValidationError({'refresh': 'User not found or inactive.'})
+        if refresh_revoked(refresh):
+            raise InvalidToken('The password has changed; sign in again.')
+        if 'role' in refresh.payload:
+            for claim, value in token_claims(user).items():
+                refresh[claim] = value
+
+        data = {'access': str(refresh.access_token)}
+        if api_settings.ROTATE_REFRESH_TOKENS:
+            if api_settings.BLACKLIST_AFTER_ROTATION:
+                refresh.blacklist()
+            refresh.set_jti()
+            refresh.set_exp()
+            refresh.set_iat()
+            data['refresh'] = str(refresh)
         return data
 
 # === Admin Action Serializers ===
@@ -70,7 +165,9 @@ class StudentSerializer(serializers.ModelSerializer):
 
     class Meta:
         model = Student
+        list_serializer_class = PrimedListSerializer
         fields = '__all__'
+        read_only_fields = ['outstanding_balance']
 
     @transaction.atomic
     def create(self, validated_data):
@@ -113,6 +210,7 @@ class TeacherSerializer(serializers.ModelSerializer):
     user = UserSerializer()
     class Meta:
         model = Teacher
+        list_serializer_class = PrimedListSerializer
         fields = '__all__'
 
     @transaction.atomic
@@ -149,12 +247,66 @@ class PeriodSerializer(serializers.ModelSerializer):
 
 class TimetableSerializer(serializers.ModelSerializer):
     teacher = TeacherSerializer(read_only=True, allow_null=True)
+    teacher_id = serializers.PrimaryKeyRelatedField(
+        source='teacher', queryset=Teacher.objects.all(), write_only=True, required=False, allow_null=True
+    )
     day_of_week_display = serializers.CharField(source='get_day_of_week_display', read_only=True)
 
     class Meta:
         model = Timetable
+        list_serializer_class = PrimedListSerializer
         fields = '__all__'
 
+    def validate(self, attrs):
+        """Reject slots that end before they start or overlap the class's or teacher's other slots."""
+        current = lambda field: attrs.get(field, getattr(self.instance, field, None))
+        start_time, end_time = current('start_time'), current('end_time')
+        if start_time and end_time and start_time >= end_time:
+            raise serializers.ValidationError({'end_time': 'End time must be after start time.'})
+        school_class, teacher = current('school_class'), current('teacher')
+        if school_class and current('day_of_week') and start_time and end_time:
+            conflicts = slot_conflicts(
+                current('day_of_week'), start_time, end_time, school_class.pk,
+                teacher.pk if teacher else None, exclude_id=self.instance.pk if self.instance else None,
+            )
+            if conflicts:
+                raise serializers.ValidationError({'conflicts': [
+                    f"The {c['type']} already has timetable entry {c['conflicts_with']} at this time on {c['day_of_week']}."
+                    for c in conflicts
+                ]})
+        return attrs
+
+class TimetableEntrySerializer(serializers.Serializer):
+    """One proposed slot in a bulk validation request."""
+    id = serializers.IntegerField(required=False)
+    school_class = serializers.IntegerField()
+    teacher = serializers.IntegerField(required=False, allow_null=True)
+    day_of_week = serializers.ChoiceField(choices=Timetable.Day.choices)
+    start_time = serializers.TimeField()
+    end_time = serializers.TimeField()
+
+    def validate(self, attrs):
+        if attrs['start_time'] >= attrs['end_time']:
+            raise serializers.ValidationError({'end_time': 'End time must be after start time.'})
+        return attrs
+
+class SubjectRequirementSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = SubjectRequirement
+        fields = ['id', 'school_class', 'subject', 'periods_per_week', 'teacher']
+
+class TeacherUnavailabilitySerializer(serializers.ModelSerializer):
+    class Meta:
+        model = TeacherUnavailability
+        fields = ['id', 'teacher', 'day_of_week', 'period']
+
+class TimetableGenerateSerializer(serializers.Serializer):
+    class_ids = serializers.ListField(child=serializers.IntegerField(), required=False)
+    teacher_id = serializers.IntegerField(required=False)
+    time_budget = serializers.FloatField(required=False, min_value=0.1)
+    seed = serializers.IntegerField(required=False, default=0)
+    dry_run = serializers.BooleanField(required=False, default=False)
+
 class FeeTypeSerializer(serializers.ModelSerializer):
     class Meta:
         model = FeeType
@@ -162,9 +314,30 @@ class FeeTypeSerializer(serializers.ModelSerializer):
 
 class FeeSerializer(serializers.ModelSerializer):
     student = StudentSerializer(read_only=True)
+    balance = serializers.DecimalField(max_digits=10, decimal_places=2, read_only=True)
     class Meta:
         model = Fee
+        list_serializer_class = PrimedListSerializer
         fields = '__all__'
+        read_only_fields = ['amount_paid', 'late_fee']
+
+class InstallmentScheduleSerializer(serializers.Serializer):
+    start_date = serializers.DateField()
+    class_id = serializers.IntegerField(required=False)
+
+class PaymentSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = Payment
+        fields = ['id', 'fee', 'amount', 'paid_on', 'method', 'reference', 'recorded_by', 'created_at']
+        read_only_fields = ['fee', 'recorded_by', 'created_at']
+
+class StudentDuesSerializer(serializers.ModelSerializer):
+    name = serializers.CharField(source='user.get_full_name', read_only=True)
+    school_class = serializers.CharField(source='school_class.name', read_only=True, default=None)
+    class Meta:
+        model = Student
+        list_serializer_class = PrimedListSerializer
+        fields = ['user', 'name', 'school_class', 'outstanding_balance']
 
 class AttendanceSerializer(serializers.ModelSerializer):
     class Meta:
@@ -175,6 +348,7 @@ class LeaveRequestSerializer(serializers.ModelSerializer):
     user = UserSerializer(read_only=True)
     class Meta:
         model = LeaveRequest
+        list_serializer_class = PrimedListSerializer
         fields = '__all__'
         read_only_fields = ['user']
     def create(self, validated_data):
@@ -194,6 +368,7 @@ class GradeSerializer(serializers.ModelSerializer):
     assignment = AssignmentSerializer(read_only=True)
     class Meta:
         model = Grade
+        list_serializer_class = PrimedListSerializer
         fields = ['id', 'assignment', 'score', 'graded_date']
 class SetPasswordSerializer(serializers.Serializer):
     """
@@ -219,6 +394,7 @@ class TaskSerializer(serializers.ModelSerializer):
 
     class Meta:
         model = Task
+        list_serializer_class = PrimedListSerializer
         fields = [
             'id', 'teacher', 'title', 'description', 'task_type', 'task_type_display',
             'priority', 'priority_display', 'status', 'status_display',
@@ -227,15 +403,25 @@ class TaskSerializer(serializers.ModelSerializer):
         read_only_fields = ['created_at', 'updated_at', 'completed_at']
 
     def create(self, validated_data):
-        # Set the teacher based on the current user
+        # Set the teacher based on the current user, unless the view already did
         request = self.context.get('request')
-        if request and hasattr(request, 'user'):
-            try:
-                teacher = Teacher.objects.get(user=request.user)
-                validated_data['teacher'] = teacher
-            except Teacher.DoesNotExist:
+        if 'teacher' not in validated_data and request and hasattr(request, 'user'):
+            teacher = identity.get(Teacher, teacher_id_for(request.user))
+            if teacher is None:
                 raise serializers.ValidationError("Teacher profile not found for current user.")
+            validated_data['teacher'] = teacher
         return super().create(validated_data)
 
+class NotificationSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = Notification
+        fields = ['id', 'title', 'message', 'is_read', 'created_at']
+        read_only_fields = ['title', 'message', 'created_at']
+
+class MarkReadSerializer(serializers.Serializer):
+    """Selects notifications by id, by age, or (with neither) all unread ones."""
+    ids = serializers.ListField(child=serializers.IntegerField(), required=False, max_length=1000)
+    before = serializers.DateTimeField(required=False)
+
 # === User and Auth Serializers ===
 
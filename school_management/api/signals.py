@@ -0,0 +1,230 @@
+# api/signals.py
+"""Signal handlers that keep derived tables in step with their source rows."""
+
+from django.db import transaction
+from django.db.models import Q
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+from .authentication import revoke_user_tokens
+from .attendance import apply_rollup_delta, bitmap_enabled, set_bitmap_day
+from .fees import apply_fee_change, fee_snapshot, rebuild_fee_summary
+from .models import Attendance, Fee, LeaveRequest, Notification, SchoolClass, Student, Teacher, Timetable, User
+from .notifications import adjust_unread_count
+from .realtime import leave_payload, notification_payload, publish
+from .schedule import bump_timetable_version
+
+
+# --------------------------
+# Attendance rollups and bitmaps
+# --------------------------
+
+@receiver(pre_save, sender=Attendance)
+def remember_previous_attendance(sender, instance, **kwargs):
+    """Capture the stored row before an update so its old counter can be reverted."""
+    instance._previous_attendance = None
+    if instance.pk:
+        instance._previous_attendance = (
+            Attendance.objects.filter(pk=instance.pk).values('student_id', 'date', 'status').first()
+        )
+
+
+@receiver(post_save, sender=Attendance)
+def update_attendance_rollup(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    previous = getattr(instance, '_previous_attendance', None)
+    if previous:
+        apply_rollup_delta(previous['student_id'], previous['date'], previous['status'], -1)
+    apply_rollup_delta(instance.student_id, instance.date, instance.status, 1)
+
+    if bitmap_enabled():
+        if previous and (previous['student_id'], previous['date']) != (instance.student_id, instance.date):
+            set_bitmap_day(previous['student_id'], previous['date'], None)
+        set_bitmap_day(instance.student_id, instance.date, instance.status)
+
+
+@receiver(post_delete, sender=Attendance)
+def revert_attendance_rollup(sender, instance, **kwargs):
+    apply_rollup_delta(instance.student_id, instance.date, instance.status, -1)
+    if bitmap_enabled():
+        set_bitmap_day(instance.student_id, instance.date, None)
+
+
+# --------------------------
+# Fee summaries
+# --------------------------
+
+@receiver(pre_save, sender=Fee)
+def remember_previous_fee(sender, instance, **kwargs):
+    instance._previous_fee = None
+    if instance.pk:
+        stored = Fee.objects.filter(pk=instance.pk).first()
+        instance._previous_fee = fee_snapshot(stored) if stored else None
+
+
+@receiver(post_save, sender=Fee)
+def update_fee_summary(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    apply_fee_change(instance.pk, getattr(instance, '_previous_fee', None), fee_snapshot(instance))
+
+
+@receiver(post_delete, sender=Fee)
+def revert_fee_summary(sender, instance, **kwargs):
+    apply_fee_change(instance.pk, fee_snapshot(instance), None)
+
+
+@receiver(pre_save, sender=Student)
+def remember_previous_class(sender, instance, **kwargs):
+    instance._previous_class_id = (
+        Student.objects.filter(pk=instance.pk).values_list('school_class_id', flat=True).first()
+        if instance.pk else None
+    )
+
+
+@receiver(post_save, sender=Student)
+def move_fee_summary_on_class_change(sender, instance, created, raw=False, **kwargs):
+    """A student's fees count towards their class, so a class change moves them."""
+    previous = getattr(instance, '_previous_class_id', None)
+    if raw or created or previous == instance.school_class_id:
+        return
+    if Fee.objects.filter(student=instance).exists():
+        rebuild_fee_summary(class_ids=[previous, instance.school_class_id])
+
+
+@receiver(post_delete, sender=SchoolClass)
+def move_fee_summary_on_class_delete(sender, instance, **kwargs):
+    """Students of a deleted class become unassigned, so rebuild that bucket."""
+    rebuild_fee_summary(class_ids=[None])
+
+
+
+# --------------------------
+# Unread notification counters
+# --------------------------
+
+@receiver(pre_save, sender=Notification)
+def remember_previous_read_state(sender, instance, **kwargs):
+    instance._previous_is_read = (
+        Notification.objects.filter(pk=instance.pk).values_list('is_read', flat=True).first()
+        if instance.pk else None
+    )
+
+
+@receiver(post_save, sender=Notification)
+def update_unread_count(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    previous = getattr(instance, '_previous_is_read', None)
+    was_unread = previous is False
+    if was_unread != (not instance.is_read):
+        adjust_unread_count(instance.user_id, -1 if was_unread else 1)
+
+
+@receiver(post_delete, sender=Notification)
+def revert_unread_count(sender, instance, **kwargs):
+    if not instance.is_read:
+        adjust_unread_count(instance.user_id, -1)
+
+
+# --------------------------
+# Server push
+# --------------------------
+
+@receiver(post_save, sender=Notification)
+def push_notification(sender, instance, created, raw=False, **kwargs):
+    if raw or not created:
+        return
+    user_id, payload = instance.user_id, notification_payload(instance)
+    transaction.on_commit(lambda: publish(user_id, 'notification', payload))
+
+
+@receiver(pre_save, sender=LeaveRequest)
+def remember_previous_leave_status(sender, instance, **kwargs):
+    instance._previous_status = (
+        LeaveRequest.objects.filter(pk=instance.pk).values_list('status', flat=True).first()
+        if instance.pk else None
+    )
+
+
+def _publish_to_reviewers(event, payload):
+    reviewers = User.objects.filter(Q(role=User.Role.PRINCIPAL) | Q(is_staff=True), is_active=True)
+    for user_id in reviewers.values_list('pk', flat=True):
+        publish(user_id, event, payload)
+
+
+@receiver(post_save, sender=LeaveRequest)
+def push_leave_status(sender, instance, created, raw=False, **kwargs):
+    """Tell reviewers about new requests and the requester about status changes."""
+    if raw:
+        return
+    payload = leave_payload(instance)
+    if created:
+        transaction.on_commit(lambda: _publish_to_reviewers('leave_request', payload))
+    elif getattr(instance, '_previous_status', None) != instance.status:
+        user_id = instance.user_id
+        transaction.on_commit(lambda: publish(user_id, 'leave_status', payload))
+        transaction.on_commit(lambda: _publish_to_reviewers('leave_request', payload))
+
+
+# --------------------------
+# Schedule index version
+# --------------------------
+
+@receiver(post_save, sender=Timetable)
+@receiver(post_delete, sender=Timetable)
+def invalidate_schedule_indexes(sender, instance, **kwargs):
+    transaction.on_commit(bump_timetable_version)
+
+
+# --------------------------
+# Token claim revocation
+# --------------------------
+
+CLAIMED_USER_FIELDS = ('username', 'role', 'is_staff', 'is_superuser', 'is_active', 'password')
+
+
+def _password_replaced(instance):
+    # set_password keeps the raw password until the save; the rehash on login
+    # (check_password) clears it first, so an upgraded hash of the same password
+    # does not log the user out. Disabling the password always counts.
+    return instance._password is not None or not instance.has_usable_password()
+
+
+@receiver(pre_save, sender=User)
+def remember_previous_claims(sender, instance, **kwargs):
+    instance._claims_changed = instance._password_changed = False
+    if instance._state.adding or instance.pk is None:
+        return
+    # Deferred fields (see api.authentication) were not touched, so only compare loaded ones
+    loaded = [field for field in CLAIMED_USER_FIELDS if field in instance.__dict__]
+    if 'password' in loaded and not _password_replaced(instance):
+        loaded.remove('password')
+    stored = User.objects.filter(pk=instance.pk).values(*loaded).first() if loaded else None
+    changed = {field for field in loaded if stored is not None and stored[field] != getattr(instance, field)}
+    instance._claims_changed = bool(changed)
+    instance._password_changed = 'password' in changed
+
+
+@receiver(post_save, sender=User)
+def revoke_tokens_on_claim_change(sender, instance, created, raw=False, **kwargs):
+    if not raw and getattr(instance, '_claims_changed', False):
+        # A new password ends every session; other claim changes only need a refresh
+        user_id, password = instance.pk, instance._password_changed
+        transaction.on_commit(lambda: revoke_user_tokens(user_id, password=password))
+
+
+@receiver(post_save, sender=Teacher)
+@receiver(post_save, sender=Student)
+def revoke_tokens_on_new_profile(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        user_id = instance.pk
+        transaction.on_commit(lambda: revoke_user_tokens(user_id))
+
+
+@receiver(post_delete, sender=Teacher)
+@receiver(post_delete, sender=Student)
+@receiver(post_delete, sender=User)
+def revoke_tokens_on_delete(sender, instance, **kwargs):
+    user_id = instance.pk
+    transaction.on_commit(lambda: revoke_user_tokens(user_id))
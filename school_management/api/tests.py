@@ -1,10 +1,59 @@
-from django.test import TestCase
+from django.test import AsyncClient, RequestFactory, TestCase, TransactionTestCase, override_settings
+from django.contrib import admin as django_admin
 from django.contrib.auth import get_user_model
+from django.conf import settings
+from django.core.cache import caches
+from django.core.management import call_command
+from django.db.models import F, Sum
 from django.urls import reverse
-from rest_framework.test import APITestCase
+from django.utils import timezone
+from rest_framework.test import APITestCase, APITransactionTestCase
 from rest_framework import status
 from rest_framework_simplejwt.tokens import RefreshToken
-from .models import Student, Teacher, UserProfile, SchoolClass
+import asyncio
+import io
+import json
+import logging
+import queue
+import sys
+import tempfile
+import time as time_module
+from pathlib import Path
+from asgiref.sync import async_to_sync
+from datetime import date, datetime, time, timedelta
+from unittest import mock
+from decimal import Decimal
+from .models import (
+    Student, Teacher, UserProfile, SchoolClass, Attendance, AttendanceArchive, AttendanceMonthlyRollup,
+    Assignment, Grade, Fee, FeeSummary, FeeType, Payment, Notification, NotificationArchive, LeaveRequest,
+    Period, SubjectRequirement, Task, Teacher, TeacherUnavailability, TokenRevocation, Timetable,
+)
+from .fees import (
+    PaymentError, apply_late_fees, fees_summary, rebuild_fee_summary, rebuild_student_balances, record_payment,
+    schedule_installments,
+)
+from .notifications import archive_read_before, rebuild_unread_counts
+from .timetable import IntervalIndex, export_timetable_csv, find_conflicts, generate_timetable, import_timetable_csv
+from .timetable_solver import SolverError, solve
+from .schedule import my_day, schedule_index, timetable_version
+from .realtime import EventStreamApp, RedisRelay, broker, publish
+from .authentication import ClaimsJWTAuthentication, jti_blacklist, revocations, revoke_user_tokens
+from .analytics import attendance_analytics, performance_analytics
+from . import health
+from .async_views import gather_reads
+from . import identity
+from .serializers import StudentSerializer, TaskSerializer, TimetableSerializer
+from .metrics import PROCESSES_KEY, observe_report, registry
+from .profiling import RequestProfile, fingerprint
+from .reset import flush_order, reset_school_data
+from .workload import (
+    ClientTransport, WorkloadRecorderMiddleware, clear_page_cache, profile_from_log, read_only, replay, summarize,
+    synthesize,
+)
+from .attendance import (
+    archive_before, attendance_history, attendance_rate, bitmap_summary, decode_bitmap, encode_bitmap,
+    load_term_bitmap, rebuild_bitmaps, rebuild_rollups,
+)
 
 User = get_user_model()
 
@@ -280,12 +329,1511 @@ class ProfileUpdateAPITestCase(APITestCase):
         self.assertEqual(profile.phone, '7778889999')
         self.assertEqual(profile.address, 'New Student Address')
 
-class HealthCheckTestCase(APITestCase):
+# Transactional: the probes run in other threads, which a test transaction would lock out of the cache table
+class HealthCheckTestCase(APITransactionTestCase):
     """Test health check endpoint"""
 
+    def setUp(self):
+        health._last = None
+        self.addCleanup(setattr, health, '_last', None)
+
     def test_health_check(self):
         """Test that health check endpoint works"""
         response = self.client.get(reverse('health_check'))
         self.assertEqual(response.status_code, status.HTTP_200_OK)
         self.assertEqual(response.data['status'], 'ok')
         self.assertIn('message', response.data)
+
+class AttendanceStorageTestCase(TestCase):
+    """Test attendance rollup maintenance and archive routing"""
+
+    def setUp(self):
+        user = User.objects.create_user(username='student1', password='testpass123', role='student')
+        self.student = Student.objects.create(user=user)
+
+    def rollup(self, month):
+        return AttendanceMonthlyRollup.objects.get(student=self.student, month=month)
+
+    def test_rollup_follows_create_update_delete(self):
+        """Test that monthly counters track every attendance write"""
+        first = Attendance.objects.create(student=self.student, date=date(2024, 3, 4), status='present')
+        Attendance.objects.create(student=self.student, date=date(2024, 3, 5), status='absent')
+        rollup = self.rollup(date(2024, 3, 1))
+        self.assertEqual((rollup.present_count, rollup.absent_count, rollup.late_count), (1, 1, 0))
+
+        first.status = 'late'
+        first.save()
+        rollup = self.rollup(date(2024, 3, 1))
+        self.assertEqual((rollup.present_count, rollup.absent_count, rollup.late_count), (0, 1, 1))
+
+        first.delete()
+        rollup = self.rollup(date(2024, 3, 1))
+        self.assertEqual(rollup.total_count, 1)
+        self.assertEqual(attendance_rate(self.student), 0)
+
+    def test_archive_keeps_history_and_rollups(self):
+        """Test that archived rows stay readable and counted"""
+        Attendance.objects.create(student=self.student, date=date(2020, 7, 1), status='present')
+        Attendance.objects.create(student=self.student, date=date.today(), status='absent')
+
+        moved = archive_before(date(2021, 1, 1))
+
+        self.assertEqual(moved, 1)
+        self.assertEqual(Attendance.objects.count(), 1)
+        self.assertEqual(AttendanceArchive.objects.get().academic_year, 2020)
+        self.assertEqual([row['date'] for row in attendance_history(self.student)], [date(2020, 7, 1), date.today()])
+        self.assertEqual(attendance_rate(self.student), 50)
+
+        rebuild_rollups()
+        self.assertEqual(attendance_rate(self.student), 50)
+
+@override_settings(ATTENDANCE_BITMAP_ENABLED=True)
+class AttendanceBitmapTestCase(APITestCase):
+    """Test the packed attendance bitmap store"""
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='student1', password='testpass123', role='student')
+        self.student = Student.objects.create(user=self.user)
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {RefreshToken.for_user(self.user).access_token}')
+
+    def test_encode_decode_round_trip(self):
+        """Test that packing four days per byte is lossless"""
+        codes = [1, 2, 3, 0, 1, 1, 2]
+        self.assertEqual(list(decode_bitmap(encode_bitmap(codes))[:len(codes)]), codes)
+
+    def test_viewset_writes_keep_bitmap_in_sync(self):
+        """Test that AttendanceViewSet create/update/delete update the bitmap"""
+        url = reverse('attendance-list')
+        for day, status_value in [(2, 'present'), (3, 'late'), (4, 'absent'), (5, 'present')]:
+            response = self.client.post(url, {'student': self.student.pk, 'date': f'2024-09-0{day}', 'status': status_value})
+            self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+
+        summary = bitmap_summary(*load_term_bitmap(self.student, date(2024, 9, 2)))
+        self.assertEqual(summary['recorded_days'], 4)
+        self.assertEqual(summary['attendance_rate'], 75)
+        self.assertEqual(summary['longest_streak'], 2)
+        self.assertEqual(summary['current_streak'], 1)
+        self.assertEqual(summary['absent_days'], [date(2024, 9, 4)])
+
+        absent = Attendance.objects.get(date=date(2024, 9, 4))
+        self.client.patch(reverse('attendance-detail', kwargs={'pk': absent.pk}), {'status': 'present'})
+        self.client.delete(reverse('attendance-detail', kwargs={'pk': Attendance.objects.get(date=date(2024, 9, 5)).pk}))
+        summary = bitmap_summary(*load_term_bitmap(self.student, date(2024, 9, 2)))
+        self.assertEqual((summary['recorded_days'], summary['longest_streak'], summary['absent_days']), (3, 3, []))
+
+        codes, _ = load_term_bitmap(self.student, date(2024, 9, 2))
+        rebuild_bitmaps()
+        rebuilt, _ = load_term_bitmap(self.student, date(2024, 9, 2))
+        self.assertEqual(list(codes[:len(rebuilt)]), list(rebuilt))
+
+    def test_student_detail_reads_current_term_bitmap(self):
+        """Test that StudentDetailView serves attendance from the bitmap"""
+        Attendance.objects.create(student=self.student, date=date.today(), status='absent')
+        response = self.client.get(reverse('student_details', kwargs={'student_id': self.student.pk}))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            response.data['attendance'], [{'id': None, 'student': self.student.pk, 'date': date.today(), 'status': 'absent'}]
+        )
+        self.assertEqual(response.data['attendance_summary']['absent_days'], [date.today()])
+
+        # The row-based path (flag off) returns records with the same keys
+        with override_settings(ATTENDANCE_BITMAP_ENABLED=False):
+            rows = self.client.get(reverse('student_details', kwargs={'student_id': self.student.pk})).data['attendance']
+        self.assertEqual(set(rows[0]), set(response.data['attendance'][0]))
+        self.assertIsNotNone(rows[0]['id'])
+
+class AnalyticsTestCase(TestCase):
+    """Test the vectorized report analytics"""
+
+    def setUp(self):
+        class_a = SchoolClass.objects.create(name='A')
+        class_b = SchoolClass.objects.create(name='B')
+        self.students = []
+        for i, school_class in enumerate([class_a, class_a, class_b]):
+            user = User.objects.create_user(username=f'student{i}', password='testpass123', role='student')
+            self.students.append(Student.objects.create(user=user, school_class=school_class))
+        first = Assignment.objects.create(title='Essay', due_date=date(2024, 1, 10), school_class=class_a)
+        second = Assignment.objects.create(title='Quiz', due_date=date(2024, 1, 20), school_class=class_a)
+        for student, scores in zip(self.students, [(90, 70), (80, 80), (60, 100)]):
+            Grade.objects.create(student=student, assignment=first, score=scores[0])
+            Grade.objects.create(student=student, assignment=second, score=scores[1])
+
+    def test_performance_rankings_and_class_means(self):
+        """Test that tied averages share a rank and class means cover all grades"""
+        report = performance_analytics(top_n=2)
+        ranks = {row['user__username']: row['rank'] for row in report['student_performance']}
+        self.assertEqual(ranks, {'student0': 1, 'student1': 1, 'student2': 1})
+        self.assertEqual(
+            {row['class_name']: row['avg_score'] for row in report['class_performance']},
+            {'A': 80.0, 'B': 80.0},
+        )
+        self.assertEqual(len(report['top_performers']), 2)
+        self.assertEqual(report['score_percentiles']['p50'], 80.0)
+
+    def test_attendance_class_average_of_student_rates(self):
+        """Test that class attendance averages per-student present rates"""
+        Attendance.objects.create(student=self.students[0], date=date(2024, 3, 4), status='present')
+        Attendance.objects.create(student=self.students[1], date=date(2024, 3, 4), status='absent')
+        Attendance.objects.create(student=self.students[1], date=date(2024, 3, 5), status='present')
+        report = attendance_analytics()
+        self.assertEqual(report['attendance_statistics']['total_records'], 3)
+        class_a = next(row for row in report['class_attendance'] if row['name'] == 'A')
+        self.assertEqual(class_a['avg_attendance'], 75.0)
+        self.assertEqual(len(report['at_risk_students']), 1)
+
+class FeeSummaryTestCase(APITestCase):
+    """Test the maintained FeeSummary aggregates"""
+
+    def setUp(self):
+        self.class_a = SchoolClass.objects.create(name='A')
+        self.class_b = SchoolClass.objects.create(name='B')
+        self.students = []
+        for i in range(2):
+            user = User.objects.create_user(username=f'student{i}', password='testpass123', role='student')
+            self.students.append(Student.objects.create(user=user, school_class=self.class_a))
+
+    def snapshot(self):
+        return {
+            row.key: (row.paid_count, row.paid_total, row.unpaid_count, row.unpaid_total, row.unpaid_student_count)
+            for row in FeeSummary.objects.order_by('key')
+        }
+
+    def assert_matches_rebuild(self):
+        maintained = {key: value for key, value in self.snapshot().items() if any(value)}
+        rebuild_fee_summary()
+        self.assertEqual(maintained, {key: value for key, value in self.snapshot().items() if any(value)})
+
+    def test_summary_tracks_fee_writes(self):
+        """Test that create, update, delete and class moves keep the summary exact"""
+        first = Fee.objects.create(student=self.students[0], amount=100, due_date=date(2024, 1, 1))
+        Fee.objects.create(student=self.students[0], amount=50, due_date=date(2024, 2, 1), status='partial')
+        Fee.objects.create(student=self.students[1], amount=70, due_date=date(2024, 1, 1), status='paid')
+        self.assertEqual(self.snapshot()['overall'], (1, 70, 2, 150, 1))
+        self.assert_matches_rebuild()
+
+        first.status = 'paid'
+        first.save()
+        self.assertEqual(self.snapshot()['overall'], (2, 170, 1, 50, 1))
+        self.assert_matches_rebuild()
+
+        student = self.students[0]
+        student.school_class = self.class_b
+        student.save()
+        self.assertEqual(self.snapshot()[FeeSummary.class_key(self.class_b.pk)], (1, 100, 1, 50, 1))
+        self.assert_matches_rebuild()
+
+        Fee.objects.filter(status='partial').delete()
+        self.assertEqual(self.snapshot()['overall'], (2, 170, 0, 0, 0))
+        self.assert_matches_rebuild()
+
+    def test_fees_summary_endpoint_reads_summary(self):
+        """Test that the finance dashboard payload is served from FeeSummary"""
+        admin = User.objects.create_user(username='admin', password='testpass123', role='principal', is_staff=True)
+        Fee.objects.create(student=self.students[1], amount=40, due_date=date(2024, 1, 1))
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {RefreshToken.for_user(admin).access_token}')
+        response = self.client.get(reverse('report-fees-summary'))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['pie_chart']['unpaid_total'], 40)
+        self.assertEqual(response.data['class_breakdown'], [
+            {'student__school_class__name': 'A', 'total_pending': 40, 'student_count': 1}
+        ])
+        self.assertEqual(response.data, fees_summary())
+
+        # Not page-cached: a new fee shows up on the next read
+        self.assertIn('no-cache', response['Cache-Control'])
+        Fee.objects.create(student=self.students[0], amount=60, due_date=date(2024, 1, 1))
+        response = self.client.get(reverse('report-fees-summary'))
+        self.assertEqual(response.data['pie_chart']['unpaid_total'], 100)
+
+
+
+class PaymentLedgerTestCase(APITestCase):
+    """Test partial payments and the cached fee and student balances"""
+
+    def setUp(self):
+        school_class = SchoolClass.objects.create(name='A')
+        user = User.objects.create_user(username='student', password='testpass123', role='student')
+        self.student = Student.objects.create(user=user, school_class=school_class)
+        self.fee = Fee.objects.create(student=self.student, amount=100, due_date=date(2024, 1, 1))
+        Fee.objects.create(student=self.student, amount=40, due_date=date(2024, 2, 1))
+
+    def balance(self):
+        self.student.refresh_from_db()
+        return self.student.outstanding_balance
+
+    def test_partial_payments_update_balances(self):
+        """Test that payments move the fee, student balance and summary together"""
+        self.assertEqual(self.balance(), 140)
+        record_payment(self.fee.pk, 30, method='cash')
+        self.fee.refresh_from_db()
+        self.assertEqual((self.fee.status, self.fee.amount_paid, self.fee.balance), ('partial', 30, 70))
+        self.assertEqual(self.balance(), 110)
+        overall = FeeSummary.objects.get(key=FeeSummary.OVERALL)
+        self.assertEqual((overall.paid_total, overall.unpaid_total), (30, 110))
+
+        record_payment(self.fee.pk, 70)
+        self.fee.refresh_from_db()
+        self.assertEqual(self.fee.status, 'paid')
+        self.assertEqual(self.balance(), 40)
+
+        rebuild_student_balances()
+        self.assertEqual(self.balance(), 40)
+
+    def test_overpayment_rejected(self):
+        """Test that a payment larger than the remaining balance is refused"""
+        with self.assertRaises(PaymentError):
+            record_payment(self.fee.pk, 101)
+        self.assertFalse(Payment.objects.exists())
+        self.assertEqual(self.balance(), 140)
+
+    def test_payment_endpoints(self):
+        """Test recording a payment and listing outstanding dues over the API"""
+        admin = User.objects.create_user(username='admin', password='testpass123', role='principal', is_staff=True)
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {RefreshToken.for_user(admin).access_token}')
+        url = reverse('fee-payments', args=[self.fee.pk])
+        response = self.client.get(reverse('fee-outstanding'))
+        self.assertEqual(Decimal(response.data[0]['outstanding_balance']), Decimal('140'))
+        self.assertEqual(self.client.get(url).data, [])
+        response = self.client.post(url, {'amount': '25.00', 'method': 'upi'})
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        response = self.client.post(url, {'amount': '500.00'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+        # Neither list is served from the page cache, to this client or to anyone else
+        response = self.client.get(reverse('fee-outstanding'))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertIn('no-cache', response['Cache-Control'])
+        self.assertEqual(len(response.data), 1)
+        self.assertEqual(Decimal(response.data[0]['outstanding_balance']), Decimal('115'))
+        self.assertEqual(len(self.client.get(url).data), 1)
+        self.client.credentials()
+        self.assertEqual(self.client.get(reverse('fee-outstanding')).status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_stale_saves_keep_balance_and_admin_is_read_only(self):
+        """Test that saving a stale student keeps its balance and that payments can't be edited in the admin"""
+        stale = Student.objects.get(pk=self.student.pk)
+        record_payment(self.fee.pk, 30)
+        stale.roll_number = '7'
+        stale.save()
+        self.assertEqual(self.balance(), 110)
+        self.assertEqual(self.student.roll_number, '7')
+
+        admin = User.objects.create_superuser(username='root', password='testpass123')
+        request = RequestFactory().get('/admin/')
+        request.user = admin
+        payment_admin = django_admin.site._registry[Payment]
+        self.assertFalse(payment_admin.has_add_permission(request))
+        self.assertFalse(payment_admin.has_change_permission(request, Payment.objects.first()))
+        self.assertFalse(payment_admin.has_delete_permission(request, Payment.objects.first()))
+        self.assertTrue(payment_admin.has_view_permission(request))
+
+
+@override_settings(LATE_FEE_GRACE_DAYS=5, LATE_FEE_PERIOD_DAYS=30, LATE_FEE_PERCENT=2, LATE_FEE_MAX_PERIODS=3)
+class FeeSchedulingTestCase(APITestCase):
+    """Test installment generation and the set-based late-fee pass"""
+
+    def setUp(self):
+        school_class = SchoolClass.objects.create(name='A')
+        self.students = []
+        for i in range(2):
+            user = User.objects.create_user(username=f'student{i}', password='testpass123', role='student')
+            self.students.append(Student.objects.create(user=user, school_class=school_class))
+
+    def test_installments_follow_category_plan(self):
+        """Test that an annual fee is split into quarterly installments once"""
+        fee_type = FeeType.objects.create(name='Development', amount=1000, category='Annual')
+        self.assertEqual(schedule_installments(fee_type, date(2024, 1, 31)), 8)
+        self.assertEqual(schedule_installments(fee_type, date(2024, 1, 31)), 0)
+        fees = Fee.objects.filter(student=self.students[0]).order_by('installment_number')
+        self.assertEqual([fee.due_date for fee in fees], [
+            date(2024, 1, 31), date(2024, 4, 30), date(2024, 7, 31), date(2024, 10, 31)
+        ])
+        self.assertEqual(sum(fee.amount for fee in fees), 1000)
+        self.students[0].refresh_from_db()
+        self.assertEqual(self.students[0].outstanding_balance, 1000)
+        self.assertEqual(FeeSummary.objects.get(key=FeeSummary.OVERALL).unpaid_total, 2000)
+
+    def test_late_fees_applied_in_periods(self):
+        """Test penalties per started period, the cap, and that paid fees are untouched"""
+        today = date(2024, 6, 30)
+        recent = Fee.objects.create(student=self.students[0], amount=100, due_date=today - timedelta(days=3))
+        one_period = Fee.objects.create(student=self.students[0], amount=100, due_date=today - timedelta(days=20))
+        capped = Fee.objects.create(student=self.students[1], amount=200, due_date=today - timedelta(days=400))
+        paid = Fee.objects.create(student=self.students[1], amount=100, due_date=today - timedelta(days=400), status='paid')
+
+        self.assertEqual(apply_late_fees(today), 2)
+        self.assertEqual(apply_late_fees(today), 0)
+        late_fees = {fee.pk: fee.late_fee for fee in Fee.objects.all()}
+        self.assertEqual(late_fees[recent.pk], 0)
+        self.assertEqual(late_fees[one_period.pk], 2)
+        self.assertEqual(late_fees[capped.pk], 12)
+        self.assertEqual(late_fees[paid.pk], 0)
+
+        self.students[1].refresh_from_db()
+        self.assertEqual(self.students[1].outstanding_balance, 212)
+        with self.assertRaises(PaymentError):
+            record_payment(capped.pk, 213)
+        record_payment(capped.pk, 212)
+        capped.refresh_from_db()
+        self.assertEqual(capped.status, 'paid')
+
+
+class ServerPushTestCase(TestCase):
+    """Test the server-push stream and the signals that feed it"""
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='teacher', password='testpass123', role='teacher')
+        self.principal = User.objects.create_user(username='principal', password='testpass123', role='principal')
+
+    def stream(self, query_string, events=()):
+        """Run the SSE app until the first event arrives; return the sent ASGI messages."""
+        sent = []
+
+        async def run():
+            done = asyncio.Event()
+
+            async def receive():
+                await done.wait()
+                return {'type': 'http.disconnect'}
+
+            async def send(message):
+                sent.append(message)
+                if message.get('body', b'').startswith(b'event:'):
+                    done.set()
+
+            scope = {'type': 'http', 'path': '/api/events/', 'query_string': query_string, 'headers': []}
+            task = asyncio.ensure_future(EventStreamApp(heartbeat=5)(scope, receive, send))
+            if events:
+                while not broker.subscriber_count(self.user.pk):
+                    await asyncio.sleep(0.01)
+                for event, data in events:
+                    publish(self.user.pk, event, data)
+            await asyncio.wait_for(task, 5)
+
+        async_to_sync(run)()
+        return sent
+
+    def test_stream_requires_token(self):
+        """Test that the stream rejects unauthenticated clients"""
+        sent = self.stream(b'')
+        self.assertEqual(sent[0]['status'], 401)
+
+    def test_stream_delivers_published_events(self):
+        """Test that a published event reaches the user's open stream and the subscription is freed"""
+        token = str(RefreshToken.for_user(self.user).access_token)
+        sent = self.stream(f'token={token}'.encode(), [('notification', {'id': 1, 'title': 'Hello'})])
+        self.assertEqual(sent[0]['status'], 200)
+        self.assertEqual(sent[-1]['body'], b'event: notification\ndata: {"id": 1, "title": "Hello"}\n\n')
+        self.assertEqual(broker.subscriber_count(self.user.pk), 0)
+
+    def test_subscriber_only_relay_receives_other_nodes_events(self):
+        """Test that a Redis relay that never publishes still delivers events from other nodes"""
+        channels = {}
+
+        class PubSub:
+            def __init__(self, ignore_subscribe_messages=True):
+                self.inbox = queue.Queue()
+
+            def subscribe(self, channel):
+                channels.setdefault(channel, []).append(self.inbox)
+
+            def listen(self):
+                while True:
+                    yield self.inbox.get()
+
+        class Redis:
+            @classmethod
+            def from_url(cls, url):
+                return cls()
+
+            def pubsub(self, **kwargs):
+                return PubSub(**kwargs)
+
+            def publish(self, channel, data):
+                for inbox in channels.get(channel, []):
+                    inbox.put({'type': 'message', 'data': data})
+
+        with mock.patch.dict(sys.modules, {'redis': mock.Mock(Redis=Redis)}), \
+                mock.patch.object(broker, 'deliver') as deliver:
+            RedisRelay('redis://cache:6379/0', 'events')
+            deadline = time_module.monotonic() + 5
+            while not channels.get('events') and time_module.monotonic() < deadline:
+                time_module.sleep(0.01)
+            Redis().publish('events', json.dumps({'node': 'other', 'user_id': self.user.pk, 'message': 'hello'}))
+            while not deliver.called and time_module.monotonic() < deadline:
+                time_module.sleep(0.01)
+        deliver.assert_called_once_with(self.user.pk, 'hello')
+
+    def test_signals_publish_after_commit(self):
+        """Test that new notifications and leave decisions are pushed once committed"""
+        with mock.patch('api.signals.publish') as published:
+            with self.captureOnCommitCallbacks(execute=True):
+                Notification.objects.create(user=self.user, title='Hi', message='Welcome')
+                leave = LeaveRequest.objects.create(
+                    user=self.user, start_date=date(2024, 1, 1), end_date=date(2024, 1, 2), reason='Trip'
+                )
+            self.assertEqual([c.args[:2] for c in published.call_args_list], [
+                (self.user.pk, 'notification'), (self.principal.pk, 'leave_request'),
+            ])
+
+            published.reset_mock()
+            with self.captureOnCommitCallbacks(execute=True):
+                leave.status = LeaveRequest.Status.APPROVED
+                leave.save()
+            self.assertIn((self.user.pk, 'leave_status'), [c.args[:2] for c in published.call_args_list])
+
+
+class NotificationInboxTestCase(APITestCase):
+    """Test the inbox endpoints and the cached unread counter"""
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='teacher', password='testpass123', role='teacher')
+        self.notifications = [
+            Notification.objects.create(user=self.user, title=f'Note {i}', message='Body') for i in range(5)
+        ]
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {RefreshToken.for_user(self.user).access_token}')
+
+    def counter(self):
+        self.user.refresh_from_db()
+        return self.user.unread_notifications
+
+    def test_counter_tracks_writes(self):
+        """Test that inserts, reads and deletes keep the counter in step"""
+        self.assertEqual(self.counter(), 5)
+        first = self.notifications[0]
+        first.is_read = True
+        first.save()
+        self.assertEqual(self.counter(), 4)
+        self.notifications[1].delete()
+        self.assertEqual(self.counter(), 3)
+        User.objects.filter(pk=self.user.pk).update(unread_notifications=0)
+        rebuild_unread_counts()
+        self.assertEqual(self.counter(), 3)
+
+    def test_user_saves_keep_counter(self):
+        """Test that saving a user loaded before new notifications keeps the counter"""
+        stale = User.objects.get(pk=self.user.pk)
+        Notification.objects.create(user=self.user, title='Late', message='Body')
+        stale.first_name = 'Renamed'
+        stale.set_password('newpass12345')
+        stale.save()
+        self.assertEqual(self.counter(), 6)
+        self.assertEqual(self.user.first_name, 'Renamed')
+        self.assertTrue(self.user.check_password('newpass12345'))
+
+    def test_inbox_pagination_and_mark_read(self):
+        """Test cursor pages and bulk mark-read by ids and by timestamp"""
+        url = reverse('notification-list')
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([n['title'] for n in response.data['results']], [f'Note {i}' for i in reversed(range(5))])
+
+        response = self.client.post(reverse('notification-mark-read'), {'ids': [self.notifications[0].pk]}, format='json')
+        self.assertEqual(response.data, {'updated': 1, 'unread_count': 4})
+        response = self.client.post(
+            reverse('notification-mark-read'), {'before': self.notifications[2].created_at.isoformat()}, format='json'
+        )
+        self.assertEqual(response.data, {'updated': 2, 'unread_count': 2})
+        response = self.client.get(reverse('notification-unread-count'))
+        self.assertEqual(response.data['unread_count'], 2)
+        response = self.client.get(url, {'unread': 'true'})
+        self.assertEqual(len(response.data['results']), 2)
+
+    def test_retention_archives_read_rows(self):
+        """Test that only old read notifications are moved to the archive"""
+        Notification.objects.filter(pk__in=[n.pk for n in self.notifications[:3]]).update(is_read=True)
+        rebuild_unread_counts()
+        moved = archive_read_before(timezone.now() + timedelta(seconds=1), batch_size=2)
+        self.assertEqual(moved, 3)
+        self.assertEqual(NotificationArchive.objects.count(), 3)
+        self.assertEqual(Notification.objects.count(), 2)
+        self.assertEqual(self.counter(), 2)
+
+
+class TimetableConflictTestCase(APITestCase):
+    """Test the interval indexes behind timetable validation"""
+
+    def setUp(self):
+        self.class_a = SchoolClass.objects.create(name='A')
+        self.class_b = SchoolClass.objects.create(name='B')
+        user = User.objects.create_user(username='teacher', password='testpass123', role='teacher')
+        self.teacher = Teacher.objects.create(user=user)
+        self.slot = Timetable.objects.create(
+            school_class=self.class_a, teacher=self.teacher, day_of_week='MON',
+            start_time=time(9), end_time=time(10), subject='Maths',
+        )
+        admin = User.objects.create_user(username='admin', password='testpass123', role='principal', is_staff=True)
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {RefreshToken.for_user(admin).access_token}')
+
+    def test_interval_index(self):
+        """Test overlap queries, touching intervals and incremental edits"""
+        index = IntervalIndex([(60, 120, 'a'), (0, 200, 'long'), (300, 360, 'b')])
+        self.assertEqual(index.overlapping(150, 250), 'long')
+        self.assertIsNone(index.overlapping(200, 300))
+        index.remove('long')
+        self.assertIsNone(index.overlapping(150, 250))
+        index.add(240, 310, 'c')
+        self.assertEqual(index.overlapping(150, 250), 'c')
+
+    def test_find_conflicts(self):
+        """Test that the sweep reports class and teacher overlaps"""
+        entries = [
+            {'ref': 0, 'school_class': 1, 'teacher': 7, 'day_of_week': 'MON', 'start_time': time(9), 'end_time': time(10)},
+            {'ref': 1, 'school_class': 2, 'teacher': 7, 'day_of_week': 'MON', 'start_time': time(9, 30), 'end_time': time(10, 30)},
+            {'ref': 2, 'school_class': 1, 'teacher': 8, 'day_of_week': 'MON', 'start_time': time(10), 'end_time': time(11)},
+            {'ref': 3, 'school_class': 1, 'teacher': 8, 'day_of_week': 'TUE', 'start_time': time(9), 'end_time': time(10)},
+        ]
+        self.assertEqual(find_conflicts(entries), [
+            {'type': 'teacher', 'day_of_week': 'MON', 'entry': 1, 'conflicts_with': 0},
+        ])
+
+    def test_write_path_rejects_double_booking(self):
+        """Test that the viewset refuses a teacher booked in two classes at once"""
+        payload = {
+            'school_class': self.class_b.pk, 'teacher_id': self.teacher.pk, 'day_of_week': 'MON',
+            'start_time': '09:30', 'end_time': '10:30', 'subject': 'Maths',
+        }
+        response = self.client.post(reverse('timetable-list'), payload)
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(response.data['conflicts'], [
+            f'The teacher already has timetable entry {self.slot.pk} at this time on MON.'
+        ])
+
+        payload['start_time'], payload['end_time'] = '10:00', '11:00'
+        response = self.client.post(reverse('timetable-list'), payload)
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        response = self.client.patch(reverse('timetable-detail', args=[self.slot.pk]), {'end_time': '09:45'})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_bulk_validate_endpoint(self):
+        """Test validating a batch against itself and the stored slots"""
+        entries = [
+            {'school_class': self.class_b.pk, 'teacher': self.teacher.pk, 'day_of_week': 'MON',
+             'start_time': '09:15', 'end_time': '09:45'},
+            {'school_class': self.class_b.pk, 'day_of_week': 'MON', 'start_time': '09:40', 'end_time': '10:20'},
+        ]
+        response = self.client.post(reverse('timetable-validate'), {'entries': entries}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertFalse(response.data['valid'])
+        self.assertEqual(
+            sorted((c['type'], c['entry'], c['conflicts_with']) for c in response.data['conflicts']),
+            [('class', 1, 0), ('teacher', 0, f'id:{self.slot.pk}')],
+        )
+
+
+class TimetableGeneratorTestCase(APITestCase):
+    """Test timetable generation from subject requirements"""
+
+    def setUp(self):
+        self.periods = [
+            Period.objects.create(period_number=n + 1, start_time=time(9 + n), end_time=time(10 + n)) for n in range(4)
+        ]
+        self.classes = [SchoolClass.objects.create(name=name) for name in ('A', 'B', 'C')]
+        self.teachers = []
+        for subject in ('Maths', 'Science'):
+            user = User.objects.create_user(username=subject.lower(), password='testpass123', role='teacher')
+            self.teachers.append(Teacher.objects.create(user=user, specialization=subject))
+        # Each teacher covers three classes x 6 lessons = 18 of 20 weekly slots
+        for school_class in self.classes:
+            SubjectRequirement.objects.create(school_class=school_class, subject='Maths', periods_per_week=6)
+            SubjectRequirement.objects.create(school_class=school_class, subject='Science', periods_per_week=6)
+
+    def stored_entries(self):
+        return [
+            {'ref': row.pk, 'school_class': row.school_class_id, 'teacher': row.teacher_id,
+             'day_of_week': row.day_of_week, 'start_time': row.start_time, 'end_time': row.end_time}
+            for row in Timetable.objects.all()
+        ]
+
+    def test_generates_conflict_free_timetable(self):
+        """Test that every required lesson is saved without overlaps"""
+        summary = generate_timetable(time_budget=5, workers=1)
+        self.assertEqual(summary['hard_violations'], 0)
+        self.assertEqual(summary['saved'], 36)
+        self.assertEqual(find_conflicts(self.stored_entries()), [])
+        maths = Timetable.objects.filter(subject='Maths').values_list('teacher_id', flat=True).distinct()
+        self.assertEqual(list(maths), [self.teachers[0].pk])
+
+    def test_incremental_resolve_moves_only_that_teacher(self):
+        """Test that new unavailability re-schedules the teacher and keeps everyone else fixed"""
+        generate_timetable(time_budget=5, workers=1)
+        maths, science = self.teachers
+        before = set(Timetable.objects.filter(teacher=science).values_list('school_class_id', 'day_of_week', 'start_time'))
+        busy = Timetable.objects.filter(teacher=maths).first()
+        period = Period.objects.get(start_time=busy.start_time)
+        TeacherUnavailability.objects.create(teacher=maths, day_of_week=busy.day_of_week, period=period)
+
+        summary = generate_timetable(time_budget=5, workers=1, teacher_id=maths.pk)
+        self.assertEqual(summary['hard_violations'], 0)
+        self.assertFalse(Timetable.objects.filter(
+            teacher=maths, day_of_week=busy.day_of_week, start_time=busy.start_time
+        ).exists())
+        after = set(Timetable.objects.filter(teacher=science).values_list('school_class_id', 'day_of_week', 'start_time'))
+        self.assertEqual(before, after)
+        self.assertEqual(find_conflicts(self.stored_entries()), [])
+
+    def test_rows_without_requirement_are_kept(self):
+        """Test that full and incremental runs keep hand-entered rows and schedule around them"""
+        maths, science = self.teachers
+        assembly = Timetable.objects.create(
+            school_class=self.classes[0], teacher=science, day_of_week='MON',
+            start_time=time(9), end_time=time(10), subject='Assembly',
+        )
+        generate_timetable(time_budget=5, workers=1)
+        generate_timetable(time_budget=5, workers=1, teacher_id=maths.pk)
+        self.assertTrue(Timetable.objects.filter(pk=assembly.pk).exists())
+        self.assertEqual(Timetable.objects.exclude(pk=assembly.pk).count(), 36)
+        self.assertEqual(find_conflicts(self.stored_entries()), [])
+
+    def test_endpoint_searches_in_one_process(self):
+        """Test that the API never forks a solver pool"""
+        admin = User.objects.create_user(username='admin', password='testpass123', role='principal', is_staff=True)
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {RefreshToken.for_user(admin).access_token}')
+        with mock.patch('api.timetable.solve', wraps=solve) as solver:
+            response = self.client.post(reverse('timetable-generate'), {'time_budget': 5}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(solver.call_args.kwargs['workers'], 1)
+
+    def test_capacity_error(self):
+        """Test that an impossible requirement is rejected before searching"""
+        SubjectRequirement.objects.filter(subject='Maths').update(periods_per_week=16)
+        with self.assertRaises(SolverError):
+            generate_timetable(time_budget=1, workers=1)
+        self.assertFalse(Timetable.objects.exists())
+
+
+class MyDayTestCase(APITestCase):
+    """Test the cached schedule index and the /me/today endpoint"""
+
+    def setUp(self):
+        self.school_class = SchoolClass.objects.create(name='A')
+        user = User.objects.create_user(username='teacher', password='testpass123', role='teacher', first_name='Ann')
+        self.teacher = Teacher.objects.create(user=user)
+        Period.objects.create(period_number=1, start_time=time(9), end_time=time(10))
+        for day, hour, subject in (('MON', 11, 'Science'), ('MON', 9, 'Maths'), ('WED', 9, 'Maths')):
+            Timetable.objects.create(
+                school_class=self.school_class, teacher=self.teacher, day_of_week=day,
+                start_time=time(hour), end_time=time(hour + 1), subject=subject,
+            )
+        self.monday = timezone.make_aware(datetime(2026, 10, 19, 10, 30))
+        Task.objects.create(teacher=self.teacher, title='Mark tests', due_date=self.monday.date())
+        LeaveRequest.objects.create(user=user, start_date=date(2026, 11, 2), end_date=date(2026, 11, 3), reason='Trip')
+
+    def test_my_day(self):
+        """Test slots, tasks, leaves and the next class for a teacher"""
+        day = my_day(self.teacher.user, self.monday)
+        self.assertEqual([slot['subject'] for slot in day['slots']], ['Maths', 'Science'])
+        self.assertEqual(day['slots'][0]['period'], 1)
+        self.assertEqual(len(day['tasks']), 1)
+        self.assertEqual(len(day['pending_leaves']), 1)
+        self.assertEqual(day['next_class']['subject'], 'Science')
+        self.assertEqual(day['next_class']['label'], 'Today 11:00 AM')
+
+        evening = my_day(self.teacher.user, self.monday.replace(hour=18))
+        self.assertEqual(evening['next_class']['label'], 'Wednesday 9:00 AM')
+
+    def test_index_is_cached_until_the_timetable_changes(self):
+        """Test that a timetable write invalidates the cached index"""
+        schedule_index(teacher_id=self.teacher.pk)
+        with self.assertNumQueries(2):  # version and index from the database cache
+            schedule_index(teacher_id=self.teacher.pk)
+        with self.captureOnCommitCallbacks(execute=True):
+            Timetable.objects.create(
+                school_class=self.school_class, teacher=self.teacher, day_of_week='FRI',
+                start_time=time(9), end_time=time(10), subject='Art',
+            )
+        self.assertEqual([slot['subject'] for slot in schedule_index(teacher_id=self.teacher.pk)['FRI']], ['Art'])
+
+    def test_endpoint_and_student_dashboard(self):
+        """Test /me/today for a teacher and real next-class values on the student dashboard"""
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {RefreshToken.for_user(self.teacher.user).access_token}')
+        response = self.client.get('/api/me/today/', {'date': '2026-10-21'})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['day_of_week'], 'WED')
+        self.assertEqual(response.data['next_class']['label'], 'Today 9:00 AM')
+        self.assertEqual(response.data['tasks'], [])
+
+        student_user = User.objects.create_user(username='student', password='testpass123', role='student')
+        Student.objects.create(user=student_user, school_class=self.school_class)
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {RefreshToken.for_user(student_user).access_token}')
+        response = self.client.get('/api/student/dashboard/')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        for subject in response.data['subjects']:
+            self.assertRegex(subject['nextClass'], r'^(Today|Tomorrow|Monday|Tuesday|Wednesday|Thursday|Friday|Saturday|Sunday) ')
+
+
+class TimetableImportExportTestCase(APITestCase):
+    """Test CSV import/export and the cached iCalendar feeds"""
+
+    def setUp(self):
+        self.class_a = SchoolClass.objects.create(name='A')
+        self.class_b = SchoolClass.objects.create(name='B')
+        user = User.objects.create_user(username='ann', password='testpass123', role='teacher')
+        self.teacher = Teacher.objects.create(user=user)
+        Period.objects.create(period_number=1, start_time=time(9), end_time=time(10))
+        admin = User.objects.create_user(username='admin', password='testpass123', role='principal', is_staff=True)
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {RefreshToken.for_user(admin).access_token}')
+
+    def test_import_validates_whole_file(self):
+        """Test that a bad row or an overlap rejects the whole file"""
+        header = 'class,day_of_week,period,start_time,end_time,subject,teacher\n'
+        result = import_timetable_csv(io.StringIO(header + 'A,MON,1,,,Maths,ann\nC,Funday,,,,Art,\n'))
+        self.assertEqual([error['line'] for error in result['errors']], [3, 3, 3])
+        result = import_timetable_csv(io.StringIO(header + 'A,MON,1,,,Maths,ann\nB,Monday,,09:30,10:30,Art,ann\n'))
+        self.assertEqual(result['conflicts'], [{'type': 'teacher', 'day_of_week': 'MON', 'entry': 3, 'conflicts_with': 2}])
+        self.assertFalse(Timetable.objects.exists())
+
+        result = import_timetable_csv(io.StringIO(header + 'A,MON,1,,,Maths,ann\nB,Tuesday,,10:00,11:00,Art,\n'))
+        self.assertEqual(result['created'], 2)
+        self.assertEqual(Timetable.objects.get(school_class=self.class_a).end_time, time(10))
+
+    def test_export_round_trips_with_replace(self):
+        """Test that an exported CSV imports back over the same classes"""
+        Timetable.objects.create(school_class=self.class_a, teacher=self.teacher, day_of_week='WED',
+                                 start_time=time(9), end_time=time(10), subject='Maths')
+        Timetable.objects.create(school_class=self.class_a, day_of_week='MON',
+                                 start_time=time(11), end_time=time(12), subject='Art')
+        exported = export_timetable_csv(io.StringIO()).getvalue()
+        self.assertEqual(exported.splitlines()[1:], ['A,MON,,11:00,12:00,Art,', 'A,WED,1,09:00,10:00,Maths,ann'])
+
+        response = self.client.post('/api/timetable/import/', {
+            'file': io.BytesIO(exported.encode()), 'replace': 'true',
+        }, format='multipart')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED, response.data)
+        self.assertEqual(Timetable.objects.count(), 2)
+
+    def test_ical_feed_follows_timetable_version(self):
+        """Test the iCal feed, its ETag and regeneration after a change"""
+        with self.captureOnCommitCallbacks(execute=True):
+            Timetable.objects.create(school_class=self.class_a, teacher=self.teacher, day_of_week='MON',
+                                     start_time=time(9), end_time=time(10), subject='Maths, Advanced')
+        url = f'/api/timetable/ical/teacher/{self.teacher.pk}/'
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        body = response.content.decode()
+        self.assertIn('SUMMARY:Maths\\, Advanced (Period 1)', body)
+        self.assertIn('RRULE:FREQ=WEEKLY;BYDAY=MO', body)
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=response['ETag']).status_code, 304)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Timetable.objects.create(school_class=self.class_b, teacher=self.teacher, day_of_week='TUE',
+                                     start_time=time(9), end_time=time(10), subject='Art')
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertIn('BYDAY=TU', response.content.decode())
+
+
+class ClaimsAuthenticationTestCase(APITestCase):
+    """Test authentication from signed token claims and their revocation"""
+
+    def setUp(self):
+        caches['locmem'].clear()
+        revocations.clear()
+        self.user = User.objects.create_user(
+            username='teacher', password='testpass123', role='teacher', first_name='Ann', email='ann@example.com',
+        )
+        Teacher.objects.create(user=self.user)
+        response = self.client.post('/api/auth/login/', {'username': 'teacher', 'password': 'testpass123'})
+        self.access = response.data['access']
+
+    def authenticate(self):
+        from rest_framework.test import APIRequestFactory
+        request = APIRequestFactory().get('/', HTTP_AUTHORIZATION=f'Bearer {self.access}')
+        return ClaimsJWTAuthentication().authenticate(request)[0]
+
+    def test_zero_queries_and_lazy_fields(self):
+        """Test that claims build the user without queries and other fields load together"""
+        self.authenticate()  # first call loads the revocation map
+        with self.assertNumQueries(0):
+            user = self.authenticate()
+            self.assertEqual((user.pk, user.role, user.claims['teacher_id']), (self.user.pk, 'teacher', self.user.pk))
+        with self.assertNumQueries(1):
+            self.assertEqual((user.first_name, user.email), ('Ann', 'ann@example.com'))
+
+    def test_claim_change_revokes_tokens(self):
+        """Test that a role change rejects tokens carrying the old role"""
+        from rest_framework_simplejwt.exceptions import AuthenticationFailed
+        self.authenticate()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user.role = User.Role.PRINCIPAL
+            self.user.save()
+        with self.assertRaises(AuthenticationFailed):
+            self.authenticate()
+
+    def test_revocations_survive_cache_loss(self):
+        """Test that revocations are stored per user and outlive the cache and the process copy"""
+        from rest_framework_simplejwt.exceptions import AuthenticationFailed
+        other = User.objects.create_user(username='other', password='testpass123')
+        revoke_user_tokens(self.user.pk)
+        revoke_user_tokens(other.pk)
+        caches['default'].clear()
+        revocations.clear()
+        self.assertEqual(TokenRevocation.objects.count(), 2)
+        with self.assertRaises(AuthenticationFailed):
+            self.authenticate()
+
+    def test_tasks_use_teacher_claim(self):
+        """Test that a teacher's task list needs no profile lookup"""
+        Task.objects.create(teacher_id=self.user.pk, title='Plan', due_date=date.today())
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {self.access}')
+        response = self.client.post('/api/tasks/', {'title': 'Mark', 'due_date': date.today().isoformat()})
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED, response.data)
+        response = self.client.get('/api/tasks/')
+        self.assertEqual(len(response.data), 2)
+
+
+class TokenBlacklistTestCase(APITestCase):
+    """Test refresh rotation, logout and the in-process blacklist"""
+
+    def setUp(self):
+        caches['locmem'].clear()
+        revocations.clear()
+        jti_blacklist.clear()
+        self.user = User.objects.create_user(username='student', password='testpass123', role='student')
+        response = self.client.post('/api/auth/login/', {'username': 'student', 'password': 'testpass123'})
+        self.access, self.refresh = response.data['access'], response.data['refresh']
+
+    def test_rotation_blacklists_old_refresh_token(self):
+        """Test that a used refresh token cannot be replayed"""
+        response = self.client.post('/api/auth/token/refresh/', {'refresh': self.refresh})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertNotEqual(response.data['refresh'], self.refresh)
+        self.assertEqual(self.client.post('/api/auth/token/refresh/', {'refresh': self.refresh}).status_code, 401)
+        self.assertEqual(
+            self.client.post('/api/auth/token/refresh/', {'refresh': response.data['refresh']}).status_code, 200
+        )
+
+    def test_logout_revokes_both_tokens(self):
+        """Test that logout blacklists the refresh token and the access token in use"""
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {self.access}')
+        response = self.client.post('/api/auth/logout/', {'refresh': self.refresh})
+        self.assertEqual(response.status_code, status.HTTP_205_RESET_CONTENT)
+        self.assertEqual(self.client.get('/api/auth/user/').status_code, status.HTTP_401_UNAUTHORIZED)
+        self.client.credentials()
+        self.assertEqual(self.client.post('/api/auth/token/refresh/', {'refresh': self.refresh}).status_code, 401)
+
+    def test_password_change_ends_sessions(self):
+        """Test that refresh tokens issued before a password change are rejected, unlike after a role change"""
+        refresh = '/api/auth/token/refresh/'
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user.role = User.Role.TEACHER
+            self.user.save()
+        response = self.client.post(refresh, {'refresh': self.refresh})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        rotated = response.data['refresh']
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user.set_password('newpass123')
+            self.user.save()
+        self.assertEqual(self.client.post(refresh, {'refresh': rotated}).status_code, status.HTTP_401_UNAUTHORIZED)
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {response.data['access']}")
+        self.assertEqual(self.client.get('/api/auth/user/').status_code, status.HTTP_401_UNAUTHORIZED)
+        self.client.credentials()
+        response = self.client.post('/api/auth/login/', {'username': 'student', 'password': 'newpass123'})
+        self.assertEqual(self.client.post(refresh, {'refresh': response.data['refresh']}).status_code, 200)
+
+    def test_blacklist_syncs_from_database(self):
+        """Test that other processes' blacklist entries arrive on the next sync, then cost no queries"""
+        from rest_framework_simplejwt.token_blacklist.models import BlacklistedToken, OutstandingToken
+        from .authentication import SchoolRefreshToken
+        token = SchoolRefreshToken(self.refresh)
+        jti = token['jti']
+        self.assertNotIn(jti, jti_blacklist)
+        BlacklistedToken.objects.create(token=OutstandingToken.objects.get(jti=jti))
+        jti_blacklist.sync()
+        with self.assertNumQueries(0):
+            self.assertIn(jti, jti_blacklist)
+
+
+class LoginThroughputTestCase(APITestCase):
+    """Test the lean login payload, hasher upgrades on login and the login throttle"""
+
+    def setUp(self):
+        caches['locmem'].clear()
+        self.user = User.objects.create_user(username='student', password='testpass123', role='student')
+
+    def test_login_returns_lean_user(self):
+        """Test that login returns identity fields only"""
+        response = self.client.post('/api/auth/login/', {'username': 'student', 'password': 'testpass123'})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['user']['role'], 'student')
+        self.assertNotIn('profile', response.data['user'])
+
+    def test_login_rehashes_with_current_cost(self):
+        """Test that a hash made with an older cost is upgraded on the next login without revoking tokens"""
+        hashers = ['api.hashers.ProfilePBKDF2PasswordHasher']
+        with self.settings(PASSWORD_HASHERS=hashers, PASSWORD_PBKDF2_ITERATIONS=1000):
+            self.user.set_password('testpass123')
+            self.user.save()
+        with self.settings(PASSWORD_HASHERS=hashers, PASSWORD_PBKDF2_ITERATIONS=2000), \
+                self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post('/api/auth/login/', {'username': 'student', 'password': 'testpass123'})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.user.refresh_from_db()
+        self.assertTrue(self.user.password.startswith('pbkdf2_sha256$2000$'))
+        self.assertFalse(TokenRevocation.objects.filter(user_id=self.user.pk).exists())
+        # An explicit password change still does
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user.set_password('newpass123')
+            self.user.save()
+        self.assertTrue(TokenRevocation.objects.filter(user_id=self.user.pk).exists())
+
+    @override_settings(LOGIN_THROTTLE_USER_BURST=2, LOGIN_THROTTLE_USER_PER_MINUTE=1)
+    def test_login_throttled_per_username(self):
+        """Test that repeated attempts on one account are throttled with Retry-After"""
+        for _ in range(2):
+            response = self.client.post('/api/auth/login/', {'username': 'Student', 'password': 'wrong'})
+            self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+        response = self.client.post('/api/auth/login/', {'username': 'student', 'password': 'testpass123'})
+        self.assertEqual(response.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+        self.assertIn('Retry-After', response)
+
+
+class SeedDataTestCase(TestCase):
+    """Test the bulk seeding command and the derived tables it rebuilds"""
+
+    def test_seed_data_builds_consistent_dataset(self):
+        """Test that a seeded dataset has the requested scale and rebuilt counters"""
+        User.objects.create_superuser(username='admin', password='adminpass', role='principal')
+        version = timetable_version()
+        for _ in range(2):  # idempotent: the second run replaces the first
+            with self.captureOnCommitCallbacks(execute=True):
+                call_command('seed_data', students=45, days=14, seed=3, batch_size=100, stdout=io.StringIO())
+
+        self.assertEqual(Student.objects.count(), 45)
+        self.assertEqual(SchoolClass.objects.count(), 2)
+        self.assertEqual(Teacher.objects.count(), 12)
+        self.assertTrue(User.objects.filter(username='admin').exists())
+        self.assertEqual(Attendance.objects.filter(student=Student.objects.first()).count(), 10)
+        self.assertGreater(timetable_version(), version)
+
+        student = User.objects.get(username='student7')
+        self.assertTrue(student.check_password('demo'))
+        self.assertEqual(Student.objects.get(pk=student.pk).school_class.name, 'Grade 1')
+        rollups = AttendanceMonthlyRollup.objects.aggregate(
+            total=Sum(F('present_count') + F('absent_count') + F('late_count'))
+        )
+        self.assertEqual(rollups['total'], Attendance.objects.count())
+        self.assertEqual(
+            sum(User.objects.values_list('unread_notifications', flat=True)),
+            Notification.objects.filter(is_read=False).count(),
+        )
+        stored = FeeSummary.objects.get(key=FeeSummary.OVERALL)
+        rebuild_fee_summary()
+        self.assertEqual(FeeSummary.objects.get(key=FeeSummary.OVERALL).unpaid_total, stored.unpaid_total)
+
+
+class WorkloadReplayTestCase(TestCase):
+    """Test workload synthesis, recording and replay"""
+
+    def setUp(self):
+        self.teacher = User.objects.create_user(username='teacher', password='testpass123', role='teacher')
+        Teacher.objects.create(user=self.teacher)
+        self.school_class = SchoolClass.objects.create(name='Class 5A', teacher=self.teacher)
+        self.students = []
+        for n in range(3):
+            user = User.objects.create_user(username=f'student{n}', password='testpass123', role='student')
+            self.students.append(Student.objects.create(user=user, school_class=self.school_class))
+
+    def test_synthesis_is_deterministic(self):
+        """Test that the same seed and data give the same profile"""
+        first = synthesize('morning-attendance', duration=60, seed=7, day=date(2024, 9, 2))
+        self.assertEqual(first, synthesize('morning-attendance', duration=60, seed=7, day=date(2024, 9, 2)))
+        self.assertNotEqual(first['events'], synthesize('morning-attendance', duration=60, seed=8)['events'])
+        marks = [event for event in first['events'] if event['name'] == 'POST /api/attendance/']
+        self.assertEqual(sorted(event['body']['student'] for event in marks), [s.pk for s in self.students])
+        self.assertTrue(all(event['user'] == 'teacher' for event in marks))
+        self.assertEqual([event['at'] for event in first['events']], sorted(event['at'] for event in first['events']))
+
+    def test_replay_reports_per_endpoint(self):
+        """Test that replaying sends authenticated requests and summarizes them per endpoint"""
+        profile = synthesize('morning-attendance', duration=1, think_time=0, seed=1, day=date(2024, 9, 2))
+        results, wall = replay(profile, ClientTransport(), concurrency=1, speed=0)
+        report = summarize(results, wall)
+
+        self.assertEqual(Attendance.objects.filter(date=date(2024, 9, 2)).count(), 3)
+        marks = report['endpoints']['POST /api/attendance/']
+        self.assertEqual((marks['requests'], marks['client_errors'], marks['errors']), (3, 0, 0))
+        self.assertEqual(report['endpoints']['GET /api/me/today/']['requests'], 4)
+        self.assertEqual(report['total']['requests'], len(profile['events']))
+        self.assertLessEqual(report['total']['p50_ms'], report['total']['p99_ms'])
+
+    def test_repeatable_benchmark_runs(self):
+        """Test that benchmarks replay reads only and clear cached pages but no other cache keys"""
+        profile = synthesize('morning-attendance', duration=1, think_time=0, seed=1, day=date(2024, 9, 2))
+        reads = read_only(profile)
+        self.assertEqual({event['method'] for event in reads['events']}, {'GET'})
+        self.assertEqual(len(reads['events']), len(profile['events']) - 3)
+
+        cache = caches[settings.CACHE_MIDDLEWARE_ALIAS]
+        cache.set('views.decorators.cache.cache_page.school_api.GET.abc', 'page')
+        cache.set('timetable:version', 7)
+        self.assertTrue(clear_page_cache())
+        self.assertIsNone(cache.get('views.decorators.cache.cache_page.school_api.GET.abc'))
+        self.assertEqual(cache.get('timetable:version'), 7)
+
+    def test_recorded_log_becomes_profile(self):
+        """Test that recorded requests are replayable with ids folded into endpoint names"""
+        log = [
+            '{"ts": 100.5, "user": "student0", "name": "GET /api/student/{id}/details/", "method": "GET", '
+            '"path": "/api/student/4/details/", "body": null, "status": 200, "ms": 3.1}',
+            '{"ts": 100.0, "user": "teacher", "name": "POST /api/attendance/", "method": "POST", '
+            '"path": "/api/attendance/", "body": {"student": 4}, "status": 201, "ms": 9.0}',
+        ]
+        profile = profile_from_log(log)
+        self.assertEqual([event['at'] for event in profile['events']], [0.0, 0.5])
+        self.assertEqual(profile['events'][0]['body'], {'student': 4})
+        self.assertEqual(profile['users'], 2)
+
+    def test_recorder_redacts_secrets(self):
+        """Test that recorded requests keep their bodies but never passwords or tokens"""
+        from django.http import HttpResponse
+        body = {'username': 'new', 'password': 'hunter22', 'profile': {'phone': '1'},
+                'requests': [{'path': '/users/', 'body': {'new_password': 'hunter22'}}]}
+        with tempfile.TemporaryDirectory() as directory:
+            log_file = Path(directory) / 'workload.jsonl'
+            with self.settings(WORKLOAD_RECORD_FILE=str(log_file)):
+                middleware = WorkloadRecorderMiddleware(lambda request: HttpResponse(status=201))
+                middleware(RequestFactory().post('/api/users/?token=abc&page=2', body, content_type='application/json'))
+                middleware(RequestFactory().post('/api/auth/login/', body, content_type='application/json'))
+            lines = log_file.read_text().splitlines()
+        self.assertEqual(len(lines), 1)
+        self.assertNotIn('hunter22', lines[0])
+        record = json.loads(lines[0])
+        self.assertEqual((record['status'], record['body']['username']), (201, 'new'))
+        self.assertEqual(record['body']['password'], '[redacted]')
+        self.assertEqual(record['body']['requests'][0]['body']['new_password'], '[redacted]')
+        self.assertEqual(record['path'], '/api/users/?token=%5Bredacted%5D&page=2')
+        self.assertEqual(profile_from_log(lines)['events'][0]['body']['profile'], {'phone': '1'})
+
+
+class ResetSchoolDataTestCase(APITestCase):
+    """Test the fast delete-everything reset"""
+
+    def test_reset_keeps_superusers_only(self):
+        """Test that school data is emptied and its sequences restart while superusers and revocations survive"""
+        admin = User.objects.create_superuser(username='admin', password='adminpass', role='principal')
+        UserProfile.objects.create(user=admin, phone='123')
+        teacher = User.objects.create_user(username='teacher', password='testpass123', role='teacher')
+        Teacher.objects.create(user=teacher)
+        school_class = SchoolClass.objects.create(name='Class 5A', teacher=teacher)
+        student = Student.objects.create(
+            user=User.objects.create_user(username='student', password='testpass123', role='student'),
+            school_class=school_class,
+        )
+        Attendance.objects.create(student=student, date=date(2024, 9, 2), status='present')
+        Fee.objects.create(student=student, amount=Decimal('100'), due_date=date(2024, 9, 30))
+        access = self.client.post('/api/auth/login/', {'username': 'teacher', 'password': 'testpass123'}).data['access']
+        revoke_user_tokens(admin.pk)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            reset_school_data()
+
+        self.assertEqual(list(User.objects.values_list('username', flat=True)), ['admin'])
+        self.assertTrue(UserProfile.objects.filter(user=admin).exists())
+        for model in (Student, Teacher, SchoolClass, Attendance, AttendanceMonthlyRollup, Fee, FeeSummary):
+            self.assertFalse(model.objects.exists(), model.__name__)
+        self.assertEqual(SchoolClass.objects.create(name='Class 1A').pk, 1)
+        # Deleted users' tokens are revoked and their ids not reused; earlier revocations stay
+        self.assertEqual(
+            set(TokenRevocation.objects.values_list('user_id', flat=True)), {admin.pk, teacher.pk, student.pk}
+        )
+        self.assertGreater(User.objects.create_user(username='new', password='testpass123').pk, student.pk)
+        response = self.client.get('/api/me/today/', HTTP_AUTHORIZATION=f'Bearer {access}')
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_flush_order_puts_children_first(self):
+        """Test that referencing tables are emptied before the tables they reference"""
+        order = flush_order([SchoolClass, Student, Attendance, Fee, Payment])
+        self.assertLess(order.index(Payment), order.index(Fee))
+        self.assertLess(order.index(Fee), order.index(Student))
+        self.assertLess(order.index(Attendance), order.index(Student))
+        self.assertLess(order.index(Student), order.index(SchoolClass))
+
+
+class RequestProfilingTestCase(APITestCase):
+    """Test the opt-in profiling middleware"""
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.addCleanup(self.directory.cleanup)
+        self.user = User.objects.create_user(username='student', password='testpass123', role='student')
+        self.client.force_authenticate(self.user)
+
+    def test_fingerprints_group_repeated_statements(self):
+        """Test that statements differing only in parameters or IN-list length share a fingerprint"""
+        self.assertEqual(
+            fingerprint('SELECT * FROM t WHERE id IN (%s, %s)'), fingerprint('SELECT *  FROM t\nWHERE id IN (%s, %s, %s)')
+        )
+        profile = RequestProfile()
+        for _ in range(4):
+            profile(lambda *args: None, 'SELECT * FROM t WHERE id = %s', [1], False, {})
+        profile(lambda *args: None, 'SELECT 1', [], False, {})
+        self.assertEqual(profile.query_count, 5)
+        self.assertEqual(profile.duplicates(), [(4, 'SELECT * FROM t WHERE id = %s')])
+
+    def test_middleware_reports_and_logs_slow_requests(self):
+        """Test Server-Timing, the slow-request log and sampled cProfile dumps"""
+        log = Path(self.directory.name) / 'slow.log'
+        middleware = ['api.profiling.RequestProfilerMiddleware'] + [
+            name for name in settings.MIDDLEWARE if 'cache' not in name
+        ]
+        with self.settings(
+            MIDDLEWARE=middleware, PROFILING_SLOW_REQUEST_MS=0, PROFILING_SLOW_LOG=str(log),
+            PROFILING_CPROFILE_SAMPLE_RATE=1.0, PROFILING_CPROFILE_THRESHOLD_MS=0,
+            PROFILING_CPROFILE_DIR=self.directory.name,
+        ), mock.patch('api.profiling.slow_log', logging.getLogger('api.profiling.slow.test')):
+            response = self.client.get('/api/notifications/unread-count/')
+        test_log = logging.getLogger('api.profiling.slow.test')
+        for handler in list(test_log.handlers):
+            handler.close()
+            test_log.removeHandler(handler)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertRegex(response['Server-Timing'], r'db;dur=[\d.]+;desc="\d+ queries"')
+        entry = json.loads(log.read_text().splitlines()[-1])
+        self.assertEqual(entry['path'], '/api/notifications/unread-count/')
+        self.assertGreaterEqual(entry['queries'], 1)
+        self.assertTrue(entry['top_queries'][0]['sql'])
+        self.assertTrue(list(Path(self.directory.name).glob('*.prof')))
+
+
+@override_settings(
+    METRICS_TOKEN='secret',
+    MIDDLEWARE=['api.metrics.MetricsMiddleware'] + [name for name in settings.MIDDLEWARE if 'metrics' not in name],
+)
+class MetricsEndpointTestCase(APITestCase):
+    """Test the Prometheus /metrics endpoint"""
+
+    def setUp(self):
+        registry.clear()
+        caches['metrics'].clear()
+        self.user = User.objects.create_user(username='student', password='testpass123', role='student')
+        self.client.force_authenticate(self.user)
+
+    def scrape(self, **headers):
+        response = self.client.get('/metrics', HTTP_AUTHORIZATION='Bearer secret', **headers)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(response['Content-Type'].startswith('text/plain; version=0.0.4'))
+        return response.content.decode()
+
+    def test_requests_queries_and_caches_per_route(self):
+        """Test request counters and latency per route name, SQL per alias and cache lookups per alias"""
+        self.client.get('/api/notifications/unread-count/')
+        self.client.get('/api/health/')
+        text = self.scrape()
+        self.assertIn(
+            'school_http_requests_total{route="notification-unread-count",method="GET",status="200"} 1', text,
+        )
+        self.assertIn('school_http_request_duration_seconds_count{route="health_check",method="GET"} 1', text)
+        self.assertIn('school_http_request_duration_seconds_bucket{route="health_check",method="GET",le="+Inf"} 1', text)
+        self.assertRegex(text, r'school_db_queries_total\{alias="default"\} [1-9]')
+        self.assertRegex(text, r'school_cache_requests_total\{alias="default",result="(hit|miss)"\} [1-9]')
+        self.assertRegex(text, r'school_cache_hit_ratio\{alias="default"\} [\d.]+')
+        self.assertIn('school_metrics_processes 1', text)
+
+    def test_sums_processes_and_drops_stale_ones(self):
+        """Test that snapshots published by other workers are added, and stale workers are left out"""
+        observe_report('financial', 2.0)
+        labels = (('report_type', 'financial'), ('outcome', 'success'))
+        other = {'values': {}, 'histograms': {('school_report_generation_seconds', labels): [0] * 4 + [1] + [0] * 6 + [3.0]}}
+        cache = caches['metrics']
+        cache.set('metrics:proc:other:1', other)
+        cache.set('metrics:proc:gone:2', other)
+        cache.set(PROCESSES_KEY, {'metrics:proc:other:1': time_module.time(), 'metrics:proc:gone:2': 0})
+
+        text = self.scrape()
+        self.assertIn('school_report_generation_seconds_count{report_type="financial",outcome="success"} 2', text)
+        self.assertIn('school_report_generation_seconds_sum{report_type="financial",outcome="success"} 5.0', text)
+        self.assertIn('school_report_generation_seconds_bucket{report_type="financial",outcome="success",le="2.5"} 1', text)
+        self.assertIn('school_report_generation_seconds_bucket{report_type="financial",outcome="success",le="5"} 2', text)
+        self.assertIn('school_metrics_processes 2', text)
+        self.assertNotIn('metrics:proc:gone:2', cache.get(PROCESSES_KEY))
+
+    def test_token(self):
+        """Test that METRICS_TOKEN is required, and that without one only DEBUG serves metrics"""
+        self.assertEqual(self.client.get('/metrics').status_code, status.HTTP_403_FORBIDDEN)
+        self.assertEqual(
+            self.client.get('/metrics', HTTP_AUTHORIZATION='Bearer wrong').status_code, status.HTTP_403_FORBIDDEN
+        )
+        self.scrape()
+        with self.settings(METRICS_TOKEN=''):
+            self.assertEqual(self.client.get('/metrics').status_code, status.HTTP_403_FORBIDDEN)
+            with self.settings(DEBUG=True):
+                self.assertEqual(self.client.get('/metrics').status_code, status.HTTP_200_OK)
+
+    def test_snapshots_stay_out_of_the_page_cache(self):
+        """Test that worker snapshots are published to the metrics cache, not the default one"""
+        self.scrape()
+        self.assertIsNotNone(caches['metrics'].get(PROCESSES_KEY))
+        self.assertIsNone(caches['default'].get(PROCESSES_KEY))
+
+
+class HealthProbeTestCase(APITestCase):
+    """Test the liveness and readiness endpoints"""
+
+    def setUp(self):
+        health._last = None
+        self.addCleanup(setattr, health, '_last', None)
+
+    def test_liveness_touches_no_dependency(self):
+        """Test that liveness answers without running probes"""
+        with mock.patch.object(health, 'run_probes') as run_probes:
+            response = self.client.get('/api/health/live/')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        run_probes.assert_not_called()
+
+    def test_readiness_reports_probes_and_caches_results(self):
+        """Test that readiness runs every probe once per HEALTH_CACHE_SECONDS"""
+        checks = {name: {'status': 'ok', 'ms': 1.0} for name in health.PROBES}
+        with mock.patch.object(health, 'run_probes', return_value=checks) as run_probes:
+            first = self.client.get('/api/health/ready/')
+            second = self.client.get('/api/health/')
+        self.assertEqual(first.status_code, status.HTTP_200_OK)
+        self.assertEqual(first.data['status'], 'ok')
+        self.assertEqual(second.data['checks'], checks)
+        self.assertEqual(run_probes.call_count, 1)
+        self.assertIn('no-cache', first['Cache-Control'])
+
+    def test_failures_and_timeouts(self):
+        """Test 503 for a failing critical probe, degraded for others, and the probe timeout"""
+        def hang():
+            time_module.sleep(1)
+            return {}
+
+        def fail():
+            raise OSError('disk gone')
+
+        probes = {'database': health.probe_database, 'report_storage': fail, 'job_queue': hang}
+        with mock.patch.dict(health.PROBES, probes, clear=True), self.settings(HEALTH_PROBE_TIMEOUT_SECONDS=0.2):
+            started = time_module.monotonic()
+            checks = health.run_probes()
+            self.assertLess(time_module.monotonic() - started, 0.9)
+            self.assertEqual(checks['database']['status'], 'ok')
+            self.assertEqual(checks['report_storage'], {'status': 'error', 'error': 'OSError'})
+            self.assertEqual(checks['job_queue'], {'status': 'timeout'})
+            self.assertEqual(health.readiness(refresh=True)['status'], 'degraded')
+
+        health._last = None
+        with mock.patch.object(health, 'run_probes', return_value={'database': {'status': 'timeout'}}):
+            response = self.client.get('/api/health/ready/')
+        self.assertEqual(response.status_code, status.HTTP_503_SERVICE_UNAVAILABLE)
+        self.assertEqual(response.data['status'], 'unavailable')
+
+
+class AsyncDashboardTestCase(TransactionTestCase):
+    """Test the async dashboard views and their concurrent reads"""
+
+    def setUp(self):
+        teacher_user = User.objects.create_user(
+            username='teacher', password='testpass123', role='teacher', first_name='Tara', last_name='Khan',
+        )
+        teacher = Teacher.objects.create(user=teacher_user)
+        self.school_class = SchoolClass.objects.create(name='Grade 5', teacher=teacher_user)
+        self.user = User.objects.create_user(username='student', password='testpass123', role='student')
+        self.student = Student.objects.create(user=self.user, school_class=self.school_class)
+        other = User.objects.create_user(username='other', password='testpass123', role='student')
+        self.other = Student.objects.create(user=other, school_class=self.school_class)
+        Timetable.objects.create(
+            school_class=self.school_class, teacher=teacher, day_of_week='MON',
+            start_time=time(9), end_time=time(10), subject='Maths',
+        )
+        assignment = Assignment.objects.create(
+            school_class=self.school_class, title='Fractions', description='', due_date=date.today(),
+        )
+        Grade.objects.create(student=self.student, assignment=assignment, score=91, graded_date=date.today())
+        Fee.objects.create(student=self.student, amount=Decimal('500.00'), due_date=date.today())
+        self.token = RefreshToken.for_user(self.user).access_token
+
+    def get(self, path, authenticated=True):
+        headers = {'Authorization': f'Bearer {self.token}'} if authenticated else {}
+
+        async def fetch():
+            return await AsyncClient().get(path, headers=headers)
+        return async_to_sync(fetch)()
+
+    def test_reads_run_concurrently(self):
+        """Test that gather_reads overlaps its reads and keeps their order"""
+        def read(value):
+            time_module.sleep(0.3)
+            return value
+
+        started = time_module.monotonic()
+        results = async_to_sync(gather_reads)((read, 1), (read, 2), (read, 3))
+        self.assertEqual(results, [1, 2, 3])
+        self.assertLess(time_module.monotonic() - started, 0.8)
+
+    def test_student_dashboard_and_details(self):
+        """Test the dashboard and detail payloads served by the async views"""
+        response = self.get('/api/student/dashboard/')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertIn('no-cache', response['Cache-Control'])
+        data = response.json()
+        self.assertEqual(data['subjects'][0]['name'], 'Maths')
+        self.assertEqual(data['subjects'][0]['teacher'], 'Tara Khan')
+        self.assertEqual([grade['score'] for grade in data['grades']], [91])
+        self.assertEqual(len(data['assignments']), 1)
+        self.assertEqual(data['schedule'][0]['teacher']['user']['username'], 'teacher')
+
+        response = self.get(f'/api/student/{self.student.pk}/details/')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        data = response.json()
+        self.assertEqual(data['student']['user']['username'], 'student')
+        self.assertEqual(len(data['fees']), 1)
+        self.assertEqual(len(data['grades']), 1)
+
+        response = self.get(f'/api/student/{self.other.pk}/details/')
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+    def test_class_details_and_authentication(self):
+        """Test class details with its teacher, 404s and unauthenticated requests"""
+        response = self.get(f'/api/classes/{self.school_class.pk}/details/')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        data = response.json()
+        self.assertEqual(data['teacher']['username'], 'teacher')
+        self.assertEqual(data['total_students'], 2)
+        self.assertEqual(self.get('/api/classes/999/details/').status_code, 404)
+
+        response = self.get('/api/student/dashboard/', authenticated=False)
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+        self.assertIn('WWW-Authenticate', response)
+
+
+class BatchRequestTestCase(APITestCase):
+    """Test /api/batch/ sub-requests, partial failures and the shared identity map"""
+
+    def setUp(self):
+        teacher_user = User.objects.create_user(username='teacher', password='testpass123', role='teacher')
+        Teacher.objects.create(user=teacher_user)
+        self.school_class = SchoolClass.objects.create(name='Grade 6', teacher=teacher_user)
+        self.user = User.objects.create_user(username='student', password='testpass123', role='student')
+        self.student = Student.objects.create(user=self.user, school_class=self.school_class)
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {RefreshToken.for_user(self.user).access_token}')
+
+    def batch(self, *requests):
+        return self.client.post('/api/batch/', {'requests': list(requests)}, format='json')
+
+    def test_combined_responses_with_partial_failure(self):
+        """Test that each sub-request gets its own status and body, in order"""
+        response = self.batch(
+            {'id': 'me', 'path': '/auth/user/'},
+            {'id': 'dashboard', 'path': '/api/student/dashboard/'},
+            {'id': 'class', 'path': f'/classes/{self.school_class.pk}/details/'},
+            {'id': 'missing', 'path': '/no-such-route/'},
+            {'id': 'invalid', 'method': 'POST', 'path': '/students/', 'body': {}},
+            {'id': 'nested', 'method': 'POST', 'path': '/batch/', 'body': {'requests': []}},
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        results = {item['id']: item for item in response.json()['responses']}
+        self.assertEqual(list(results), ['me', 'dashboard', 'class', 'missing', 'invalid', 'nested'])
+        self.assertEqual(results['me']['status'], 200)
+        self.assertEqual(results['me']['body']['username'], 'student')
+        self.assertEqual(results['dashboard']['status'], 200)
+        self.assertIn('stats', results['dashboard']['body'])
+        self.assertEqual(results['class']['body']['total_students'], 1)
+        self.assertEqual(results['missing']['status'], 404)
+        self.assertEqual(results['invalid']['status'], 400)
+        self.assertEqual(results['nested']['status'], 400)
+
+    def test_validation_limit_and_authentication(self):
+        """Test malformed and oversized batches and unauthenticated callers"""
+        self.assertEqual(self.client.post('/api/batch/', {}, format='json').status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(self.batch({'path': 'students/'}).status_code, status.HTTP_400_BAD_REQUEST)
+        with override_settings(BATCH_MAX_REQUESTS=2):
+            response = self.batch(*[{'path': '/auth/user/'}] * 3)
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.client.credentials()
+        self.assertEqual(self.batch({'path': '/auth/user/'}).status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_identity_map_shares_rows(self):
+        """Test that lookups in one scope load each row once and saves drop it"""
+        with identity.identity_scope():
+            with self.assertNumQueries(1):
+                found = identity.get_many(Student, [self.student.pk, self.student.pk, 999999])
+                self.assertEqual(list(found), [self.student.pk])
+                self.assertIs(identity.get(Student, str(self.student.pk)), found[self.student.pk])
+                self.assertIsNone(identity.get(Student, 999999))
+            self.student.save()
+            with self.assertNumQueries(1):
+                identity.get(Student, self.student.pk)
+        with self.assertNumQueries(1):
+            identity.get(Student, self.student.pk)
+
+    def test_reads_after_writes_are_fresh(self):
+        """Test that rows changed by UPDATEs in a scope, or by an earlier write sub-request, are read again"""
+        fee = Fee.objects.create(student=self.student, amount=Decimal('3250.00'), due_date=date(2024, 9, 30))
+        with identity.identity_scope():
+            self.assertEqual(identity.get(Student, self.student.pk).outstanding_balance, Decimal('3250.00'))
+            record_payment(fee.pk, '250.00')
+            self.assertEqual(identity.get(Student, self.student.pk).outstanding_balance, Decimal('3000.00'))
+            self.assertEqual(identity.get(User, self.user.pk).unread_notifications, 0)
+            Notification.objects.create(user=self.user, title='Fee', message='Paid')
+            self.assertEqual(identity.get(User, self.user.pk).unread_notifications, 1)
+
+        admin = User.objects.create_user(username='office', password='testpass123', role='principal', is_staff=True)
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {RefreshToken.for_user(admin).access_token}')
+        fees = f'/fees/?student={self.student.pk}'
+        response = self.batch(
+            {'id': 'before', 'path': fees},
+            {'id': 'pay', 'method': 'POST', 'path': f'/fees/{fee.pk}/payments/', 'body': {'amount': '500.00'}},
+            {'id': 'after', 'path': fees},
+        )
+        results = {item['id']: item for item in response.json()['responses']}
+        self.assertEqual(results['pay']['status'], 201, results['pay'])
+
+        def balance(body):
+            rows = body['results'] if isinstance(body, dict) else body
+            return rows[0]['student']['outstanding_balance']
+        self.assertEqual(balance(results['before']['body']), '3000.00')
+        self.assertEqual(balance(results['after']['body']), '2500.00')
+
+
+class IdentityLoaderTestCase(APITestCase):
+    """Test that list serializers load related rows per distinct object, not per row"""
+
+    def setUp(self):
+        self.teachers = []
+        for name in ('ada', 'ben'):
+            user = User.objects.create_user(username=name, password='testpass123', role='teacher')
+            self.teachers.append(Teacher.objects.create(user=user))
+        school_class = SchoolClass.objects.create(name='Grade 7', teacher=self.teachers[0].user)
+        for hour in range(8, 14):
+            Timetable.objects.create(
+                school_class=school_class, teacher=self.teachers[hour % 2], day_of_week='TUE',
+                start_time=time(hour), end_time=time(hour, 45), subject=f'Subject {hour}',
+            )
+            Task.objects.create(teacher=self.teachers[hour % 2], title=f'Task {hour}', due_date=date.today())
+        for number in range(5):
+            user = User.objects.create_user(username=f'pupil{number}', password='testpass123', role='student')
+            Student.objects.create(user=user, school_class=school_class)
+
+    def test_query_count_follows_distinct_rows(self):
+        """Test one query per relation level for timetable and student lists"""
+        entries = list(Timetable.objects.all())
+        with self.assertNumQueries(3):  # teachers, their users, their profiles
+            data = TimetableSerializer(entries, many=True).data
+        self.assertEqual({entry['teacher']['user']['username'] for entry in data}, {'ada', 'ben'})
+
+        students = list(Student.objects.all())
+        with self.assertNumQueries(3):  # users, profiles, classes
+            data = StudentSerializer(students, many=True).data
+        self.assertEqual({student['school_class'] for student in data}, {'Grade 7'})
+
+    def test_rows_shared_across_serializers_in_scope(self):
+        """Test that a later serializer in the same request reuses the loaded teachers"""
+        entries, tasks = list(Timetable.objects.all()), list(Task.objects.all())
+        with identity.identity_scope():
+            with self.assertNumQueries(3):
+                TimetableSerializer(entries, many=True).data
+            with self.assertNumQueries(0):
+                data = TaskSerializer(tasks, many=True).data
+        self.assertEqual(len(data), 6)
+        self.assertEqual(data[0]['teacher']['user']['username'], Task.objects.first().teacher.user.username)
+
+    def test_teacher_creates_task(self):
+        """Test that a teacher's new task is assigned to their profile"""
+        token = RefreshToken.for_user(self.teachers[1].user).access_token
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {token}')
+        response = self.client.post('/api/tasks/', {'title': 'Mark papers', 'due_date': str(date.today())}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(response.json()['teacher']['user']['username'], 'ben')
@@ -0,0 +1,73 @@
+# api/throttling.py
+"""
+Token-bucket throttling for the login endpoint.
+
+A bucket holds up to `capacity` tokens and refills at `rate` tokens per
+second. Each attempt takes one. State is a (tokens, timestamp) pair in a
+local cache (`LOGIN_THROTTLE_CACHE`, per process by default). A morning rush
+therefore costs no database writes, and limits scale with the number of
+workers.
+"""
+
+import threading
+import time
+from django.conf import settings
+from django.core.cache import caches
+from rest_framework.throttling import BaseThrottle
+
+_lock = threading.Lock()
+
+
+class TokenBucket:
+    def __init__(self, prefix, capacity, per_minute):
+        self.prefix = prefix
+        self.capacity = capacity
+        self.rate = per_minute / 60.0
+
+    def take(self, key, now=None):
+        """Take a token for `key`. Returns 0 when allowed, else the seconds until one is available."""
+        now = time.time() if now is None else now
+        cache = caches[settings.LOGIN_THROTTLE_CACHE]
+        cache_key = f'{self.prefix}:{key}'
+        with _lock:
+            tokens, stamp = cache.get(cache_key, (self.capacity, now))
+            tokens = min(self.capacity, tokens + (now - stamp) * self.rate)
+            if tokens < 1:
+                cache.set(cache_key, (tokens, now), timeout=self._ttl())
+                return (1 - tokens) / self.rate if self.rate else None
+            cache.set(cache_key, (tokens - 1, now), timeout=self._ttl())
+            return 0
+
+    def _ttl(self):
+        # A bucket idle long enough to be full again carries no state
+        return int(self.capacity / self.rate) + 1 if self.rate else None
+
+
+class LoginRateThrottle(BaseThrottle):
+    """Throttles login attempts per client IP and per username."""
+
+    def __init__(self):
+        self._wait = None
+
+    def allow_request(self, request, view):
+        if request.method != 'POST':
+            return True
+        buckets = [
+            (TokenBucket('login:ip', settings.LOGIN_THROTTLE_IP_BURST, settings.LOGIN_THROTTLE_IP_PER_MINUTE),
+             self.get_ident(request)),
+        ]
+        username = str(request.data.get('username', '')).strip().lower()
+        if username:
+            buckets.append((
+                TokenBucket('login:user', settings.LOGIN_THROTTLE_USER_BURST, settings.LOGIN_THROTTLE_USER_PER_MINUTE),
+                username,
+            ))
+        for bucket, key in buckets:
+            wait = bucket.take(key)
+            if wait != 0:
+                self._wait = wait
+                return False
+        return True
+
+    def wait(self):
+        return self._wait
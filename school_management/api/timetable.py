@@ -0,0 +1,474 @@
+# api/timetable.py
+"""
+Timetable conflict detection.
+
+Two slots conflict when they share a teacher or a class on the same
+`day_of_week` and their [start_time, end_time) ranges intersect. Slots are
+grouped per (teacher, day) and per (class, day):
+
+- `IntervalIndex` answers "does [start, end) overlap anything?" in O(log n)
+  with a bisect over sorted starts plus a prefix maximum of ends. The
+  serializer uses it to validate single edits.
+- `find_conflicts` sorts each group once and sweeps it, reporting every
+  overlapping pair's nearest offender in O(n log n) overall; bulk imports
+  and the validation endpoint use it.
+
+The import/export section reads and writes whole timetables as CSV, validated
+in one pass and inserted with `bulk_create`.
+
+The generation section loads `Period`, `SubjectRequirement` and
+`TeacherUnavailability` rows into a `timetable_solver.Problem`, runs the
+solver and bulk-saves the result.
+"""
+
+import csv
+import time
+from bisect import bisect_left, insort
+from collections import defaultdict
+from datetime import datetime
+from django.db import transaction
+from django.db.models import Case, IntegerField, Q, Value, When
+from .models import Period, SchoolClass, SubjectRequirement, Teacher, TeacherUnavailability, Timetable, User
+from .schedule import bump_timetable_version
+from .timetable_solver import Problem, SolverError, solution_entries, solve
+
+TEACHER = 'teacher'
+CLASS = 'class'
+
+
+def minutes(value):
+    """Minutes since midnight for a `datetime.time`."""
+    return value.hour * 60 + value.minute + value.second / 60
+
+
+class IntervalIndex:
+    """
+    Half-open intervals sorted by start. `_reach[i]` is the position of the
+    interval with the latest end among the first i + 1, so the only interval
+    that can overlap a query ending at `end` is `_reach` of the last start
+    before `end`.
+    """
+
+    def __init__(self, intervals=()):
+        self._items = sorted(intervals, key=lambda item: (item[0], item[1]))
+        self._starts = [item[0] for item in self._items]
+        self._reach = []
+        self._extend_reach(0)
+
+    def __len__(self):
+        return len(self._items)
+
+    def _extend_reach(self, position):
+        del self._reach[position:]
+        for i in range(position, len(self._items)):
+            best = self._reach[i - 1] if i else i
+            if self._items[i][1] > self._items[best][1]:
+                best = i
+            self._reach.append(best)
+
+    def overlapping(self, start, end):
+        """Return the ref of an interval overlapping [start, end), or None."""
+        i = bisect_left(self._starts, end)
+        if not i:
+            return None
+        _, latest_end, ref = self._items[self._reach[i - 1]]
+        return ref if latest_end > start else None
+
+    def add(self, start, end, ref):
+        position = bisect_left(self._starts, start)
+        insort(self._starts, start)
+        self._items.insert(position, (start, end, ref))
+        self._extend_reach(position)
+
+    def remove(self, ref):
+        for position, item in enumerate(self._items):
+            if item[2] == ref:
+                del self._items[position]
+                del self._starts[position]
+                self._extend_reach(position)
+                return True
+        return False
+
+
+def slot_conflicts(day, start_time, end_time, school_class_id, teacher_id=None, exclude_id=None):
+    """
+    Conflicts for one proposed slot against the stored timetable: a list of
+    {'type', 'day_of_week', 'conflicts_with'} dicts, empty when the slot fits.
+    """
+    owners = Q(school_class_id=school_class_id)
+    if teacher_id is not None:
+        owners |= Q(teacher_id=teacher_id)
+    rows = Timetable.objects.filter(owners, day_of_week=day)
+    if exclude_id is not None:
+        rows = rows.exclude(pk=exclude_id)
+
+    by_class, by_teacher = [], []
+    for pk, class_id, row_teacher_id, row_start, row_end in rows.values_list(
+        'pk', 'school_class_id', 'teacher_id', 'start_time', 'end_time'
+    ):
+        interval = (minutes(row_start), minutes(row_end), pk)
+        if class_id == school_class_id:
+            by_class.append(interval)
+        if teacher_id is not None and row_teacher_id == teacher_id:
+            by_teacher.append(interval)
+
+    start, end = minutes(start_time), minutes(end_time)
+    conflicts = []
+    for kind, intervals in ((CLASS, by_class), (TEACHER, by_teacher)):
+        other = IntervalIndex(intervals).overlapping(start, end)
+        if other is not None:
+            conflicts.append({'type': kind, 'day_of_week': day, 'conflicts_with': other})
+    return conflicts
+
+
+def find_conflicts(entries):
+    """
+    Sweep `entries` (dicts with 'ref', 'day_of_week', 'start_time',
+    'end_time', 'school_class' and optional 'teacher') and return conflict
+    dicts {'type', 'day_of_week', 'entry', 'conflicts_with'}. Each entry that
+    overlaps an earlier one in its group is reported once per group.
+    """
+    groups = defaultdict(list)
+    for entry in entries:
+        interval = (minutes(entry['start_time']), minutes(entry['end_time']), entry['ref'])
+        groups[(CLASS, entry['school_class'], entry['day_of_week'])].append(interval)
+        if entry.get('teacher') is not None:
+            groups[(TEACHER, entry['teacher'], entry['day_of_week'])].append(interval)
+
+    conflicts = []
+    for (kind, _, day), intervals in groups.items():
+        intervals.sort(key=lambda item: (item[0], item[1]))
+        latest_end, latest_ref = None, None
+        for start, end, ref in intervals:
+            if latest_end is not None and start < latest_end:
+                conflicts.append({'type': kind, 'day_of_week': day, 'entry': ref, 'conflicts_with': latest_ref})
+            if latest_end is None or end > latest_end:
+                latest_end, latest_ref = end, ref
+    return conflicts
+
+
+def validate_entries(entries, include_existing=True, replace_classes=()):
+    """
+    Check a batch of proposed slots (dicts as for `find_conflicts`, with
+    'ref' set by the caller and an optional 'id' for rows being replaced)
+    among themselves and, optionally, against stored slots of the same
+    classes and teachers, ignoring stored slots of `replace_classes`.
+    Stored rows are referred to as 'id:<pk>'. Returns only conflicts that
+    involve a proposed slot.
+    """
+    combined = list(entries)
+    if include_existing and entries:
+        class_ids = {entry['school_class'] for entry in entries}
+        teacher_ids = {entry['teacher'] for entry in entries if entry.get('teacher') is not None}
+        replaced = [entry['id'] for entry in entries if entry.get('id')]
+        stored = Timetable.objects.filter(Q(school_class_id__in=class_ids) | Q(teacher_id__in=teacher_ids))
+        if replaced:
+            stored = stored.exclude(pk__in=replaced)
+        if replace_classes:
+            stored = stored.exclude(school_class_id__in=replace_classes)
+        combined.extend(
+            {'ref': f'id:{pk}', 'school_class': class_id, 'teacher': teacher_id,
+             'day_of_week': day, 'start_time': start, 'end_time': end}
+            for pk, class_id, teacher_id, day, start, end in stored.values_list(
+                'pk', 'school_class_id', 'teacher_id', 'day_of_week', 'start_time', 'end_time'
+            ).iterator()
+        )
+    proposed = {entry['ref'] for entry in entries}
+    return [
+        conflict for conflict in find_conflicts(combined)
+        if conflict['entry'] in proposed or conflict['conflicts_with'] in proposed
+    ]
+
+
+# --------------------------
+# CSV import / export
+# --------------------------
+
+CSV_FIELDS = ['class', 'day_of_week', 'period', 'start_time', 'end_time', 'subject', 'teacher']
+DAY_ALIASES = {
+    **{value.lower(): value for value in Timetable.Day.values},
+    **{label.lower(): value for value, label in Timetable.Day.choices},
+}
+
+
+def _parse_time(value):
+    return datetime.strptime(value.strip(), '%H:%M:%S' if value.count(':') == 2 else '%H:%M').time()
+
+
+def parse_timetable_csv(lines):
+    """
+    Parse CSV rows (`CSV_FIELDS`; `period` may stand in for the times and
+    `teacher` is a username) into timetable entries, resolving classes,
+    teachers and periods with one query each. Returns (entries, errors),
+    where each entry's 'ref' is its CSV line number.
+    """
+    reader = csv.DictReader(lines)
+    missing = {'class', 'day_of_week', 'subject'} - set(reader.fieldnames or ())
+    if missing:
+        return [], [{'line': 1, 'error': f"Missing columns: {', '.join(sorted(missing))}"}]
+    rows = [(reader.line_num, row) for row in reader]
+
+    classes = dict(SchoolClass.objects.filter(name__in={(row.get('class') or '').strip() for _, row in rows})
+                   .values_list('name', 'pk'))
+    usernames = {(row.get('teacher') or '').strip() for _, row in rows} - {''}
+    teachers = dict(User.objects.filter(username__in=usernames, teacher__isnull=False).values_list('username', 'pk'))
+    periods = {number: (start, end) for number, start, end in
+               Period.objects.values_list('period_number', 'start_time', 'end_time')}
+
+    entries, errors = [], []
+    for line, row in rows:
+        row = {key: (value or '').strip() for key, value in row.items() if key}
+        problems = []
+        school_class = classes.get(row['class'])
+        if school_class is None:
+            problems.append(f"Unknown class '{row['class']}'")
+        day = DAY_ALIASES.get(row['day_of_week'].lower())
+        if day is None:
+            problems.append(f"Unknown day '{row['day_of_week']}'")
+        teacher = None
+        if row.get('teacher'):
+            teacher = teachers.get(row['teacher'])
+            if teacher is None:
+                problems.append(f"Unknown teacher '{row['teacher']}'")
+        if not row['subject']:
+            problems.append('Subject is required')
+
+        start_time = end_time = None
+        try:
+            if row.get('start_time') and row.get('end_time'):
+                start_time, end_time = _parse_time(row['start_time']), _parse_time(row['end_time'])
+            elif row.get('period'):
+                start_time, end_time = periods[int(row['period'])]
+            else:
+                problems.append('Give a period or both start_time and end_time')
+        except (KeyError, ValueError):
+            problems.append(f"Invalid period or time in '{row.get('period') or row.get('start_time')}'")
+        if start_time is not None and start_time >= end_time:
+            problems.append('End time must be after start time')
+
+        if problems:
+            errors.extend({'line': line, 'error': problem} for problem in problems)
+        else:
+            entries.append({
+                'ref': line, 'school_class': school_class, 'teacher': teacher, 'day_of_week': day,
+                'start_time': start_time, 'end_time': end_time, 'subject': row['subject'],
+            })
+    return entries, errors
+
+
+def import_timetable_csv(lines, replace=False):
+    """
+    Import a CSV timetable in one pass: parse, check every row for overlaps
+    against the file and the stored timetable, then bulk insert. With
+    `replace`, the stored timetables of the classes in the file are replaced.
+    Nothing is written unless the whole file is valid. Returns a dict with
+    'created', 'errors' and 'conflicts'.
+    """
+    entries, errors = parse_timetable_csv(lines)
+    if errors:
+        return {'created': 0, 'errors': errors, 'conflicts': []}
+    class_ids = {entry['school_class'] for entry in entries}
+    conflicts = validate_entries(entries, replace_classes=class_ids if replace else ())
+    if conflicts:
+        return {'created': 0, 'errors': [], 'conflicts': conflicts}
+
+    with transaction.atomic():
+        if replace:
+            # Nothing references timetable rows; skip the per-row delete signals and bump the version once
+            Timetable.objects.filter(school_class_id__in=class_ids)._raw_delete(Timetable.objects.db)
+        Timetable.objects.bulk_create([
+            Timetable(
+                school_class_id=entry['school_class'], teacher_id=entry['teacher'], day_of_week=entry['day_of_week'],
+                start_time=entry['start_time'], end_time=entry['end_time'], subject=entry['subject'],
+            ) for entry in entries
+        ], batch_size=1000)
+        transaction.on_commit(bump_timetable_version)
+    return {'created': len(entries), 'errors': [], 'conflicts': []}
+
+
+def export_timetable_csv(out, school_class_id=None, teacher_id=None):
+    """Write the timetable (optionally of one class or teacher) to `out` as CSV that `import_timetable_csv` reads back."""
+    weekday = Case(*[When(day_of_week=day, then=Value(i)) for i, day in enumerate(Timetable.Day.values)],
+                   output_field=IntegerField())
+    rows = Timetable.objects.order_by('school_class__name', weekday, 'start_time')
+    if school_class_id is not None:
+        rows = rows.filter(school_class_id=school_class_id)
+    if teacher_id is not None:
+        rows = rows.filter(teacher_id=teacher_id)
+    periods = dict(Period.objects.values_list('start_time', 'period_number'))
+    writer = csv.writer(out)
+    writer.writerow(CSV_FIELDS)
+    for name, day, start, end, subject, username in rows.values_list(
+        'school_class__name', 'day_of_week', 'start_time', 'end_time', 'subject', 'teacher__user__username'
+    ).iterator():
+        writer.writerow([
+            name, day, periods.get(start, ''), start.strftime('%H:%M'), end.strftime('%H:%M'), subject, username or '',
+        ])
+    return out
+
+
+# --------------------------
+# Generation
+# --------------------------
+
+def load_problem(class_ids=None):
+    """
+    Build a solver `Problem` for `class_ids` (default every class with
+    requirements). Slots that candidate teachers already teach in classes
+    outside the problem are treated as unavailable. Rows of the scheduled
+    classes whose subject has no requirement (entered by hand) are kept, so
+    their slots are blocked for the class and unavailable for their teacher.
+    """
+    periods = list(Period.objects.order_by('period_number').values_list('period_number', 'start_time', 'end_time'))
+    if not periods:
+        raise SolverError('Define at least one Period before generating a timetable.')
+    days = list(Timetable.Day.values)
+    period_index = {number: i for i, (number, _, _) in enumerate(periods)}
+
+    requirements = SubjectRequirement.objects.order_by('school_class_id', 'subject')
+    if class_ids is not None:
+        requirements = requirements.filter(school_class_id__in=class_ids)
+    requirements = list(requirements.values_list('school_class_id', 'subject', 'periods_per_week', 'teacher_id'))
+    if not requirements:
+        raise SolverError('No subject requirements to schedule.')
+
+    # Teachers whose specialization matches the subject; anyone if nobody matches
+    teachers = list(Teacher.objects.values_list('pk', 'specialization'))
+    if not teachers:
+        raise SolverError('No teachers available.')
+    by_subject = defaultdict(list)
+    for pk, specialization in teachers:
+        by_subject[(specialization or '').strip().lower()].append(pk)
+    everyone = [pk for pk, _ in teachers]
+    problem_requirements = [
+        (class_id, subject, lessons,
+         tuple([teacher_id] if teacher_id else (by_subject.get(subject.strip().lower()) or everyone)))
+        for class_id, subject, lessons, teacher_id in requirements
+    ]
+
+    unavailable = defaultdict(set)
+    for teacher_id, day, period_number in TeacherUnavailability.objects.values_list(
+        'teacher_id', 'day_of_week', 'period__period_number'
+    ):
+        unavailable[teacher_id].add(days.index(day) * len(periods) + period_index[period_number])
+
+    def overlapping_slots(day, start, end):
+        return [days.index(day) * len(periods) + i
+                for i, (_, period_start, period_end) in enumerate(periods) if period_start < end and start < period_end]
+
+    scheduled = {class_id for class_id, _, _, _ in problem_requirements}
+    candidates = {teacher for *_, options in problem_requirements for teacher in options}
+    elsewhere = Timetable.objects.filter(teacher_id__in=candidates).exclude(school_class_id__in=scheduled)
+    for teacher_id, day, start, end in elsewhere.values_list('teacher_id', 'day_of_week', 'start_time', 'end_time'):
+        unavailable[teacher_id].update(overlapping_slots(day, start, end))
+
+    blocked = defaultdict(set)
+    for class_id, teacher_id, day, start, end in kept_rows(problem_requirements).values_list(
+        'school_class_id', 'teacher_id', 'day_of_week', 'start_time', 'end_time'
+    ):
+        slots = overlapping_slots(day, start, end)
+        blocked[class_id].update(slots)
+        if teacher_id is not None:
+            unavailable[teacher_id].update(slots)
+
+    return Problem(days=days, periods=periods, requirements=problem_requirements,
+                   unavailable=dict(unavailable), blocked=dict(blocked))
+
+
+def _owned(requirements):
+    """Q for the stored rows a solution replaces: a scheduled class's subjects with a requirement."""
+    subjects = defaultdict(set)
+    for class_id, subject, *_ in requirements:
+        subjects[class_id].add(subject)
+    owned = Q(pk__in=[])
+    for class_id, names in subjects.items():
+        owned |= Q(school_class_id=class_id, subject__in=names)
+    return owned
+
+
+def kept_rows(requirements):
+    """Rows of the scheduled classes that generation leaves alone (subjects without a requirement)."""
+    class_ids = {requirement[0] for requirement in requirements}
+    return Timetable.objects.filter(school_class_id__in=class_ids).exclude(_owned(requirements))
+
+
+def attach_current_timetable(problem):
+    """
+    Seed `problem.initial` from stored rows that match a requirement (same
+    class and subject) and start at a Period.
+    """
+    starts = {start: i for i, (_, start, _) in enumerate(problem.periods)}
+    requirement_index = {(class_id, subject): r for r, (class_id, subject, _, _) in enumerate(problem.requirements)}
+    initial = {}
+    rows = Timetable.objects.filter(school_class_id__in={r[0] for r in problem.requirements}).values_list(
+        'school_class_id', 'subject', 'teacher_id', 'day_of_week', 'start_time'
+    )
+    for class_id, subject, teacher_id, day, start in rows:
+        r = requirement_index.get((class_id, subject))
+        if r is None or start not in starts or day not in problem.days:
+            continue
+        _, slots = initial.setdefault(r, (teacher_id, []))
+        if len(slots) < problem.requirements[r][2]:
+            slots.append(problem.days.index(day) * len(problem.periods) + starts[start])
+    problem.initial = initial
+    return problem
+
+
+@transaction.atomic
+def save_solution(problem, solution):
+    """
+    Replace the rows the solver owns (the scheduled classes' subjects with a
+    requirement) with the solution in one bulk insert, keeping rows entered
+    by hand. Returns the number of rows written.
+    """
+    entries = solution_entries(problem, solution)
+    kept = [
+        {'ref': f'kept-{pk}', 'school_class': class_id, 'teacher': teacher_id,
+         'day_of_week': day, 'start_time': start, 'end_time': end}
+        for pk, class_id, teacher_id, day, start, end in kept_rows(problem.requirements).values_list(
+            'pk', 'school_class_id', 'teacher_id', 'day_of_week', 'start_time', 'end_time'
+        )
+    ]
+    if find_conflicts(entries + kept):
+        raise SolverError('Refusing to save a timetable with conflicts.')
+    # Nothing references timetable rows; skip the per-row delete signals and bump the version once
+    Timetable.objects.filter(_owned(problem.requirements))._raw_delete(Timetable.objects.db)
+    Timetable.objects.bulk_create([
+        Timetable(
+            school_class_id=entry['school_class'], teacher_id=entry['teacher'], day_of_week=entry['day_of_week'],
+            start_time=entry['start_time'], end_time=entry['end_time'], subject=entry['subject'],
+        ) for entry in entries
+    ], batch_size=1000)
+    transaction.on_commit(bump_timetable_version)
+    return len(entries)
+
+
+def generate_timetable(class_ids=None, time_budget=10.0, workers=None, seed=0, teacher_id=None, dry_run=False):
+    """
+    Solve the timetable for `class_ids` (default all) and save it unless
+    `dry_run` or conflicts remain. With `teacher_id`, re-solve only around
+    that teacher, starting from the stored timetable. Returns a summary dict.
+    """
+    started = time.monotonic()
+    if teacher_id is not None and class_ids is None:
+        class_ids = set(SchoolClass.objects.filter(timetable_entries__teacher_id=teacher_id).values_list('pk', flat=True))
+        class_ids |= set(SubjectRequirement.objects.filter(teacher_id=teacher_id).values_list('school_class_id', flat=True))
+        if not class_ids:
+            raise SolverError(f'Teacher {teacher_id} has no lessons to re-schedule.')
+    problem = load_problem(class_ids)
+    if teacher_id is not None:
+        attach_current_timetable(problem)
+    solution = solve(problem, time_budget=time_budget, workers=workers, seed=seed, movable_teacher=teacher_id)
+    summary = {
+        'classes': len({r[0] for r in problem.requirements}),
+        'lessons': len(solution.slots),
+        'hard_violations': solution.hard,
+        'soft_violations': solution.soft,
+        'seed': solution.seed,
+        'iterations': solution.iterations,
+        'saved': 0,
+    }
+    if not solution.hard and not dry_run:
+        summary['saved'] = save_solution(problem, solution)
+    summary['seconds'] = round(time.monotonic() - started, 2)
+    return summary
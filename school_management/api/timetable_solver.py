@@ -0,0 +1,342 @@
+# api/timetable_solver.py
+"""
+Search for the automatic timetable generator.
+
+The school week is a grid of slots (`Timetable.Day` x `Period`). Every
+`SubjectRequirement` expands into `periods_per_week` lessons that need a
+slot and a teacher. Hard constraints: a class and a teacher hold at most one
+lesson per slot, and teachers are never placed in a `TeacherUnavailability`
+period. Soft constraint: a subject is spread over the week (at most
+ceil(periods / days) lessons of it per class per day).
+
+`solve` runs a greedy most-constrained-first construction followed by a
+min-conflicts local search with random walk, restarted with different seeds
+in parallel worker processes, all inside a wall-clock budget; the best result
+wins. `solve(..., movable_teacher=...)` re-solves incrementally: the current
+timetable is the starting point and only that teacher's (and any unplaced)
+lessons may move, widening to the classes they teach if that is not enough.
+
+This module works on the plain-data `Problem` only and imports nothing from
+Django, so worker processes can run it without app setup. Loading and saving
+live in `api.timetable`.
+"""
+
+import math
+import os
+import random
+import time
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+
+HARD_WEIGHT = 1000
+NOISE = 0.1
+SWAP_PROBABILITY = 0.3
+
+
+class SolverError(ValueError):
+    pass
+
+
+@dataclass
+class Problem:
+    days: list
+    periods: list                # (period_number, start_time, end_time)
+    requirements: list           # (class_id, subject, lessons, candidate teacher ids)
+    unavailable: dict = field(default_factory=dict)   # teacher id -> set of slots
+    blocked: dict = field(default_factory=dict)       # class id -> slots taken by rows the solver keeps
+    initial: dict = field(default_factory=dict)       # requirement index -> (teacher id, [slots])
+
+    @property
+    def slot_count(self):
+        return len(self.days) * len(self.periods)
+
+    def day_of(self, slot):
+        return slot // len(self.periods)
+
+
+@dataclass
+class Solution:
+    teachers: list               # chosen teacher per requirement
+    slots: list                  # slot per lesson
+    lesson_requirement: list     # requirement index per lesson
+    hard: int
+    soft: int
+    seed: int = 0
+    iterations: int = 0
+
+    @property
+    def cost(self):
+        return self.hard * HARD_WEIGHT + self.soft
+
+
+# --------------------------
+# Search
+# --------------------------
+
+class _Search:
+    """Mutable search state for one restart."""
+
+    def __init__(self, problem, rng, movable=None):
+        self.problem = problem
+        self.rng = rng
+        self.slot_count = problem.slot_count
+        self.lesson_requirement = [r for r, req in enumerate(problem.requirements) for _ in range(req[2])]
+        self.lessons_of = defaultdict(list)
+        for lesson, r in enumerate(self.lesson_requirement):
+            self.lessons_of[r].append(lesson)
+        self.day_cap = [max(1, math.ceil(req[2] / len(problem.days))) for req in problem.requirements]
+        self.teachers = [None] * len(problem.requirements)
+        self.slots = [None] * len(self.lesson_requirement)
+        self.class_occupancy = defaultdict(int)      # (class id, slot) -> lessons
+        self.teacher_occupancy = defaultdict(int)    # (teacher id, slot) -> lessons
+        self.day_load = defaultdict(int)             # (requirement, day) -> lessons
+        self.teacher_load = defaultdict(int)
+        self.movable = movable
+        self.fresh = []                              # lessons placed by construction, not seeded
+        self.hard = 0
+        self.soft = 0
+
+    # Placement bookkeeping ----------------------------------------------
+
+    def score(self, lesson, slot, teacher=None):
+        """Violations added by putting `lesson` (currently unplaced) at `slot`."""
+        r = self.lesson_requirement[lesson]
+        class_id = self.problem.requirements[r][0]
+        teacher = self.teachers[r] if teacher is None else teacher
+        hard = self.class_occupancy[(class_id, slot)] + self.teacher_occupancy[(teacher, slot)]
+        if slot in self.problem.unavailable.get(teacher, ()):
+            hard += 1
+        if slot in self.problem.blocked.get(class_id, ()):
+            hard += 1
+        soft = 1 if self.day_load[(r, self.problem.day_of(slot))] >= self.day_cap[r] else 0
+        return hard, soft
+
+    def place(self, lesson, slot):
+        hard, soft = self.score(lesson, slot)
+        r = self.lesson_requirement[lesson]
+        self.class_occupancy[(self.problem.requirements[r][0], slot)] += 1
+        self.teacher_occupancy[(self.teachers[r], slot)] += 1
+        self.day_load[(r, self.problem.day_of(slot))] += 1
+        self.slots[lesson] = slot
+        self.hard += hard
+        self.soft += soft
+
+    def unplace(self, lesson):
+        r = self.lesson_requirement[lesson]
+        slot = self.slots[lesson]
+        self.class_occupancy[(self.problem.requirements[r][0], slot)] -= 1
+        self.teacher_occupancy[(self.teachers[r], slot)] -= 1
+        self.day_load[(r, self.problem.day_of(slot))] -= 1
+        self.slots[lesson] = None
+        hard, soft = self.score(lesson, slot)
+        self.hard -= hard
+        self.soft -= soft
+
+    def best_slot(self, lesson, teacher=None):
+        best, best_cost = [], None
+        for slot in range(self.slot_count):
+            hard, soft = self.score(lesson, slot, teacher)
+            cost = hard * HARD_WEIGHT + soft
+            if best_cost is None or cost < best_cost:
+                best, best_cost = [slot], cost
+            elif cost == best_cost:
+                best.append(slot)
+        return self.rng.choice(best), best_cost
+
+    # Construction --------------------------------------------------------
+
+    def construct(self):
+        requirements = self.problem.requirements
+        for r, (teacher, slots) in self.problem.initial.items():
+            if teacher in requirements[r][3]:
+                self.teachers[r] = teacher
+                self.teacher_load[teacher] += requirements[r][2]
+                for lesson, slot in zip(self.lessons_of[r], slots):
+                    self.place(lesson, slot)
+
+        # Most constrained first: fewest candidate teachers, then most lessons
+        order = sorted(
+            (r for r in range(len(requirements)) if self.teachers[r] is None),
+            key=lambda r: (len(requirements[r][3]), -requirements[r][2], self.rng.random()),
+        )
+        for r in order:
+            candidates = list(requirements[r][3])
+            self.rng.shuffle(candidates)
+            teacher = min(candidates, key=lambda t: self.teacher_load[t] + len(self.problem.unavailable.get(t, ())))
+            self.teachers[r] = teacher
+            self.teacher_load[teacher] += requirements[r][2]
+
+        for lesson in self.rng.sample(range(len(self.slots)), len(self.slots)):
+            if self.slots[lesson] is None:
+                self.place(lesson, self.best_slot(lesson)[0])
+                self.fresh.append(lesson)
+
+    # Local search --------------------------------------------------------
+
+    def in_conflict(self, lesson):
+        r = self.lesson_requirement[lesson]
+        slot = self.slots[lesson]
+        teacher = self.teachers[r]
+        class_id = self.problem.requirements[r][0]
+        return (
+            self.class_occupancy[(class_id, slot)] > 1
+            or self.teacher_occupancy[(teacher, slot)] > 1
+            or slot in self.problem.unavailable.get(teacher, ())
+            or slot in self.problem.blocked.get(class_id, ())
+        )
+
+    def candidates(self):
+        lessons = range(len(self.slots)) if self.movable is None else self.movable
+        if self.hard:
+            return [lesson for lesson in lessons if self.in_conflict(lesson)]
+        return [
+            lesson for lesson in lessons
+            if self.day_load[(self.lesson_requirement[lesson], self.problem.day_of(self.slots[lesson]))]
+            > self.day_cap[self.lesson_requirement[lesson]]
+        ]
+
+    def relocate(self, lesson):
+        self.unplace(lesson)
+        if self.rng.random() < NOISE:
+            self.place(lesson, self.rng.randrange(self.slot_count))
+        else:
+            self.place(lesson, self.best_slot(lesson)[0])
+
+    def swap(self, lesson):
+        """Swap with another movable lesson of the same class (class occupancy is unchanged)."""
+        r = self.lesson_requirement[lesson]
+        class_id = self.problem.requirements[r][0]
+        allowed = None if self.movable is None else set(self.movable)
+        partners = [
+            other for other, other_r in enumerate(self.lesson_requirement)
+            if other != lesson and self.problem.requirements[other_r][0] == class_id
+            and other_r != r and (allowed is None or other in allowed)
+        ]
+        if not partners:
+            return self.relocate(lesson)
+        other = self.rng.choice(partners)
+        before = self.hard * HARD_WEIGHT + self.soft
+        first, second = self.slots[lesson], self.slots[other]
+        self.unplace(lesson)
+        self.unplace(other)
+        self.place(lesson, second)
+        self.place(other, first)
+        if self.hard * HARD_WEIGHT + self.soft > before and self.rng.random() >= NOISE:
+            # Undo worsening swaps most of the time
+            self.unplace(lesson)
+            self.unplace(other)
+            self.place(lesson, first)
+            self.place(other, second)
+
+    def run(self, deadline, stall_limit=2000):
+        best = self.snapshot()
+        stalled = iterations = 0
+        while time.monotonic() < deadline and stalled < stall_limit:
+            conflicted = self.candidates()
+            if not conflicted:
+                break
+            lesson = self.rng.choice(conflicted)
+            if self.rng.random() < SWAP_PROBABILITY:
+                self.swap(lesson)
+            else:
+                self.relocate(lesson)
+            iterations += 1
+            if self.hard * HARD_WEIGHT + self.soft < best.cost:
+                best = self.snapshot()
+                stalled = 0
+            else:
+                stalled += 1
+        best.iterations = iterations
+        return best
+
+    def snapshot(self):
+        return Solution(
+            teachers=list(self.teachers), slots=list(self.slots),
+            lesson_requirement=self.lesson_requirement, hard=self.hard, soft=self.soft,
+        )
+
+
+def _solve_once(problem, budget, seed, movable_teacher=None):
+    """One worker: restart from fresh constructions until conflict-free or out of time."""
+    rng = random.Random(seed)
+    deadline = time.monotonic() + budget
+    best = None
+    while best is None or (best.hard and time.monotonic() < deadline):
+        search = _Search(problem, rng)
+        search.construct()
+        if movable_teacher is not None:
+            movable = sorted(set(search.fresh) | {
+                lesson for lesson, r in enumerate(search.lesson_requirement) if search.teachers[r] == movable_teacher
+            })
+            search.movable = movable
+            result = search.run(time.monotonic() + budget / 2)
+            if result.hard:
+                # Widen to every lesson of the classes involved
+                classes = {problem.requirements[search.lesson_requirement[lesson]][0] for lesson in movable}
+                search.movable = [
+                    lesson for lesson, r in enumerate(search.lesson_requirement) if problem.requirements[r][0] in classes
+                ]
+                result = search.run(deadline)
+        else:
+            result = search.run(deadline, stall_limit=max(2000, 20 * len(search.slots)))
+        if best is None or result.cost < best.cost:
+            best = result
+        if movable_teacher is not None:
+            break
+    best.seed = seed
+    return best
+
+
+def check_capacity(problem):
+    """Raise SolverError when no assignment can exist."""
+    per_class = defaultdict(int)
+    for class_id, _, lessons, _ in problem.requirements:
+        per_class[class_id] += lessons
+    for class_id, lessons in per_class.items():
+        free = problem.slot_count - len(problem.blocked.get(class_id, ()))
+        if lessons > free:
+            raise SolverError(f'Class {class_id} needs {lessons} lessons but the week has {free} free slots.')
+    for class_id, subject, lessons, candidates in problem.requirements:
+        if len(candidates) == 1:
+            free = problem.slot_count - len(problem.unavailable.get(candidates[0], ()))
+            if lessons > free:
+                raise SolverError(f'Teacher {candidates[0]} has only {free} free slots for {subject} in class {class_id}.')
+
+
+def solve(problem, time_budget=10.0, workers=None, seed=0, movable_teacher=None):
+    """
+    Run restarts in parallel (one per worker, `workers` defaults to the CPU
+    count) and return the best `Solution`; `solution.hard == 0` means
+    conflict-free.
+    """
+    check_capacity(problem)
+    workers = max(1, workers or os.cpu_count() or 1)
+    seeds = [seed + i for i in range(workers)]
+    if workers == 1:
+        results = [_solve_once(problem, time_budget, seeds[0], movable_teacher)]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            results = list(pool.map(
+                _solve_once, [problem] * workers, [time_budget] * workers, seeds, [movable_teacher] * workers
+            ))
+    return min(results, key=lambda solution: (solution.cost, solution.seed))
+
+
+def solution_entries(problem, solution):
+    """Timetable field dicts for a solution, one per lesson."""
+    entries = []
+    for lesson, slot in enumerate(solution.slots):
+        r = solution.lesson_requirement[lesson]
+        class_id, subject, _, _ = problem.requirements[r]
+        _, start, end = problem.periods[slot % len(problem.periods)]
+        entries.append({
+            'ref': lesson,
+            'school_class': class_id,
+            'teacher': solution.teachers[r],
+            'day_of_week': problem.days[problem.day_of(slot)],
+            'start_time': start,
+            'end_time': end,
+            'subject': subject,
+        })
+    return entries
@@ -1,8 +1,8 @@
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
 from rest_framework_simplejwt.views import TokenRefreshView
-from . import views
-from .views import StudentDashboardView, AdminUserUpdateView, StudentDetailView, DatabaseSnapshotView, ReportManagementViewSet # Import AdminUserUpdateView
+from . import async_views, views
+from .views import AdminUserUpdateView, DatabaseSnapshotView, ReportManagementViewSet # Import AdminUserUpdateView
 from .views import FeeActionsView # Import the new view
 
 router = DefaultRouter()
@@ -20,7 +20,10 @@ router.register(r'reports', views.ReportViewSet, basename='report')
 router.register(r'report-management', views.ReportManagementViewSet, basename='report-management')
 router.register(r'async-tasks', views.AsyncTaskViewSet, basename='async-task')
 router.register(r'periods', views.PeriodViewSet, basename='period')
+router.register(r'subject-requirements', views.SubjectRequirementViewSet, basename='subject-requirement')
+router.register(r'teacher-unavailability', views.TeacherUnavailabilityViewSet, basename='teacher-unavailability')
 router.register(r'tasks', views.TaskViewSet, basename='task')
+router.register(r'notifications', views.NotificationViewSet, basename='notification')
 
 urlpatterns = [
     # --- ADD THE NEW PATH FOR CREDENTIAL CHANGE ---
@@ -29,12 +32,18 @@ urlpatterns = [
 
     # ... (keep all other paths)
     path('health/', views.HealthCheckView.as_view(), name='health_check'),
-    path('student/dashboard/', StudentDashboardView.as_view(), name='student_dashboard'),
-    path('student/<int:student_id>/details/', StudentDetailView.as_view(), name='student_details'),
+    path('health/live/', views.LivenessView.as_view(), name='health_live'),
+    path('health/ready/', views.HealthCheckView.as_view(), name='health_ready'),
+    path('student/dashboard/', async_views.student_dashboard, name='student_dashboard'),
+    path('me/today/', views.MyTodayView.as_view(), name='my_today'),
+    path('student/<int:student_id>/details/', async_views.student_details, name='student_details'),
+    # Ahead of the router, which would otherwise treat it as a ClassViewSet route
+    path('classes/<int:pk>/details/', async_views.class_details, name='class-details'),
     path('auth/login/', views.CustomTokenObtainPairView.as_view(), name='token_obtain_pair'),
     path('auth/token/refresh/', TokenRefreshView.as_view(), name='token_refresh'),
     path('auth/logout/', views.LogoutView.as_view(), name='auth_logout'),
     path('auth/user/', views.CurrentUserView.as_view(), name='current_user'),
+    path('batch/', views.BatchView.as_view(), name='batch'),
     path('snapshot/', DatabaseSnapshotView.as_view(), name='database_snapshot'),
     path('', include(router.urls)),
 ]
\ No newline at end of file
@@ -1,5 +1,6 @@
-from rest_framework import viewsets, status, generics, views
+from rest_framework import viewsets, status, generics, views, mixins
 from rest_framework.decorators import action
+from rest_framework.pagination import CursorPagination
 from rest_framework.permissions import IsAuthenticated, AllowAny, IsAdminUser, BasePermission
 from rest_framework.response import Response
 
@@ -16,36 +17,74 @@ class IsOwnerOrAdmin(BasePermission):
         # Allow write permissions only for object owners or admins
         return obj.user == request.user or request.user.is_staff or request.user.role == 'principal'
 from rest_framework_simplejwt.views import TokenObtainPairView
-from rest_framework_simplejwt.tokens import RefreshToken
+from rest_framework_simplejwt.exceptions import TokenError
+from rest_framework_simplejwt.settings import api_settings as jwt_settings
 from django.http import HttpResponse
 from django.template.loader import render_to_string
 from django.db import models
+from django.conf import settings
 from django.db.models import Sum, Count
 from django.utils import timezone
-from django.views.decorators.cache import cache_page
+from django.views.decorators.cache import cache_page, never_cache
 from django.utils.decorators import method_decorator
-from asgiref.sync import sync_to_async
-from datetime import timedelta
-import asyncio
+from datetime import date, datetime, timedelta
+import csv
+import io
 from .models import *
 from .serializers import *
+from .analytics import attendance_analytics, performance_analytics
+from . import identity
+from .batch import parse_requests, run_batch
+from .authentication import SchoolRefreshToken, blacklist_token, teacher_id_for
+from .throttling import LoginRateThrottle
+from .health import readiness
+from .schedule import ical_feed, my_day
+from .timetable import export_timetable_csv, generate_timetable, import_timetable_csv, validate_entries
+from .timetable_solver import SolverError
+from .notifications import mark_read as mark_notifications_read, unread_count as get_unread_count
+from .fees import (
+    PaymentError, apply_late_fees, fees_summary as get_fees_summary, installment_schedule, record_payment,
+    schedule_installments,
+)
 
 # === Public & Authentication Views ===
 
+# Probe results are cached in api.health; the page cache would hide a failing node
+@method_decorator(never_cache, name='dispatch')
 class HealthCheckView(views.APIView):
-    """A public endpoint to check if the backend is running."""
+    """Readiness: 503 when the database or cache probes fail (see api/health.py)."""
     permission_classes = [AllowAny]
     authentication_classes = []  # Disable JWT authentication for this endpoint
 
-    @method_decorator(cache_page(60))  # Cache for 1 minute
     def get(self, request, *args, **kwargs):
-        return Response({"status": "ok", "message": "Backend is connected and running."})
+        result = readiness()
+        messages = {
+            'ok': "Backend is connected and running.",
+            'degraded': "Backend is running with degraded dependencies.",
+            'unavailable': "Backend cannot reach a required dependency.",
+        }
+        return Response(
+            {**result, "message": messages[result['status']]},
+            status=status.HTTP_503_SERVICE_UNAVAILABLE if result['status'] == 'unavailable' else status.HTTP_200_OK,
+        )
+
+@method_decorator(never_cache, name='dispatch')
+class LivenessView(views.APIView):
+    """Liveness: the process answers requests. Touches no dependency."""
+    permission_classes = [AllowAny]
+    authentication_classes = []
+
+    def get(self, request, *args, **kwargs):
+        return Response({"status": "ok"})
 
 class CustomTokenObtainPairView(TokenObtainPairView):
-    """Login endpoint. Returns tokens and user data."""
+    """Login endpoint. Returns tokens and a lean user payload; throttled per IP and per username."""
     permission_classes = [AllowAny]
     serializer_class = CustomTokenObtainPairSerializer
+    throttle_classes = [LoginRateThrottle]
 
+# Per-user response: the site-wide page cache must not share it between users
+@method_decorator(never_cache, name='dispatch')
 class CurrentUserView(generics.RetrieveAPIView):
     """Returns the currently authenticated user's data."""
     permission_classes = [IsAuthenticated]
@@ -54,86 +93,55 @@ class CurrentUserView(generics.RetrieveAPIView):
         return self.request.user
 
 class LogoutView(views.APIView):
-    """Handles logout by blacklisting the refresh token."""
+    """Handles logout by blacklisting the refresh token and the access token used for the request."""
     permission_classes = [IsAuthenticated]
     def post(self, request):
         try:
-            refresh_token = request.data["refresh"]
-            token = RefreshToken(refresh_token)
-            token.blacklist()
-            return Response(status=status.HTTP_205_RESET_CONTENT)
-        except Exception:
+            token = SchoolRefreshToken(request.data["refresh"])
+        except (KeyError, TokenError):
             return Response(status=status.HTTP_400_BAD_REQUEST)
-
-# === Dashboard Views ===
-
-class StudentDashboardView(views.APIView):
-    """Provides all necessary data for the student dashboard in a single endpoint."""
+        if token[jwt_settings.USER_ID_CLAIM] != request.user.pk:
+            return Response(status=status.HTTP_400_BAD_REQUEST)
+        token.blacklist()
+        if request.auth is not None:
+            blacklist_token(request.auth, user_id=request.user.pk)
+        return Response(status=status.HTTP_205_RESET_CONTENT)
+
+# Sub-request responses are per user; never serve a batch from the page cache
+@method_decorator(never_cache, name='dispatch')
+class BatchView(views.APIView):
+    """Runs several API calls in one request and returns each one's status and body (see api/batch.py)."""
     permission_classes = [IsAuthenticated]
 
-    @method_decorator(cache_page(300))  # Cache for 5 minutes
-    def get(self, request, *args, **kwargs):
-        user = self.request.user
-        if user.role != User.Role.STUDENT:
-            return Response({"error": "User is not a student"}, status=status.HTTP_403_FORBIDDEN)
-
-        try:
-            student = Student.objects.select_related('user').get(user=user)
-        except Student.DoesNotExist:
-            return Response({"error": "Student profile not found"}, status=status.HTTP_404_NOT_FOUND)
-
-        # Get attendance records
-        attendance_records = student.attendance_records.all()
-        total_days = attendance_records.count()
-        present_days = attendance_records.filter(
-            status__in=[Attendance.Status.PRESENT, Attendance.Status.LATE]
-        ).count()
-        attendance_rate = (present_days / total_days * 100) if total_days > 0 else 100
-
-        # Get schedule, grades, and assignments
-        schedule_data = list(Timetable.objects.filter(school_class=student.school_class))
-        grades_data = list(student.grades.all().order_by('-graded_date'))
-        assignments_data = list(Assignment.objects.filter(school_class=student.school_class).order_by('due_date'))
-
-        stats_data = {
-            "attendanceRate": round(attendance_rate, 1),
-            "currentGPA": 3.7,
-            "completedAssignments": 28,
-            "totalAssignments": 32,
-            "upcomingDeadlines": 5,
-            "currentGrade": "A-"
-        }
+    def post(self, request, *args, **kwargs):
+        return Response({'responses': run_batch(request, parse_requests(request.data))})
 
-        # Process subjects data
-        subjects_data = []
-        unique_subjects = set((entry.subject, entry.teacher_id) for entry in schedule_data)
+# === Dashboard Views ===
 
-        # Batch fetch teachers
-        teacher_ids = [teacher_id for _, teacher_id in unique_subjects if teacher_id]
-        teachers = {
-            teacher.user_id: teacher for teacher in Teacher.objects.filter(user_id__in=teacher_ids).select_related('user')
-        }
+# The student dashboard, student details and class details are async views: see api/async_views.py
 
-        for idx, (subject, teacher_id) in enumerate(unique_subjects):
-            teacher = teachers.get(teacher_id)
-            teacher_name = f"{teacher.user.first_name} {teacher.user.last_name}" if teacher else "Unknown"
-            subjects_data.append({
-                "id": idx + 1,
-                "name": subject,
-                "teacher": teacher_name,
-                "grade": "A-",
-                "attendance": 95,
-                "nextClass": "Tomorrow 9:00 AM"
-            })
+# Per-user and time-dependent, so keep it out of the site-wide page cache
+@method_decorator(never_cache, name='dispatch')
+class MyTodayView(views.APIView):
+    """
+    The current user's day: timetable slots, tasks due, pending leave requests
+    and the next class. `?date=YYYY-MM-DD` looks at another day.
+    """
+    permission_classes = [IsAuthenticated]
 
-        payload = {
-            "stats": stats_data,
-            "subjects": subjects_data,
-            "assignments": AssignmentSerializer(assignments_data, many=True).data,
-            "schedule": TimetableSerializer(schedule_data, many=True).data,
-            "grades": GradeSerializer(grades_data, many=True).data,
-        }
-        return Response(payload)
+    def get(self, request, *args, **kwargs):
+        now = timezone.localtime()
+        if request.query_params.get('date'):
+            try:
+                day = date.fromisoformat(request.query_params['date'])
+            except ValueError:
+                return Response({"error": "date must be in YYYY-MM-DD format"}, status=status.HTTP_400_BAD_REQUEST)
+            if day != now.date():
+                now = timezone.make_aware(datetime.combine(day, datetime.min.time()))
+        today = my_day(request.user, now)
+        today['tasks'] = TaskSerializer(today['tasks'], many=True).data
+        today['pending_leaves'] = LeaveRequestSerializer(today['pending_leaves'], many=True).data
+        return Response(today)
 
 # === Admin Action Views ===
 
@@ -237,10 +245,64 @@ class FeeTypeViewSet(viewsets.ModelViewSet):
     serializer_class = FeeTypeSerializer
     permission_classes = [IsAdminUser]
 
+    @action(detail=True, methods=['get', 'post'])
+    def schedule(self, request, pk=None):
+        """Preview (GET) or create (POST) the installment fees of this fee type's category plan."""
+        fee_type = self.get_object()
+        serializer = InstallmentScheduleSerializer(data=request.data if request.method == 'POST' else request.query_params)
+        serializer.is_valid(raise_exception=True)
+        start = serializer.validated_data['start_date']
+        plan = [
+            {'installment_number': number, 'due_date': due_date, 'amount': amount}
+            for number, due_date, amount in installment_schedule(fee_type, start)
+        ]
+        if request.method == 'GET':
+            return Response({'fee_type': fee_type.name, 'installments': plan})
+
+        students = Student.objects.all()
+        if serializer.validated_data.get('class_id'):
+            students = students.filter(school_class_id=serializer.validated_data['class_id'])
+        created = schedule_installments(fee_type, start, students)
+        return Response({'fee_type': fee_type.name, 'installments': plan, 'created': created}, status=status.HTTP_201_CREATED)
+
+# Balances change with every payment and are per student, so none of these responses may be page-cached
+@method_decorator(never_cache, name='dispatch')
 class FeeViewSet(viewsets.ModelViewSet):
     queryset = Fee.objects.all()
     serializer_class = FeeSerializer
 
+    @action(detail=True, methods=['get', 'post'])
+    def payments(self, request, pk=None):
+        """List a fee's payments, or record a new (possibly partial) payment."""
+        fee = self.get_object()
+        if request.method == 'GET':
+            return Response(PaymentSerializer(fee.payments.all(), many=True).data)
+
+        if not (request.user.is_staff or request.user.role == User.Role.PRINCIPAL):
+            return Response({'error': 'Only administrators can record payments'}, status=status.HTTP_403_FORBIDDEN)
+        serializer = PaymentSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        try:
+            payment = record_payment(fee.pk, recorded_by=request.user, **serializer.validated_data)
+        except PaymentError as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        return Response(PaymentSerializer(payment).data, status=status.HTTP_201_CREATED)
+
+    @action(detail=False, methods=['post'], url_path='apply-late-fees', permission_classes=[IsAdminUser])
+    def late_fees(self, request):
+        """Recompute late fees for all overdue fees (normally run nightly by `schedule_fees`)."""
+        return Response({'updated': apply_late_fees()})
+
+    @action(detail=False, methods=['get'])
+    def outstanding(self, request):
+        """Students with dues, largest first, read from the cached balances."""
+        students = Student.objects.filter(outstanding_balance__gt=0).select_related('user', 'school_class') \
+            .order_by('-outstanding_balance')
+        class_id = request.query_params.get('class_id')
+        if class_id:
+            students = students.filter(school_class_id=class_id)
+        return Response(StudentDuesSerializer(students, many=True).data)
+
 class LeaveRequestViewSet(viewsets.ModelViewSet):
     queryset = LeaveRequest.objects.all().order_by('-id')
     serializer_class = LeaveRequestSerializer
@@ -266,6 +328,101 @@ class TimetableViewSet(viewsets.ModelViewSet):
         except Exception as e:
             return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
 
+    @action(detail=False, methods=['post'])
+    def validate(self, request):
+        """
+        Check a whole proposed timetable (`{"entries": [...], "include_existing": true}`)
+        for overlapping class or teacher slots without saving anything.
+        """
+        serializer = TimetableEntrySerializer(data=request.data.get('entries', []), many=True)
+        serializer.is_valid(raise_exception=True)
+        entries = [dict(entry, ref=index) for index, entry in enumerate(serializer.validated_data)]
+        include_existing = str(request.data.get('include_existing', True)).lower() not in ('false', '0')
+        conflicts = validate_entries(entries, include_existing=include_existing)
+        return Response({'valid': not conflicts, 'checked': len(entries), 'conflicts': conflicts})
+
+    @action(detail=False, methods=['post'], url_path='import', permission_classes=[IsAdminUser])
+    def import_csv(self, request):
+        """
+        Import a whole timetable from an uploaded CSV `file` (columns class,
+        day_of_week, period or start_time/end_time, subject, teacher). With
+        `replace=true` the listed classes' timetables are replaced. All rows
+        are validated first; nothing is saved if any row is invalid or overlaps.
+        """
+        upload = request.FILES.get('file')
+        if upload is None:
+            return Response({'error': 'Upload the CSV as `file`'}, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            lines = io.TextIOWrapper(upload.file, encoding='utf-8-sig')
+            result = import_timetable_csv(lines, replace=str(request.data.get('replace', '')).lower() in ('1', 'true'))
+        except (UnicodeDecodeError, csv.Error) as e:
+            return Response({'error': f'Could not read CSV: {e}'}, status=status.HTTP_400_BAD_REQUEST)
+        if result['errors'] or result['conflicts']:
+            return Response(result, status=status.HTTP_400_BAD_REQUEST)
+        return Response(result, status=status.HTTP_201_CREATED)
+
+    @action(detail=False, methods=['get'], url_path='export')
+    @method_decorator(never_cache)
+    def export_csv(self, request):
+        """Download the timetable as CSV, optionally for one `class_id` or `teacher_id`."""
+        response = HttpResponse(content_type='text/csv')
+        response['Content-Disposition'] = 'attachment; filename="timetable.csv"'
+        export_timetable_csv(
+            response, school_class_id=request.query_params.get('class_id'), teacher_id=request.query_params.get('teacher_id'),
+        )
+        return response
+
+    @action(detail=False, methods=['get'], url_path=r'ical/(?P<owner>class|teacher)/(?P<owner_id>\d+)')
+    @method_decorator(never_cache)
+    def ical(self, request, owner=None, owner_id=None):
+        """
+        Weekly iCalendar feed of a class or teacher. Served from a cache keyed by
+        the timetable version, which is also the ETag.
+        """
+        if owner == 'class':
+            name = SchoolClass.objects.filter(pk=owner_id).values_list('name', flat=True).first()
+            kwargs = {'school_class_id': int(owner_id)}
+        else:
+            teacher = Teacher.objects.filter(pk=owner_id).select_related('user').first()
+            name = str(teacher) if teacher else None
+            kwargs = {'teacher_id': int(owner_id)}
+        if name is None:
+            return Response({'error': f'{owner.title()} not found'}, status=status.HTTP_404_NOT_FOUND)
+
+        version, feed = ical_feed(f'{name} timetable', **kwargs)
+        etag = f'"{version}"'
+        if request.headers.get('If-None-Match') == etag:
+            response = HttpResponse(status=status.HTTP_304_NOT_MODIFIED)
+        else:
+            response = HttpResponse(feed, content_type='text/calendar; charset=utf-8')
+            response['Content-Disposition'] = f'inline; filename="{owner}-{owner_id}.ics"'
+        response['ETag'] = etag
+        return response
+
+    @action(detail=False, methods=['post'], permission_classes=[IsAdminUser])
+    def generate(self, request):
+        """
+        Generate timetables from subject requirements and teacher availability
+        (`{"class_ids": [...], "teacher_id": 3, "time_budget": 10, "dry_run": false}`).
+        With `teacher_id`, only that teacher's lessons are re-scheduled. Runs in
+        this worker with a single search process; use `manage.py generate_timetable`
+        for long or parallel runs.
+        """
+        serializer = TimetableGenerateSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        data = serializer.validated_data
+        max_seconds = settings.TIMETABLE_SOLVER_MAX_SECONDS
+        try:
+            summary = generate_timetable(
+                class_ids=data.get('class_ids'), teacher_id=data.get('teacher_id'),
+                time_budget=min(data.get('time_budget', max_seconds), max_seconds),
+                # Never fork a process pool from the server process
+                workers=1, seed=data['seed'], dry_run=data['dry_run'],
+            )
+        except SolverError as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        return Response(summary, status=status.HTTP_201_CREATED if summary['saved'] else status.HTTP_200_OK)
+
     @action(detail=False, methods=['get'], url_path='overview')
     @method_decorator(cache_page(300))  # Cache for 5 minutes
     def overview(self, request):
@@ -316,73 +473,27 @@ class ReportViewSet(viewsets.ViewSet):
         })
 
     @method_decorator(cache_page(600))  # Cache for 10 minutes
+    @action(detail=False, methods=['get'])
+    def performance(self, request):
+        """Grade distribution, percentiles, per-class means, rankings and top performers."""
+        return Response(performance_analytics())
+
+    @method_decorator(cache_page(600))  # Cache for 10 minutes
+    @action(detail=False, methods=['get'], url_path='attendance')
+    def attendance_report(self, request):
+        """Attendance totals, per-student and per-class rates, distribution and monthly trend."""
+        return Response(attendance_analytics())
+
     @action(detail=False, methods=['get'], url_path='fees-summary')
+    @method_decorator(never_cache)
     def fees_summary(self, request):
-        paid_fees = Fee.objects.filter(status='paid')
-        unpaid_fees = Fee.objects.filter(status__in=['unpaid', 'partial'])
-        pie_chart_data = {
-            'paid_count': paid_fees.count(),
-            'paid_total': paid_fees.aggregate(total=Sum('amount'))['total'] or 0,
-            'unpaid_count': unpaid_fees.count(),
-            'unpaid_total': unpaid_fees.aggregate(total=Sum('amount'))['total'] or 0,
-        }
-        class_breakdown = unpaid_fees.values('student__school_class__name') \
-            .annotate(total_pending=Sum('amount'), student_count=Count('student', distinct=True)) \
-            .order_by('-total_pending')
-        return Response({"pie_chart": pie_chart_data, "class_breakdown": list(class_breakdown)})
+        # Read from the maintained FeeSummary rows: cheap and exact, so never served from the page cache
+        return Response(get_fees_summary())
+
 class ClassViewSet(viewsets.ModelViewSet):
     queryset = SchoolClass.objects.all()
     serializer_class = SchoolClassSerializer
 
-    @action(detail=True, methods=['get'])
-    @method_decorator(cache_page(300))  # Cache for 5 minutes
-    def details(self, request, pk=None):
-        """Get detailed information about a specific class including students and teacher."""
-        try:
-            school_class = self.get_object()
-            students = Student.objects.filter(school_class=school_class).select_related('user')
-            teacher = school_class.teacher
-
-            data = {
-                'class_info': SchoolClassSerializer(school_class).data,
-                'teacher': UserSerializer(teacher.user).data if teacher else None,
-                'students': StudentSerializer(students, many=True).data,
-                'total_students': students.count()
-            }
-            return Response(data)
-        except Exception as e:
-            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
-
-class StudentDetailView(views.APIView):
-    """Get detailed information about a specific student."""
-    permission_classes = [IsAuthenticated]
-
-    @method_decorator(cache_page(300))  # Cache for 5 minutes
-    def get(self, request, student_id):
-        try:
-            student = Student.objects.select_related('user').get(pk=student_id)
-            # Check if user has permission to view this student
-            if request.user.role == 'student' and request.user != student.user:
-                return Response({'error': 'Permission denied'}, status=status.HTTP_403_FORBIDDEN)
-
-            # Get student's attendance, grades, fees, etc.
-            attendance_records = student.attendance_records.all()
-            grades = student.grades.all().order_by('-graded_date')
-            fees = Fee.objects.filter(student=student)
-
-            data = {
-                'student': StudentSerializer(student).data,
-                'attendance': AttendanceSerializer(attendance_records, many=True).data,
-                'grades': GradeSerializer(grades, many=True).data,
-                'fees': FeeSerializer(fees, many=True).data,
-                'attendance_rate': (attendance_records.filter(status__in=['present', 'late']).count() / attendance_records.count() * 100) if attendance_records.count() > 0 else 0
-            }
-            return Response(data)
-        except Student.DoesNotExist:
-            return Response({'error': 'Student not found'}, status=status.HTTP_404_NOT_FOUND)
-        except Exception as e:
-            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
-
 class PeriodViewSet(viewsets.ModelViewSet):
     """
     API endpoint for managing the school's period time slots.
@@ -391,6 +502,18 @@ class PeriodViewSet(viewsets.ModelViewSet):
     serializer_class = PeriodSerializer
     permission_classes = [IsAdminUser] # Only principals can edit period timings
 
+class SubjectRequirementViewSet(viewsets.ModelViewSet):
+    """Weekly lessons per subject for each class, the input to timetable generation."""
+    queryset = SubjectRequirement.objects.all().order_by('school_class_id', 'subject')
+    serializer_class = SubjectRequirementSerializer
+    permission_classes = [IsAdminUser]
+
+class TeacherUnavailabilityViewSet(viewsets.ModelViewSet):
+    """Periods a teacher cannot be scheduled in."""
+    queryset = TeacherUnavailability.objects.all().order_by('teacher_id', 'day_of_week', 'period_id')
+    serializer_class = TeacherUnavailabilitySerializer
+    permission_classes = [IsAdminUser]
+
 class TaskViewSet(viewsets.ModelViewSet):
     """
     API endpoint for managing teacher tasks.
@@ -401,11 +524,11 @@ class TaskViewSet(viewsets.ModelViewSet):
     def get_queryset(self):
         """Return tasks for the current teacher user."""
         if self.request.user.role == User.Role.TEACHER:
-            try:
-                teacher = Teacher.objects.get(user=self.request.user)
-                return Task.objects.filter(teacher=teacher)
-            except Teacher.DoesNotExist:
+            # The teacher id comes from the token claims, so no profile lookup is needed
+            teacher_id = teacher_id_for(self.request.user)
+            if teacher_id is None:
                 return Task.objects.none()
+            return Task.objects.filter(teacher_id=teacher_id)
         elif self.request.user.role == User.Role.PRINCIPAL:
             # Principals can see all tasks
             return Task.objects.all()
@@ -414,11 +537,11 @@ class TaskViewSet(viewsets.ModelViewSet):
     def perform_create(self, serializer):
         """Set the teacher when creating a task."""
         if self.request.user.role == User.Role.TEACHER:
-            try:
-                teacher = Teacher.objects.get(user=self.request.user)
-                serializer.save(teacher=teacher)
-            except Teacher.DoesNotExist:
+            # Shared through the request's identity map, so the response reuses it
+            teacher = identity.get(Teacher, teacher_id_for(self.request.user))
+            if teacher is None:
                 raise serializers.ValidationError("Teacher profile not found.")
+            serializer.save(teacher=teacher)
         else:
             serializer.save()
 
@@ -458,6 +581,43 @@ class TaskViewSet(viewsets.ModelViewSet):
         serializer = self.get_serializer(queryset, many=True)
         return Response(serializer.data)
 
+class NotificationCursorPagination(CursorPagination):
+    page_size = 20
+    ordering = ('-created_at', '-id')
+
+# Inbox state changes with every read, so keep it out of the site-wide page cache
+@method_decorator(never_cache, name='dispatch')
+class NotificationViewSet(mixins.ListModelMixin, mixins.RetrieveModelMixin, mixins.UpdateModelMixin,
+                          mixins.DestroyModelMixin, viewsets.GenericViewSet):
+    """
+    The current user's notification inbox, newest first. `?unread=true` limits
+    it to unread items.
+    """
+    serializer_class = NotificationSerializer
+    permission_classes = [IsAuthenticated]
+    pagination_class = NotificationCursorPagination
+
+    def get_queryset(self):
+        queryset = Notification.objects.filter(user=self.request.user)
+        if self.request.query_params.get('unread') in ('1', 'true'):
+            queryset = queryset.filter(is_read=False)
+        return queryset
+
+    @action(detail=False, methods=['get'], url_path='unread-count')
+    def unread_count(self, request):
+        """Unread count from the cached per-user counter."""
+        return Response({'unread_count': get_unread_count(request.user)})
+
+    @action(detail=False, methods=['post'], url_path='mark-read')
+    def mark_read(self, request):
+        """Mark notifications read by `ids`, by `before` timestamp, or all, in one UPDATE."""
+        serializer = MarkReadSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        updated = mark_notifications_read(
+            request.user, ids=serializer.validated_data.get('ids'), before=serializer.validated_data.get('before')
+        )
+        return Response({'updated': updated, 'unread_count': get_unread_count(request.user)})
+
 class SchoolViewSet(viewsets.ModelViewSet):
     """
     API endpoint for managing school details.
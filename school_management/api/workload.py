@@ -0,0 +1,572 @@
+# api/workload.py
+"""
+Synthetic workloads and load replay.
+
+A workload profile is a JSON document whose `events` list holds timed API
+requests: {"at": seconds from start, "user": username, "name": endpoint
+label, "method", "path", "body"}. Profiles come from two places:
+
+- `synthesize` builds one of the `SCENARIOS` from the users and classes in
+  the database: each simulated user runs a session of requests separated by
+  exponential think times, and sessions start following the scenario's
+  arrival shape (a morning burst, a ramp towards a fee due date, ...). The
+  same seed and database give the same profile.
+- `WorkloadRecorderMiddleware` (enabled by `WORKLOAD_RECORD_FILE`) appends
+  live API requests to a JSON-lines log that `profile_from_log` converts.
+  Passwords, tokens and other secrets in bodies and query strings are
+  replaced with `REDACTED` before they are written (`redact`).
+
+`replay` sends a profile's events on schedule from a thread pool, either
+in-process through Django's test client or over HTTP to a running server.
+`replay_async` sends them from tasks on one event loop through Django's ASGI
+handler, as an ASGI server runs the application. `summarize` reports
+throughput and latency percentiles per endpoint. `read_only` and
+`clear_page_cache` let a profile be replayed several times from the same
+state, as `manage.py benchmark_asgi` does.
+Requests are authenticated with access tokens minted locally, so replaying
+needs the server's database and SECRET_KEY but never hits the login
+throttle or the password hasher.
+"""
+
+import asyncio
+import http.client
+import json
+import random
+import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date
+from urllib.parse import parse_qsl, urlencode, urlsplit
+import numpy as np
+from django.conf import settings
+from django.core.cache import caches
+from django.core.cache.backends.db import DatabaseCache
+from django.db import connections, router
+from django.db.models import Q
+from asgiref.sync import sync_to_async
+from django.test import Client
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.tokens import AccessToken
+from .authentication import ClaimsJWTAuthentication, token_claims
+from .models import Attendance, Fee, SchoolClass, Student, User
+
+SCENARIOS = {
+    'morning-attendance': 'Teachers mark their class registers in a burst at the start of the day '
+                          'while students open their day view.',
+    'exam-week': 'Students repeatedly check dashboards and grades, teachers review class results '
+                 'and administrators run performance reports.',
+    'fee-due': 'Traffic ramps up towards a fee due date: students check dues while the office '
+               'records payments and watches the outstanding list.',
+    'school-day': 'An ordinary day: a steady mix of every role\'s common requests.',
+}
+RECORD_SKIP_PREFIXES = ('/api/auth/', '/api/events/', '/admin/')
+# Keys whose values are never written to the workload log (matched as substrings, any case)
+SENSITIVE_KEYS = ('password', 'token', 'refresh', 'access', 'secret')
+REDACTED = '[redacted]'
+_ID_SEGMENT = re.compile(r'/\d+(?=/|$)')
+
+
+def endpoint_name(method, path):
+    """'GET /api/student/{id}/details/' for 'GET /api/student/12/details/?x=1'."""
+    return f"{method} {_ID_SEGMENT.sub('/{id}', path.split('?', 1)[0])}"
+
+
+def _sensitive(key):
+    key = str(key).lower()
+    return any(part in key for part in SENSITIVE_KEYS)
+
+
+def redact(value):
+    """`value` (parsed JSON) with the values of sensitive keys, at any depth, replaced by REDACTED."""
+    if isinstance(value, dict):
+        return {key: REDACTED if _sensitive(key) else redact(item) for key, item in value.items()}
+    if isinstance(value, list):
+        return [redact(item) for item in value]
+    return value
+
+
+def redact_path(path):
+    """`path` with the values of sensitive query parameters replaced by REDACTED."""
+    base, _, query = path.partition('?')
+    if not query:
+        return path
+    params = [(key, REDACTED if _sensitive(key) else item) for key, item in parse_qsl(query, keep_blank_values=True)]
+    return f'{base}?{urlencode(params)}'
+
+
+# --------------------------
+# Synthesis
+# --------------------------
+
+def _step(method, path, body=None, think=1.0):
+    """One request of a session; `think` scales the pause that follows it."""
+    return {'name': endpoint_name(method, path), 'method': method, 'path': path, 'body': body, 'think': think}
+
+
+def _burst(peak, spread):
+    return lambda rng: min(1.0, max(0.0, rng.gauss(peak, spread)))
+
+
+def _uniform(low=0.0, high=1.0):
+    return lambda rng: rng.uniform(low, high)
+
+
+def _ramp(mode):
+    return lambda rng: rng.triangular(0.0, 1.0, mode)
+
+
+def _population():
+    """Users and ids the scenarios draw from, in primary key order so synthesis is deterministic."""
+    students = list(Student.objects.order_by('pk').values_list('pk', 'user__username', 'school_class_id'))
+    rosters = {}
+    for student_id, _, class_id in students:
+        rosters.setdefault(class_id, []).append(student_id)
+    return {
+        'students': students,
+        'rosters': rosters,
+        'classes': list(
+            SchoolClass.objects.filter(teacher__isnull=False).order_by('pk').values_list('pk', 'teacher__username')
+        ),
+        'teachers': list(User.objects.filter(role=User.Role.TEACHER, is_active=True, teacher__isnull=False)
+                         .order_by('pk').values_list('pk', 'username')),
+        'admins': list(User.objects.filter(Q(is_staff=True) | Q(role=User.Role.PRINCIPAL), is_active=True)
+                       .order_by('pk').values_list('username', flat=True)),
+        'unpaid_fees': list(Fee.objects.filter(status__in=[Fee.Status.UNPAID, Fee.Status.PARTIAL])
+                            .order_by('pk').values_list('pk', flat=True)),
+    }
+
+
+def _student_sessions(population, rng, steps):
+    return [(username, steps(student_id, rng)) for student_id, username, _ in population['students']]
+
+
+def _morning_attendance(population, rng, day):
+    statuses = [Attendance.Status.PRESENT, Attendance.Status.ABSENT, Attendance.Status.LATE]
+    teachers = [
+        (username, [_step('GET', '/api/me/today/'), _step('GET', f'/api/classes/{class_id}/details/')] + [
+            _step('POST', '/api/attendance/', {
+                'student': student_id, 'date': day.isoformat(),
+                'status': rng.choices(statuses, weights=[0.9, 0.07, 0.03])[0],
+            }, think=0.2)
+            for student_id in population['rosters'].get(class_id, [])
+        ] + [_step('GET', '/api/tasks/today_tasks/')])
+        for class_id, username in population['classes']
+    ]
+    students = _student_sessions(population, rng, lambda student_id, rng: [
+        _step('GET', f'/api/me/today/?date={day.isoformat()}'),
+        _step('GET', '/api/notifications/unread-count/'),
+    ])
+    return [(session, _burst(0.15, 0.05)) for session in teachers] + \
+        [(session, _uniform(0.0, 0.6)) for session in students]
+
+
+def _exam_week(population, rng, day):
+    students = _student_sessions(population, rng, lambda student_id, rng: [
+        _step('GET', '/api/student/dashboard/'),
+        _step('GET', f'/api/student/{student_id}/details/'),
+        _step('GET', '/api/notifications/'),
+        _step('GET', f'/api/student/{student_id}/details/', think=3.0),
+    ])
+    teachers = [(username, [
+        _step('GET', f'/api/teachers/{teacher_id}/students/'),
+        _step('GET', '/api/tasks/upcoming_tasks/'),
+    ]) for teacher_id, username in population['teachers']]
+    admins = [(username, [
+        _step('GET', '/api/reports/performance/'),
+        _step('GET', '/api/reports/academic/'),
+        _step('GET', '/api/reports/attendance/'),
+    ]) for username in population['admins']]
+    return [(session, _burst(0.7, 0.15)) for session in students] + \
+        [(session, _uniform()) for session in teachers + admins]
+
+
+def _fee_due(population, rng, day):
+    students = _student_sessions(population, rng, lambda student_id, rng: [
+        _step('GET', '/api/student/dashboard/'),
+        _step('GET', f'/api/student/{student_id}/details/'),
+    ])
+    fees = list(population['unpaid_fees'])
+    rng.shuffle(fees)
+    admins = population['admins']
+    office = [(username, [_step('GET', '/api/fees/outstanding/'), _step('GET', '/api/reports/fees-summary/')] + [
+        _step('POST', f'/api/fees/{fee_id}/payments/', {'amount': '100.00', 'method': 'cash'}, think=0.5)
+        for fee_id in fees[n::len(admins)][:50]
+    ]) for n, username in enumerate(admins)]
+    return [(session, _ramp(0.85)) for session in students + office]
+
+
+def _school_day(population, rng, day):
+    students = _student_sessions(population, rng, lambda student_id, rng: [
+        _step('GET', '/api/me/today/'),
+        _step('GET', '/api/student/dashboard/'),
+        _step('GET', '/api/notifications/unread-count/'),
+    ])
+    teachers = [(username, [
+        _step('GET', '/api/me/today/'),
+        _step('GET', '/api/tasks/today_tasks/'),
+        _step('GET', f'/api/teachers/{teacher_id}/students/'),
+    ]) for teacher_id, username in population['teachers']]
+    admins = [(username, [
+        _step('GET', '/api/reports/fees-summary/'),
+        _step('GET', '/api/fees/outstanding/'),
+    ]) for username in population['admins']]
+    return [(session, _uniform()) for session in students + teachers + admins]
+
+
+_BUILDERS = {
+    'morning-attendance': _morning_attendance,
+    'exam-week': _exam_week,
+    'fee-due': _fee_due,
+    'school-day': _school_day,
+}
+
+
+def synthesize(scenario, duration=300.0, think_time=2.0, max_users=None, seed=0, day=None):
+    """
+    Build a profile for `scenario` from the current database. Sessions start
+    within `duration` seconds following the scenario's arrival shape; pauses
+    between a session's requests average `think_time` seconds. `max_users`
+    samples that many sessions.
+    """
+    if scenario not in _BUILDERS:
+        raise ValueError(f"Unknown scenario '{scenario}'; choose from {', '.join(SCENARIOS)}.")
+    rng = random.Random(seed)
+    sessions = _BUILDERS[scenario](_population(), rng, day or date.today())
+    sessions = [((user, steps), arrival) for (user, steps), arrival in sessions if steps]
+    if max_users is not None and len(sessions) > max_users:
+        sessions = rng.sample(sessions, max_users)
+
+    events = []
+    for (user, steps), arrival in sessions:
+        at = arrival(rng) * duration
+        for step in steps:
+            events.append({
+                'at': round(at, 3), 'user': user, 'name': step['name'],
+                'method': step['method'], 'path': step['path'], 'body': step['body'],
+            })
+            at += rng.expovariate(1 / (think_time * step['think'])) if think_time > 0 else 0
+    events.sort(key=lambda event: event['at'])
+    return {'scenario': scenario, 'seed': seed, 'duration': duration, 'users': len(sessions), 'events': events}
+
+
+# --------------------------
+# Recording
+# --------------------------
+
+def profile_from_log(lines):
+    """Build a profile from `WorkloadRecorderMiddleware` JSON lines, timed from the first request."""
+    records = sorted((json.loads(line) for line in lines if line.strip()), key=lambda record: record['ts'])
+    start = records[0]['ts'] if records else 0
+    events = [{
+        'at': round(record['ts'] - start, 3), 'user': record['user'], 'name': record['name'],
+        'method': record['method'], 'path': record['path'], 'body': record['body'],
+    } for record in records]
+    return {
+        'scenario': 'recorded', 'seed': None, 'duration': events[-1]['at'] if events else 0,
+        'users': len({event['user'] for event in events}), 'events': events,
+    }
+
+
+class WorkloadRecorderMiddleware:
+    """
+    Appends each API request to `WORKLOAD_RECORD_FILE` as a JSON line. JSON
+    request bodies are kept, redacted, so writes can be replayed;
+    authentication and event-stream requests are skipped. Meant for short
+    capture sessions.
+    """
+
+    _lock = threading.Lock()
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.authentication = ClaimsJWTAuthentication()
+
+    def _username(self, request):
+        user = getattr(request, 'user', None)
+        if user is not None and user.is_authenticated:
+            return user.get_username()
+        # Responses served by the page cache never reach DRF's authentication
+        try:
+            header = self.authentication.get_header(request)
+            raw = self.authentication.get_raw_token(header) if header else None
+            if raw is None:
+                return None
+            token = self.authentication.get_validated_token(raw)
+        except Exception:
+            return None
+        return token.get('username') or User.objects.filter(
+            pk=token.get(api_settings.USER_ID_CLAIM)
+        ).values_list('username', flat=True).first()
+
+    def __call__(self, request):
+        path = request.get_full_path()
+        if not path.startswith('/api/') or path.startswith(RECORD_SKIP_PREFIXES):
+            return self.get_response(request)
+
+        body = None
+        if request.method not in ('GET', 'HEAD', 'OPTIONS') and request.content_type == 'application/json':
+            try:
+                # Reading the body first caches it for the view's parsers
+                body = json.loads(request.body or b'null')
+            except ValueError:
+                body = None
+        started = time.time()
+        response = self.get_response(request)
+        record = {
+            'ts': round(started, 3), 'user': self._username(request), 'name': endpoint_name(request.method, path),
+            'method': request.method, 'path': redact_path(path), 'body': redact(body), 'status': response.status_code,
+            'ms': round((time.time() - started) * 1000, 2),
+        }
+        with self._lock, open(settings.WORKLOAD_RECORD_FILE, 'a') as log:
+            log.write(json.dumps(record) + '\n')
+        return response
+
+
+# --------------------------
+# Replay
+# --------------------------
+
+class _Tokens:
+    """Access tokens with signed claims, minted per user and renewed before they expire."""
+
+    def __init__(self):
+        self._tokens = {}
+        self._lock = threading.Lock()
+        self._renew_after = api_settings.ACCESS_TOKEN_LIFETIME.total_seconds() * 0.8
+
+    def header(self, username):
+        if username is None:
+            return None
+        with self._lock:
+            token, minted_at = self._tokens.get(username, (None, 0))
+            if token is None or time.monotonic() - minted_at > self._renew_after:
+                user = User.objects.get(username=username)
+                access = AccessToken.for_user(user)
+                for claim, value in token_claims(user).items():
+                    access[claim] = value
+                token = f'Bearer {access}'
+                self._tokens[username] = (token, time.monotonic())
+            return token
+
+
+def _client_host():
+    hosts = [host for host in settings.ALLOWED_HOSTS if host not in ('*', '')]
+    return hosts[0].lstrip('.') if hosts else 'localhost'
+
+
+class ClientTransport:
+    """Sends requests in-process through Django's test client (one client per thread)."""
+
+    def __init__(self):
+        self._local = threading.local()
+        self._host = _client_host()
+
+    def send(self, method, path, body, authorization):
+        client = getattr(self._local, 'client', None)
+        if client is None:
+            client = self._local.client = Client(HTTP_HOST=self._host)
+        extra = {'HTTP_AUTHORIZATION': authorization} if authorization else {}
+        data = json.dumps(body) if body is not None else ''
+        return client.generic(method, path, data, content_type='application/json', **extra).status_code
+
+
+class ASGITransport:
+    """Sends requests in-process to Django's ASGI handler, the way an ASGI server calls it."""
+
+    def __init__(self):
+        from django.core.handlers.asgi import ASGIHandler
+
+        self._handler = ASGIHandler()
+        self._host = _client_host().encode()
+
+    async def send(self, method, path, body, authorization):
+        path, _, query = path.partition('?')
+        data = json.dumps(body).encode() if body is not None else b''
+        headers = [(b'host', self._host), (b'content-type', b'application/json'), (b'accept', b'application/json'),
+                   (b'content-length', str(len(data)).encode())]
+        if authorization:
+            headers.append((b'authorization', authorization.encode()))
+        scope = {
+            'type': 'http', 'asgi': {'version': '3.0'}, 'http_version': '1.1', 'method': method, 'scheme': 'http',
+            'path': path, 'raw_path': path.encode(), 'query_string': query.encode(), 'headers': headers,
+            'client': ('127.0.0.1', 0), 'server': ('127.0.0.1', 80),
+        }
+        received, status = False, []
+
+        async def receive():
+            nonlocal received
+            if received:
+                return {'type': 'http.disconnect'}
+            received = True
+            return {'type': 'http.request', 'body': data, 'more_body': False}
+
+        async def send(message):
+            if message['type'] == 'http.response.start':
+                status.append(message['status'])
+
+        await self._handler(scope, receive, send)
+        return status[0]
+
+
+class HTTPTransport:
+    """Sends requests to a running server over one keep-alive connection per thread."""
+
+    def __init__(self, base_url, timeout=30):
+        parts = urlsplit(base_url)
+        self._connection_class = http.client.HTTPSConnection if parts.scheme == 'https' else http.client.HTTPConnection
+        self._netloc, self._prefix, self._timeout = parts.netloc, parts.path.rstrip('/'), timeout
+        self._local = threading.local()
+
+    def send(self, method, path, body, authorization):
+        headers = {'Content-Type': 'application/json', 'Accept': 'application/json'}
+        if authorization:
+            headers['Authorization'] = authorization
+        data = json.dumps(body).encode() if body is not None else None
+        for attempt in range(2):
+            connection = getattr(self._local, 'connection', None)
+            if connection is None:
+                connection = self._local.connection = self._connection_class(self._netloc, timeout=self._timeout)
+            try:
+                connection.request(method, self._prefix + path, body=data, headers=headers)
+                response = connection.getresponse()
+                response.read()
+                return response.status
+            except (http.client.HTTPException, OSError):
+                # Reconnect once if the server closed the kept-alive connection
+                connection.close()
+                self._local.connection = None
+                if attempt:
+                    raise
+
+
+READ_METHODS = ('GET', 'HEAD', 'OPTIONS')
+# Keys written by Django's CacheMiddleware and cache_page, after the alias's prefix and version
+PAGE_CACHE_KEY = 'views.decorators.cache.'
+
+
+def read_only(profile):
+    """`profile` without its writes, so replaying it leaves the database as it was."""
+    return {**profile, 'events': [event for event in profile['events'] if event['method'] in READ_METHODS]}
+
+
+def clear_page_cache():
+    """
+    Delete the cached pages from the CACHE_MIDDLEWARE_ALIAS cache, leaving its
+    other keys in place. Returns False when the backend cannot select them.
+    """
+    page_cache = caches[settings.CACHE_MIDDLEWARE_ALIAS]
+    if not isinstance(page_cache, DatabaseCache):
+        return False
+    connection = connections[router.db_for_write(page_cache.cache_model_class)]
+    table = connection.ops.quote_name(page_cache._table)
+    with connection.cursor() as cursor:
+        cursor.execute(f'DELETE FROM {table} WHERE cache_key LIKE %s', [f'%{PAGE_CACHE_KEY}%'])
+    return True
+
+
+def replay(profile, transport=None, concurrency=8, speed=1.0):
+    """
+    Send the profile's events, each at start + at / speed (as fast as
+    possible with speed 0), from `concurrency` threads. Returns (results,
+    wall seconds) where each result is (name, status, latency, lag); status 0
+    means the request failed without a response and lag is how late it was
+    sent (always 0 with speed 0).
+    """
+    transport = transport or ClientTransport()
+    tokens = _Tokens()
+    results = []
+    lock = threading.Lock()
+
+    def send(event, authorization, due):
+        sent = time.perf_counter()
+        due = sent if due is None else due
+        try:
+            status = transport.send(event['method'], event['path'], event['body'], authorization)
+        except Exception:
+            status = 0
+        finished = time.perf_counter()
+        with lock:
+            results.append((event['name'], status, finished - sent, max(0.0, sent - due)))
+
+    started = time.perf_counter()
+    if concurrency <= 1:
+        for event in profile['events']:
+            due = started + event['at'] / speed if speed else None
+            if due is not None:
+                time.sleep(max(0.0, due - time.perf_counter()))
+            send(event, tokens.header(event['user']), due)
+    else:
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            for event in profile['events']:
+                due = started + event['at'] / speed if speed else None
+                authorization = tokens.header(event['user'])
+                if due is not None:
+                    time.sleep(max(0.0, due - time.perf_counter()))
+                pool.submit(send, event, authorization, due)
+    return results, time.perf_counter() - started
+
+
+def replay_async(profile, transport=None, concurrency=8, speed=1.0):
+    """
+    `replay` from `concurrency` tasks on one event loop instead of threads,
+    with an async transport (by default `ASGITransport`).
+    """
+    return asyncio.run(_replay_async(profile, transport or ASGITransport(), concurrency, speed))
+
+
+async def _replay_async(profile, transport, concurrency, speed):
+    tokens = _Tokens()
+    header = sync_to_async(tokens.header)
+    slots = asyncio.Semaphore(concurrency)
+    results = []
+
+    async def send(event, authorization, due):
+        async with slots:
+            sent = time.perf_counter()
+            due = sent if due is None else due
+            try:
+                status = await transport.send(event['method'], event['path'], event['body'], authorization)
+            except Exception:
+                status = 0
+            finished = time.perf_counter()
+            results.append((event['name'], status, finished - sent, max(0.0, sent - due)))
+
+    started = time.perf_counter()
+    tasks = []
+    for event in profile['events']:
+        due = started + event['at'] / speed if speed else None
+        authorization = await header(event['user'])
+        if due is not None:
+            await asyncio.sleep(max(0.0, due - time.perf_counter()))
+        tasks.append(asyncio.ensure_future(send(event, authorization, due)))
+    await asyncio.gather(*tasks)
+    return results, time.perf_counter() - started
+
+
+def _stats(rows, wall):
+    latencies = np.array([latency for _, _, latency, _ in rows]) * 1000
+    p50, p90, p99 = np.percentile(latencies, [50, 90, 99]) if len(latencies) else (0, 0, 0)
+    return {
+        'requests': len(rows),
+        'rps': round(len(rows) / wall, 2) if wall else 0,
+        'client_errors': sum(1 for _, status, _, _ in rows if 400 <= status < 500),
+        'errors': sum(1 for _, status, _, _ in rows if status == 0 or status >= 500),
+        'p50_ms': round(float(p50), 2),
+        'p90_ms': round(float(p90), 2),
+        'p99_ms': round(float(p99), 2),
+        'max_ms': round(float(latencies.max()), 2) if len(latencies) else 0,
+        'mean_lag_ms': round(float(np.mean([lag for _, _, _, lag in rows]) * 1000), 2) if rows else 0,
+    }
+
+
+def summarize(results, wall):
+    """Throughput and latency percentiles overall and per endpoint name."""
+    by_name = {}
+    for row in results:
+        by_name.setdefault(row[0], []).append(row)
+    return {
+        'wall_seconds': round(wall, 3),
+        'total': _stats(results, wall),
+        'endpoints': {name: _stats(rows, wall) for name, rows in sorted(by_name.items())},
+    }
@@ -2,6 +2,8 @@
 ASGI config for school_management project.
 
 It exposes the ASGI callable as a module-level variable named ``application``.
+Requests to ``/api/events/`` are answered by the server-push stream in
+``api.realtime``; everything else goes to Django.
 
 For more information on this file, see
 https://docs.djangoproject.com/en/5.2/howto/deployment/asgi/
@@ -13,4 +15,17 @@ from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'school_management.settings')
 
-application = get_asgi_application()
+django_application = get_asgi_application()
+
+# Imported after Django is set up
+from api.realtime import EventStreamApp  # noqa: E402
+
+EVENTS_PATH = '/api/events/'
+event_stream = EventStreamApp()
+
+
+async def application(scope, receive, send):
+    if scope['type'] == 'http' and scope['path'] == EVENTS_PATH:
+        await event_stream(scope, receive, send)
+    else:
+        await django_application(scope, receive, send)
@@ -11,7 +11,7 @@ https://docs.djangoproject.com/en/5.2/ref/settings/
 """
 # school_management/settings.py
 import os
-from decouple import config
+from decouple import Csv, config
 
 INSTALLED_APPS = [
     'django.contrib.admin',
@@ -24,6 +24,7 @@ INSTALLED_APPS = [
     # Third-party apps
     'rest_framework',
     'rest_framework_simplejwt',
+    'rest_framework_simplejwt.token_blacklist',
     'corsheaders',
 
     # Our app
@@ -64,7 +65,7 @@ ROOT_URLCONF = 'school_management.urls'
 # Django REST Framework settings
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': (
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'api.authentication.ClaimsJWTAuthentication',
     ),
     'DEFAULT_PERMISSION_CLASSES': [
         'rest_framework.permissions.IsAuthenticated',
@@ -77,8 +78,9 @@ from datetime import timedelta
 SIMPLE_JWT = {
     'ACCESS_TOKEN_LIFETIME': timedelta(minutes=15),
     'REFRESH_TOKEN_LIFETIME': timedelta(days=1),
-    'ROTATE_REFRESH_TOKENS': False,
-    'BLACKLIST_AFTER_ROTATION': False,
+    'ROTATE_REFRESH_TOKENS': True,
+    'BLACKLIST_AFTER_ROTATION': True,
+    'TOKEN_REFRESH_SERIALIZER': 'api.serializers.ClaimsTokenRefreshSerializer',
 }
 
 # ... keep the rest of the settings
@@ -149,6 +151,21 @@ AUTH_PASSWORD_VALIDATORS = [
 ]
 
 
+# Password hashing profile: 'pbkdf2' (default), 'argon2' (needs argon2-cffi) or
+# 'bcrypt' (needs bcrypt). The preferred hasher comes first; the others still verify
+# older hashes, which are upgraded on the user's next login. Measure costs for this
+# hardware with `manage.py tune_password_hasher`.
+from api.hasher_profiles import password_hashers
+
+PASSWORD_HASHER_PROFILE = config('PASSWORD_HASHER_PROFILE', default='pbkdf2')
+PASSWORD_HASHERS = password_hashers(PASSWORD_HASHER_PROFILE)
+PASSWORD_PBKDF2_ITERATIONS = config('PASSWORD_PBKDF2_ITERATIONS', default=600000, cast=int)
+PASSWORD_ARGON2_TIME_COST = config('PASSWORD_ARGON2_TIME_COST', default=2, cast=int)
+PASSWORD_ARGON2_MEMORY_COST = config('PASSWORD_ARGON2_MEMORY_COST', default=102400, cast=int)  # KiB
+PASSWORD_ARGON2_PARALLELISM = config('PASSWORD_ARGON2_PARALLELISM', default=8, cast=int)
+PASSWORD_BCRYPT_ROUNDS = config('PASSWORD_BCRYPT_ROUNDS', default=12, cast=int)
+
+
 # Internationalization
 # https://docs.djangoproject.com/en/5.2/topics/i18n/
 
@@ -189,6 +206,15 @@ CACHES = {
         'LOCATION': 'unique-snowflake',
         'TIMEOUT': 300,
     },
+    # Per-process metrics snapshots (api/metrics.py), kept apart from the page cache so they are not culled
+    'metrics': {
+        'BACKEND': 'django.core.cache.backends.db.DatabaseCache',
+        'LOCATION': 'api_metrics_cache',
+        'TIMEOUT': 600,
+        'OPTIONS': {
+            'MAX_ENTRIES': 10000,
+        }
+    },
     # Redis cache configuration
     'redis': {
         'BACKEND': 'django.core.cache.backends.redis.RedisCache',
@@ -215,3 +241,132 @@ API_CACHE_KEY_PREFIX = 'api_v1'
 
 # Cache page timeout for specific views
 CACHE_PAGE_TIMEOUT = 300
+
+# ===== ATTENDANCE STORAGE =====
+# Month in which the academic year starts. Rows from earlier academic years are
+# moved to AttendanceArchive by `manage.py archive_attendance`.
+ACADEMIC_YEAR_START_MONTH = config('ACADEMIC_YEAR_START_MONTH', default=6, cast=int)
+
+# Keep a packed 2-bits-per-day AttendanceBitmap per student and term, and serve
+# dashboard attendance from it. Backfill with `manage.py build_attendance_bitmaps`.
+ATTENDANCE_BITMAP_ENABLED = config('ATTENDANCE_BITMAP_ENABLED', default=False, cast=bool)
+
+# ===== FEE SCHEDULING =====
+# Late fees applied nightly by `manage.py schedule_fees --late-fees`: LATE_FEE_PERCENT
+# of the fee amount per started LATE_FEE_PERIOD_DAYS overdue, after a grace period.
+LATE_FEE_GRACE_DAYS = config('LATE_FEE_GRACE_DAYS', default=7, cast=int)
+LATE_FEE_PERIOD_DAYS = config('LATE_FEE_PERIOD_DAYS', default=30, cast=int)
+LATE_FEE_PERCENT = config('LATE_FEE_PERCENT', default=2.0, cast=float)
+LATE_FEE_MAX_PERIODS = config('LATE_FEE_MAX_PERIODS', default=6, cast=int)
+
+# ===== SERVER PUSH =====
+# Notifications and leave updates are pushed over SSE at /api/events/ (ASGI only).
+# Set REALTIME_REDIS_URL to fan events out across several ASGI workers/nodes;
+# without it events are delivered within the current process.
+REALTIME_REDIS_URL = config('REALTIME_REDIS_URL', default='')
+REALTIME_CHANNEL = config('REALTIME_CHANNEL', default='school_events')
+REALTIME_HEARTBEAT_SECONDS = config('REALTIME_HEARTBEAT_SECONDS', default=15, cast=int)
+
+# ===== TIMETABLE GENERATION =====
+# Upper bound on the solver time budget accepted by POST /api/timetable/generate/,
+# which holds a server worker and searches in one process for that long.
+# `manage.py generate_timetable --budget` is not capped and runs parallel searches.
+TIMETABLE_SOLVER_MAX_SECONDS = config('TIMETABLE_SOLVER_MAX_SECONDS', default=10, cast=float)
+# Per-class/per-teacher schedule indexes behind /api/me/today/ are cached under the
+# current timetable version (bumped on every timetable write); this bounds how long
+# renamed classes or teachers can show their old names.
+SCHEDULE_CACHE_SECONDS = config('SCHEDULE_CACHE_SECONDS', default=3600, cast=int)
+
+# ===== AUTHENTICATION =====
+# Access tokens carry signed role/profile claims (api/authentication.py). When a
+# user's claims change their tokens are revoked through a shared map that each
+# process re-reads at most this often.
+AUTH_REVOCATION_REFRESH_SECONDS = config('AUTH_REVOCATION_REFRESH_SECONDS', default=5, cast=float)
+# Blacklisted token ids are checked against an in-process set synced from the
+# token_blacklist tables this often. Run `manage.py flushexpiredtokens` daily.
+AUTH_BLACKLIST_SYNC_SECONDS = config('AUTH_BLACKLIST_SYNC_SECONDS', default=5, cast=float)
+# Token-bucket throttling of POST /api/auth/login/, kept in the per-process 'locmem'
+# cache: a burst of N attempts, refilled at PER_MINUTE. Per IP it must cover a whole
+# school behind one NAT; per username it stops password guessing.
+LOGIN_THROTTLE_CACHE = config('LOGIN_THROTTLE_CACHE', default='locmem')
+LOGIN_THROTTLE_IP_BURST = config('LOGIN_THROTTLE_IP_BURST', default=1200, cast=int)
+LOGIN_THROTTLE_IP_PER_MINUTE = config('LOGIN_THROTTLE_IP_PER_MINUTE', default=600, cast=float)
+LOGIN_THROTTLE_USER_BURST = config('LOGIN_THROTTLE_USER_BURST', default=10, cast=int)
+LOGIN_THROTTLE_USER_PER_MINUTE = config('LOGIN_THROTTLE_USER_PER_MINUTE', default=5, cast=float)
+
+# ===== LOAD TESTING =====
+# Set to a file path to append every API request to it as a JSON line
+# (api/workload.py); `manage.py make_workload --from-log` turns the capture into a
+# profile that `manage.py replay_workload` can replay. Leave unset in production.
+WORKLOAD_RECORD_FILE = config('WORKLOAD_RECORD_FILE', default='')
+if WORKLOAD_RECORD_FILE:
+    # Outermost, so requests answered by the page cache are recorded too
+    MIDDLEWARE.insert(0, 'api.workload.WorkloadRecorderMiddleware')
+
+# ===== PROFILING =====
+# Opt-in per-request profiling (api/profiling.py): Server-Timing headers with DB time,
+# query and cache counts, a rotating JSON log of slow requests with their top SQL,
+# and sampled cProfile dumps. Adds overhead; enable for diagnosis, not permanently.
+PROFILING_ENABLED = config('PROFILING_ENABLED', default=False, cast=bool)
+PROFILING_SLOW_REQUEST_MS = config('PROFILING_SLOW_REQUEST_MS', default=500, cast=float)
+PROFILING_SLOW_LOG = config('PROFILING_SLOW_LOG', default=str(BASE_DIR / 'logs' / 'slow_requests.log'))
+PROFILING_SLOW_LOG_MAX_BYTES = config('PROFILING_SLOW_LOG_MAX_BYTES', default=10 * 1024 * 1024, cast=int)
+PROFILING_SLOW_LOG_BACKUPS = config('PROFILING_SLOW_LOG_BACKUPS', default=5, cast=int)
+# A statement run this many times in one request is reported as a likely N+1 loop
+PROFILING_DUPLICATE_QUERY_THRESHOLD = config('PROFILING_DUPLICATE_QUERY_THRESHOLD', default=3, cast=int)
+PROFILING_CPROFILE_SAMPLE_RATE = config('PROFILING_CPROFILE_SAMPLE_RATE', default=0.0, cast=float)
+PROFILING_CPROFILE_THRESHOLD_MS = config('PROFILING_CPROFILE_THRESHOLD_MS', default=1000, cast=float)
+PROFILING_CPROFILE_DIR = config('PROFILING_CPROFILE_DIR', default=str(BASE_DIR / 'logs' / 'profiles'))
+if PROFILING_ENABLED:
+    # Outermost, so the timings include the page cache and every other middleware
+    MIDDLEWARE.insert(0, 'api.profiling.RequestProfilerMiddleware')
+
+# ===== METRICS =====
+# Prometheus metrics at GET /metrics (api/metrics.py): request counts and latency per
+# route name, SQL per database alias, cache hits/misses per cache alias, open event
+# streams and report generation times. Each worker publishes its counters to the
+# METRICS_CACHE_ALIAS cache every METRICS_FLUSH_SECONDS and a scrape sums the workers
+# seen within METRICS_PROCESS_TTL_SECONDS. Scrapes need `Authorization: Bearer
+# <METRICS_TOKEN>`; without a token /metrics is only served when DEBUG is on, so
+# metrics are collected by default only when a token (or DEBUG) is set.
+METRICS_TOKEN = config('METRICS_TOKEN', default='')
+METRICS_ENABLED = config('METRICS_ENABLED', default=bool(METRICS_TOKEN) or DEBUG, cast=bool)
+METRICS_FLUSH_SECONDS = config('METRICS_FLUSH_SECONDS', default=10, cast=float)
+METRICS_PROCESS_TTL_SECONDS = config('METRICS_PROCESS_TTL_SECONDS', default=600, cast=int)
+METRICS_CACHE_ALIAS = config('METRICS_CACHE_ALIAS', default='metrics')
+if METRICS_ENABLED:
+    # Outermost, so requests answered by the page cache are counted too
+    MIDDLEWARE.insert(0, 'api.metrics.MetricsMiddleware')
+
+# ===== HEALTH CHECKS =====
+# /api/health/live/ is liveness (no dependencies touched); /api/health/ready/ (and
+# /api/health/) probe the database, caches, report storage and event relay in
+# parallel (api/health.py). A probe slower than the timeout counts as failed, and
+# each process reuses results for HEALTH_CACHE_SECONDS. Only the critical probes
+# return 503; the others report "degraded".
+HEALTH_PROBE_TIMEOUT_SECONDS = config('HEALTH_PROBE_TIMEOUT_SECONDS', default=2, cast=float)
+HEALTH_CACHE_SECONDS = config('HEALTH_CACHE_SECONDS', default=5, cast=float)
+# Caches the app reads and writes; the 'redis' alias above is not used unless configured
+HEALTH_CACHE_ALIASES = config('HEALTH_CACHE_ALIASES', default='default,locmem', cast=Csv())
+HEALTH_CRITICAL_PROBES = config('HEALTH_CRITICAL_PROBES', default='database,cache', cast=Csv())
+HEALTH_REPORT_MIN_FREE_MB = config('HEALTH_REPORT_MIN_FREE_MB', default=100, cast=int)
+
+# ===== ASYNC VIEWS =====
+# The student dashboard, student details and class details views (api/async_views.py)
+# run their independent reads concurrently in a pool of this many threads per process,
+# each with its own database connection. Serve them from `school_management.asgi`; with
+# PostgreSQL set CONN_MAX_AGE so the pool's connections are reused between requests.
+ASYNC_READ_WORKERS = config('ASYNC_READ_WORKERS', default=8, cast=int)
+
+# ===== BATCH REQUESTS =====
+# POST /api/batch/ runs up to this many API calls in one request, authenticated once
+# and sharing one identity map (api/batch.py). Larger batches are rejected with 400.
+BATCH_MAX_REQUESTS = config('BATCH_MAX_REQUESTS', default=25, cast=int)
+
+# ===== IDENTITY MAP =====
+# Each request gets an identity map (api/identity.py): rows loaded by primary key
+# are shared by every serializer in the request, and list serializers load the
+# related rows they render with one query per relation instead of one per row.
+IDENTITY_MAP_ENABLED = config('IDENTITY_MAP_ENABLED', default=True, cast=bool)
+if IDENTITY_MAP_ENABLED:
+    MIDDLEWARE.append('api.identity.IdentityMapMiddleware')